@@ -0,0 +1,158 @@
+"""
+登录用户依赖
+解码token并加载当前用户的身份信息（用户、学生/教师档案、班级），按用户ID短时缓存
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from fastapi import Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
+from jose import jwt
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.core.config import settings
+from app.db.session import get_db
+from app.models.base import StudentProfile, TeacherProfile, User
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
+
+# User 的列名（与属性名一致）
+USER_FIELDS = tuple(column.key for column in User.__table__.columns)
+
+
+class Principal:
+    """
+    当前登录用户的身份信息
+
+    Args:
+        user_fields: User 的全部列（属性名 -> 值）
+        student_profile_id: 学生档案ID，不是学生或没有档案时为None
+        teacher_profile_id: 教师档案ID，不是教师或没有档案时为None
+        class_id: 学生所在班级ID
+    """
+
+    def __init__(
+        self,
+        user_fields: Dict[str, Any],
+        student_profile_id: Optional[int] = None,
+        teacher_profile_id: Optional[int] = None,
+        class_id: Optional[int] = None
+    ):
+        self.user_fields = user_fields
+        self.user_id: int = user_fields["id"]
+        self.role: str = user_fields["role"]
+        self.student_profile_id = student_profile_id
+        self.teacher_profile_id = teacher_profile_id
+        self.class_id = class_id
+
+
+async def load_principal(db: AsyncSession, user_id: int) -> Optional[Principal]:
+    """一次查询用户及其学生、教师档案，用户不存在时返回None"""
+    user_columns = [getattr(User, field) for field in USER_FIELDS]
+    result = await db.execute(
+        select(
+            *user_columns,
+            StudentProfile.id.label("student_profile_id"),
+            StudentProfile.class_id.label("class_id"),
+            TeacherProfile.id.label("teacher_profile_id"),
+        )
+        .outerjoin(StudentProfile, StudentProfile.user_id == User.id)
+        .outerjoin(TeacherProfile, TeacherProfile.user_id == User.id)
+        .where(User.id == user_id)
+        .limit(1)
+    )
+    row = result.first()
+    if row is None:
+        return None
+    mapping = row._mapping
+    return Principal(
+        {field: mapping[column] for field, column in zip(USER_FIELDS, user_columns)},
+        student_profile_id=mapping["student_profile_id"],
+        teacher_profile_id=mapping["teacher_profile_id"],
+        class_id=mapping["class_id"],
+    )
+
+
+class PrincipalCache:
+    """
+    登录用户身份信息缓存（按最近使用淘汰）
+
+    Args:
+        ttl: 缓存时间（秒），0表示不缓存
+        max_size: 最多缓存的用户数
+    """
+
+    def __init__(self, ttl: int = 30, max_size: int = 10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+
+    async def get(self, db: AsyncSession, user_id: int) -> Optional[Principal]:
+        entry = self._entries.get(user_id)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(user_id)
+            return entry[1]
+        principal = await load_principal(db, user_id)
+        if principal is None:
+            self._entries.pop(user_id, None)
+            return None
+        if self.ttl > 0:
+            self._entries[user_id] = (time.monotonic() + self.ttl, principal)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return principal
+
+    def invalidate(self, user_id: int) -> None:
+        """用户信息、档案或密码变更后清除其缓存"""
+        self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+# 创建全局登录用户缓存实例
+principal_cache = PrincipalCache(
+    ttl=settings.AUTH_PRINCIPAL_CACHE_TTL,
+    max_size=settings.AUTH_PRINCIPAL_CACHE_SIZE
+)
+
+
+def decode_user_id(token: str) -> int:
+    """从token中取出用户ID，token无效时返回401"""
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        return int(payload["sub"])
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+async def get_current_principal(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db),
+) -> Principal:
+    """当前登录用户的身份信息（含学生、教师档案ID和班级ID）"""
+    principal = await principal_cache.get(db, decode_user_id(token))
+    if principal is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+        )
+    return principal
+
+
+async def get_current_user(
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db),
+) -> User:
+    """当前登录用户（绑定到请求的数据库会话）"""
+    user = User(**principal.user_fields)
+    make_transient_to_detached(user)
+    return await db.merge(user, load=False)
@@ -8,17 +8,18 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import func, and_
 from pydantic import BaseModel
-import pandas as pd
 import hashlib
 
 from app.db.session import get_db
+from app.api.deps import principal_cache
 from app.models.base import User, StudentProfile, TeacherProfile, Class, Major, EnrollmentOrder, Organization
 from app.schemas import user as user_schemas
 from app.core import security
+from app.services.org_stats_service import org_stats_cache
 from app.utils.import_utils import (
-    parse_excel_file, generate_excel_template,
-    check_duplicate_username, check_duplicate_email, check_duplicate_phone,
-    check_duplicate_student_no, check_duplicate_class_name
+    parse_excel_file, generate_excel_template, excel_row_numbers,
+    clean_text_column, parse_number_column, mark_file_duplicates,
+    find_existing_values, bulk_insert
 )
 
 def generate_random_password(length: int = 6) -> str:
@@ -245,7 +246,7 @@ async def create_student(
     # Create User
     user = User(
         username=student_in.username,
-        hashed_password=security.get_password_hash(student_in.password),
+        hashed_password=await security.get_password_hash_async(student_in.password),
         full_name=student_in.full_name,
         email=student_in.email if student_in.email else None,
         phone=student_in.phone,
@@ -270,6 +271,7 @@ async def create_student(
     db.add(profile)
     try:
         await db.commit()
+        org_stats_cache.invalidate()
     except Exception as e:
         await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to create student profile: {str(e)}")
@@ -326,7 +328,7 @@ async def update_student(
     
     # Handle password hashing if provided
     if "password" in update_data:
-        update_data["hashed_password"] = security.get_password_hash(update_data.pop("password"))
+        update_data["hashed_password"] = await security.get_password_hash_async(update_data.pop("password"))
     
     for field, value in update_data.items():
         if hasattr(student, field):
@@ -381,6 +383,8 @@ async def update_student(
             profile.updated_at = datetime.utcnow()
     
     await db.commit()
+    org_stats_cache.invalidate()
+    principal_cache.invalidate(student_id)
     await db.refresh(student)
     return student
 
@@ -402,6 +406,8 @@ async def delete_student(
     student.is_active = False
     student.updated_at = datetime.utcnow()
     await db.commit()
+    org_stats_cache.invalidate()
+    principal_cache.invalidate(student_id)
     return {"message": "Student deleted successfully", "id": student_id}
 
 @router.post("/students/import")
@@ -412,7 +418,7 @@ async def import_students(
     """批量导入学生"""
     try:
         # 解析Excel文件
-        df = parse_excel_file(file)
+        df = await parse_excel_file(file)
         
         # 验证必需的列
         required_columns = ["姓名", "学号", "用户名", "手机号", "所属班级ID"]
@@ -423,84 +429,101 @@ async def import_students(
                 detail=f"缺少必需的列: {', '.join(missing_columns)}"
             )
         
-        # 验证数据
+        # 整列清洗
+        row_numbers = excel_row_numbers(df)
+        full_names = clean_text_column(df, "姓名")
+        student_nos = clean_text_column(df, "学号")
+        usernames = clean_text_column(df, "用户名")
+        phones = clean_text_column(df, "手机号")
+        emails = clean_text_column(df, "邮箱（可选）")
+        class_ids = parse_number_column(df, "所属班级ID")
+        
+        # 每列一次查询，找出数据库中已存在的值
+        existing_student_nos = await find_existing_values(db, StudentProfile.student_no, student_nos)
+        existing_usernames = await find_existing_values(db, User.username, usernames)
+        existing_phones = await find_existing_values(db, User.phone, phones)
+        existing_emails = await find_existing_values(db, User.email, emails)
+        class_result = await db.execute(
+            select(Class.id, Class.major_id).where(
+                and_(
+                    Class.id.in_(list({cid for cid in class_ids if isinstance(cid, int)})),
+                    Class.is_active == True
+                )
+            )
+        )
+        class_majors = {row.id: row.major_id for row in class_result}
+        
+        # 文件内重复
+        dup_student_nos = mark_file_duplicates(student_nos)
+        dup_usernames = mark_file_duplicates(usernames)
+        dup_phones = mark_file_duplicates(phones)
+        dup_emails = mark_file_duplicates(emails)
+        
+        # 验证数据（每行只报告第一个错误）
         errors = []
         students_to_create = []
         
-        for idx, row in df.iterrows():
-            row_num = idx + 2  # Excel行号
-            
-            # 获取姓名
-            full_name = str(row["姓名"]).strip() if pd.notna(row["姓名"]) else None
+        for i, row_num in enumerate(row_numbers):
+            full_name = full_names[i]
             if not full_name:
                 errors.append(f"第{row_num}行: 姓名不能为空")
                 continue
             
-            # 获取学号
-            student_no = str(row["学号"]).strip() if pd.notna(row["学号"]) else None
+            student_no = student_nos[i]
             if not student_no:
                 errors.append(f"第{row_num}行: 学号不能为空")
                 continue
-            
-            # 检查学号重复
-            if await check_duplicate_student_no(db, student_no):
+            if student_no in existing_student_nos:
                 errors.append(f"第{row_num}行: 学号 '{student_no}' 已存在")
                 continue
+            if dup_student_nos[i]:
+                errors.append(f"第{row_num}行: 学号 '{student_no}' 在文件中重复")
+                continue
             
-            # 获取用户名
-            username = str(row["用户名"]).strip() if pd.notna(row["用户名"]) else None
+            username = usernames[i]
             if not username:
                 errors.append(f"第{row_num}行: 用户名不能为空")
                 continue
-            
-            # 检查用户名重复
-            if await check_duplicate_username(db, username):
+            if username in existing_usernames:
                 errors.append(f"第{row_num}行: 用户名 '{username}' 已存在")
                 continue
+            if dup_usernames[i]:
+                errors.append(f"第{row_num}行: 用户名 '{username}' 在文件中重复")
+                continue
             
-            # 获取手机号
-            phone = str(row["手机号"]).strip() if pd.notna(row["手机号"]) else None
+            phone = phones[i]
             if not phone:
                 errors.append(f"第{row_num}行: 手机号不能为空")
                 continue
-            
-            # 检查手机号重复
-            if await check_duplicate_phone(db, phone):
+            if phone in existing_phones:
                 errors.append(f"第{row_num}行: 手机号 '{phone}' 已存在")
                 continue
+            if dup_phones[i]:
+                errors.append(f"第{row_num}行: 手机号 '{phone}' 在文件中重复")
+                continue
             
-            # 获取邮箱（可选）
-            email = None
-            if "邮箱（可选）" in df.columns and pd.notna(row["邮箱（可选）"]):
-                email_str = str(row["邮箱（可选）"]).strip()
-                if email_str:
-                    # 简单验证邮箱格式
-                    if "@" not in email_str:
-                        errors.append(f"第{row_num}行: 邮箱格式错误")
-                        continue
-                    email = email_str
-                    # 检查邮箱重复
-                    if await check_duplicate_email(db, email):
-                        errors.append(f"第{row_num}行: 邮箱 '{email}' 已存在")
-                        continue
-            
-            # 获取所属班级ID
-            try:
-                class_id = int(row["所属班级ID"])
-                # 验证班级是否存在
-                class_result = await db.execute(
-                    select(Class).where(and_(Class.id == class_id, Class.is_active == True))
-                )
-                class_obj = class_result.scalars().first()
-                if not class_obj:
-                    errors.append(f"第{row_num}行: 所属班级ID {class_id} 不存在")
+            # 邮箱（可选）
+            email = emails[i]
+            if email:
+                # 简单验证邮箱格式
+                if "@" not in email:
+                    errors.append(f"第{row_num}行: 邮箱格式错误")
+                    continue
+                if email in existing_emails:
+                    errors.append(f"第{row_num}行: 邮箱 '{email}' 已存在")
                     continue
-                
-                # 获取专业ID（从班级关联）
-                major_id = class_obj.major_id
-            except (ValueError, TypeError):
+                if dup_emails[i]:
+                    errors.append(f"第{row_num}行: 邮箱 '{email}' 在文件中重复")
+                    continue
+            
+            # 所属班级ID，专业ID从班级关联
+            class_id = class_ids[i]
+            if not isinstance(class_id, int):
                 errors.append(f"第{row_num}行: 所属班级ID格式错误")
                 continue
+            if class_id not in class_majors:
+                errors.append(f"第{row_num}行: 所属班级ID {class_id} 不存在")
+                continue
             
             students_to_create.append({
                 "full_name": full_name,
@@ -509,7 +532,7 @@ async def import_students(
                 "phone": phone,
                 "email": email,
                 "class_id": class_id,
-                "major_id": major_id
+                "major_id": class_majors[class_id]
             })
         
         # 如果有错误，返回错误信息
@@ -530,35 +553,37 @@ async def import_students(
             )
         
         # 开始事务，批量创建学生
-        created_count = 0
         try:
-            for student_data in students_to_create:
-                # 创建用户（默认密码：12345678）
-                password_hash = security.get_password_hash("12345678")
-                user = User(
-                    username=student_data["username"],
-                    hashed_password=password_hash,
-                    full_name=student_data["full_name"],
-                    email=student_data["email"],
-                    phone=student_data["phone"],
-                    role="student",
-                    is_active=True
-                )
-                db.add(user)
-                await db.flush()  # 获取user.id
-                
-                # 创建学生档案
-                profile = StudentProfile(
-                    user_id=user.id,
-                    student_no=student_data["student_no"],
-                    class_id=student_data["class_id"],
-                    major_id=student_data["major_id"],
-                    status="active"
-                )
-                db.add(profile)
-                created_count += 1
+            # 默认密码：12345678，每个用户独立加盐，在进程池中并行计算
+            password_hashes = await security.get_password_hashes(["12345678"] * len(students_to_create))
+            user_ids = await bulk_insert(db, User, [
+                {
+                    "username": student_data["username"],
+                    "hashed_password": password_hash,
+                    "full_name": student_data["full_name"],
+                    "email": student_data["email"],
+                    "phone": student_data["phone"],
+                    "role": "student",
+                    "is_active": True,
+                }
+                for student_data, password_hash in zip(students_to_create, password_hashes)
+            ], returning=User.id)
+            
+            # 创建学生档案
+            await bulk_insert(db, StudentProfile, [
+                {
+                    "user_id": user_id,
+                    "student_no": student_data["student_no"],
+                    "class_id": student_data["class_id"],
+                    "major_id": student_data["major_id"],
+                    "status": "active",
+                }
+                for student_data, user_id in zip(students_to_create, user_ids)
+            ])
+            created_count = len(user_ids)
             
             await db.commit()
+            org_stats_cache.invalidate()
             
             return {
                 "message": f"成功导入 {created_count} 条学生数据",
@@ -704,7 +729,7 @@ async def create_teacher(
     # Create User with teacher role
     user = User(
         username=username,  # Use phone as username
-        hashed_password=security.get_password_hash(password),
+        hashed_password=await security.get_password_hash_async(password),
         full_name=teacher_in.full_name,
         email=teacher_in.email,
         phone=teacher_in.phone,
@@ -767,6 +792,7 @@ async def update_teacher(
     user.updated_at = datetime.utcnow()
         
     await db.commit()
+    principal_cache.invalidate(teacher_id)
     return {"message": "Teacher updated successfully"}
 
 @router.post("/teachers/{teacher_id}/reset-password")
@@ -784,9 +810,10 @@ async def reset_teacher_password(
     new_password = generate_random_password(6)
     
     # 更新密码
-    user.hashed_password = security.get_password_hash(new_password)
+    user.hashed_password = await security.get_password_hash_async(new_password)
     user.updated_at = datetime.utcnow()
     await db.commit()
+    principal_cache.invalidate(teacher_id)
     await db.refresh(user)
     
     return {
@@ -817,6 +844,7 @@ async def delete_teacher(
     user.is_active = False
     user.updated_at = datetime.utcnow()
     await db.commit()
+    principal_cache.invalidate(teacher_id)
     return {"message": "Teacher deleted successfully", "id": teacher_id}
 
 @router.get("/teachers/template")
@@ -844,7 +872,7 @@ async def import_teachers(
     """批量导入教师"""
     try:
         # 解析Excel文件
-        df = parse_excel_file(file)
+        df = await parse_excel_file(file)
         
         # 验证必需的列
         required_columns = ["姓名", "手机号", "所属专业ID"]
@@ -855,71 +883,73 @@ async def import_teachers(
                 detail=f"缺少必需的列: {', '.join(missing_columns)}"
             )
         
-        # 验证数据
+        # 整列清洗
+        row_numbers = excel_row_numbers(df)
+        full_names = clean_text_column(df, "姓名")
+        phones = clean_text_column(df, "手机号")
+        emails = clean_text_column(df, "邮箱（可选）")
+        titles = clean_text_column(df, "职称（可选）")
+        major_ids = parse_number_column(df, "所属专业ID")
+        
+        # 每列一次查询，找出数据库中已存在的值（用户名使用手机号）
+        existing_phones = await find_existing_values(db, User.phone, phones)
+        existing_usernames = await find_existing_values(db, User.username, phones)
+        existing_emails = await find_existing_values(db, User.email, emails)
+        valid_major_ids = await find_existing_values(db, Major.id, major_ids, Major.is_active == True)
+        
+        # 文件内重复
+        dup_phones = mark_file_duplicates(phones)
+        dup_emails = mark_file_duplicates(emails)
+        
+        # 验证数据（每行只报告第一个错误）
         errors = []
         teachers_to_create = []
         
-        for idx, row in df.iterrows():
-            row_num = idx + 2  # Excel行号
-            
-            # 获取姓名
-            full_name = str(row["姓名"]).strip() if pd.notna(row["姓名"]) else None
+        for i, row_num in enumerate(row_numbers):
+            full_name = full_names[i]
             if not full_name:
                 errors.append(f"第{row_num}行: 姓名不能为空")
                 continue
             
-            # 获取手机号
-            phone = str(row["手机号"]).strip() if pd.notna(row["手机号"]) else None
+            phone = phones[i]
             if not phone:
                 errors.append(f"第{row_num}行: 手机号不能为空")
                 continue
-            
-            # 检查手机号重复
-            if await check_duplicate_phone(db, phone):
+            if phone in existing_phones:
                 errors.append(f"第{row_num}行: 手机号 '{phone}' 已存在")
                 continue
+            if dup_phones[i]:
+                errors.append(f"第{row_num}行: 手机号 '{phone}' 在文件中重复")
+                continue
             
             # 用户名使用手机号
             username = phone
-            
-            # 检查用户名重复
-            if await check_duplicate_username(db, username):
+            if username in existing_usernames:
                 errors.append(f"第{row_num}行: 手机号 '{phone}' 对应的用户名已存在")
                 continue
             
-            # 获取邮箱（可选）
-            email = None
-            if "邮箱（可选）" in df.columns and pd.notna(row["邮箱（可选）"]):
-                email_str = str(row["邮箱（可选）"]).strip()
-                if email_str:
-                    # 简单验证邮箱格式
-                    if "@" not in email_str:
-                        errors.append(f"第{row_num}行: 邮箱格式错误")
-                        continue
-                    email = email_str
-                    # 检查邮箱重复
-                    if await check_duplicate_email(db, email):
-                        errors.append(f"第{row_num}行: 邮箱 '{email}' 已存在")
-                        continue
-            
-            # 获取所属专业ID
-            try:
-                major_id = int(row["所属专业ID"])
-                # 验证专业是否存在
-                major_result = await db.execute(
-                    select(Major).where(and_(Major.id == major_id, Major.is_active == True))
-                )
-                if not major_result.scalars().first():
-                    errors.append(f"第{row_num}行: 所属专业ID {major_id} 不存在")
+            # 邮箱（可选）
+            email = emails[i]
+            if email:
+                # 简单验证邮箱格式
+                if "@" not in email:
+                    errors.append(f"第{row_num}行: 邮箱格式错误")
+                    continue
+                if email in existing_emails:
+                    errors.append(f"第{row_num}行: 邮箱 '{email}' 已存在")
                     continue
-            except (ValueError, TypeError):
+                if dup_emails[i]:
+                    errors.append(f"第{row_num}行: 邮箱 '{email}' 在文件中重复")
+                    continue
+            
+            # 所属专业ID
+            major_id = major_ids[i]
+            if not isinstance(major_id, int):
                 errors.append(f"第{row_num}行: 所属专业ID格式错误")
                 continue
-            
-            # 获取职称（可选）
-            title = None
-            if "职称（可选）" in df.columns and pd.notna(row["职称（可选）"]):
-                title = str(row["职称（可选）"]).strip()
+            if major_id not in valid_major_ids:
+                errors.append(f"第{row_num}行: 所属专业ID {major_id} 不存在")
+                continue
             
             teachers_to_create.append({
                 "full_name": full_name,
@@ -927,7 +957,7 @@ async def import_teachers(
                 "phone": phone,
                 "email": email,
                 "major_id": major_id,
-                "title": title
+                "title": titles[i]
             })
         
         # 如果有错误，返回错误信息
@@ -948,31 +978,32 @@ async def import_teachers(
             )
         
         # 开始事务，批量创建教师
-        created_count = 0
         try:
-            for teacher_data in teachers_to_create:
-                # 创建用户（默认密码：12345678）
-                password_hash = security.get_password_hash("12345678")
-                user = User(
-                    username=teacher_data["username"],
-                    hashed_password=password_hash,
-                    full_name=teacher_data["full_name"],
-                    email=teacher_data["email"],
-                    phone=teacher_data["phone"],
-                    role="teacher",
-                    is_active=True
-                )
-                db.add(user)
-                await db.flush()  # 获取user.id
-                
-                # 创建教师档案
-                profile = TeacherProfile(
-                    user_id=user.id,
-                    major_id=teacher_data["major_id"],
-                    title=teacher_data["title"]
-                )
-                db.add(profile)
-                created_count += 1
+            # 默认密码：12345678，每个用户独立加盐，在进程池中并行计算
+            password_hashes = await security.get_password_hashes(["12345678"] * len(teachers_to_create))
+            user_ids = await bulk_insert(db, User, [
+                {
+                    "username": teacher_data["username"],
+                    "hashed_password": password_hash,
+                    "full_name": teacher_data["full_name"],
+                    "email": teacher_data["email"],
+                    "phone": teacher_data["phone"],
+                    "role": "teacher",
+                    "is_active": True,
+                }
+                for teacher_data, password_hash in zip(teachers_to_create, password_hashes)
+            ], returning=User.id)
+            
+            # 创建教师档案
+            await bulk_insert(db, TeacherProfile, [
+                {
+                    "user_id": user_id,
+                    "major_id": teacher_data["major_id"],
+                    "title": teacher_data["title"],
+                }
+                for teacher_data, user_id in zip(teachers_to_create, user_ids)
+            ])
+            created_count = len(user_ids)
             
             await db.commit()
             
@@ -1172,6 +1203,7 @@ async def create_class(
         }
     )
     await db.commit()
+    org_stats_cache.invalidate()
     row = result.fetchone()
     if not row:
         raise HTTPException(status_code=500, detail="Failed to create class")
@@ -1237,6 +1269,7 @@ async def update_class(
         params
     )
     await db.commit()
+    org_stats_cache.invalidate()
     row = result.fetchone()
     if not row:
         raise HTTPException(status_code=404, detail="Class not found")
@@ -1287,6 +1320,7 @@ async def delete_class(
     class_obj.is_active = False
     class_obj.updated_at = datetime.utcnow()
     await db.commit()
+    org_stats_cache.invalidate()
     
     return {"message": "Class deleted successfully", "id": class_id}
 
@@ -1315,7 +1349,7 @@ async def import_classes(
     """批量导入班级"""
     try:
         # 解析Excel文件
-        df = parse_excel_file(file)
+        df = await parse_excel_file(file)
         
         # 验证必需的列
         required_columns = ["班级名称", "所属专业ID", "年级"]
@@ -1326,54 +1360,52 @@ async def import_classes(
                 detail=f"缺少必需的列: {', '.join(missing_columns)}"
             )
         
-        # 验证数据
+        # 整列清洗
+        row_numbers = excel_row_numbers(df)
+        names = clean_text_column(df, "班级名称")
+        major_ids = parse_number_column(df, "所属专业ID")
+        grades = clean_text_column(df, "年级")
+        codes = clean_text_column(df, "班级代码（可选）")
+        
+        # 每列一次查询
+        existing_names = await find_existing_values(db, Class.name, names, Class.is_active == True)
+        valid_major_ids = await find_existing_values(db, Major.id, major_ids, Major.is_active == True)
+        dup_names = mark_file_duplicates(names)
+        
+        # 验证数据（每行只报告第一个错误）
         errors = []
         classes_to_create = []
         
-        for idx, row in df.iterrows():
-            row_num = idx + 2  # Excel行号
-            
-            # 获取班级名称
-            name = str(row["班级名称"]).strip() if pd.notna(row["班级名称"]) else None
+        for i, row_num in enumerate(row_numbers):
+            name = names[i]
             if not name:
                 errors.append(f"第{row_num}行: 班级名称不能为空")
                 continue
-            
-            # 检查重复
-            if await check_duplicate_class_name(db, name):
+            if name in existing_names:
                 errors.append(f"第{row_num}行: 班级名称 '{name}' 已存在")
                 continue
+            if dup_names[i]:
+                errors.append(f"第{row_num}行: 班级名称 '{name}' 在文件中重复")
+                continue
             
-            # 获取所属专业ID
-            try:
-                major_id = int(row["所属专业ID"])
-                # 验证专业是否存在
-                major_result = await db.execute(
-                    select(Major).where(and_(Major.id == major_id, Major.is_active == True))
-                )
-                if not major_result.scalars().first():
-                    errors.append(f"第{row_num}行: 所属专业ID {major_id} 不存在")
-                    continue
-            except (ValueError, TypeError):
+            major_id = major_ids[i]
+            if not isinstance(major_id, int):
                 errors.append(f"第{row_num}行: 所属专业ID格式错误")
                 continue
+            if major_id not in valid_major_ids:
+                errors.append(f"第{row_num}行: 所属专业ID {major_id} 不存在")
+                continue
             
-            # 获取年级
-            grade = str(row["年级"]).strip() if pd.notna(row["年级"]) else None
+            grade = grades[i]
             if not grade:
                 errors.append(f"第{row_num}行: 年级不能为空")
                 continue
             
-            # 获取班级代码（可选）
-            code = None
-            if "班级代码（可选）" in df.columns and pd.notna(row["班级代码（可选）"]):
-                code = str(row["班级代码（可选）"]).strip()
-            
             classes_to_create.append({
                 "name": name,
                 "major_id": major_id,
                 "grade": grade,
-                "code": code
+                "code": codes[i]
             })
         
         # 如果有错误，返回错误信息
@@ -1394,19 +1426,15 @@ async def import_classes(
             )
         
         # 开始事务，批量创建班级
-        created_count = 0
         try:
-            for class_data in classes_to_create:
-                class_obj = Class(
-                    name=class_data["name"],
-                    major_id=class_data["major_id"],
-                    grade=class_data["grade"],
-                    code=class_data["code"]
-                )
-                db.add(class_obj)
-                created_count += 1
+            await bulk_insert(db, Class, [
+                {**class_data, "is_active": True}
+                for class_data in classes_to_create
+            ])
+            created_count = len(classes_to_create)
             
             await db.commit()
+            org_stats_cache.invalidate()
             
             return {
                 "message": f"成功导入 {created_count} 条班级数据",
@@ -1577,9 +1605,10 @@ async def reset_user_password(
     
     # 重置密码为111111
     new_password = "111111"
-    user.hashed_password = security.get_password_hash(new_password)
+    user.hashed_password = await security.get_password_hash_async(new_password)
     
     await db.commit()
+    principal_cache.invalidate(user_id)
     
     return {
         "message": "Password reset successfully",
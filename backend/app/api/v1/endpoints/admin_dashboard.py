@@ -3,6 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_, text
 from datetime import datetime, timedelta
+from app.core.security import password_hasher
 from app.db.session import get_db
 from app.models.base import User, TeacherProfile, StudentProfile, Major, Class, Course
 from app.models.exam import Exam
@@ -118,7 +119,8 @@ async def get_dashboard_statistics(
             "system_health": {
                 "database_status": database_status,
                 "api_status": api_status,
-                "storage_usage": storage_usage
+                "storage_usage": storage_usage,
+                "password_hashing": password_hasher.stats()
             }
         }
     
@@ -2,15 +2,17 @@
 AI智能创作API端点
 用于生成、保存和导出AI创作的教学内容
 """
-from typing import Any, List, Optional
+from typing import Any, List, Optional, Tuple
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from pydantic import BaseModel
+import asyncio
 import io
 import os
 import uuid
+import time
 import logging
 from datetime import datetime
 from urllib.parse import quote
@@ -22,7 +24,11 @@ from app.models.teaching_resource import TeachingResource
 from app.models.base import User
 from app.utils.oss_client import oss_client
 from app.utils.markdown_to_word import markdown_to_word
-import httpx
+from app.utils.llm_call_logger import log_llm_call, enqueue_llm_call_log, STREAM_CANCELLED_MESSAGE
+from app.utils.sse import format_sse, sse_response
+from app.utils.extraction_executor import extract_docx_paragraphs, extraction_executor
+from app.services.llm_gateway import llm_gateway
+from app.services.resource_knowledge import sync_resource_knowledge_points
 import json
 
 router = APIRouter()
@@ -82,13 +88,8 @@ async def parse_file_content(file: UploadFile) -> str:
         elif filename.endswith('.pdf'):
             # PDF文件
             try:
-                from PyPDF2 import PdfReader
-                pdf_file = io.BytesIO(content_bytes)
-                reader = PdfReader(pdf_file)
-                text = ""
-                for page in reader.pages:
-                    text += page.extract_text() + "\n"
-                return text
+                pages = await extraction_executor.extract_pdf_pages(content_bytes)
+                return "".join(page_text + "\n" for page_text in pages)
             except Exception as e:
                 logger.error(f"PDF解析失败: {str(e)}")
                 return f"[PDF文件解析失败: {str(e)}]"
@@ -96,13 +97,8 @@ async def parse_file_content(file: UploadFile) -> str:
         elif filename.endswith(('.doc', '.docx')):
             # Word文件
             try:
-                from docx import Document
-                doc_file = io.BytesIO(content_bytes)
-                doc = Document(doc_file)
-                text = ""
-                for para in doc.paragraphs:
-                    text += para.text + "\n"
-                return text
+                paragraphs = await extraction_executor.run(extract_docx_paragraphs, content_bytes)
+                return "".join(paragraph + "\n" for paragraph in paragraphs)
             except Exception as e:
                 logger.error(f"Word文件解析失败: {str(e)}")
                 return f"[Word文件解析失败: {str(e)}]"
@@ -126,273 +122,156 @@ def build_knowledge_tree_text(nodes: List[dict], level: int = 0) -> str:
     return result
 
 
-async def call_openai_compatible(config: LLMConfig, prompt: str) -> str:
-    """调用OpenAI兼容的API"""
-    endpoint_url = config.endpoint_url
+async def prepare_generation(
+    db: AsyncSession,
+    knowledge_point: str,
+    graph_id: int,
+    teacher_id: int,
+    custom_prompt: str,
+    selected_resource_ids: str,
+    auxiliary_files: List[UploadFile]
+) -> Tuple[Optional[LLMConfig], str, Optional[str]]:
+    """
+    准备AI生成：获取LLM配置、知识图谱结构和辅助资料，构建提示词
     
-    # 检查endpoint_url是否已经包含chat/completions
-    if not endpoint_url.endswith('/chat/completions'):
-        endpoint_url = f"{endpoint_url.rstrip('/')}/chat/completions"
+    Returns:
+        (LLM配置, 提示词, 错误信息)，出错时LLM配置为None
+    """
+    # 1. 获取激活的LLM配置
+    result = await db.execute(
+        select(LLMConfig).where(LLMConfig.is_active == True)
+    )
+    config = result.scalars().first()
     
-    headers = {
-        "Authorization": f"Bearer {config.api_key}",
-        "Content-Type": "application/json"
-    }
+    if not config:
+        return None, "", "未找到激活的LLM配置，请先在管理后台配置并启用LLM"
     
-    data = {
-        "model": config.model_name,
-        "messages": [
-            {"role": "user", "content": prompt}
-        ],
-        "temperature": 0.7,
-        "max_tokens": 4000
-    }
+    if not config.api_key:
+        return None, "", "LLM配置的API Key未设置"
     
-    try:
-        # 增加超时到5分钟，AI生成长文本需要较长时间
-        async with httpx.AsyncClient(timeout=300.0) as client:
-            logger.info(f"调用LLM API: {endpoint_url}, 模型: {config.model_name}")
-            response = await client.post(endpoint_url, json=data, headers=headers)
-            response.raise_for_status()
-            result = response.json()
-            logger.info(f"LLM API调用成功，返回内容长度: {len(result['choices'][0]['message']['content'])}")
-            return result["choices"][0]["message"]["content"]
-    except httpx.TimeoutException as e:
-        error_msg = f"AI生成超时（超过5分钟），请稍后重试或简化提示词"
-        logger.error(f"LLM API超时: {str(e)}")
-        raise Exception(error_msg)
-    except httpx.HTTPStatusError as e:
-        error_msg = f"AI生成失败: HTTP {e.response.status_code}"
-        logger.error(f"LLM API HTTP错误: {e.response.status_code} - {e.response.text[:200]}")
-        raise Exception(error_msg)
-    except KeyError as e:
-        error_msg = f"AI返回数据格式错误"
-        logger.error(f"LLM API返回数据解析失败: {str(e)}")
-        raise Exception(error_msg)
-    except Exception as e:
-        logger.error(f"LLM API调用异常: {type(e).__name__} - {str(e)}")
-        raise
-
-
-async def call_aliyun_qwen(config: LLMConfig, prompt: str) -> str:
-    """调用阿里云通义千问API"""
-    import dashscope
+    # 2. 获取知识图谱树形结构
+    graph_result = await db.execute(
+        select(KnowledgeGraph).where(
+            KnowledgeGraph.id == graph_id,
+            KnowledgeGraph.teacher_id == teacher_id
+        )
+    )
+    graph = graph_result.scalars().first()
     
-    dashscope.api_key = config.api_key
+    if not graph:
+        return None, "", "知识图谱不存在"
     
-    response = dashscope.Generation.call(
-        model=config.model_name or "qwen-turbo",
-        prompt=prompt,
-        max_tokens=4000
+    # 获取知识图谱的所有节点
+    nodes_result = await db.execute(
+        select(KnowledgeNode).where(
+            KnowledgeNode.graph_id == graph_id
+        ).order_by(KnowledgeNode.id)
     )
+    all_nodes = nodes_result.scalars().all()
     
-    if response.status_code == 200:
-        return response.output.text
-    else:
-        raise Exception(f"通义千问API调用失败: {response.message}")
-
-
-async def call_wenxin(config: LLMConfig, prompt: str) -> str:
-    """调用百度文心一言API"""
-    # 文心一言需要access_token
-    token_url = "https://aip.baidubce.com/oauth/2.0/token"
+    # 构建树形结构
+    def build_tree(parent_id: Optional[int]) -> List[dict]:
+        children = []
+        for node in all_nodes:
+            if node.parent_id == parent_id:
+                node_dict = {
+                    'id': node.id,
+                    'node_name': node.node_name,
+                    'children': build_tree(node.id)
+                }
+                children.append(node_dict)
+        return children
     
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        # 获取access_token
-        token_params = {
-            "grant_type": "client_credentials",
-            "client_id": config.api_key,
-            "client_secret": config.api_secret
-        }
-        token_response = await client.post(token_url, params=token_params)
-        token_response.raise_for_status()
-        access_token = token_response.json()["access_token"]
-        
-        # 调用生成API
-        api_url = f"{config.endpoint_url}?access_token={access_token}"
-        data = {
-            "messages": [
-                {"role": "user", "content": prompt}
-            ]
-        }
-        response = await client.post(api_url, json=data)
-        response.raise_for_status()
-        result = response.json()
-        return result["result"]
-
-
-# ==================== API端点 ====================
-
-@router.post("/generate", response_model=GenerateResponse)
-async def ai_generate_content(
-    knowledge_point: str = Form(...),
-    graph_id: int = Form(...),
-    teacher_id: int = Form(...),
-    custom_prompt: str = Form(default=""),
-    selected_resource_ids: str = Form(default=""),  # 逗号分隔的ID列表
-    auxiliary_files: List[UploadFile] = File(default=[]),
-    db: AsyncSession = Depends(get_db),
-) -> Any:
-    """
-    AI生成教学内容
-    """
-    try:
-        # 1. 获取激活的LLM配置
-        result = await db.execute(
-            select(LLMConfig).where(LLMConfig.is_active == True)
-        )
-        config = result.scalars().first()
-        
-        if not config:
-            return GenerateResponse(
-                success=False,
-                error="未找到激活的LLM配置，请先在管理后台配置并启用LLM"
-            )
-        
-        if not config.api_key:
-            return GenerateResponse(
-                success=False,
-                error="LLM配置的API Key未设置"
-            )
-        
-        # 2. 获取知识图谱树形结构
-        graph_result = await db.execute(
-            select(KnowledgeGraph).where(
-                KnowledgeGraph.id == graph_id,
-                KnowledgeGraph.teacher_id == teacher_id
-            )
-        )
-        graph = graph_result.scalars().first()
-        
-        if not graph:
-            return GenerateResponse(
-                success=False,
-                error="知识图谱不存在"
-            )
-        
-        # 获取知识图谱的所有节点
-        nodes_result = await db.execute(
-            select(KnowledgeNode).where(
-                KnowledgeNode.graph_id == graph_id
-            ).order_by(KnowledgeNode.id)
-        )
-        all_nodes = nodes_result.scalars().all()
-        
-        # 构建树形结构
-        def build_tree(parent_id: Optional[int]) -> List[dict]:
-            children = []
-            for node in all_nodes:
-                if node.parent_id == parent_id:
-                    node_dict = {
-                        'id': node.id,
-                        'node_name': node.node_name,
-                        'children': build_tree(node.id)
-                    }
-                    children.append(node_dict)
-            return children
-        
-        tree = build_tree(None)
-        knowledge_tree_text = build_knowledge_tree_text(tree)
-        
-        # 3. 处理选中的资源
-        auxiliary_content = ""
-        total_size = 0
-        
-        # 3.1 处理选中的教学资源
-        if selected_resource_ids:
-            try:
-                resource_ids = [int(id.strip()) for id in selected_resource_ids.split(',') if id.strip()]
-                for resource_id in resource_ids:
-                    # 获取资源信息
-                    resource_result = await db.execute(
-                        select(TeachingResource).where(TeachingResource.id == resource_id)
-                    )
-                    resource = resource_result.scalars().first()
-                    
-                    if resource and resource.file_path:
-                        try:
-                            from app.utils.oss_client import get_oss_client
-                            oss_client_instance = get_oss_client()
+    tree = build_tree(None)
+    knowledge_tree_text = build_knowledge_tree_text(tree)
+    
+    # 3. 处理选中的资源
+    auxiliary_content = ""
+    total_size = 0
+    
+    # 3.1 处理选中的教学资源
+    if selected_resource_ids:
+        try:
+            resource_ids = [int(id.strip()) for id in selected_resource_ids.split(',') if id.strip()]
+            for resource_id in resource_ids:
+                # 获取资源信息
+                resource_result = await db.execute(
+                    select(TeachingResource).where(TeachingResource.id == resource_id)
+                )
+                resource = resource_result.scalars().first()
+                
+                if resource and resource.file_path:
+                    try:
+                        from app.utils.oss_client import get_oss_client
+                        oss_client_instance = get_oss_client()
+                        
+                        if oss_client_instance and oss_client_instance.enabled:
+                            # 从OSS读取文件内容
+                            file_content = await asyncio.to_thread(oss_client_instance.bucket.get_object, resource.file_path)
+                            content_bytes = await asyncio.to_thread(file_content.read)
                             
-                            if oss_client_instance and oss_client_instance.enabled:
-                                # 从OSS读取文件内容
-                                file_content = oss_client_instance.bucket.get_object(resource.file_path)
-                                content_bytes = file_content.read()
-                                
-                                # 根据资源类型解析内容
-                                resource_text = ""
-                                if resource.resource_type in ['txt', 'markdown']:
-                                    try:
-                                        resource_text = content_bytes.decode('utf-8')
-                                    except:
-                                        try:
-                                            resource_text = content_bytes.decode('gbk')
-                                        except:
-                                            resource_text = "[文本内容无法解析]"
-                                elif resource.resource_type == 'pdf':
+                            # 根据资源类型解析内容
+                            resource_text = ""
+                            if resource.resource_type in ['txt', 'markdown']:
+                                try:
+                                    resource_text = content_bytes.decode('utf-8')
+                                except:
                                     try:
-                                        from PyPDF2 import PdfReader
-                                        pdf_file = io.BytesIO(content_bytes)
-                                        reader = PdfReader(pdf_file)
-                                        for page in reader.pages:
-                                            resource_text += page.extract_text() + "\n"
+                                        resource_text = content_bytes.decode('gbk')
                                     except:
-                                        resource_text = "[PDF内容无法解析]"
-                                elif resource.resource_type == 'word':
-                                    try:
-                                        from docx import Document
-                                        doc_file = io.BytesIO(content_bytes)
-                                        doc = Document(doc_file)
-                                        for para in doc.paragraphs:
-                                            resource_text += para.text + "\n"
-                                    except:
-                                        resource_text = "[Word内容无法解析]"
-                                
-                                if resource_text:
-                                    auxiliary_content += f"\n\n--- {resource.resource_name} ---\n{resource_text}\n"
-                                    total_size += len(resource_text)
-                        except Exception as e:
-                            logger.warning(f"Failed to read resource {resource_id}: {str(e)}")
-            except Exception as e:
-                logger.error(f"Failed to process selected resources: {str(e)}")
-        
-        # 3.2 处理上传的辅助文件
-        for file in auxiliary_files:
-            # 检查文件大小
-            file_content = await file.read()
-            file_size = len(file_content)
-            total_size += file_size
-            
-            if total_size > MAX_FILE_SIZE:
-                return GenerateResponse(
-                    success=False,
-                    error=f"辅助资料总大小超过限制（{MAX_FILE_SIZE / 1024 / 1024}MB）"
-                )
-            
-            # 重置文件指针
-            await file.seek(0)
-            
-            # 解析文件内容
-            content = await parse_file_content(file)
-            auxiliary_content += f"\n\n--- {file.filename} ---\n{content}\n"
-        
-        # 检查总内容长度
-        if len(auxiliary_content) > MAX_CONTENT_LENGTH:
-            return GenerateResponse(
-                success=False,
-                error="辅助资料内容太大，无法处理（限制60k字符）"
-            )
-        
-        # 4. 构建AI提示词
-        auxiliary_section = ""
-        if auxiliary_content.strip():
-            auxiliary_section = f"\n\n## 辅助参考资料\n{auxiliary_content}"
-        
-        custom_section = ""
-        if custom_prompt.strip():
-            custom_section = f"\n\n## 用户补充要求\n{custom_prompt.strip()}"
-        
-        prompt = f"""请根据以下知识点生成详细的教学讲解内容。
+                                        resource_text = "[文本内容无法解析]"
+                            elif resource.resource_type == 'pdf':
+                                try:
+                                    pages = await extraction_executor.extract_pdf_pages(content_bytes)
+                                    resource_text = "".join(page_text + "\n" for page_text in pages)
+                                except:
+                                    resource_text = "[PDF内容无法解析]"
+                            elif resource.resource_type == 'word':
+                                try:
+                                    paragraphs = await extraction_executor.run(extract_docx_paragraphs, content_bytes)
+                                    resource_text = "".join(paragraph + "\n" for paragraph in paragraphs)
+                                except:
+                                    resource_text = "[Word内容无法解析]"
+                            
+                            if resource_text:
+                                auxiliary_content += f"\n\n--- {resource.resource_name} ---\n{resource_text}\n"
+                                total_size += len(resource_text)
+                    except Exception as e:
+                        logger.warning(f"Failed to read resource {resource_id}: {str(e)}")
+        except Exception as e:
+            logger.error(f"Failed to process selected resources: {str(e)}")
+    
+    # 3.2 处理上传的辅助文件
+    for file in auxiliary_files:
+        # 检查文件大小
+        file_content = await file.read()
+        file_size = len(file_content)
+        total_size += file_size
+        
+        if total_size > MAX_FILE_SIZE:
+            return None, "", f"辅助资料总大小超过限制（{MAX_FILE_SIZE / 1024 / 1024}MB）"
+        
+        # 重置文件指针
+        await file.seek(0)
+        
+        # 解析文件内容
+        content = await parse_file_content(file)
+        auxiliary_content += f"\n\n--- {file.filename} ---\n{content}\n"
+    
+    # 检查总内容长度
+    if len(auxiliary_content) > MAX_CONTENT_LENGTH:
+        return None, "", "辅助资料内容太大，无法处理（限制60k字符）"
+    
+    # 4. 构建AI提示词
+    auxiliary_section = ""
+    if auxiliary_content.strip():
+        auxiliary_section = f"\n\n## 辅助参考资料\n{auxiliary_content}"
+    
+    custom_section = ""
+    if custom_prompt.strip():
+        custom_section = f"\n\n## 用户补充要求\n{custom_prompt.strip()}"
+    
+    prompt = f"""请根据以下知识点生成详细的教学讲解内容。
 
 ## 知识图谱结构
 {knowledge_tree_text}
@@ -412,6 +291,49 @@ async def ai_generate_content(
 
 请直接输出Markdown格式的教学内容，不要包含其他说明文字。
 """
+    
+    return config, prompt, None
+
+
+def clean_generated_content(content: str) -> str:
+    """清理内容（去除可能的markdown代码块标记）"""
+    content = content.strip()
+    if content.startswith('```markdown'):
+        content = content[11:].strip()
+    elif content.startswith('```'):
+        content = content[3:].strip()
+    if content.endswith('```'):
+        content = content[:-3].strip()
+    return content
+
+
+# ==================== API端点 ====================
+
+@router.post("/generate", response_model=GenerateResponse)
+async def ai_generate_content(
+    knowledge_point: str = Form(...),
+    graph_id: int = Form(...),
+    teacher_id: int = Form(...),
+    custom_prompt: str = Form(default=""),
+    selected_resource_ids: str = Form(default=""),  # 逗号分隔的ID列表
+    auxiliary_files: List[UploadFile] = File(default=[]),
+    db: AsyncSession = Depends(get_db),
+) -> Any:
+    """
+    AI生成教学内容
+    """
+    try:
+        config, prompt, error = await prepare_generation(
+            db=db,
+            knowledge_point=knowledge_point,
+            graph_id=graph_id,
+            teacher_id=teacher_id,
+            custom_prompt=custom_prompt,
+            selected_resource_ids=selected_resource_ids,
+            auxiliary_files=auxiliary_files
+        )
+        if error:
+            return GenerateResponse(success=False, error=error)
         
         # 5. 调用LLM API
         provider_key = config.provider_key
@@ -428,13 +350,7 @@ async def ai_generate_content(
             related_type="knowledge_graph"
         ) as log_context:
             try:
-                if provider_key == "aliyun_qwen":
-                    content = await call_aliyun_qwen(config, prompt)
-                elif provider_key in ["deepseek", "kimi", "volcengine_doubao", "siliconflow"]:
-                    content = await call_openai_compatible(config, prompt)
-                elif provider_key == "wenxin":
-                    content = await call_wenxin(config, prompt)
-                else:
+                if not llm_gateway.is_supported(provider_key):
                     error_msg = f"不支持的LLM提供商: {provider_key}"
                     log_context.set_result(None, status='failed', error_message=error_msg)
                     return GenerateResponse(
@@ -442,6 +358,8 @@ async def ai_generate_content(
                         error=error_msg
                     )
                 
+                # AI生成长文本需要较长时间，超时设置为5分钟
+                content = await llm_gateway.chat(config, prompt, max_tokens=4000, timeout=300.0)
                 log_context.set_result(content, status='success')
             except Exception as e:
                 logger.error(f"LLM API调用失败: {str(e)}")
@@ -451,18 +369,9 @@ async def ai_generate_content(
                     error=f"AI生成失败: {str(e)}"
                 )
         
-        # 清理内容（去除可能的markdown代码块标记）
-        content = content.strip()
-        if content.startswith('```markdown'):
-            content = content[11:].strip()
-        elif content.startswith('```'):
-            content = content[3:].strip()
-        if content.endswith('```'):
-            content = content[:-3].strip()
-        
         return GenerateResponse(
             success=True,
-            content=content
+            content=clean_generated_content(content)
         )
     
     except Exception as e:
@@ -473,6 +382,79 @@ async def ai_generate_content(
         )
 
 
+@router.post("/generate/stream")
+async def ai_generate_content_stream(
+    knowledge_point: str = Form(...),
+    graph_id: int = Form(...),
+    teacher_id: int = Form(...),
+    custom_prompt: str = Form(default=""),
+    selected_resource_ids: str = Form(default=""),  # 逗号分隔的ID列表
+    auxiliary_files: List[UploadFile] = File(default=[]),
+    db: AsyncSession = Depends(get_db),
+) -> Any:
+    """
+    AI生成教学内容（Server-Sent Events流式返回）
+    
+    事件：
+    - delta: 增量文本 {"content": "..."}
+    - done: 生成完成 {"content": 清理后的完整内容}
+    - error: 生成失败 {"detail": "..."}
+    """
+    config, prompt, error = await prepare_generation(
+        db=db,
+        knowledge_point=knowledge_point,
+        graph_id=graph_id,
+        teacher_id=teacher_id,
+        custom_prompt=custom_prompt,
+        selected_resource_ids=selected_resource_ids,
+        auxiliary_files=auxiliary_files
+    )
+    if not error and not llm_gateway.is_supported(config.provider_key):
+        error = f"不支持的LLM提供商: {config.provider_key}"
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    
+    # 提示词准备完毕后释放数据库连接，流式生成期间不占用连接池
+    await db.close()
+    
+    async def event_stream():
+        start_time = time.perf_counter()
+        chunks: List[str] = []
+        # 没有正常结束（客户端断开，生成器在yield处被关闭）时按中途断开记录
+        error_message: Optional[str] = STREAM_CANCELLED_MESSAGE
+        try:
+            try:
+                async for delta in llm_gateway.stream_chat(config, prompt, max_tokens=4000, timeout=300.0):
+                    chunks.append(delta)
+                    yield format_sse({"content": delta}, event="delta")
+                error_message = None
+            except Exception as e:
+                logger.error(f"LLM流式调用失败: {str(e)}")
+                error_message = str(e)
+        finally:
+            # 发送结束事件前记录调用日志，客户端断开（GeneratorExit/CancelledError）时也会记录
+            await asyncio.shield(asyncio.ensure_future(enqueue_llm_call_log(
+                function_type="ai_create_resource",
+                user_id=teacher_id,
+                user_role="teacher",
+                llm_config_id=config.id,
+                prompt=prompt,
+                result="".join(chunks) if error_message is None else None,
+                execution_time_ms=int((time.perf_counter() - start_time) * 1000),
+                status='success' if error_message is None else 'failed',
+                error_message=error_message,
+                related_id=graph_id,
+                related_type="knowledge_graph"
+            )))
+        
+        if error_message is None:
+            yield format_sse({"content": clean_generated_content("".join(chunks))}, event="done")
+        else:
+            yield format_sse({"detail": f"AI生成失败: {error_message}"}, event="error")
+    
+    return sse_response(event_stream())
+
+
 @router.post("/save", response_model=SaveResponse)
 async def save_ai_content(
     request: SaveRequest,
@@ -535,6 +517,8 @@ async def save_ai_content(
         )
         
         db.add(resource)
+        await db.flush()
+        await sync_resource_knowledge_points(db, resource)
         await db.commit()
         await db.refresh(resource)
         
@@ -5,6 +5,7 @@ from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
+from app.api.deps import principal_cache
 from app.db.session import get_db
 from app.models.base import User, StudentProfile
 from app.schemas import user as user_schemas
@@ -48,7 +49,7 @@ async def login_access_token(
     
     print(f"🔑 数据库密码hash: {user.hashed_password[:50]}...")
     
-    password_valid = security.verify_password(form_data.password, user.hashed_password)
+    password_valid = await security.verify_password_async(form_data.password, user.hashed_password)
     print(f"🔐 密码验证结果: {password_valid}")
     
     if not password_valid:
@@ -58,6 +59,12 @@ async def login_access_token(
             detail="Incorrect username/phone or password",
         )
     
+    # 计算成本配置变更后，用本次登录的明文密码重新哈希
+    if security.password_needs_rehash(user.hashed_password):
+        user.hashed_password = await security.get_password_hash_async(form_data.password)
+        await db.commit()
+        principal_cache.invalidate(user.id)
+    
     print(f"✅ 登录成功! 用户角色: {user.role}")
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     return {
@@ -90,7 +97,7 @@ async def register_user(
     # Create user
     user = User(
         username=user_in.username,
-        hashed_password=security.get_password_hash(user_in.password),
+        hashed_password=await security.get_password_hash_async(user_in.password),
         full_name=user_in.full_name,
         email=user_in.email,
         role=user_in.role
@@ -1,6 +1,5 @@
 from typing import Any, List, Optional
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from fastapi.responses import FileResponse, RedirectResponse, Response
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import func
@@ -10,11 +9,12 @@ import uuid
 from pathlib import Path
 from datetime import datetime
 import logging
-import httpx
 
 from app.db.session import get_db
 from app.models.base import CourseCover
 from app.utils.oss_client import oss_client
+from app.utils.streaming_upload import stream_upload, upload_size
+from app.services.cover_image_service import COVER_VARIANTS, cover_image_service
 from app.core.config import settings
 
 router = APIRouter()
@@ -36,6 +36,7 @@ class CoverImageResponse(BaseModel):
     id: int
     filename: str
     image_url: str
+    thumbnail_url: Optional[str] = None
     file_size: Optional[int] = None
     created_at: Optional[str] = None
     
@@ -84,6 +85,7 @@ async def get_all_images(
             "id": cover.id,
             "filename": cover.filename,
             "image_url": image_url,
+            "thumbnail_url": f"/api/v1/course-covers/{cover.id}/image?size=thumbnail",
             "file_size": file_size,
             "created_at": cover.created_at.isoformat() if cover.created_at else None
         })
@@ -120,9 +122,8 @@ async def upload_image(
             detail=f"Invalid file type. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
         )
     
-    # 读取文件内容并检查大小
-    file_content = await file.read()
-    file_size = len(file_content)
+    # 检查文件大小
+    file_size = upload_size(file)
     
     if file_size > MAX_FILE_SIZE:
         raise HTTPException(
@@ -147,8 +148,11 @@ async def upload_image(
     if oss_client.enabled:
         try:
             oss_key = f"course_covers/{filename}"
-            oss_url = oss_client.upload_file(file_content, oss_key, content_type=content_type)
-            logger.info(f"封面已上传到OSS: {oss_key}, URL: {oss_url}")
+            stored = await stream_upload(file, oss_key=oss_key, content_type=content_type, max_size=MAX_FILE_SIZE)
+            file_size = stored.size
+            oss_url = stored.oss_url
+            if oss_url:
+                logger.info(f"封面已上传到OSS: {oss_key}, URL: {oss_url}")
         except Exception as e:
             logger.error(f"上传到OSS失败: {e}，将保存到本地")
             oss_url = None
@@ -157,8 +161,8 @@ async def upload_image(
     if not oss_url:
         file_path = UPLOAD_DIR / filename
         try:
-            with open(file_path, "wb") as f:
-                f.write(file_content)
+            stored = await stream_upload(file, local_path=file_path, max_size=MAX_FILE_SIZE)
+            file_size = stored.size
             logger.info(f"封面已保存到本地: {file_path}")
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
@@ -168,6 +172,10 @@ async def upload_image(
         # 使用OSS URL
         stored_filename = oss_url
     
+    # 生成列表页使用的尺寸变体（封面不超过2MB，直接读取上传内容）
+    await file.seek(0)
+    await cover_image_service.create_variants(stored_filename, await file.read())
+    
     # 获取当前最大的 sort_order（用于排序）
     max_order_result = await db.execute(
         select(func.max(CourseCover.sort_order)).where(CourseCover.course_id.is_(None))
@@ -215,7 +223,8 @@ async def delete_image(
     if not cover:
         raise HTTPException(status_code=404, detail="Image not found")
     
-    # 删除文件
+    # 删除文件（包括尺寸变体）
+    await cover_image_service.delete_variants(cover.filename)
     if is_oss_url(cover.filename):
         # OSS文件，从OSS URL中提取key
         try:
@@ -280,6 +289,7 @@ async def update_image(
             if old_path.exists():
                 try:
                     old_path.rename(new_path)
+                    await cover_image_service.delete_variants(cover.filename)
                     cover.filename = new_filename
                 except Exception as e:
                     raise HTTPException(status_code=500, detail=f"Failed to rename file: {str(e)}")
@@ -328,9 +338,8 @@ async def replace_image(
             detail=f"Invalid file type. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
         )
     
-    # 读取文件内容并检查大小
-    file_content = await file.read()
-    file_size = len(file_content)
+    # 检查文件大小
+    file_size = upload_size(file)
     
     if file_size > MAX_FILE_SIZE:
         raise HTTPException(
@@ -346,7 +355,8 @@ async def replace_image(
     }
     content_type = content_type_map.get(file_ext, "image/jpeg")
     
-    # 删除旧文件
+    # 删除旧文件（包括尺寸变体）
+    await cover_image_service.delete_variants(cover.filename)
     if is_oss_url(cover.filename):
         # OSS文件，从OSS删除
         try:
@@ -384,8 +394,11 @@ async def replace_image(
     if oss_client.enabled:
         try:
             oss_key = f"course_covers/{filename}"
-            oss_url = oss_client.upload_file(file_content, oss_key, content_type=content_type)
-            logger.info(f"新封面已上传到OSS: {oss_key}, URL: {oss_url}")
+            stored = await stream_upload(file, oss_key=oss_key, content_type=content_type, max_size=MAX_FILE_SIZE)
+            file_size = stored.size
+            oss_url = stored.oss_url
+            if oss_url:
+                logger.info(f"新封面已上传到OSS: {oss_key}, URL: {oss_url}")
         except Exception as e:
             logger.error(f"上传到OSS失败: {e}，将保存到本地")
             oss_url = None
@@ -394,8 +407,8 @@ async def replace_image(
     if not oss_url:
         file_path = UPLOAD_DIR / filename
         try:
-            with open(file_path, "wb") as f:
-                f.write(file_content)
+            stored = await stream_upload(file, local_path=file_path, max_size=MAX_FILE_SIZE)
+            file_size = stored.size
             logger.info(f"新封面已保存到本地: {file_path}")
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
@@ -403,6 +416,10 @@ async def replace_image(
     else:
         stored_filename = oss_url
     
+    # 生成列表页使用的尺寸变体（封面不超过2MB，直接读取上传内容）
+    await file.seek(0)
+    await cover_image_service.create_variants(stored_filename, await file.read())
+    
     # 更新数据库记录
     cover.filename = stored_filename
     cover.file_size = file_size
@@ -426,9 +443,17 @@ async def replace_image(
 @router.get("/{image_id}/image")
 async def get_image(
     image_id: int,
+    request: Request,
+    size: Optional[str] = Query(None, description="尺寸变体：thumbnail/card/full，不传返回原图"),
     db: AsyncSession = Depends(get_db),
 ):
-    """获取图片文件（OSS或本地）"""
+    """获取图片文件（OSS或本地，支持尺寸变体和条件请求）"""
+    if size is not None and size not in COVER_VARIANTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid size. Allowed sizes: {', '.join(COVER_VARIANTS)}"
+        )
+    
     # 移除course_id限制，允许获取所有封面（包括已关联到课程的）
     result = await db.execute(
         select(CourseCover).where(
@@ -440,61 +465,12 @@ async def get_image(
     if not cover:
         raise HTTPException(status_code=404, detail="Image not found")
     
-    # 如果是OSS URL，代理返回图片内容（避免CORS问题）
-    if is_oss_url(cover.filename):
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(cover.filename, timeout=10.0)
-                if response.status_code == 200:
-                    # 根据文件扩展名确定媒体类型
-                    filename_lower = cover.filename.lower()
-                    if filename_lower.endswith((".jpg", ".jpeg")):
-                        media_type = "image/jpeg"
-                    elif filename_lower.endswith(".png"):
-                        media_type = "image/png"
-                    elif filename_lower.endswith(".gif"):
-                        media_type = "image/gif"
-                    elif filename_lower.endswith(".webp"):
-                        media_type = "image/webp"
-                    else:
-                        media_type = "image/jpeg"  # 默认
-                    
-                    return Response(
-                        content=response.content,
-                        media_type=media_type,
-                        headers={
-                            "Cache-Control": "public, max-age=31536000",  # 缓存1年
-                        }
-                    )
-                else:
-                    raise HTTPException(status_code=404, detail="Failed to fetch image from OSS")
-        except Exception as e:
-            logger.error(f"Failed to fetch image from OSS: {e}")
-            raise HTTPException(status_code=500, detail="Failed to fetch image from OSS")
-    
-    # 本地文件
-    file_path = UPLOAD_DIR / cover.filename
-    
-    if not file_path.exists():
+    try:
+        image = await cover_image_service.get(cover.filename, size)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Image file not found")
+    except Exception as e:
+        logger.error(f"Failed to fetch image from OSS: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch image from OSS")
     
-    # 根据文件扩展名确定媒体类型
-    filename_lower = cover.filename.lower()
-    if filename_lower.endswith((".jpg", ".jpeg")):
-        media_type = "image/jpeg"
-    elif filename_lower.endswith(".png"):
-        media_type = "image/png"
-    elif filename_lower.endswith(".gif"):
-        media_type = "image/gif"
-    elif filename_lower.endswith(".webp"):
-        media_type = "image/webp"
-    else:
-        media_type = "image/jpeg"  # 默认
-    
-    return FileResponse(
-        file_path,
-        media_type=media_type,
-        headers={
-            "Cache-Control": "public, max-age=31536000",  # 缓存1年
-        }
-    )
+    return cover_image_service.response(request, image)
@@ -9,6 +9,7 @@ from pydantic import BaseModel
 from datetime import datetime
 
 from app.db.session import get_db
+from app.api.deps import get_current_user
 from app.models.course_outline import CourseSectionResource, CourseChapterExamPaper, CourseSectionHomework, CourseChapterExam, HomeworkAttachment
 from app.models.base import Course, CourseChapter
 from app.models.teaching_resource import TeachingResource
@@ -16,40 +17,7 @@ from app.models.reference_material import ReferenceMaterial
 from app.models.exam_paper import ExamPaper
 from app.models.exam import Exam
 from app.core import security
-from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
-from jose import jwt
-from app.core.config import settings
-
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
-
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_db),
-):
-    from app.models.base import User
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials",
-            )
-    except Exception:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-        )
-    
-    result = await db.execute(select(User).where(User.id == int(user_id)))
-    user = result.scalars().first()
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-        )
-    return user
+from app.services.course_outline_service import course_outline_cache
 
 router = APIRouter()
 
@@ -342,6 +310,7 @@ async def create_chapter(
         chapter_id = result.scalar_one()
         
         await db.commit()
+        course_outline_cache.invalidate(course_id)
         logging.info(f"章节创建成功: chapter_id={chapter_id}, course_id={course_id}")
         
         # 验证数据是否真的保存了
@@ -417,6 +386,7 @@ async def update_chapter(
         update_result = await db.execute(sql_update, update_params)
         updated_row = update_result.first()
         await db.commit()
+        course_outline_cache.invalidate(row.course_id)
         
         return {
             "id": updated_row.id,
@@ -468,6 +438,7 @@ async def delete_chapter(
         sql_delete = text("DELETE FROM course_chapter WHERE id = :chapter_id")
         await db.execute(sql_delete, {"chapter_id": chapter_id})
         await db.commit()
+        course_outline_cache.invalidate(row.course_id)
         
         logging.info(f"章节删除成功: chapter_id={chapter_id}")
         return {"message": "Chapter deleted successfully"}
@@ -545,6 +516,7 @@ async def add_section_resource(
     )
     db.add(section_resource)
     await db.commit()
+    course_outline_cache.invalidate(chapter_row.course_id)
     await db.refresh(section_resource)
     
     return {
@@ -595,6 +567,7 @@ async def remove_section_resource(
     # 删除资源关联
     await db.delete(resource)
     await db.commit()
+    course_outline_cache.invalidate(chapter_row.course_id)
     
     return {"message": "Resource removed successfully"}
 
@@ -757,6 +730,7 @@ async def create_homework(
             })
 
     await db.commit()
+    course_outline_cache.invalidate(chapter.course_id)
     await db.refresh(homework)
 
     return {
@@ -840,6 +814,7 @@ async def update_homework(
             })
 
     await db.commit()
+    course_outline_cache.invalidate(homework.chapter.course_id)
     await db.refresh(homework)
 
     return {
@@ -874,6 +849,7 @@ async def delete_homework(
     
     await db.delete(homework)
     await db.commit()
+    course_outline_cache.invalidate(homework.chapter.course_id)
     
     return {"message": "Homework deleted successfully"}
 
@@ -921,6 +897,7 @@ async def reorder_chapters(
             })
         
         await db.commit()
+        course_outline_cache.invalidate(course_id)
         logging.info(f"成功更新 {len(request.chapters)} 个章节的排序")
         
         return {"message": "Chapters reordered successfully"}
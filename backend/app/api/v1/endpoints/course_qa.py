@@ -3,7 +3,7 @@
 支持学生与AI对话，并可选择将消息发送给教师
 """
 from typing import Any, List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import desc
@@ -14,15 +14,19 @@ import logging
 from app.db.session import get_db
 from app.models.base import User
 from app.models.course_qa import CourseQASession, CourseQAMessage
-from app.api.v1.endpoints.students import get_current_user
+from app.api.deps import get_current_user
+from app.utils.sse import format_sse, sse_response
 from app.services.course_qa_service import (
     get_or_create_session,
     get_course_teachers,
     send_student_message,
+    stream_student_message,
     send_to_teachers,
     teacher_reply,
-    get_teacher_qa_sessions_grouped
+    get_teacher_qa_sessions_grouped,
+    refresh_teacher_inbox
 )
+from app.utils.pagination import InvalidCursorError
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -103,6 +107,7 @@ class TeacherQACourseGroupResponse(BaseModel):
 
 class TeacherQASessionsListResponse(BaseModel):
     courses: List[TeacherQACourseGroupResponse]
+    next_cursor: Optional[str] = None  # 下一页游标，没有下一页时为空
 
     class Config:
         from_attributes = True
@@ -319,6 +324,81 @@ async def send_message(
         raise HTTPException(status_code=500, detail=f"发送消息失败: {error_detail}")
 
 
+def _build_message_response(message: CourseQAMessage, sender_name: Optional[str]) -> MessageResponse:
+    """将消息对象转换为响应模型"""
+    return MessageResponse(
+        id=message.id,
+        session_id=message.session_id,
+        sender_id=message.sender_id,
+        sender_type=message.sender_type,
+        content=message.content,
+        message_type=message.message_type,
+        is_sent_to_teacher=message.is_sent_to_teacher or False,
+        teacher_ids=message.teacher_ids,
+        ai_response_id=message.ai_response_id,
+        parent_message_id=message.parent_message_id,
+        is_read=message.is_read or False,
+        created_at=message.created_at.isoformat() if message.created_at else "",
+        sender_name=sender_name
+    )
+
+
+@router.post("/courses/{course_id}/qa/messages/stream")
+async def send_message_stream(
+    course_id: int,
+    request: SendMessageRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> Any:
+    """
+    发送学生消息，AI回复以Server-Sent Events流式返回
+    
+    事件：
+    - student_message: 已保存的学生消息
+    - delta: AI回复的增量文本 {"content": "..."}
+    - done: 已保存的AI回复消息
+    - error: 生成失败 {"detail": "..."}（学生消息仍然保存）
+    """
+    if current_user.role != 'student':
+        raise HTTPException(status_code=403, detail="只有学生可以访问此接口")
+    
+    if not request.content.strip():
+        raise HTTPException(status_code=400, detail="消息内容不能为空")
+    
+    sender_name = current_user.full_name or current_user.username
+    try:
+        session = await get_or_create_session(
+            db=db,
+            student_id=current_user.id,
+            course_id=course_id
+        )
+        student_msg, ai_events = await stream_student_message(
+            db=db,
+            session_id=session.id,
+            student_id=current_user.id,
+            content=request.content.strip()
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"发送消息失败: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"发送消息失败: {str(e)}")
+    
+    student_payload = _build_message_response(student_msg, sender_name).model_dump()
+    
+    async def event_stream():
+        yield format_sse(student_payload, event="student_message")
+        async for event, data in ai_events:
+            if event == "delta":
+                yield format_sse({"content": data}, event="delta")
+            elif event == "done":
+                yield format_sse(_build_message_response(data, "AI助手").model_dump(), event="done")
+            else:
+                yield format_sse({"detail": data}, event="error")
+    
+    return sse_response(event_stream())
+
+
 @router.post("/courses/{course_id}/qa/messages/{message_id}/send-to-teacher", response_model=MessageResponse)
 async def send_message_to_teacher(
     course_id: int,
@@ -420,19 +500,23 @@ async def get_course_qa_teachers(
 
 @router.get("/qa/sessions", response_model=TeacherQASessionsListResponse)
 async def get_teacher_qa_sessions(
+    cursor: Optional[str] = Query(None, description="上一页返回的游标"),
+    limit: Optional[int] = Query(None, ge=1, le=200, description="每页会话数，不传时返回全部"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> Any:
     """
-    获取教师的所有问答会话，按课程分组
+    获取教师的问答会话，按课程分组（按最新消息时间倒序游标分页）
     """
     if current_user.role != 'teacher':
         raise HTTPException(status_code=403, detail="只有教师可以访问此接口")
     
     try:
-        sessions_grouped = await get_teacher_qa_sessions_grouped(
+        sessions_grouped, next_cursor = await get_teacher_qa_sessions_grouped(
             db=db,
-            teacher_id=current_user.id
+            teacher_id=current_user.id,
+            cursor=cursor,
+            limit=limit
         )
         
         # 转换为响应模型
@@ -457,8 +541,10 @@ async def get_teacher_qa_sessions(
                 students=students
             ))
         
-        return TeacherQASessionsListResponse(courses=courses)
+        return TeacherQASessionsListResponse(courses=courses, next_cursor=next_cursor)
     
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"获取教师问答会话列表失败: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -760,6 +846,8 @@ async def mark_message_as_read(
             raise HTTPException(status_code=404, detail="消息不存在或无权访问")
         
         message.is_read = True
+        await db.flush()
+        await refresh_teacher_inbox(db, message.session_id)
         await db.commit()
         await db.refresh(message)
         
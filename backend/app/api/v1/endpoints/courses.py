@@ -6,47 +6,12 @@ from sqlalchemy.orm import selectinload
 from sqlalchemy import and_, or_, func
 
 from app.db.session import get_db
+from app.api.deps import get_current_user
 from app.models.base import Course, ClassCourseRelation, TeacherProfile, User, CourseCover, Major, Class
 from app.schemas import course as course_schemas
 from app.core import security
-from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
-from jose import jwt
-from app.core.config import settings
 from pydantic import BaseModel
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
-
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_db),
-) -> User:
-    """
-    从token获取当前用户
-    """
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials",
-            )
-    except Exception:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-        )
-    
-    result = await db.execute(select(User).where(User.id == int(user_id)))
-    user = result.scalars().first()
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-        )
-    return user
-
 router = APIRouter()
 
 class LinkClassesRequest(BaseModel):
@@ -1,16 +1,17 @@
-from typing import Any, List, Optional
+from typing import Any, Dict, List, Optional
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 from sqlalchemy import and_, func
 from pydantic import BaseModel
-import random
 
 from app.db.session import get_db
 from app.models.exam_paper import ExamPaper, ExamPaperQuestion
 from app.models.question import Question
 from app.models.base import User
+from app.services.paper_composer import InsufficientQuestionsError, paper_composer
+from app.services.question_repository import load_options
 
 router = APIRouter()
 
@@ -47,11 +48,14 @@ class AutoCompositionConfig(BaseModel):
     question_type: str
     count: int
     score_per_question: float
+    difficulty_distribution: Optional[Dict[int, float]] = None  # 难度比例，如 {1: 0.3, 2: 0.5, 3: 0.2}，不填按题库中各难度的比例
+    knowledge_points: Optional[List[str]] = None  # 知识点范围，不填不限（题量尽量平均分到各知识点）
 
 class QuestionTypeConfig(BaseModel):
     question_type: str  # single_choice, multiple_choice, true_false, etc.
     count: int
     score_per_question: float
+    difficulty_distribution: Optional[Dict[int, float]] = None  # 难度比例，不填按题库中各难度的比例
 
 class AIAssembleConfig(BaseModel):
     question_configs: List[QuestionTypeConfig]
@@ -586,43 +590,26 @@ async def auto_compose_paper(
             detail=f"配置的总分值 ({total_score}) 与试卷总分值 ({paper.total_score}) 不一致"
         )
     
-    # 按题型抽取题目
-    sort_order = 1
-    added_questions = []
+    # 按题型分层抽取题目（难度比例、知识点覆盖）
+    try:
+        selected = await paper_composer.compose(db, teacher_id, configs)
+    except InsufficientQuestionsError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    for config in configs:
-        # 获取该题型的可用题目（排除已在试卷中的）
-        question_result = await db.execute(
-            select(Question).where(
-                and_(
-                    Question.teacher_id == teacher_id,
-                    Question.question_type == config.question_type,
-                    Question.is_active == True
-                )
-            ).limit(config.count)
+    # 添加到试卷
+    added_questions = []
+    for sort_order, (question, config) in enumerate(selected, start=1):
+        epq = ExamPaperQuestion(
+            exam_paper_id=paper_id,
+            question_id=question.id,
+            score=config.score_per_question,
+            sort_order=sort_order
         )
-        questions = question_result.scalars().all()
-        
-        if len(questions) < config.count:
-            raise HTTPException(
-                status_code=400,
-                detail=f"题型 {config.question_type} 的可用题目不足，需要 {config.count} 道，只有 {len(questions)} 道"
-            )
-        
-        # 添加到试卷
-        for question in questions:
-            epq = ExamPaperQuestion(
-                exam_paper_id=paper_id,
-                question_id=question.id,
-                score=config.score_per_question,
-                sort_order=sort_order
-            )
-            db.add(epq)
-            added_questions.append({
-                "question_id": question.id,
-                "score": config.score_per_question
-            })
-            sort_order += 1
+        db.add(epq)
+        added_questions.append({
+            "question_id": question.id,
+            "score": config.score_per_question
+        })
     
     await db.commit()
     
@@ -676,50 +663,27 @@ async def ai_assemble_paper(
     )
     existing_question_ids = set(existing_questions_result.scalars().all())
     
-    # 为每种题型选择题目
-    selected_questions = []
-    for cfg in config.question_configs:
-        # 查询该知识点下该题型的所有可用题目(排除已添加的)
-        questions_result = await db.execute(
-            select(Question).where(
-                and_(
-                    Question.teacher_id == teacher_id,
-                    Question.knowledge_point == paper.knowledge_point,
-                    Question.question_type == cfg.question_type,
-                    Question.is_active == True,
-                    Question.id.notin_(existing_question_ids)
-                )
-            )
+    # 在该知识点下按题型分层随机选择题目(排除已添加的)
+    try:
+        selected_questions = await paper_composer.compose(
+            db,
+            teacher_id,
+            config.question_configs,
+            knowledge_points=[paper.knowledge_point],
+            exclude_ids=existing_question_ids
+        )
+    except InsufficientQuestionsError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"知识点'{paper.knowledge_point}'下'{e.question_type}'类型的题目数量不足(需要{e.required}道,可用{e.available}道)"
         )
-        available_questions = list(questions_result.scalars().all())
-        
-        # 检查题目数量是否充足
-        if len(available_questions) < cfg.count:
-            raise HTTPException(
-                status_code=400,
-                detail=f"知识点'{paper.knowledge_point}'下'{cfg.question_type}'类型的题目数量不足(需要{cfg.count}道,可用{len(available_questions)}道)"
-            )
-        
-        # 随机选择指定数量的题目
-        selected = random.sample(available_questions, cfg.count)
-        for question in selected:
-            selected_questions.append({
-                "question": question,
-                "score": cfg.score_per_question
-            })
+    
+    # 一次查询加载所有选中题目的选项
+    options_by_question = await load_options(db, [question.id for question, _ in selected_questions])
     
     # 返回选择的题目供前端预览
     result_questions = []
-    for item in selected_questions:
-        question = item["question"]
-        # 获取选项(如果有)
-        options_result = await db.execute(
-            select(Question).options(selectinload(Question.options)).where(
-                Question.id == question.id
-            )
-        )
-        question_with_options = options_result.scalar_one_or_none()
-        
+    for question, cfg in selected_questions:
         question_data = {
             "id": question.id,
             "question_type": question.question_type,
@@ -729,20 +693,19 @@ async def ai_assemble_paper(
             "answer": question.answer,
             "explanation": question.explanation,
             "difficulty": question.difficulty,
-            "score": item["score"],
+            "score": cfg.score_per_question,
             "options": []
         }
         
-        if question_with_options and question_with_options.options:
-            question_data["options"] = [
-                {
-                    "id": opt.id,
-                    "option_text": opt.option_text,
-                    "option_image": opt.option_image,
-                    "is_correct": opt.is_correct,
-                }
-                for opt in question_with_options.options
-            ]
+        question_data["options"] = [
+            {
+                "id": opt.id,
+                "option_text": opt.option_text,
+                "option_image": opt.option_image,
+                "is_correct": opt.is_correct,
+            }
+            for opt in options_by_question[question.id]
+        ]
         
         result_questions.append(question_data)
     
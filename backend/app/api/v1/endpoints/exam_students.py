@@ -7,6 +7,7 @@ from sqlalchemy import and_, func
 from app.db.session import get_db
 from app.models.base import Major, Class, StudentProfile, User
 from app.models.exam import Exam, ExamStudent
+from app.services.exam_monitor import exam_monitor
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -247,6 +248,7 @@ async def add_students_batch(
             added_count += 1
     
     await db.commit()
+    await exam_monitor.publish_changes(exam_id, {"pending": added_count})
     
     return {
         "message": f"成功添加 {added_count} 名考生",
@@ -313,6 +315,7 @@ async def add_class_students(
             added_count += 1
     
     await db.commit()
+    await exam_monitor.publish_changes(exam_id, {"pending": added_count})
     
     return {
         "message": f"成功添加 {added_count} 名考生",
@@ -356,11 +359,15 @@ async def remove_students_batch(
     
     # 删除记录
     removed_count = 0
+    removed_by_status = {}
     for es in exam_students:
+        status_key = es.exam_status or "pending"
+        removed_by_status[status_key] = removed_by_status.get(status_key, 0) - 1
         await db.delete(es)
         removed_count += 1
     
     await db.commit()
+    await exam_monitor.publish_changes(exam_id, removed_by_status)
     
     return {
         "message": f"成功移除 {removed_count} 名考生",
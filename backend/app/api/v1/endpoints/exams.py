@@ -1,8 +1,7 @@
 from typing import Any, List, Optional
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
 from sqlalchemy import and_, func, or_
 from pydantic import BaseModel
 from datetime import datetime
@@ -14,9 +13,13 @@ from app.db.session import get_db
 from app.models.exam import Exam, ExamStudent
 from app.models.exam_paper import ExamPaper
 from app.models.base import User
-from app.models.base import StudentProfile
+from app.models.base import StudentProfile, Class
+from app.models.student_learning import StudentExamScore
 from app.services.oss_service import oss_service
 from app.core.config import settings
+from app.services.exam_monitor import exam_monitor
+from app.utils.sse import sse_response
+from app.utils.streaming_export import export_response, stream_rows
 
 router = APIRouter()
 
@@ -535,6 +538,7 @@ async def add_students(
             added_count += 1
     
     await db.commit()
+    await exam_monitor.publish_changes(exam_id, {"pending": added_count})
     
     return {
         "message": f"成功添加 {added_count} 名考生",
@@ -579,18 +583,28 @@ async def remove_student(
     if not es:
         raise HTTPException(status_code=404, detail="考生不在考试中")
     
+    removed_status = es.exam_status or "pending"
     await db.delete(es)
     await db.commit()
+    await exam_monitor.publish_changes(exam_id, {removed_status: -1})
     
     return {"message": "考生移除成功"}
 
+# 考生状态在导出文件中的显示名称
+EXAM_STATUS_LABELS = {
+    "pending": "待考试",
+    "in_progress": "考试中",
+    "submitted": "已提交",
+}
+
 @router.get("/{exam_id}/export-grades")
 async def export_grades(
     exam_id: int,
     teacher_id: int,
+    export_format: str = Query("xlsx", alias="format", pattern="^(xlsx|csv)$", description="导出格式：xlsx 或 csv"),
     db: AsyncSession = Depends(get_db),
 ) -> Any:
-    """导出考试成绩（暂时返回空数据，后续实现）"""
+    """导出考试成绩为Excel或CSV文件（流式生成）"""
     # 检查考试是否存在
     result = await db.execute(
         select(Exam).where(
@@ -606,30 +620,63 @@ async def export_grades(
     if not exam:
         raise HTTPException(status_code=404, detail="考试不存在")
     
-    # TODO: 实现成绩导出逻辑
-    # 暂时返回空数据
-    return {
-        "message": "成绩导出功能开发中",
-        "exam_id": exam_id,
-        "exam_name": exam.exam_name
-    }
+    # 每个考生取最近一次的成绩记录
+    latest_score = (
+        select(
+            StudentExamScore.student_id,
+            StudentExamScore.score,
+            StudentExamScore.total_score,
+        )
+        .where(StudentExamScore.exam_id == exam_id)
+        .distinct(StudentExamScore.student_id)
+        .order_by(StudentExamScore.student_id, StudentExamScore.created_at.desc())
+        .subquery()
+    )
+    statement = (
+        select(
+            StudentProfile.student_no,
+            User.full_name,
+            Class.name.label("class_name"),
+            ExamStudent.exam_status,
+            ExamStudent.start_time,
+            ExamStudent.submit_time,
+            latest_score.c.score,
+            latest_score.c.total_score,
+        )
+        .join(StudentProfile, StudentProfile.id == ExamStudent.student_id)
+        .outerjoin(User, User.id == StudentProfile.user_id)
+        .outerjoin(Class, Class.id == StudentProfile.class_id)
+        .outerjoin(latest_score, latest_score.c.student_id == StudentProfile.user_id)
+        .where(ExamStudent.exam_id == exam_id)
+        .order_by(StudentProfile.student_no, ExamStudent.id)
+    )
+    
+    async def rows():
+        async for row in stream_rows(statement):
+            yield [
+                row.student_no or "",
+                row.full_name or "",
+                row.class_name or "",
+                EXAM_STATUS_LABELS.get(row.exam_status, row.exam_status or ""),
+                row.start_time.strftime("%Y-%m-%d %H:%M:%S") if row.start_time else "",
+                row.submit_time.strftime("%Y-%m-%d %H:%M:%S") if row.submit_time else "",
+                row.score if row.score is not None else "",
+                row.total_score if row.total_score is not None else "",
+            ]
+    
+    return export_response(
+        f"{exam.exam_name}_成绩",
+        "成绩",
+        ["学号", "姓名", "班级", "考试状态", "开始时间", "提交时间", "得分", "总分"],
+        rows(),
+        export_format
+    )
 
 
-@router.get("/{exam_id}/statistics")
-async def get_exam_statistics(
-    exam_id: int,
-    teacher_id: int,
-    db: AsyncSession = Depends(get_db)
-) -> Any:
-    """
-    获取考试实时统计信息
-    """
-    # 验证考试是否属于该教师
+async def get_teacher_exam(db: AsyncSession, exam_id: int, teacher_id: int) -> Exam:
+    """获取教师的有效考试（不加载考生），不存在时返回404"""
     result = await db.execute(
-        select(Exam).options(
-            selectinload(Exam.exam_paper),
-            selectinload(Exam.exam_students).selectinload(ExamStudent.student)
-        ).where(
+        select(Exam).where(
             and_(
                 Exam.id == exam_id,
                 Exam.teacher_id == teacher_id,
@@ -638,24 +685,24 @@ async def get_exam_statistics(
         )
     )
     exam = result.scalar_one_or_none()
-    
     if not exam:
         raise HTTPException(status_code=404, detail="考试不存在")
-    
-    # 统计考生状态
-    pending_count = 0  # 待考试
-    in_progress_count = 0  # 考试中
-    submitted_count = 0  # 已提交
-    
-    for exam_student in exam.exam_students:
-        if exam_student.exam_status == 'pending':
-            pending_count += 1
-        elif exam_student.exam_status == 'in_progress':
-            in_progress_count += 1
-        elif exam_student.exam_status == 'submitted':
-            submitted_count += 1
-    
-    total_students = len(exam.exam_students)
+    return exam
+
+@router.get("/{exam_id}/statistics")
+async def get_exam_statistics(
+    exam_id: int,
+    teacher_id: int,
+    db: AsyncSession = Depends(get_db)
+) -> Any:
+    """
+    获取考试实时统计信息（考生状态计数来自考试监控的缓存，不加载考生列表）
+    """
+    exam = await get_teacher_exam(db, exam_id, teacher_id)
+    paper_name = (await db.execute(
+        select(ExamPaper.paper_name).where(ExamPaper.id == exam.exam_paper_id)
+    )).scalar_one_or_none()
+    counts = await exam_monitor.get_counts(db, exam_id)
     
     return {
         "exam_id": exam.id,
@@ -663,13 +710,28 @@ async def get_exam_statistics(
         "exam_date": exam.exam_date.isoformat() if exam.exam_date else None,
         "start_time": exam.start_time.isoformat() if exam.start_time else None,
         "end_time": exam.end_time.isoformat() if exam.end_time else None,
-        "exam_paper_name": exam.exam_paper.paper_name if exam.exam_paper else None,
-        "total_students": total_students,
-        "pending_count": pending_count,
-        "in_progress_count": in_progress_count,
-        "submitted_count": submitted_count,
+        "exam_paper_name": paper_name,
+        "total_students": counts["total"],
+        "pending_count": counts["pending"],
+        "in_progress_count": counts["in_progress"],
+        "submitted_count": counts["submitted"],
         "early_login_minutes": exam.early_login_minutes,
         "late_forbidden_minutes": exam.late_forbidden_minutes,
         "minimum_submission_minutes": exam.minimum_submission_minutes,
     }
 
+@router.get("/{exam_id}/monitor")
+async def monitor_exam(
+    exam_id: int,
+    teacher_id: int,
+    db: AsyncSession = Depends(get_db)
+) -> Any:
+    """
+    考试实时监控（SSE）：连接时推送完整的考生状态计数（snapshot），之后推送状态增量（delta）
+    """
+    await get_teacher_exam(db, exam_id, teacher_id)
+    counts = await exam_monitor.get_counts(db, exam_id)
+    # 释放数据库连接，推送期间不占用连接池
+    await db.close()
+    return sse_response(exam_monitor.stream(exam_id, counts))
+
@@ -5,7 +5,6 @@ from sqlalchemy.future import select
 from sqlalchemy import and_, func
 from pydantic import BaseModel
 from datetime import datetime
-import httpx
 import json
 import logging
 from pathlib import Path
@@ -17,6 +16,9 @@ from app.models.llm_config import LLMConfig
 from app.models.teaching_resource import TeachingResource
 from app.utils.pdf_extractor import pdf_extractor
 from app.utils.llm_call_logger import log_llm_call
+from app.services.llm_gateway import llm_gateway
+from app.services.knowledge_tree_cache import knowledge_tree_cache, touch_graph
+from app.services.resource_knowledge import count_resources_by_knowledge_point, resource_ids_for_knowledge_points
 
 logger = logging.getLogger(__name__)
 
@@ -248,23 +250,10 @@ async def get_graph_tree(
         ).order_by(KnowledgeNode.sort_order)
     )
     nodes = nodes_result.scalars().all()
+    knowledge_tree_cache.put(graph, nodes)
     
-    # 查询每个知识点的资源数量
-    resource_counts = {}
-    resources_result = await db.execute(
-        select(
-            TeachingResource.knowledge_point,
-            func.count(TeachingResource.id).label('count')
-        ).where(
-            and_(
-                TeachingResource.teacher_id == teacher_id,
-                TeachingResource.is_active == True,
-                TeachingResource.knowledge_point.isnot(None)
-            )
-        ).group_by(TeachingResource.knowledge_point)
-    )
-    for row in resources_result:
-        resource_counts[row.knowledge_point] = row.count
+    # 查询每个知识点的资源数量（按关联表聚合）
+    resource_counts = await count_resources_by_knowledge_point(db, teacher_id)
     
     # 构建树状结构
     tree = build_tree(nodes, resource_counts)
@@ -323,8 +312,10 @@ async def create_node(
     )
     
     db.add(node)
+    touch_graph(graph)
     await db.commit()
     await db.refresh(node)
+    knowledge_tree_cache.invalidate(graph_id)
     
     return {
         "message": "节点创建成功",
@@ -341,7 +332,7 @@ async def update_node(
 ) -> Any:
     """更新知识节点"""
     result = await db.execute(
-        select(KnowledgeNode).join(KnowledgeGraph).where(
+        select(KnowledgeNode, KnowledgeGraph).join(KnowledgeGraph).where(
             and_(
                 KnowledgeNode.id == node_id,
                 KnowledgeGraph.teacher_id == teacher_id,
@@ -350,10 +341,11 @@ async def update_node(
             )
         )
     )
-    node = result.scalars().first()
+    row = result.first()
     
-    if not node:
+    if not row:
         raise HTTPException(status_code=404, detail="节点不存在")
+    node, graph = row
     
     # 验证父节点（如果指定）
     if node_data.parent_id is not None:
@@ -374,14 +366,10 @@ async def update_node(
                 raise HTTPException(status_code=404, detail="父节点不存在")
         
         # 检查是否形成循环引用
-        current_parent_id = node_data.parent_id
-        while current_parent_id:
-            if current_parent_id == node_id:
+        if node_data.parent_id:
+            tree = await knowledge_tree_cache.get(db, graph)
+            if tree.is_descendant(node_data.parent_id, node_id):
                 raise HTTPException(status_code=400, detail="不能形成循环引用")
-            parent_check = await db.execute(
-                select(KnowledgeNode.parent_id).where(KnowledgeNode.id == current_parent_id)
-            )
-            current_parent_id = parent_check.scalar()
     
     if node_data.node_name is not None:
         node.node_name = node_data.node_name
@@ -393,7 +381,9 @@ async def update_node(
         node.sort_order = node_data.sort_order
     
     node.updated_at = datetime.utcnow()
+    touch_graph(graph)
     await db.commit()
+    knowledge_tree_cache.invalidate(graph.id)
     
     return {"message": "节点更新成功"}
 
@@ -405,7 +395,7 @@ async def delete_node(
 ) -> Any:
     """删除知识节点（逻辑删除）"""
     result = await db.execute(
-        select(KnowledgeNode).join(KnowledgeGraph).where(
+        select(KnowledgeNode, KnowledgeGraph).join(KnowledgeGraph).where(
             and_(
                 KnowledgeNode.id == node_id,
                 KnowledgeGraph.teacher_id == teacher_id,
@@ -414,10 +404,11 @@ async def delete_node(
             )
         )
     )
-    node = result.scalars().first()
+    row = result.first()
     
-    if not node:
+    if not row:
         raise HTTPException(status_code=404, detail="节点不存在")
+    node, graph = row
     
     # 检查是否有子节点
     children_result = await db.execute(
@@ -438,7 +429,9 @@ async def delete_node(
     
     node.is_active = False
     node.updated_at = datetime.utcnow()
+    touch_graph(graph)
     await db.commit()
+    knowledge_tree_cache.invalidate(graph.id)
     
     return {"message": "节点删除成功"}
 
@@ -451,7 +444,7 @@ async def move_node(
 ) -> Any:
     """移动节点到另一个父节点"""
     result = await db.execute(
-        select(KnowledgeNode).join(KnowledgeGraph).where(
+        select(KnowledgeNode, KnowledgeGraph).join(KnowledgeGraph).where(
             and_(
                 KnowledgeNode.id == node_id,
                 KnowledgeGraph.teacher_id == teacher_id,
@@ -460,10 +453,11 @@ async def move_node(
             )
         )
     )
-    node = result.scalars().first()
+    row = result.first()
     
-    if not node:
+    if not row:
         raise HTTPException(status_code=404, detail="节点不存在")
+    node, graph = row
     
     # 验证目标父节点
     if target_parent_id:
@@ -484,18 +478,15 @@ async def move_node(
             raise HTTPException(status_code=404, detail="目标父节点不存在")
         
         # 检查是否形成循环引用
-        current_parent_id = target_parent_id
-        while current_parent_id:
-            if current_parent_id == node_id:
-                raise HTTPException(status_code=400, detail="不能将节点移动到其子节点下")
-            parent_check = await db.execute(
-                select(KnowledgeNode.parent_id).where(KnowledgeNode.id == current_parent_id)
-            )
-            current_parent_id = parent_check.scalar()
+        tree = await knowledge_tree_cache.get(db, graph)
+        if tree.is_descendant(target_parent_id, node_id):
+            raise HTTPException(status_code=400, detail="不能将节点移动到其子节点下")
     
     node.parent_id = target_parent_id
     node.updated_at = datetime.utcnow()
+    touch_graph(graph)
     await db.commit()
+    knowledge_tree_cache.invalidate(graph.id)
     
     return {"message": "节点移动成功"}
 
@@ -541,7 +532,7 @@ async def ai_generate_graph_from_pdf(
     
     # 提取PDF文本
     logger.info(f"开始提取PDF文本: {file.filename}, 大小: {file_size} bytes")
-    pdf_text = pdf_extractor.extract_text_from_bytes(file_content, max_pages=50)  # 限制最多50页
+    pdf_text = await pdf_extractor.extract_text_from_bytes_async(file_content, max_pages=50)  # 限制最多50页
     
     if not pdf_text or len(pdf_text.strip()) < 100:
         return AIGenerateGraphResponse(
@@ -631,13 +622,7 @@ async def ai_generate_graph_from_pdf(
                 # 调用LLM API
                 provider_key = config.provider_key
                 
-                if provider_key == "aliyun_qwen":
-                    response_text = await _call_aliyun_qwen(config, prompt)
-                elif provider_key in ["deepseek", "kimi", "volcengine_doubao", "siliconflow"]:
-                    response_text = await _call_openai_compatible(config, prompt)
-                elif provider_key == "wenxin":
-                    response_text = await _call_wenxin(config, prompt)
-                else:
+                if not llm_gateway.is_supported(provider_key):
                     error_msg = f"不支持的LLM提供商: {provider_key}"
                     log_context.set_result(None, status='failed', error_message=error_msg)
                     return AIGenerateGraphResponse(
@@ -645,6 +630,7 @@ async def ai_generate_graph_from_pdf(
                         error=error_msg
                     )
                 
+                response_text = await llm_gateway.chat(config, prompt, max_tokens=4000, timeout=120.0)
                 log_context.set_result(response_text, status='success')
             except Exception as e:
                 logger.error(f"LLM调用失败: {e}", exc_info=True)
@@ -682,8 +668,8 @@ async def ai_generate_graph_from_pdf(
             is_active=True
         )
         db.add(graph)
-        await db.commit()
-        await db.refresh(graph)
+        # 只分配ID，图谱和节点在最后一起提交，避免知识树缓存读到没有节点的图谱
+        await db.flush()
         graph_id_for_log = graph.id
         
         # 创建节点（递归创建）
@@ -716,6 +702,7 @@ async def ai_generate_graph_from_pdf(
                     await create_nodes_recursive(children, node.id, 0)
         
         await create_nodes_recursive(nodes_data)
+        touch_graph(graph)
         await db.commit()
         
         return AIGenerateGraphResponse(
@@ -732,119 +719,6 @@ async def ai_generate_graph_from_pdf(
             error=f"AI生成知识图谱失败: {str(e)}"
         )
 
-async def _call_openai_compatible(config: LLMConfig, prompt: str) -> str:
-    """调用OpenAI兼容的API"""
-    endpoint = config.endpoint_url.rstrip('/') if config.endpoint_url else ""
-    # 如果endpoint已经包含/chat/completions，就不需要再拼接
-    if endpoint.endswith('/chat/completions'):
-        url = endpoint
-    else:
-        url = f"{endpoint}/chat/completions"
-    
-    headers = {
-        "Authorization": f"Bearer {config.api_key}",
-        "Content-Type": "application/json"
-    }
-    
-    data = {
-        "model": config.model_name or "default",
-        "messages": [
-            {"role": "user", "content": prompt}
-        ],
-        "temperature": 0.7,
-        "max_tokens": 4000
-    }
-    
-    async with httpx.AsyncClient(timeout=120.0) as client:
-        response = await client.post(url, json=data, headers=headers)
-        response.raise_for_status()
-        result = response.json()
-        
-        if "choices" in result and len(result["choices"]) > 0:
-            return result["choices"][0]["message"]["content"]
-        else:
-            raise Exception("响应格式错误")
-
-async def _call_aliyun_qwen(config: LLMConfig, prompt: str) -> str:
-    """调用阿里云通义千问API"""
-    endpoint = config.endpoint_url.rstrip('/') if config.endpoint_url else ""
-    url = f"{endpoint}/services/aigc/text-generation/generation"
-    
-    headers = {
-        "Authorization": f"Bearer {config.api_key}",
-        "Content-Type": "application/json"
-    }
-    
-    data = {
-        "model": config.model_name or "qwen-max",
-        "input": {
-            "messages": [
-                {"role": "user", "content": prompt}
-            ]
-        },
-        "parameters": {
-            "temperature": 0.7,
-            "max_tokens": 4000
-        }
-    }
-    
-    async with httpx.AsyncClient(timeout=120.0) as client:
-        response = await client.post(url, json=data, headers=headers)
-        response.raise_for_status()
-        result = response.json()
-        
-        if "output" in result and "text" in result["output"]:
-            return result["output"]["text"]
-        else:
-            raise Exception("响应格式错误")
-
-async def _call_wenxin(config: LLMConfig, prompt: str) -> str:
-    """调用文心一言API"""
-    if not config.api_secret:
-        raise Exception("文心一言需要配置API Secret")
-    
-    # 获取access_token
-    token_url = "https://aip.baidubce.com/oauth/2.0/token"
-    token_params = {
-        "grant_type": "client_credentials",
-        "client_id": config.api_key,
-        "client_secret": config.api_secret
-    }
-    
-    async with httpx.AsyncClient(timeout=120.0) as client:
-        token_response = await client.post(token_url, params=token_params)
-        token_response.raise_for_status()
-        access_token = token_response.json()["access_token"]
-        
-        # 调用对话API
-        endpoint = config.endpoint_url.rstrip('/') if config.endpoint_url else ""
-        chat_url = f"{endpoint}/wenxinworkshop/chat/completions"
-        
-        headers = {
-            "Content-Type": "application/json"
-        }
-        
-        params = {
-            "access_token": access_token
-        }
-        
-        data = {
-            "messages": [
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.7,
-            "max_output_tokens": 4000
-        }
-        
-        chat_response = await client.post(chat_url, json=data, headers=headers, params=params)
-        chat_response.raise_for_status()
-        result = chat_response.json()
-        
-        if "result" in result:
-            return result["result"]
-        else:
-            raise Exception("响应格式错误")
-
 @router.get("/{graph_id}/nodes/{node_id}/resources-recursive")
 async def get_node_resources_recursive(
     graph_id: int,
@@ -881,49 +755,27 @@ async def get_node_resources_recursive(
     if not node:
         raise HTTPException(status_code=404, detail="节点不存在")
     
-    # 递归获取所有子节点ID（包括自己）
-    async def get_all_subnode_ids(parent_node_id: int) -> List[int]:
-        ids = [parent_node_id]
-        result = await db.execute(
-            select(KnowledgeNode.id).where(
-                and_(
-                    KnowledgeNode.parent_id == parent_node_id,
-                    KnowledgeNode.is_active == True
-                )
-            )
-        )
-        child_ids = result.scalars().all()
-        for child_id in child_ids:
-            ids.extend(await get_all_subnode_ids(child_id))
-        return ids
-    
-    node_ids = await get_all_subnode_ids(node_id)
-    
-    # 获取所有节点的名称，用于知识点搜索
-    nodes_result = await db.execute(
-        select(KnowledgeNode).where(KnowledgeNode.id.in_(node_ids))
-    )
-    nodes = nodes_result.scalars().all()
-    knowledge_points = [n.node_name for n in nodes]
+    # 从节点树缓存中取子树（包括自己），缓存未命中时一次查询加载整个图谱
+    tree = await knowledge_tree_cache.get(db, graph)
+    node_ids = tree.subtree_ids(node_id)
+    if not node_ids:
+        # 节点在加载快照之后才创建（并发写入），退回只匹配节点自身
+        node_ids = [node.id]
+        knowledge_points = [node.node_name]
+    else:
+        knowledge_points = [tree.names[nid] for nid in node_ids]
     
-    # 查询包含这些知识点的资源
-    from app.models.teaching_resource import TeachingResource
+    # 通过资源-知识点关联表查询关联到这些知识点的资源
     query = select(TeachingResource, User).join(
         User, TeachingResource.teacher_id == User.id
     ).where(
         and_(
             TeachingResource.teacher_id == teacher_id,
-            TeachingResource.is_active == True
+            TeachingResource.is_active == True,
+            TeachingResource.id.in_(resource_ids_for_knowledge_points(teacher_id, knowledge_points))
         )
     )
     
-    # 使用knowledge_point字段进行过滤
-    # 由于knowledge_point可能包含多个知识点（逗号分隔），我们需要进行模糊匹配
-    if knowledge_points:
-        from sqlalchemy import or_
-        conditions = [TeachingResource.knowledge_point.ilike(f"%{kp}%") for kp in knowledge_points]
-        query = query.where(or_(*conditions))
-    
     query = query.order_by(TeachingResource.created_at.desc())
     
     result = await db.execute(query)
@@ -6,7 +6,6 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, desc
 from sqlalchemy.orm import selectinload
-import httpx
 import logging
 
 from app.db.session import get_db
@@ -19,8 +18,9 @@ from app.schemas.learning_profile import (
     ProfileResponse,
     AssessmentHistoryResponse
 )
-from app.api.v1.endpoints.students import get_current_user
+from app.api.deps import get_current_user
 from app.utils.llm_call_logger import log_llm_call
+from app.services.llm_gateway import llm_gateway
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -296,137 +296,8 @@ async def call_llm_api(config: LLMConfig, prompt: str) -> str:
     调用LLM API生成评价
     支持多种提供商
     """
-    provider_key = config.provider_key
-
     try:
-        if provider_key == "aliyun_qwen":
-            return await call_aliyun_qwen(config, prompt)
-        elif provider_key in ["deepseek", "kimi", "volcengine_doubao", "siliconflow"]:
-            return await call_openai_compatible(config, prompt)
-        elif provider_key == "wenxin":
-            return await call_wenxin(config, prompt)
-        else:
-            raise Exception(f"不支持的LLM提供商: {provider_key}")
-
+        return await llm_gateway.chat(config, prompt, max_tokens=1000, timeout=60.0)
     except Exception as e:
         logger.error(f"LLM API调用失败: {str(e)}")
         raise Exception(f"AI评价生成失败: {str(e)}")
-
-
-async def call_openai_compatible(config: LLMConfig, prompt: str) -> str:
-    """
-    调用OpenAI兼容的API（DeepSeek, KIMI, SiliconFlow, 火山引擎等）
-    """
-    endpoint = config.endpoint_url.rstrip('/') if config.endpoint_url else ""
-    if endpoint.endswith('/chat/completions'):
-        url = endpoint
-    else:
-        url = f"{endpoint}/chat/completions"
-
-    headers = {
-        "Authorization": f"Bearer {config.api_key}",
-        "Content-Type": "application/json"
-    }
-
-    data = {
-        "model": config.model_name or "default",
-        "messages": [
-            {"role": "user", "content": prompt}
-        ],
-        "temperature": 0.7,
-        "max_tokens": 1000
-    }
-
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        response = await client.post(url, json=data, headers=headers)
-        response.raise_for_status()
-        result = response.json()
-
-        if "choices" in result and len(result["choices"]) > 0:
-            return result["choices"][0]["message"]["content"]
-        else:
-            raise Exception("LLM响应格式错误")
-
-
-async def call_aliyun_qwen(config: LLMConfig, prompt: str) -> str:
-    """
-    调用阿里云通义千问API
-    """
-    endpoint = config.endpoint_url.rstrip('/') if config.endpoint_url else ""
-    url = f"{endpoint}/services/aigc/text-generation/generation"
-
-    headers = {
-        "Authorization": f"Bearer {config.api_key}",
-        "Content-Type": "application/json"
-    }
-
-    data = {
-        "model": config.model_name or "qwen-max",
-        "input": {
-            "messages": [
-                {"role": "user", "content": prompt}
-            ]
-        },
-        "parameters": {
-            "max_tokens": 1000,
-            "temperature": 0.7
-        }
-    }
-
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        response = await client.post(url, json=data, headers=headers)
-        response.raise_for_status()
-        result = response.json()
-
-        if "output" in result and "text" in result["output"]:
-            return result["output"]["text"]
-        else:
-            raise Exception("阿里云API响应格式错误")
-
-
-async def call_wenxin(config: LLMConfig, prompt: str) -> str:
-    """
-    调用文心一言API
-    """
-    if not config.api_secret:
-        raise Exception("文心一言需要配置API Secret")
-
-    # 获取access_token
-    token_url = "https://aip.baidubce.com/oauth/2.0/token"
-    token_params = {
-        "grant_type": "client_credentials",
-        "client_id": config.api_key,
-        "client_secret": config.api_secret
-    }
-
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        token_response = await client.post(token_url, params=token_params)
-        token_response.raise_for_status()
-        access_token = token_response.json()["access_token"]
-
-        # 调用对话API
-        endpoint = config.endpoint_url.rstrip('/') if config.endpoint_url else ""
-        chat_url = f"{endpoint}/wenxinworkshop/chat/completions"
-
-        headers = {
-            "Content-Type": "application/json"
-        }
-
-        params = {
-            "access_token": access_token
-        }
-
-        data = {
-            "messages": [
-                {"role": "user", "content": prompt}
-            ]
-        }
-
-        chat_response = await client.post(chat_url, json=data, headers=headers, params=params)
-        chat_response.raise_for_status()
-        result = chat_response.json()
-
-        if "result" in result:
-            return result["result"]
-        else:
-            raise Exception("文心一言API响应格式错误")
@@ -6,57 +6,27 @@ from typing import Any, Optional
 from datetime import datetime
 import logging
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from fastapi.security import OAuth2PasswordBearer
-from jose import jwt
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import and_, desc, func
 
 from app.db.session import get_db
+from app.api.deps import get_current_user
 from app.models.llm_call_log import LLMCallLog
 from app.models.base import User
 from app.models.llm_config import LLMConfig
 from app.schemas.llm_call_log import (
     LLMCallLogListItem,
     LLMCallLogDetail,
-    LLMCallLogListResponse
+    LLMCallLogListResponse,
+    LLMCacheStatsItem,
+    LLMCacheStatsResponse
 )
-from app.core.config import settings
+from app.services.llm_cache import llm_cache
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
-
-
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_db),
-) -> User:
-    """从token获取当前用户"""
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials",
-            )
-    except Exception:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-        )
-    
-    result = await db.execute(select(User).where(User.id == int(user_id)))
-    user = result.scalars().first()
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-        )
-    return user
-
 
 async def get_current_admin_user(
     current_user: User = Depends(get_current_user),
@@ -211,6 +181,20 @@ async def get_llm_call_logs(
     )
 
 
+@router.get("/cache-stats", response_model=LLMCacheStatsResponse)
+async def get_llm_cache_stats(
+    current_user: User = Depends(get_current_admin_user),
+) -> Any:
+    """
+    获取LLM响应缓存的命中统计（按功能类型）
+    """
+    stats = await llm_cache.get_stats()
+    return LLMCacheStatsResponse(
+        items=[LLMCacheStatsItem(**item) for item in stats],
+        local_entries=llm_cache.local_size()
+    )
+
+
 @router.get("/{log_id}", response_model=LLMCallLogDetail)
 async def get_llm_call_log_detail(
     log_id: int,
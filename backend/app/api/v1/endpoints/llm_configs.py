@@ -4,10 +4,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import delete
 from pydantic import BaseModel
-import httpx
 
 from app.db.session import get_db
 from app.models.llm_config import LLMConfig
+from app.services.llm_gateway import llm_gateway
 from app.schemas.llm_config import LLMConfig as LLMConfigSchema, LLMConfigCreate, LLMConfigUpdate
 
 router = APIRouter()
@@ -175,149 +175,18 @@ async def test_llm_config(
     if not config.api_key:
         return TestResponse(success=False, error="API Key未配置")
     
+    if not llm_gateway.is_supported(config.provider_key):
+        return TestResponse(success=False, error=f"不支持的提供商: {config.provider_key}")
+    
     try:
-        # 根据不同的提供商调用不同的API
-        provider_key = config.provider_key
-        
-        if provider_key == "aliyun_qwen":
-            # 阿里云通义千问
-            response = await test_aliyun_qwen(config, test_req.message)
-        elif provider_key == "deepseek":
-            # DeepSeek
-            response = await test_openai_compatible(config, test_req.message)
-        elif provider_key == "kimi":
-            # KIMI (Moonshot)
-            response = await test_openai_compatible(config, test_req.message)
-        elif provider_key == "wenxin":
-            # 文心一言
-            response = await test_wenxin(config, test_req.message)
-        elif provider_key == "volcengine_doubao":
-            # 火山引擎豆包
-            response = await test_openai_compatible(config, test_req.message)
-        elif provider_key == "siliconflow":
-            # 硅基流动
-            response = await test_openai_compatible(config, test_req.message)
-        else:
-            return TestResponse(success=False, error=f"不支持的提供商: {provider_key}")
-        
+        response = await llm_gateway.chat(
+            config,
+            test_req.message,
+            max_tokens=100,
+            temperature=None,
+            timeout=30.0
+        )
         return TestResponse(success=True, response=response)
     
     except Exception as e:
         return TestResponse(success=False, error=str(e))
-
-async def test_openai_compatible(config: LLMConfig, message: str) -> str:
-    """
-    测试OpenAI兼容的API（DeepSeek, KIMI, SiliconFlow, 火山引擎等）
-    """
-    endpoint = config.endpoint_url.rstrip('/') if config.endpoint_url else ""
-    # 如果endpoint已经包含/chat/completions，就不需要再拼接
-    if endpoint.endswith('/chat/completions'):
-        url = endpoint
-    else:
-        url = f"{endpoint}/chat/completions"
-    
-    headers = {
-        "Authorization": f"Bearer {config.api_key}",
-        "Content-Type": "application/json"
-    }
-    
-    data = {
-        "model": config.model_name or "default",
-        "messages": [
-            {"role": "user", "content": message}
-        ],
-        "max_tokens": 100
-    }
-    
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.post(url, json=data, headers=headers)
-        response.raise_for_status()
-        result = response.json()
-        
-        if "choices" in result and len(result["choices"]) > 0:
-            return result["choices"][0]["message"]["content"]
-        else:
-            raise Exception("响应格式错误")
-
-async def test_aliyun_qwen(config: LLMConfig, message: str) -> str:
-    """
-    测试阿里云通义千问API
-    """
-    endpoint = config.endpoint_url.rstrip('/') if config.endpoint_url else ""
-    url = f"{endpoint}/services/aigc/text-generation/generation"
-    
-    headers = {
-        "Authorization": f"Bearer {config.api_key}",
-        "Content-Type": "application/json"
-    }
-    
-    data = {
-        "model": config.model_name or "qwen-max",
-        "input": {
-            "messages": [
-                {"role": "user", "content": message}
-            ]
-        },
-        "parameters": {
-            "max_tokens": 100
-        }
-    }
-    
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.post(url, json=data, headers=headers)
-        response.raise_for_status()
-        result = response.json()
-        
-        if "output" in result and "text" in result["output"]:
-            return result["output"]["text"]
-        else:
-            raise Exception("响应格式错误")
-
-async def test_wenxin(config: LLMConfig, message: str) -> str:
-    """
-    测试文心一言API
-    """
-    # 文心一言需要先获取access_token
-    if not config.api_secret:
-        raise Exception("文心一言需要配置API Secret")
-    
-    # 获取access_token
-    token_url = "https://aip.baidubce.com/oauth/2.0/token"
-    token_params = {
-        "grant_type": "client_credentials",
-        "client_id": config.api_key,
-        "client_secret": config.api_secret
-    }
-    
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        token_response = await client.post(token_url, params=token_params)
-        token_response.raise_for_status()
-        access_token = token_response.json()["access_token"]
-        
-        # 调用对话API
-        endpoint = config.endpoint_url.rstrip('/') if config.endpoint_url else ""
-        chat_url = f"{endpoint}/wenxinworkshop/chat/completions"
-        
-        headers = {
-            "Content-Type": "application/json"
-        }
-        
-        params = {
-            "access_token": access_token
-        }
-        
-        data = {
-            "messages": [
-                {"role": "user", "content": message}
-            ]
-        }
-        
-        chat_response = await client.post(chat_url, json=data, headers=headers, params=params)
-        chat_response.raise_for_status()
-        result = chat_response.json()
-        
-        if "result" in result:
-            return result["result"]
-        else:
-            raise Exception("响应格式错误")
-
@@ -5,12 +5,16 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import func, and_
 from datetime import datetime
-import pandas as pd
 
 from app.db.session import get_db
 from app.models.base import Major, Organization, Class, TeacherProfile, User
 from app.schemas import major as major_schemas
-from app.utils.import_utils import parse_excel_file, generate_excel_template, check_duplicate_major_name
+from app.services.org_stats_service import org_stats_cache
+from app.utils.import_utils import (
+    parse_excel_file, generate_excel_template, excel_row_numbers,
+    clean_text_column, parse_number_column, mark_file_duplicates,
+    find_existing_values, bulk_insert
+)
 
 router = APIRouter()
 
@@ -220,6 +224,7 @@ async def create_major(
     )
     db.add(major)
     await db.commit()
+    org_stats_cache.invalidate()
     await db.refresh(major)
     return major
 
@@ -251,6 +256,7 @@ async def update_major(
     major.updated_at = datetime.utcnow()
     
     await db.commit()
+    org_stats_cache.invalidate()
     await db.refresh(major)
     return major
 
@@ -302,6 +308,7 @@ async def delete_major(
     major.is_active = False
     major.updated_at = datetime.utcnow()
     await db.commit()
+    org_stats_cache.invalidate()
     
     return {"message": "Major deleted successfully", "id": major_id}
 
@@ -313,7 +320,7 @@ async def import_majors(
     """批量导入专业"""
     try:
         # 解析Excel文件
-        df = parse_excel_file(file)
+        df = await parse_excel_file(file)
         
         # 验证必需的列
         required_columns = ["专业名称", "所属组织ID", "学费", "学制（年）"]
@@ -324,69 +331,67 @@ async def import_majors(
                 detail=f"缺少必需的列: {', '.join(missing_columns)}"
             )
         
-        # 验证数据
+        # 整列清洗
+        row_numbers = excel_row_numbers(df)
+        names = clean_text_column(df, "专业名称")
+        organization_ids = parse_number_column(df, "所属组织ID")
+        tuition_fees = parse_number_column(df, "学费", integer=False)
+        durations = parse_number_column(df, "学制（年）")
+        descriptions = clean_text_column(df, "专业描述（可选）")
+        
+        # 每列一次查询
+        existing_names = await find_existing_values(db, Major.name, names, Major.is_active == True)
+        valid_organization_ids = await find_existing_values(
+            db, Organization.id, organization_ids, Organization.is_active == True
+        )
+        dup_names = mark_file_duplicates(names)
+        
+        # 验证数据（每行只报告第一个错误）
         errors = []
         majors_to_create = []
         
-        for idx, row in df.iterrows():
-            row_num = idx + 2  # Excel行号
-            
-            # 获取专业名称
-            name = str(row["专业名称"]).strip() if pd.notna(row["专业名称"]) else None
+        for i, row_num in enumerate(row_numbers):
+            name = names[i]
             if not name:
                 errors.append(f"第{row_num}行: 专业名称不能为空")
                 continue
-            
-            # 检查重复
-            if await check_duplicate_major_name(db, name):
+            if name in existing_names:
                 errors.append(f"第{row_num}行: 专业名称 '{name}' 已存在")
                 continue
+            if dup_names[i]:
+                errors.append(f"第{row_num}行: 专业名称 '{name}' 在文件中重复")
+                continue
             
-            # 获取所属组织ID
-            try:
-                organization_id = int(row["所属组织ID"])
-                # 验证组织是否存在
-                org_result = await db.execute(
-                    select(Organization).where(and_(Organization.id == organization_id, Organization.is_active == True))
-                )
-                if not org_result.scalars().first():
-                    errors.append(f"第{row_num}行: 所属组织ID {organization_id} 不存在")
-                    continue
-            except (ValueError, TypeError):
+            organization_id = organization_ids[i]
+            if not isinstance(organization_id, int):
                 errors.append(f"第{row_num}行: 所属组织ID格式错误")
                 continue
+            if organization_id not in valid_organization_ids:
+                errors.append(f"第{row_num}行: 所属组织ID {organization_id} 不存在")
+                continue
             
-            # 获取学费
-            try:
-                tuition_fee = float(row["学费"])
-                if tuition_fee < 0:
-                    errors.append(f"第{row_num}行: 学费不能为负数")
-                    continue
-            except (ValueError, TypeError):
+            tuition_fee = tuition_fees[i]
+            if not isinstance(tuition_fee, float):
                 errors.append(f"第{row_num}行: 学费格式错误")
                 continue
+            if tuition_fee < 0:
+                errors.append(f"第{row_num}行: 学费不能为负数")
+                continue
             
-            # 获取学制
-            try:
-                duration_years = int(row["学制（年）"])
-                if duration_years <= 0:
-                    errors.append(f"第{row_num}行: 学制必须大于0")
-                    continue
-            except (ValueError, TypeError):
+            duration_years = durations[i]
+            if not isinstance(duration_years, int):
                 errors.append(f"第{row_num}行: 学制格式错误")
                 continue
-            
-            # 获取专业描述（可选）
-            description = None
-            if "专业描述（可选）" in df.columns and pd.notna(row["专业描述（可选）"]):
-                description = str(row["专业描述（可选）"]).strip()
+            if duration_years <= 0:
+                errors.append(f"第{row_num}行: 学制必须大于0")
+                continue
             
             majors_to_create.append({
                 "name": name,
                 "organization_id": organization_id,
                 "tuition_fee": tuition_fee,
                 "duration_years": duration_years,
-                "description": description
+                "description": descriptions[i]
             })
         
         # 如果有错误，返回错误信息
@@ -407,20 +412,15 @@ async def import_majors(
             )
         
         # 开始事务，批量创建专业
-        created_count = 0
         try:
-            for major_data in majors_to_create:
-                major = Major(
-                    name=major_data["name"],
-                    organization_id=major_data["organization_id"],
-                    tuition_fee=major_data["tuition_fee"],
-                    duration_years=major_data["duration_years"],
-                    description=major_data["description"]
-                )
-                db.add(major)
-                created_count += 1
+            await bulk_insert(db, Major, [
+                {**major_data, "is_active": True}
+                for major_data in majors_to_create
+            ])
+            created_count = len(majors_to_create)
             
             await db.commit()
+            org_stats_cache.invalidate()
             
             return {
                 "message": f"成功导入 {created_count} 条专业数据",
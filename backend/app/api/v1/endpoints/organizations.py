@@ -1,52 +1,24 @@
 from typing import List, Any, Optional
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
 from fastapi.responses import Response
-from fastapi.security import OAuth2PasswordBearer
-from jose import jwt
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import func, and_
 from pydantic import BaseModel
-import pandas as pd
 import io
 
 from app.db.session import get_db
-from app.models.base import Organization, Major, Class, StudentProfile, User
-from app.utils.import_utils import parse_excel_file, generate_excel_template, check_duplicate_organization_name
-from app.core.config import settings
+from app.api.deps import get_current_user
+from app.models.base import Organization, User
+from app.utils.import_utils import (
+    parse_excel_file, generate_excel_template, excel_row_numbers,
+    clean_text_column, parse_number_column, mark_file_duplicates,
+    find_existing_values, bulk_insert, INVALID_NUMBER
+)
+from app.services.org_stats_service import org_stats_cache
 from datetime import datetime
 
 router = APIRouter()
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
-
-# 获取当前用户
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_db),
-) -> User:
-    """从token获取当前用户"""
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials",
-            )
-    except Exception:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-        )
-    
-    result = await db.execute(select(User).where(User.id == int(user_id)))
-    user = result.scalars().first()
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-        )
-    return user
 
 # 辅助函数：获取用户名称
 async def get_user_name(user_id: Optional[int], db: AsyncSession) -> Optional[str]:
@@ -67,47 +39,9 @@ class OrganizationUpdate(BaseModel):
     code: Optional[str] = None
     parent_id: Optional[int] = None
 
-def get_all_descendant_ids(org_id: int, org_dict: dict) -> set:
-    """递归获取所有子节点ID（包括子节点的子节点）"""
-    descendant_ids = {org_id}
-    for child_id, child_data in org_dict.items():
-        if child_data["parent_id"] == org_id:
-            descendant_ids.add(child_id)
-            # 递归获取子节点的子节点
-            descendant_ids.update(get_all_descendant_ids(child_id, org_dict))
-    return descendant_ids
-
-async def calculate_org_stats(org_id: int, all_descendant_ids: set, db: AsyncSession) -> dict:
-    """计算组织及其所有子节点的统计数据"""
-    # 统计有效专业数量（包含子节点）
-    majors_query = select(func.count(Major.id)).where(and_(Major.organization_id.in_(all_descendant_ids), Major.is_active == True))
-    majors_result = await db.execute(majors_query)
-    majors_count = majors_result.scalar() or 0
-    
-    # 统计有效班级数量（包含子节点）- 通过专业关联
-    classes_query = select(func.count(func.distinct(Class.id))).select_from(Class).join(
-        Major, Class.major_id == Major.id
-    ).where(and_(Major.organization_id.in_(all_descendant_ids), Major.is_active == True, Class.is_active == True))
-    classes_result = await db.execute(classes_query)
-    classes_count = classes_result.scalar() or 0
-    
-    # 统计有效学生人数（包含子节点）- 通过班级 -> 专业 -> 组织关联
-    from app.models.base import User
-    students_query = select(func.count(StudentProfile.id)).select_from(StudentProfile).join(
-        Class, StudentProfile.class_id == Class.id
-    ).join(
-        Major, Class.major_id == Major.id
-    ).join(
-        User, StudentProfile.user_id == User.id
-    ).where(and_(Major.organization_id.in_(all_descendant_ids), Major.is_active == True, Class.is_active == True, User.is_active == True))
-    students_result = await db.execute(students_query)
-    students_count = students_result.scalar() or 0
-    
-    return {
-        "majors_count": majors_count,
-        "classes_count": classes_count,
-        "students_count": students_count
-    }
+def _desc_nulls_last(value: Optional[datetime]) -> tuple:
+    """倒序排序键，空值排在最后"""
+    return (value is not None, value or datetime.min)
 
 @router.get("/")
 async def get_organizations(
@@ -118,95 +52,28 @@ async def get_organizations(
     db: AsyncSession = Depends(get_db),
 ) -> Any:
     """获取所有组织（树状结构）"""
-    # Get all organizations ordered by updated_at DESC
-    # 过滤已删除的组织
-    query = select(Organization)
-    if not include_inactive:
-        query = query.where(Organization.is_active == True)
-    # 如果提供了搜索参数，按组织名称筛选
-    if search:
-        query = query.where(Organization.name.ilike(f"%{search}%"))
-    query = query.order_by(Organization.updated_at.desc().nullslast(), Organization.created_at.desc().nullslast())
-    result = await db.execute(query)
-    all_orgs = result.scalars().all()
-    
-    # Build tree structure
-    org_dict = {org.id: {
-        "id": org.id,
-        "name": org.name,
-        "code": org.code,
-        "parent_id": org.parent_id,
-        "created_by": org.created_by,
-        "updated_by": org.updated_by,
-        "created_at": org.created_at.isoformat() if org.created_at else None,
-        "updated_at": org.updated_at.isoformat() if org.updated_at else None,
-        "children": []
-    } for org in all_orgs}
+    snapshot = await org_stats_cache.get(db)
+    search_text = search.lower() if search else None
+    matched_ids = [
+        org_id for org_id, org in snapshot.orgs.items()
+        if (include_inactive or org["is_active"]) and (not search_text or search_text in (org["name"] or "").lower())
+    ]
+    selected_ids = set(matched_ids)
     
     # 当有搜索条件时，需要包含所有匹配节点及其父节点路径
-    if search and all_orgs:
-        # 获取所有匹配节点的ID
-        matched_ids = {org.id for org in all_orgs}
-        
-        # 查找所有匹配节点的父节点路径
-        async def get_parent_path(org_id: int, existing_dict: dict) -> list:
-            """递归获取节点的所有父节点ID"""
-            path = []
-            current_id = org_id
-            # 从已有的字典中查找
-            if current_id in existing_dict:
-                parent_id = existing_dict[current_id]["parent_id"]
-                while parent_id is not None:
-                    path.append(parent_id)
-                    if parent_id in existing_dict:
-                        parent_id = existing_dict[parent_id]["parent_id"]
-                    else:
-                        # 从数据库查询父节点
-                        parent_result = await db.execute(
-                            select(Organization).where(and_(Organization.id == parent_id, Organization.is_active == True))
-                        )
-                        parent_org = parent_result.scalars().first()
-                        if parent_org:
-                            existing_dict[parent_org.id] = {
-                                "id": parent_org.id,
-                                "name": parent_org.name,
-                                "parent_id": parent_org.parent_id,
-                                "created_by": parent_org.created_by,
-                                "updated_by": parent_org.updated_by,
-                                "created_at": parent_org.created_at.isoformat() if parent_org.created_at else None,
-                                "updated_at": parent_org.updated_at.isoformat() if parent_org.updated_at else None,
-                                "children": []
-                            }
-                            parent_id = parent_org.parent_id
-                        else:
-                            break
-            return path
-        
-        # 收集所有需要的父节点
-        all_needed_ids = set(matched_ids)
+    if search:
         for org_id in matched_ids:
-            parent_path = await get_parent_path(org_id, org_dict)
-            all_needed_ids.update(parent_path)
-        
-        # 补充缺失的父节点
-        missing_ids = all_needed_ids - set(org_dict.keys())
-        if missing_ids:
-            missing_result = await db.execute(
-                select(Organization).where(and_(Organization.id.in_(missing_ids), Organization.is_active == True))
-            )
-            missing_orgs = missing_result.scalars().all()
-            for org in missing_orgs:
-                org_dict[org.id] = {
-                    "id": org.id,
-                    "name": org.name,
-                    "code": org.code,
-                    "parent_id": org.parent_id,
-                    "created_by": org.created_by,
-                    "updated_by": org.updated_by,
-                    "created_at": org.created_at.isoformat() if org.created_at else None,
-                    "updated_at": org.updated_at.isoformat() if org.updated_at else None,
-                    "children": []
-                }
+            for parent_id in snapshot.ancestor_ids(org_id):
+                if not (include_inactive or snapshot.orgs[parent_id]["is_active"]):
+                    break
+                selected_ids.add(parent_id)
+    
+    # 按更新时间、创建时间倒序
+    ordered_ids = sorted(selected_ids, key=lambda org_id: _desc_nulls_last(snapshot.orgs[org_id]["created_at"]), reverse=True)
+    ordered_ids.sort(key=lambda org_id: _desc_nulls_last(snapshot.orgs[org_id]["updated_at"]), reverse=True)
+    
+    # Build tree structure（节点带含子组织的统计数据和创建者、更新者名称）
+    org_dict = {org_id: {**snapshot.node(org_id), "children": []} for org_id in ordered_ids}
     
     root_nodes = []
     for org_id, org_data in org_dict.items():
@@ -217,25 +84,6 @@ async def get_organizations(
             if parent:
                 parent["children"].append(org_data)
     
-    # 为每个节点计算统计数据（包含子节点）并获取用户名称
-    async def add_stats_to_tree(nodes):
-        for node in nodes:
-            # 获取该节点及其所有子节点的ID
-            all_descendant_ids = get_all_descendant_ids(node["id"], org_dict)
-            # 计算统计数据
-            stats = await calculate_org_stats(node["id"], all_descendant_ids, db)
-            node.update(stats)
-            
-            # 获取创建者和更新者名称
-            node["creator_name"] = await get_user_name(node.get("created_by"), db)
-            node["updater_name"] = await get_user_name(node.get("updated_by"), db)
-            
-            # 递归处理子节点
-            if node["children"]:
-                await add_stats_to_tree(node["children"])
-    
-    await add_stats_to_tree(root_nodes)
-    
     # Flatten tree for pagination (depth-first traversal)
     def flatten_tree(nodes, result_list):
         for node in nodes:
@@ -286,16 +134,11 @@ async def get_organization_tree(
     db: AsyncSession = Depends(get_db),
 ) -> Any:
     """获取完整的组织树结构（包含统计数据）"""
-    result = await db.execute(select(Organization).where(Organization.is_active == True).order_by(Organization.id))
-    all_orgs = result.scalars().all()
-    
-    org_dict = {org.id: {
-        "id": org.id,
-        "name": org.name,
-        "code": org.code,
-        "parent_id": org.parent_id,
-        "children": []
-    } for org in all_orgs}
+    snapshot = await org_stats_cache.get(db)
+    org_dict = {
+        org_id: {**snapshot.node(org_id, with_users=False), "children": []}
+        for org_id, org in snapshot.orgs.items() if org["is_active"]
+    }
     
     root_nodes = []
     for org_id, org_data in org_dict.items():
@@ -306,20 +149,6 @@ async def get_organization_tree(
             if parent:
                 parent["children"].append(org_data)
     
-    # 为每个节点计算统计数据（包含子节点）
-    async def add_stats_to_tree(nodes):
-        for node in nodes:
-            # 获取该节点及其所有子节点的ID
-            all_descendant_ids = get_all_descendant_ids(node["id"], org_dict)
-            # 计算统计数据
-            stats = await calculate_org_stats(node["id"], all_descendant_ids, db)
-            node.update(stats)
-            # 递归处理子节点
-            if node["children"]:
-                await add_stats_to_tree(node["children"])
-    
-    await add_stats_to_tree(root_nodes)
-    
     return {"tree": root_nodes}
 
 @router.get("/template")
@@ -358,40 +187,40 @@ async def import_organizations(
                 detail=f"缺少必需的列: {', '.join(missing_columns)}"
             )
         
-        # 验证数据
+        # 整列清洗
+        row_numbers = excel_row_numbers(df)
+        names = clean_text_column(df, "组织名称")
+        parent_ids = parse_number_column(df, "上级组织ID（可选）")
+        
+        # 每列一次查询
+        existing_names = await find_existing_values(db, Organization.name, names, Organization.is_active == True)
+        valid_parent_ids = await find_existing_values(db, Organization.id, parent_ids, Organization.is_active == True)
+        dup_names = mark_file_duplicates(names)
+        
+        # 验证数据（每行只报告第一个错误）
         errors = []
         organizations_to_create = []
         
-        for idx, row in df.iterrows():
-            row_num = idx + 2  # Excel行号（从2开始，第1行是标题）
-            
-            # 获取组织名称
-            name = str(row["组织名称"]).strip() if pd.notna(row["组织名称"]) else None
-            
+        for i, row_num in enumerate(row_numbers):
+            name = names[i]
             if not name:
                 errors.append(f"第{row_num}行: 组织名称不能为空")
                 continue
-            
-            # 检查重复
-            if await check_duplicate_organization_name(db, name):
+            if name in existing_names:
                 errors.append(f"第{row_num}行: 组织名称 '{name}' 已存在")
                 continue
+            if dup_names[i]:
+                errors.append(f"第{row_num}行: 组织名称 '{name}' 在文件中重复")
+                continue
             
-            # 获取上级组织ID
-            parent_id = None
-            if "上级组织ID（可选）" in df.columns and pd.notna(row["上级组织ID（可选）"]):
-                try:
-                    parent_id = int(row["上级组织ID（可选）"])
-                    # 验证上级组织是否存在
-                    parent_result = await db.execute(
-                        select(Organization).where(and_(Organization.id == parent_id, Organization.is_active == True))
-                    )
-                    if not parent_result.scalars().first():
-                        errors.append(f"第{row_num}行: 上级组织ID {parent_id} 不存在")
-                        continue
-                except (ValueError, TypeError):
-                    errors.append(f"第{row_num}行: 上级组织ID格式错误")
-                    continue
+            # 上级组织ID（可选）
+            parent_id = parent_ids[i]
+            if parent_id is INVALID_NUMBER:
+                errors.append(f"第{row_num}行: 上级组织ID格式错误")
+                continue
+            if parent_id is not None and parent_id not in valid_parent_ids:
+                errors.append(f"第{row_num}行: 上级组织ID {parent_id} 不存在")
+                continue
             
             organizations_to_create.append({
                 "name": name,
@@ -429,19 +258,20 @@ async def import_organizations(
                 )
         
         # 开始事务，批量创建组织
-        created_count = 0
         try:
-            for org_data in organizations_to_create:
-                org = Organization(
-                    name=org_data["name"],
-                    parent_id=org_data["parent_id"],
-                    created_by=1,  # 批量导入默认使用管理员ID
-                    updated_by=1
-                )
-                db.add(org)
-                created_count += 1
+            await bulk_insert(db, Organization, [
+                {
+                    **org_data,
+                    "is_active": True,
+                    "created_by": 1,  # 批量导入默认使用管理员ID
+                    "updated_by": 1,
+                }
+                for org_data in organizations_to_create
+            ])
+            created_count = len(organizations_to_create)
             
             await db.commit()
+            org_stats_cache.invalidate()
             
             return {
                 "message": f"成功导入 {created_count} 条组织数据",
@@ -474,10 +304,8 @@ async def get_organization(
     if not org:
         raise HTTPException(status_code=404, detail="Organization not found")
     
-    # 获取统计数据
-    org_dict = {org.id: {"id": org.id, "parent_id": org.parent_id}}
-    all_descendant_ids = get_all_descendant_ids(org.id, org_dict)
-    stats = await calculate_org_stats(org.id, all_descendant_ids, db)
+    # 获取统计数据（包含子组织，与组织列表一致）
+    stats = (await org_stats_cache.get(db)).stats(org.id)
     
     return {
         "id": org.id,
@@ -526,6 +354,7 @@ async def create_organization(
     )
     db.add(org)
     await db.commit()
+    org_stats_cache.invalidate()
     await db.refresh(org)
     
     return {
@@ -600,6 +429,7 @@ async def update_organization(
     org.updated_at = datetime.utcnow()
     
     await db.commit()
+    org_stats_cache.invalidate()
     await db.refresh(org)
     
     return {
@@ -663,6 +493,7 @@ async def delete_organization(
     org.is_active = False
     org.updated_at = datetime.utcnow()
     await db.commit()
+    org_stats_cache.invalidate()
     
     return {"message": "Organization deleted successfully"}
 
@@ -10,6 +10,7 @@ from sqlalchemy.orm import selectinload
 import logging
 import json
 import re
+from datetime import datetime
 
 from app.db.session import get_db
 from app.models.base import User
@@ -35,9 +36,11 @@ from app.schemas.personalized_learning import (
     AIQuizStudyRecordRequest,
     QuizQuestion
 )
-from app.api.v1.endpoints.students import get_current_user
-from app.api.v1.endpoints.ai_creation import call_openai_compatible, call_aliyun_qwen
-from app.utils.resource_parser import download_and_parse_resource
+from app.api.deps import get_current_user
+from app.services.llm_cache import cached_chat
+from app.services.learning_behavior_writer import accumulate_daily_stats
+from app.services.resource_text_store import resource_text_store
+from app.utils.extraction_executor import ExtractionError
 from app.utils.llm_call_logger import log_llm_call
 
 router = APIRouter()
@@ -144,9 +147,9 @@ async def generate_personalized_content(
         if not llm_config:
             raise HTTPException(status_code=503, detail="系统未配置大模型服务")
         
-        # 4. 下载并解析资源文件
+        # 4. 获取资源文件的提取文本
         logger.info(f"开始解析资源文件: {resource.resource_name}")
-        resource_content = await download_and_parse_resource(resource)
+        resource_content = await resource_text_store.get_text(db, resource)
         
         if not resource_content or len(resource_content) < 50:
             raise HTTPException(status_code=400, detail="资源文件内容为空或过短，无法生成个性化内容")
@@ -173,10 +176,9 @@ async def generate_personalized_content(
             related_type="teaching_resource"
         ) as log_context:
             try:
-                if llm_config.provider_key == "aliyun_qwen":
-                    ai_content = await call_aliyun_qwen(llm_config, prompt)
-                else:
-                    ai_content = await call_openai_compatible(llm_config, prompt)
+                ai_content = await cached_chat(
+                    "personalized_learning", llm_config, prompt, max_tokens=4000, timeout=300.0, log_context=log_context
+                )
                 log_context.set_result(ai_content, status='success')
             except Exception as e:
                 logger.error(f"LLM调用失败: {str(e)}", exc_info=True)
@@ -217,6 +219,8 @@ async def generate_personalized_content(
     
     except HTTPException:
         raise
+    except ExtractionError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"生成个性化内容失败: {e}")
         raise HTTPException(status_code=500, detail=f"生成失败: {str(e)}")
@@ -258,6 +262,7 @@ async def record_personalized_content_study(
             course_id = section_resource[1]
         
         # 创建学习行为记录
+        created_at = datetime.utcnow()
         learning_behavior = StudentLearningBehavior(
             student_id=current_user.id,
             course_id=course_id,
@@ -266,10 +271,17 @@ async def record_personalized_content_study(
             resource_type="personalized_learning_content",
             behavior_type="view_personalized_content",
             duration_seconds=request.duration_seconds,
-            description=f"查看个性化学习内容 (ID: {request.content_id})"
+            description=f"查看个性化学习内容 (ID: {request.content_id})",
+            created_at=created_at
         )
         
         db.add(learning_behavior)
+        await accumulate_daily_stats(db, [{
+            "student_id": current_user.id,
+            "course_id": course_id,
+            "duration_seconds": request.duration_seconds or 0,
+            "created_at": created_at,
+        }])
         await db.commit()
         logger.info(f"学生 {current_user.id} 记录个性化内容 {request.content_id} 学习时长: {request.duration_seconds}秒 (课程ID: {course_id}, 章节ID: {chapter_id})")
         
@@ -409,9 +421,9 @@ async def generate_ai_quiz(
         if not llm_config:
             raise HTTPException(status_code=503, detail="系统未配置大模型服务")
         
-        # 5. 下载并解析资源文件
+        # 5. 获取资源文件的提取文本
         logger.info(f"开始解析资源文件: {resource.resource_name}")
-        resource_content = await download_and_parse_resource(resource)
+        resource_content = await resource_text_store.get_text(db, resource)
         
         if not resource_content or len(resource_content) < 50:
             raise HTTPException(status_code=400, detail="资源文件内容为空或过短，无法生成测评题目")
@@ -438,10 +450,9 @@ async def generate_ai_quiz(
             related_type="teaching_resource"
         ) as log_context:
             try:
-                if llm_config.provider_key == "aliyun_qwen":
-                    ai_response = await call_aliyun_qwen(llm_config, prompt)
-                else:
-                    ai_response = await call_openai_compatible(llm_config, prompt)
+                ai_response = await cached_chat(
+                    "ai_quiz", llm_config, prompt, max_tokens=4000, timeout=300.0, log_context=log_context
+                )
                 log_context.set_result(ai_response, status='success')
             except Exception as e:
                 logger.error(f"LLM调用失败: {str(e)}", exc_info=True)
@@ -493,6 +504,8 @@ async def generate_ai_quiz(
     
     except HTTPException:
         raise
+    except ExtractionError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"生成AI测评失败: {e}")
         raise HTTPException(status_code=500, detail=f"生成失败: {str(e)}")
@@ -767,6 +780,7 @@ async def record_quiz_study(
             course_id = section_resource[1]
         
         # 创建学习行为记录
+        created_at = datetime.utcnow()
         learning_behavior = StudentLearningBehavior(
             student_id=current_user.id,
             course_id=course_id,
@@ -775,10 +789,17 @@ async def record_quiz_study(
             resource_type="ai_quiz",
             behavior_type="take_ai_quiz",
             duration_seconds=request.duration_seconds,
-            description=f"AI智能测评 (ID: {request.quiz_id})"
+            description=f"AI智能测评 (ID: {request.quiz_id})",
+            created_at=created_at
         )
         
         db.add(learning_behavior)
+        await accumulate_daily_stats(db, [{
+            "student_id": current_user.id,
+            "course_id": course_id,
+            "duration_seconds": request.duration_seconds or 0,
+            "created_at": created_at,
+        }])
         await db.commit()
         logger.info(f"学生 {current_user.id} 记录AI测评 {request.quiz_id} 学习时长: {request.duration_seconds}秒 (课程ID: {course_id}, 章节ID: {chapter_id})")
         
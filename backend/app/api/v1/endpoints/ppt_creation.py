@@ -18,6 +18,7 @@ from app.models.base import User
 from app.db.session import get_db
 from app.utils.oss_client import oss_client
 from app.core.config import settings
+from app.services.resource_knowledge import sync_resource_knowledge_points
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -268,6 +269,8 @@ async def save_ppt_to_system(
         )
         
         db.add(resource)
+        await db.flush()
+        await sync_resource_knowledge_points(db, resource)
         await db.commit()
         await db.refresh(resource)
         
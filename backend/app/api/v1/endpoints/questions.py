@@ -1,9 +1,9 @@
 from typing import Any, List, Optional
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, status
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, status
 from fastapi.responses import FileResponse, Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import and_, func, or_
+from sqlalchemy import and_, func
 from pathlib import Path
 from datetime import datetime
 import os
@@ -12,7 +12,6 @@ import json
 from urllib.parse import quote
 import pandas as pd
 import io
-import httpx
 from pydantic import BaseModel
 
 from app.db.session import get_db
@@ -20,8 +19,13 @@ from app.models.base import User
 from app.models.question import Question, QuestionOption
 from app.models.llm_config import LLMConfig
 from app.models.teaching_resource import TeachingResource
-from app.api.v1.endpoints.teachers import get_current_user
+from app.api.deps import get_current_user
 from app.utils.llm_call_logger import log_llm_call
+from app.services.llm_gateway import llm_gateway
+from app.services.paper_composer import paper_composer
+from app.services.question_repository import iter_questions_with_options, question_repository
+from app.utils.pagination import InvalidCursorError
+from app.utils.streaming_export import export_response
 from fastapi import Depends
 import logging
 
@@ -97,83 +101,30 @@ async def get_questions(
     question_type: Optional[str] = None,
     knowledge_point: Optional[str] = None,
     search: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="上一页返回的next_cursor，传入时忽略skip"),
+    include_total: bool = Query(True, description="是否返回总数"),
     db: AsyncSession = Depends(get_db),
 ) -> Any:
-    """获取题目列表（支持分页）"""
-    # 构建基础查询
-    base_query = select(Question).where(
-        and_(
-            Question.teacher_id == teacher_id,
-            Question.is_active == True
-        )
-    )
-    
-    if question_type:
-        base_query = base_query.where(Question.question_type == question_type)
-    
-    if knowledge_point:
-        base_query = base_query.where(Question.knowledge_point.ilike(f"%{knowledge_point}%"))
-    
-    if search:
-        base_query = base_query.where(
-            or_(
-                Question.title.ilike(f"%{search}%"),
-                Question.knowledge_point.ilike(f"%{search}%")
-            )
+    """获取题目列表（按更新时间倒序，支持偏移分页和游标分页）"""
+    try:
+        question_list, total, next_cursor = await question_repository.list_questions(
+            db,
+            teacher_id,
+            question_type=question_type,
+            knowledge_point=knowledge_point,
+            search=search,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            include_total=include_total
         )
-    
-    # 获取总数
-    count_query = select(func.count()).select_from(base_query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar() or 0
-    
-    # 获取分页数据（按更新时间倒序）
-    query = base_query.offset(skip).limit(limit).order_by(Question.updated_at.desc())
-    result = await db.execute(query)
-    questions = result.scalars().all()
-    
-    # 获取选项（对于单选和多选）
-    question_list = []
-    for question in questions:
-        # 获取选项
-        options_result = await db.execute(
-            select(QuestionOption).where(
-                QuestionOption.question_id == question.id
-            ).order_by(QuestionOption.sort_order)
-        )
-        options = options_result.scalars().all()
-        
-        question_list.append({
-            "id": question.id,
-            "teacher_id": question.teacher_id,
-            "question_type": question.question_type,
-            "title": question.title,
-            "title_image": question.title_image,
-            "knowledge_point": question.knowledge_point,
-            "answer": question.answer,
-            "answer_image": question.answer_image,
-            "explanation": question.explanation,
-            "explanation_image": question.explanation_image,
-            "difficulty": question.difficulty,
-            "is_active": question.is_active,
-            "created_at": question.created_at.isoformat() if question.created_at else None,
-            "updated_at": question.updated_at.isoformat() if question.updated_at else None,
-            "options": [
-                {
-                    "id": opt.id,
-                    "option_label": opt.option_label,
-                    "option_text": opt.option_text,
-                    "option_image": opt.option_image,
-                    "is_correct": opt.is_correct,
-                    "sort_order": opt.sort_order,
-                }
-                for opt in options
-            ]
-        })
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return {
         "questions": question_list,
-        "total": total
+        "total": total,
+        "next_cursor": next_cursor
     }
 
 @router.post("/")
@@ -243,6 +194,8 @@ async def create_question(
             raise HTTPException(status_code=400, detail="选项数据格式错误")
     
     await db.commit()
+    question_repository.invalidate_counts(teacher_id)
+    paper_composer.invalidate(teacher_id)
     await db.refresh(question)
     
     return {
@@ -419,6 +372,8 @@ async def update_question(
     
     question.updated_at = datetime.utcnow()
     await db.commit()
+    question_repository.invalidate_counts(teacher_id)
+    paper_composer.invalidate(teacher_id)
     
     return {"message": "题目更新成功"}
 
@@ -446,85 +401,58 @@ async def delete_question(
     question.is_active = False
     question.updated_at = datetime.utcnow()
     await db.commit()
+    question_repository.invalidate_counts(teacher_id)
+    paper_composer.invalidate(teacher_id)
     
     return {"message": "题目删除成功"}
 
 @router.get("/export")
 async def export_questions(
     teacher_id: int,
+    export_format: str = Query("xlsx", alias="format", pattern="^(xlsx|csv)$", description="导出格式：xlsx 或 csv"),
     db: AsyncSession = Depends(get_db),
 ) -> Any:
-    """导出所有题目为Excel文件"""
-    # 获取所有题目
-    result = await db.execute(
-        select(Question).where(
+    """导出所有题目为Excel或CSV文件（流式生成）"""
+    has_questions = await db.execute(
+        select(Question.id).where(
             and_(
                 Question.teacher_id == teacher_id,
                 Question.is_active == True
             )
-        ).order_by(Question.created_at.desc())
+        ).limit(1)
     )
-    questions = result.scalars().all()
-    
-    if not questions:
+    if has_questions.scalar() is None:
         raise HTTPException(status_code=404, detail="没有可导出的题目")
     
-    # 准备Excel数据
-    excel_data = []
-    for question in questions:
-        # 获取选项
-        options_result = await db.execute(
-            select(QuestionOption).where(
-                QuestionOption.question_id == question.id
-            ).order_by(QuestionOption.sort_order)
-        )
-        options = options_result.scalars().all()
-        
-        # 处理选项文本
-        options_text = ""
-        if options:
-            options_list = []
-            for opt in options:
-                opt_text = f"{opt.option_label}. {opt.option_text}"
-                if opt.is_correct:
-                    opt_text += " ✓"
-                options_list.append(opt_text)
-            options_text = " | ".join(options_list)
-        
-        # 处理答案
-        answer_text = question.answer or ""
-        if question.question_type == "true_false":
-            answer_text = "正确" if answer_text == "true" else "错误"
-        
-        excel_data.append({
-            "题型": QUESTION_TYPES.get(question.question_type, question.question_type),
-            "题干": question.title,
-            "知识点": question.knowledge_point or "",
-            "选项": options_text,
-            "正确答案": answer_text,
-            "解析": question.explanation or "",
-            "难度": "简单" if question.difficulty == 1 else "中等" if question.difficulty == 2 else "困难",
-        })
-    
-    # 创建DataFrame
-    df = pd.DataFrame(excel_data)
-    
-    # 创建Excel文件
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='题目列表')
-    
-    output.seek(0)
-    
-    # 生成文件名
-    filename = f"题目导出_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    async def rows():
+        async for question, options in iter_questions_with_options(teacher_id):
+            # 处理选项文本
+            options_text = " | ".join(
+                f"{opt.option_label}. {opt.option_text}" + (" ✓" if opt.is_correct else "")
+                for opt in options
+            )
+            
+            # 处理答案
+            answer_text = question.answer or ""
+            if question.question_type == "true_false":
+                answer_text = "正确" if answer_text == "true" else "错误"
+            
+            yield [
+                QUESTION_TYPES.get(question.question_type, question.question_type),
+                question.title,
+                question.knowledge_point or "",
+                options_text,
+                answer_text,
+                question.explanation or "",
+                "简单" if question.difficulty == 1 else "中等" if question.difficulty == 2 else "困难",
+            ]
     
-    return StreamingResponse(
-        io.BytesIO(output.read()),
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={
-            "Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}"
-        }
+    return export_response(
+        "题目导出",
+        "题目列表",
+        ["题型", "题干", "知识点", "选项", "正确答案", "解析", "难度"],
+        rows(),
+        export_format
     )
 
 @router.get("/template")
@@ -719,6 +647,8 @@ async def import_questions(
     
     # 提交所有更改
     await db.commit()
+    question_repository.invalidate_counts(teacher_id)
+    paper_composer.invalidate(teacher_id)
     
     return {
         "success": True,
@@ -734,55 +664,12 @@ async def get_question(
     db: AsyncSession = Depends(get_db),
 ) -> Any:
     """获取单个题目详情"""
-    result = await db.execute(
-        select(Question).where(
-            and_(
-                Question.id == question_id,
-                Question.teacher_id == teacher_id,
-                Question.is_active == True
-            )
-        )
-    )
-    question = result.scalars().first()
+    question = await question_repository.get_question(db, teacher_id, question_id)
     
     if not question:
         raise HTTPException(status_code=404, detail="题目不存在")
     
-    # 获取选项
-    options_result = await db.execute(
-        select(QuestionOption).where(
-            QuestionOption.question_id == question.id
-        ).order_by(QuestionOption.sort_order)
-    )
-    options = options_result.scalars().all()
-    
-    return {
-        "id": question.id,
-        "teacher_id": question.teacher_id,
-        "question_type": question.question_type,
-        "title": question.title,
-        "title_image": question.title_image,
-        "knowledge_point": question.knowledge_point,
-        "answer": question.answer,
-        "answer_image": question.answer_image,
-        "explanation": question.explanation,
-        "explanation_image": question.explanation_image,
-        "difficulty": question.difficulty,
-        "is_active": question.is_active,
-        "created_at": question.created_at.isoformat() if question.created_at else None,
-        "updated_at": question.updated_at.isoformat() if question.updated_at else None,
-        "options": [
-            {
-                "id": opt.id,
-                "option_label": opt.option_label,
-                "option_text": opt.option_text,
-                "option_image": opt.option_image,
-                "is_correct": opt.is_correct,
-                "sort_order": opt.sort_order,
-            }
-            for opt in options
-        ]
-    }
+    return question
 
 class AIGenerateQuestionRequest(BaseModel):
     knowledge_point: str
@@ -949,13 +836,7 @@ async def ai_generate_question(
             # 调用LLM API
             provider_key = config.provider_key
             
-            if provider_key == "aliyun_qwen":
-                response_text = await call_aliyun_qwen(config, prompt_template)
-            elif provider_key == "deepseek" or provider_key == "kimi" or provider_key == "volcengine_doubao" or provider_key == "siliconflow":
-                response_text = await call_openai_compatible(config, prompt_template)
-            elif provider_key == "wenxin":
-                response_text = await call_wenxin(config, prompt_template)
-            else:
+            if not llm_gateway.is_supported(provider_key):
                 error_msg = f"不支持的LLM提供商: {provider_key}"
                 log_context.set_result(None, status='failed', error_message=error_msg)
                 return AIGenerateQuestionResponse(
@@ -963,6 +844,7 @@ async def ai_generate_question(
                     error=error_msg
                 )
             
+            response_text = await llm_gateway.chat(config, prompt_template, max_tokens=2000, timeout=60.0)
             log_context.set_result(response_text, status='success')
         except Exception as e:
             logger.error(f"LLM调用失败: {e}", exc_info=True)
@@ -1039,117 +921,3 @@ async def ai_generate_question(
             success=False,
             error=f"AI出题失败: {str(e)}"
         )
-
-async def call_openai_compatible(config: LLMConfig, prompt: str) -> str:
-    """调用OpenAI兼容的API"""
-    endpoint = config.endpoint_url.rstrip('/') if config.endpoint_url else ""
-    # 如果endpoint已经包含/chat/completions，就不需要再拼接
-    if endpoint.endswith('/chat/completions'):
-        url = endpoint
-    else:
-        url = f"{endpoint}/chat/completions"
-    
-    headers = {
-        "Authorization": f"Bearer {config.api_key}",
-        "Content-Type": "application/json"
-    }
-    
-    data = {
-        "model": config.model_name or "default",
-        "messages": [
-            {"role": "user", "content": prompt}
-        ],
-        "temperature": 0.7,
-        "max_tokens": 2000
-    }
-    
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        response = await client.post(url, json=data, headers=headers)
-        response.raise_for_status()
-        result = response.json()
-        
-        if "choices" in result and len(result["choices"]) > 0:
-            return result["choices"][0]["message"]["content"]
-        else:
-            raise Exception("响应格式错误")
-
-async def call_aliyun_qwen(config: LLMConfig, prompt: str) -> str:
-    """调用阿里云通义千问API"""
-    endpoint = config.endpoint_url.rstrip('/') if config.endpoint_url else ""
-    url = f"{endpoint}/services/aigc/text-generation/generation"
-    
-    headers = {
-        "Authorization": f"Bearer {config.api_key}",
-        "Content-Type": "application/json"
-    }
-    
-    data = {
-        "model": config.model_name or "qwen-max",
-        "input": {
-            "messages": [
-                {"role": "user", "content": prompt}
-            ]
-        },
-        "parameters": {
-            "temperature": 0.7,
-            "max_tokens": 2000
-        }
-    }
-    
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        response = await client.post(url, json=data, headers=headers)
-        response.raise_for_status()
-        result = response.json()
-        
-        if "output" in result and "text" in result["output"]:
-            return result["output"]["text"]
-        else:
-            raise Exception("响应格式错误")
-
-async def call_wenxin(config: LLMConfig, prompt: str) -> str:
-    """调用文心一言API"""
-    if not config.api_secret:
-        raise Exception("文心一言需要配置API Secret")
-    
-    # 获取access_token
-    token_url = "https://aip.baidubce.com/oauth/2.0/token"
-    token_params = {
-        "grant_type": "client_credentials",
-        "client_id": config.api_key,
-        "client_secret": config.api_secret
-    }
-    
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        token_response = await client.post(token_url, params=token_params)
-        token_response.raise_for_status()
-        access_token = token_response.json()["access_token"]
-        
-        # 调用对话API
-        endpoint = config.endpoint_url.rstrip('/') if config.endpoint_url else ""
-        chat_url = f"{endpoint}/wenxinworkshop/chat/completions"
-        
-        headers = {
-            "Content-Type": "application/json"
-        }
-        
-        params = {
-            "access_token": access_token
-        }
-        
-        data = {
-            "messages": [
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.7,
-            "max_output_tokens": 2000
-        }
-        
-        chat_response = await client.post(chat_url, json=data, headers=headers, params=params)
-        chat_response.raise_for_status()
-        result = chat_response.json()
-        
-        if "result" in result:
-            return result["result"]
-        else:
-            raise Exception("响应格式错误")
-
@@ -1,21 +1,20 @@
 from typing import Any, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, status, Query, Request
 from fastapi import Request
-from fastapi.responses import FileResponse, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import and_, func
 from pathlib import Path
 from datetime import datetime
 import os
-import shutil
-from urllib.parse import quote
 
 from app.db.session import get_db
 from app.models.base import User
 from app.models.reference_material import ReferenceMaterial
 from app.models.reference_folder import ReferenceFolder
 from app.utils.oss_client import oss_client
+from app.utils.streaming_upload import UploadTooLargeError, stream_upload, upload_size
+from app.utils.file_delivery import file_delivery, is_remote_path
 from app.core.config import settings
 
 router = APIRouter()
@@ -36,6 +35,21 @@ RESOURCE_TYPES = {
 UPLOAD_DIR = Path("uploads/reference_materials")
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
+# 下载接口的响应头
+DOWNLOAD_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET',
+    'Access-Control-Allow-Headers': '*',
+}
+
+# 预览接口的响应头
+PREVIEW_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET',
+    'Access-Control-Allow-Headers': '*',
+    'Cache-Control': 'public, max-age=3600',
+}
+
 def get_resource_type(filename: str) -> str:
     """根据文件扩展名判断资源类型"""
     ext = Path(filename).suffix.lower()
@@ -44,6 +58,14 @@ def get_resource_type(filename: str) -> str:
             return resource_type
     return "other"
 
+def get_material_mime_type(resource_type: str) -> str:
+    """资源类型对应的MIME类型"""
+    if resource_type in RESOURCE_TYPES:
+        mime_types = RESOURCE_TYPES[resource_type]["mime_types"]
+        if mime_types:
+            return mime_types[0]
+    return "application/octet-stream"
+
 @router.get("/stats")
 async def get_stats(
     teacher_id: int,
@@ -160,9 +182,7 @@ async def upload_material(
     """上传参考资料文件"""
     # 检查文件大小（50MB限制）
     MAX_FILE_SIZE = 50 * 1024 * 1024
-    file.file.seek(0, 2)
-    file_size = file.file.tell()
-    file.file.seek(0)
+    file_size = upload_size(file)
     
     if file_size > MAX_FILE_SIZE:
         raise HTTPException(status_code=400, detail=f"文件大小超过限制（最大50MB）")
@@ -172,43 +192,41 @@ async def upload_material(
     if resource_type == "other":
         raise HTTPException(status_code=400, detail="不支持的文件类型")
     
-    # 读取文件内容
-    file.file.seek(0)
-    file_content = file.file.read()
-    file.file.seek(0)
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    unique_filename = f"{teacher_id}_{timestamp}_{file.filename}"
     
-    # 所有文件类型都上传到OSS（如果OSS已启用）
+    # 所有文件类型都上传到OSS（如果OSS已启用），文件按块流式上传
     oss_url = None
     if oss_client.enabled:
+        oss_key = f"reference_materials/{resource_type}/{unique_filename}"
+        # 确定MIME类型
+        mime_type = None
+        if resource_type in RESOURCE_TYPES:
+            mime_types = RESOURCE_TYPES[resource_type].get("mime_types", [])
+            if mime_types:
+                mime_type = mime_types[0]
         try:
-            timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-            unique_filename = f"{teacher_id}_{timestamp}_{file.filename}"
-            oss_key = f"reference_materials/{resource_type}/{unique_filename}"
-            # 确定MIME类型
-            mime_type = None
-            if resource_type in RESOURCE_TYPES:
-                mime_types = RESOURCE_TYPES[resource_type].get("mime_types", [])
-                if mime_types:
-                    mime_type = mime_types[0]
-            oss_url = oss_client.upload_file(file_content, oss_key, content_type=mime_type)
-            import logging
+            stored = await stream_upload(file, oss_key=oss_key, content_type=mime_type, max_size=MAX_FILE_SIZE)
+        except UploadTooLargeError:
+            raise HTTPException(status_code=400, detail="文件大小超过限制（最大50MB）")
+        file_size = stored.size
+        oss_url = stored.oss_url
+        import logging
+        if oss_url:
             logging.info(f"文件已上传到OSS: {oss_key}, URL: {oss_url}")
-        except Exception as e:
-            import logging
-            logging.error(f"上传到OSS失败: {e}，将保存到本地")
-            oss_url = None
+        else:
+            logging.error("上传到OSS失败，将保存到本地")
     
     # 如果OSS上传失败，保存到本地
     if not oss_url:
-        # 生成唯一文件名
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        unique_filename = f"{teacher_id}_{timestamp}_{file.filename}"
         file_path = UPLOAD_DIR / unique_filename
         
         # 保存文件
-        file.file.seek(0)  # 重置文件指针
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        try:
+            stored = await stream_upload(file, local_path=file_path, max_size=MAX_FILE_SIZE)
+        except UploadTooLargeError:
+            raise HTTPException(status_code=400, detail="文件大小超过限制（最大50MB）")
+        file_size = stored.size
         file_path_str = str(file_path)
     else:
         # 使用OSS URL作为文件路径
@@ -338,9 +356,10 @@ async def delete_material(
 @router.get("/{material_id}/download")
 async def download_material(
     material_id: int,
+    request: Request,
     db: AsyncSession = Depends(get_db),
 ):
-    """下载参考资料（支持OSS和本地文件）"""
+    """下载参考资料（支持OSS和本地文件，支持Range分段下载）"""
     result = await db.execute(
         select(ReferenceMaterial).where(
             ReferenceMaterial.id == material_id,
@@ -355,79 +374,23 @@ async def download_material(
     if material.resource_type == "link" or material.resource_type == "hyperlink":
         raise HTTPException(status_code=400, detail="链接类型无法下载")
     
-    # 如果是OSS文件，从OSS下载并返回
-    if material.file_path.startswith('http://') or material.file_path.startswith('https://'):
-        try:
-            # 从OSS URL中提取key
-            oss_key = None
-            if '.aliyuncs.com/' in material.file_path:
-                parts = material.file_path.split('.aliyuncs.com/')
-                if len(parts) > 1:
-                    oss_key = parts[1].split('?')[0]
-            elif settings.OSS_USE_CNAME and settings.OSS_ENDPOINT:
-                if material.file_path.startswith(settings.OSS_ENDPOINT):
-                    oss_key = material.file_path.replace(settings.OSS_ENDPOINT + '/', '').split('?')[0]
-            
-            if oss_key and oss_client.enabled:
-                # 从OSS下载文件
-                import httpx
-                async with httpx.AsyncClient() as client:
-                    download_url = oss_client.generate_download_url(oss_key, expires=3600)
-                    response = await client.get(download_url)
-                    response.raise_for_status()
-                    
-                    # 确定 MIME 类型
-                    mime_type = "application/octet-stream"
-                    if material.resource_type in RESOURCE_TYPES:
-                        mime_types = RESOURCE_TYPES[material.resource_type]["mime_types"]
-                        if mime_types:
-                            mime_type = mime_types[0]
-                    
-                    from fastapi.responses import Response
-                    encoded_filename = quote(material.original_filename)
-                    
-                    return Response(
-                        content=response.content,
-                        media_type=mime_type,
-                        headers={
-                            'Content-Disposition': f'inline; filename*=UTF-8\'\'{encoded_filename}',
-                            'Access-Control-Allow-Origin': '*',
-                            'Access-Control-Allow-Methods': 'GET',
-                            'Access-Control-Allow-Headers': '*',
-                        }
-                    )
-        except Exception as e:
-            import logging
-            logging.error(f"从OSS下载文件失败: {e}")
-            raise HTTPException(status_code=500, detail=f"文件下载失败: {str(e)}")
-    
-    # 本地文件
-    file_path = Path(material.file_path)
-    
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="文件不存在")
-    
-    # 确定 MIME 类型
-    mime_type = "application/octet-stream"
-    if material.resource_type in RESOURCE_TYPES:
-        mime_types = RESOURCE_TYPES[material.resource_type]["mime_types"]
-        if mime_types:
-            mime_type = mime_types[0]
-    
-    # URL编码文件名以支持中文
-    encoded_filename = quote(material.original_filename)
-    
-    return FileResponse(
-        file_path,
-        media_type=mime_type,
-        headers={
-            'Content-Disposition': f'inline; filename*=UTF-8\'\'{encoded_filename}',
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Methods': 'GET',
-            'Access-Control-Allow-Headers': '*',
-        },
-        filename=material.original_filename
-    )
+    # OSS文件以inline返回（供前端转换预览），本地文件作为附件下载
+    is_oss = is_remote_path(material.file_path)
+    try:
+        return await file_delivery.serve(
+            request,
+            material.file_path,
+            get_material_mime_type(material.resource_type),
+            material.original_filename,
+            disposition='inline' if is_oss else 'attachment',
+            headers=DOWNLOAD_HEADERS
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        import logging
+        logging.error(f"从OSS下载文件失败: {e}")
+        raise HTTPException(status_code=500, detail=f"文件下载失败: {str(e)}")
 
 @router.get("/{material_id}/preview")
 async def preview_material(
@@ -511,51 +474,10 @@ async def preview_material(
         return RedirectResponse(url=str(material.file_path))
     
     # 本地文件预览（图片、PDF、视频等）
-    file_path = Path(material.file_path)
-    
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="文件不存在")
-    
-    # 确定 MIME 类型
-    mime_type = "application/octet-stream"
-    if material.resource_type in RESOURCE_TYPES:
-        mime_types = RESOURCE_TYPES[material.resource_type]["mime_types"]
-        if mime_types:
-            mime_type = mime_types[0]
-    
-    # URL编码文件名以支持中文
-    encoded_filename = quote(material.original_filename)
-    
-    # 对于某些类型，使用 inline 显示
-    inline_types = ['image', 'pdf', 'video']
-    
-    if material.resource_type.lower() in inline_types:
-        # 读取文件内容
-        with open(file_path, 'rb') as f:
-            content = f.read()
-        
-        return Response(
-            content=content,
-            media_type=mime_type,
-            headers={
-                'Content-Disposition': f'inline; filename*=UTF-8\'\'{encoded_filename}',
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET',
-                'Access-Control-Allow-Headers': '*',
-                'Cache-Control': 'public, max-age=3600',
-            }
-        )
-    else:
-        # 其他类型返回 FileResponse
-        return FileResponse(
-            file_path,
-            media_type=mime_type,
-            headers={
-                'Content-Disposition': f'inline; filename*=UTF-8\'\'{encoded_filename}',
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET',
-                'Access-Control-Allow-Headers': '*',
-                'Cache-Control': 'public, max-age=3600',
-            }
-        )
-
+    return await file_delivery.serve(
+        request,
+        material.file_path,
+        get_material_mime_type(material.resource_type),
+        material.original_filename,
+        headers=PREVIEW_HEADERS
+    )
@@ -5,10 +5,10 @@ from sqlalchemy import select, and_, or_, text
 from sqlalchemy.orm import selectinload
 from datetime import datetime
 from app.db.session import get_db
-from app.models.base import User, StudentProfile, Course, ClassCourseRelation
+from app.models.base import User, Course, ClassCourseRelation
 from app.models.exam import Exam, ExamStudent
 from app.models.course_outline import CourseChapterExam, CourseSectionResource
-from app.api.v1.endpoints.students import get_current_user
+from app.api.deps import Principal, get_current_principal, get_current_user
 
 router = APIRouter()
 
@@ -16,6 +16,7 @@ router = APIRouter()
 async def get_student_exams(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
+    principal: Principal = Depends(get_current_principal),
 ) -> Any:
     """
     获取学生的考试列表
@@ -27,16 +28,12 @@ async def get_student_exams(
     try:
         print(f"\n[Exams API] 获取学生 {current_user.id} 的考试列表")
         
-        student_profile_result = await db.execute(
-            select(StudentProfile).where(StudentProfile.user_id == current_user.id)
-        )
-        student_profile = student_profile_result.scalars().first()
         
-        if not student_profile:
+        if principal.student_profile_id is None:
             print("[Exams API] 未找到学生档案")
             return []
         
-        print(f"[Exams API] 学生班级ID: {student_profile.class_id}")
+        print(f"[Exams API] 学生班级ID: {principal.class_id}")
         
         exams_list = []
         now = datetime.now()  # 使用本地时间而非UTC时间
@@ -70,7 +67,7 @@ async def get_student_exams(
         
         # 2. 获取学生班级的课程
         class_course_result = await db.execute(
-            select(ClassCourseRelation).where(ClassCourseRelation.class_id == student_profile.class_id)
+            select(ClassCourseRelation).where(ClassCourseRelation.class_id == principal.class_id)
         )
         class_courses = class_course_result.scalars().all()
         course_ids = [cc.course_id for cc in class_courses]
@@ -5,9 +5,9 @@ from sqlalchemy import select, func, and_, or_, text, desc
 from sqlalchemy.orm import selectinload
 from datetime import datetime, timedelta
 from app.db.session import get_db
-from app.models.base import User, StudentProfile, Course, Class, ClassCourseRelation, TeacherProfile
+from app.models.base import User, Course, Class, ClassCourseRelation, TeacherProfile
 from app.models.student_learning import StudentLearningBehavior
-from app.api.v1.endpoints.students import get_current_user
+from app.api.deps import Principal, get_current_principal, get_current_user
 
 router = APIRouter()
 
@@ -15,6 +15,7 @@ router = APIRouter()
 async def get_student_dashboard(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
+    principal: Principal = Depends(get_current_principal),
 ) -> Any:
     """
     获取学生首页Dashboard数据
@@ -23,15 +24,9 @@ async def get_student_dashboard(
     try:
         print(f"[Dashboard] 获取用户 {current_user.id} 的Dashboard数据")
         
-        # 获取学生档案
-        student_profile_result = await db.execute(
-            select(StudentProfile).where(StudentProfile.user_id == current_user.id)
-        )
-        student_profile = student_profile_result.scalars().first()
-        
-        print(f"[Dashboard] 学生档案: {student_profile}")
+        print(f"[Dashboard] 学生档案ID: {principal.student_profile_id}")
         
-        if not student_profile or not student_profile.class_id:
+        if principal.student_profile_id is None or not principal.class_id:
             print(f"[Dashboard] 学生没有档案或班级，返回基础数据")
             # 即使没有班级，也返回新上架课程
             new_courses_result = await db.execute(
@@ -66,10 +61,10 @@ async def get_student_dashboard(
             }
         
         # 1. 获取学生的课程列表（通过班级关联）
-        print(f"[Dashboard] 学生班级ID: {student_profile.class_id}")
+        print(f"[Dashboard] 学生班级ID: {principal.class_id}")
         
         class_course_result = await db.execute(
-            select(ClassCourseRelation).where(ClassCourseRelation.class_id == student_profile.class_id)
+            select(ClassCourseRelation).where(ClassCourseRelation.class_id == principal.class_id)
         )
         class_courses = class_course_result.scalars().all()
         course_ids = [cc.course_id for cc in class_courses]
@@ -93,11 +88,11 @@ async def get_student_dashboard(
                     c.major_id,
                     m.name as major_name,
                     u.full_name as teacher_name,
-                    MAX(lb.created_at) as last_learning_time,
-                    COALESCE(SUM(lb.duration_seconds) / 60.0, 0) as study_minutes,
-                    COUNT(lb.id) as study_count
+                    MAX(ds.last_activity_at) as last_learning_time,
+                    COALESCE(SUM(ds.duration_seconds) / 60.0, 0) as study_minutes,
+                    COALESCE(SUM(ds.behavior_count), 0) as study_count
                 FROM course c
-                LEFT JOIN student_learning_behavior lb ON c.id = lb.course_id AND lb.student_id = :student_id
+                LEFT JOIN student_learning_daily_stat ds ON c.id = ds.course_id AND ds.student_id = :student_id
                 LEFT JOIN sys_user u ON c.main_teacher_id = u.id
                 LEFT JOIN course_cover cc ON c.id = cc.course_id
                 LEFT JOIN major m ON c.major_id = m.id
@@ -105,7 +100,7 @@ async def get_student_dashboard(
                 AND c.is_deleted = FALSE
                 GROUP BY c.id, c.title, c.code, c.introduction, c.cover_image, cc.filename, c.credits, 
                          c.course_type, c.is_public, c.major_id, m.name, u.full_name
-                ORDER BY MAX(lb.created_at) DESC NULLS LAST, c.id DESC
+                ORDER BY MAX(ds.last_activity_at) DESC NULLS LAST, c.id DESC
             """)
             
             result = await db.execute(
@@ -131,7 +126,7 @@ async def get_student_dashboard(
                     "teacher_name": row.teacher_name,
                     "last_learning_time": row.last_learning_time.isoformat() if row.last_learning_time else None,
                     "study_minutes": float(row.study_minutes) if row.study_minutes else 0,
-                    "study_count": row.study_count if row.study_count else 0
+                    "study_count": int(row.study_count) if row.study_count else 0
                 }
                 for row in result
             ]
@@ -153,9 +148,9 @@ async def get_student_dashboard(
                     c.is_public,
                     m.name as major_name,
                     u.full_name as teacher_name,
-                    COUNT(DISTINCT lb.student_id) as learner_count
+                    COUNT(DISTINCT ds.student_id) as learner_count
                 FROM course c
-                LEFT JOIN student_learning_behavior lb ON c.id = lb.course_id
+                LEFT JOIN student_learning_daily_stat ds ON c.id = ds.course_id
                 LEFT JOIN sys_user u ON c.main_teacher_id = u.id
                 LEFT JOIN course_cover cc ON c.id = cc.course_id
                 LEFT JOIN major m ON c.major_id = m.id
@@ -186,9 +181,9 @@ async def get_student_dashboard(
                     c.is_public,
                     m.name as major_name,
                     u.full_name as teacher_name,
-                    COUNT(DISTINCT lb.student_id) as learner_count
+                    COUNT(DISTINCT ds.student_id) as learner_count
                 FROM course c
-                LEFT JOIN student_learning_behavior lb ON c.id = lb.course_id
+                LEFT JOIN student_learning_daily_stat ds ON c.id = ds.course_id
                 LEFT JOIN sys_user u ON c.main_teacher_id = u.id
                 LEFT JOIN course_cover cc ON c.id = cc.course_id
                 LEFT JOIN major m ON c.major_id = m.id
@@ -264,9 +259,9 @@ async def get_student_dashboard(
         
         # 4. 获取班级信息
         class_info = None
-        if student_profile.class_id:
+        if principal.class_id:
             class_result = await db.execute(
-                select(Class).where(Class.id == student_profile.class_id)
+                select(Class).where(Class.id == principal.class_id)
             )
             class_obj = class_result.scalars().first()
             if class_obj:
@@ -307,20 +302,20 @@ async def get_learning_curve(
 ) -> Any:
     """
     获取学生的学习曲线数据
-    从learning_behavior表统计最近N天的学习次数和时长
+    从学习行为日汇总表统计最近N天的学习次数和时长
     """
     try:
         start_date = datetime.utcnow().date() - timedelta(days=days-1)
         
         learning_curve_query = text("""
             SELECT 
-                DATE(created_at) as date,
-                COUNT(*) as study_count,
+                stat_date as date,
+                SUM(behavior_count) as study_count,
                 COALESCE(SUM(duration_seconds) / 60, 0) as study_duration
-            FROM student_learning_behavior
+            FROM student_learning_daily_stat
             WHERE student_id = :student_id
-            AND DATE(created_at) >= :start_date
-            GROUP BY DATE(created_at)
+            AND stat_date >= :start_date
+            GROUP BY stat_date
             ORDER BY date
         """)
         
@@ -332,7 +327,7 @@ async def get_learning_curve(
         learning_data = [
             {
                 "date": row.date.isoformat() if row.date else "",
-                "study_count": row.study_count,
+                "study_count": int(row.study_count or 0),
                 "study_duration": int(row.study_duration) if row.study_duration else 0
             }
             for row in result
@@ -6,7 +6,7 @@ from sqlalchemy.orm import selectinload
 from app.db.session import get_db
 from app.models.base import User, Course
 from app.models.interaction import TeacherStudentInteraction
-from app.api.v1.endpoints.students import get_current_user
+from app.api.deps import get_current_user
 
 router = APIRouter()
 
@@ -1,43 +1,17 @@
 from typing import Any, List
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
 from sqlalchemy import text, func
 from datetime import datetime, timedelta
 from app.db.session import get_db
+from app.api.deps import get_current_user
 from app.models.base import User
-from app.models.student_learning import StudentLearningBehavior, StudentStudyDuration, StudentExamScore
-from jose import jwt
-from fastapi.security import OAuth2PasswordBearer
+from app.models.student_learning import StudentExamScore
 from app.core.config import settings
+from app.services.learning_behavior_writer import build_behavior_event, learning_behavior_writer, write_behavior_events
 
 router = APIRouter()
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
-
-
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_db),
-) -> User:
-    """
-    从token获取当前用户
-    """
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Could not validate credentials")
-    except Exception:
-        raise HTTPException(status_code=401, detail="Could not validate credentials")
-
-    result = await db.execute(select(User).where(User.id == int(user_id)))
-    user = result.scalars().first()
-    if user is None:
-        raise HTTPException(status_code=401, detail="User not found")
-    return user
-
-
 @router.get("/courses/{course_id}/learning-behaviors")
 async def get_learning_behaviors(
     course_id: int,
@@ -249,65 +223,15 @@ async def record_learning_behavior(
     if current_user.role != "student":
         raise HTTPException(status_code=403, detail="只有学生才能访问此资源")
 
-    # 创建学习行为记录
-    behavior = StudentLearningBehavior(
-        student_id=current_user.id,
-        course_id=course_id,
-        chapter_id=behavior_data.get("chapter_id"),
-        resource_id=behavior_data.get("resource_id"),
-        resource_type=behavior_data.get("resource_type"),
-        behavior_type=behavior_data.get("behavior_type", "view_resource"),
-        duration_seconds=behavior_data.get("duration_seconds", 0),
-        description=behavior_data.get("description")
-    )
-    db.add(behavior)
-    
-    # 更新当天的学习时长统计
-    today = datetime.now().date()
-    duration_minutes = behavior_data.get("duration_seconds", 0) // 60
+    event = build_behavior_event(current_user.id, course_id, behavior_data)
     
-    if duration_minutes > 0:
-        # 查找今天的记录
-        query = text("""
-            SELECT id, duration_minutes
-            FROM student_study_duration
-            WHERE student_id = :student_id 
-                AND course_id = :course_id
-                AND DATE(study_date) = :today
-        """)
-        result = await db.execute(
-            query,
-            {"student_id": current_user.id, "course_id": course_id, "today": today}
-        )
-        existing = result.fetchone()
-        
-        if existing:
-            # 更新现有记录
-            update_query = text("""
-                UPDATE student_study_duration
-                SET duration_minutes = duration_minutes + :duration_minutes,
-                    updated_at = :now
-                WHERE id = :id
-            """)
-            await db.execute(
-                update_query,
-                {
-                    "duration_minutes": duration_minutes,
-                    "now": datetime.utcnow(),
-                    "id": existing[0]
-                }
-            )
-        else:
-            # 创建新记录
-            duration_record = StudentStudyDuration(
-                student_id=current_user.id,
-                course_id=course_id,
-                study_date=datetime.now(),
-                duration_minutes=duration_minutes
-            )
-            db.add(duration_record)
+    # 批量写入模式：入队后立即返回，由后台任务批量写入
+    if settings.LEARNING_BEHAVIOR_BUFFERED and await learning_behavior_writer.enqueue(event):
+        return {"message": "学习行为记录成功", "behavior_id": None}
     
+    # 未启用批量写入或队列已满时同步写入
+    behavior_ids = await write_behavior_events(db, [event])
     await db.commit()
     
-    return {"message": "学习行为记录成功", "behavior_id": behavior.id}
+    return {"message": "学习行为记录成功", "behavior_id": behavior_ids[0]}
 
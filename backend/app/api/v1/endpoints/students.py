@@ -1,46 +1,19 @@
 from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
-from jose import jwt
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
-from sqlalchemy import text
 
 from app.db.session import get_db
-from app.core.config import settings
+from app.api.deps import Principal, get_current_principal, get_current_user
 from app.models.base import Course, ClassCourseRelation, StudentProfile, User, CourseCover, Class, TeacherProfile
 from app.models.course_outline import CourseSectionHomework, HomeworkAttachment
 from app.models.student_learning import StudentHomeworkSubmission, StudentHomeworkAttachment
+from app.services.course_outline_service import build_student_outline
 from pydantic import BaseModel
 from datetime import datetime
 
 router = APIRouter()
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
-
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_db)
-) -> User:
-    """获取当前登录用户"""
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: int = int(payload.get("sub"))
-        if user_id is None:
-            raise credentials_exception
-    except Exception:
-        raise credentials_exception
-    
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalars().first()
-    if user is None:
-        raise credentials_exception
-    return user
 
 @router.get("/profile")
 async def get_student_profile(
@@ -81,22 +54,18 @@ async def get_student_profile(
 async def get_student_courses(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
+    principal: Principal = Depends(get_current_principal),
 ) -> Any:
     """
     获取学生的课程列表（基于班级关联）
     """
     # 获取学生的班级ID
-    result = await db.execute(
-        select(StudentProfile).where(StudentProfile.user_id == current_user.id)
-    )
-    student_profile = result.scalars().first()
-    
-    if not student_profile:
+    if principal.student_profile_id is None:
         return []
     
     # 获取班级关联的课程
     class_course_result = await db.execute(
-        select(ClassCourseRelation).where(ClassCourseRelation.class_id == student_profile.class_id)
+        select(ClassCourseRelation).where(ClassCourseRelation.class_id == principal.class_id)
     )
     class_courses = class_course_result.scalars().all()
     
@@ -159,23 +128,19 @@ async def get_course_outline(
     course_id: int,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
+    principal: Principal = Depends(get_current_principal),
 ) -> Any:
     """
     获取学生可访问的课程大纲
     """
     # 验证学生是否有权限访问该课程
-    result = await db.execute(
-        select(StudentProfile).where(StudentProfile.user_id == current_user.id)
-    )
-    student_profile = result.scalars().first()
-    
-    if not student_profile:
+    if principal.student_profile_id is None:
         raise HTTPException(status_code=403, detail="学生信息不存在")
     
     # 检查课程是否关联到学生的班级
     class_course_result = await db.execute(
         select(ClassCourseRelation).where(
-            ClassCourseRelation.class_id == student_profile.class_id,
+            ClassCourseRelation.class_id == principal.class_id,
             ClassCourseRelation.course_id == course_id
         )
     )
@@ -184,149 +149,8 @@ async def get_course_outline(
     if not class_course:
         raise HTTPException(status_code=403, detail="您没有权限访问此课程")
     
-    # 获取课程大纲（使用原始SQL避免ORM问题）
-    query = text("""
-        SELECT id, course_id, title, sort_order, parent_id
-        FROM course_chapter
-        WHERE course_id = :course_id AND parent_id IS NULL
-        ORDER BY sort_order
-    """)
-    
-    chapters_result = await db.execute(query, {"course_id": course_id})
-    chapters = chapters_result.fetchall()
-    
-    outline = []
-    for chapter_row in chapters:
-        chapter_id = chapter_row[0]
-        
-        # 获取章节下的小节
-        sections_query = text("""
-            SELECT id, course_id, title, sort_order, parent_id
-            FROM course_chapter
-            WHERE parent_id = :chapter_id
-            ORDER BY sort_order
-        """)
-        sections_result = await db.execute(sections_query, {"chapter_id": chapter_id})
-        sections = sections_result.fetchall()
-        
-        sections_data = []
-        for section_row in sections:
-            section_id = section_row[0]
-            
-            # 获取小节的资源
-            resources_query = text("""
-                SELECT resource_type, resource_id
-                FROM course_section_resource
-                WHERE chapter_id = :section_id
-            """)
-            resources_result = await db.execute(resources_query, {"section_id": section_id})
-            resources_rows = resources_result.fetchall()
-            
-            resources_data = []
-            for resource_row in resources_rows:
-                resource_type = resource_row[0]
-                resource_id = resource_row[1]
-                
-                # 获取资源详情
-                resource_info = None
-                if resource_type == 'teaching_resource' or resource_type == 'teaching':
-                    res_query = text("""
-                        SELECT id, teacher_id, resource_name, original_filename, resource_type, file_size, file_path
-                        FROM teaching_resource
-                        WHERE id = :resource_id AND is_active = true
-                    """)
-                    res_result = await db.execute(res_query, {"resource_id": resource_id})
-                    res_row = res_result.fetchone()
-                    if res_row:
-                        # 构建下载URL
-                        file_url = f"/api/v1/teacher/resources/{res_row[0]}/download"
-                        resource_info = {
-                            "id": res_row[0],
-                            "teacher_id": res_row[1],  # 添加teacher_id，供ResourcePreviewModal使用
-                            "type": "teaching_resource",
-                            "resource_type": res_row[4] or "teaching_resource",  # 使用数据库中的resource_type
-                            "name": res_row[2],  # resource_name -> name
-                            "resource_name": res_row[2],  # 保留resource_name字段
-                            "original_filename": res_row[3],  # 添加original_filename
-                            "file_type": res_row[4] or "unknown",  # resource_type作为file_type
-                            "file_url": file_url,
-                            "file_size": res_row[5]
-                        }
-                elif resource_type == 'reference_material' or resource_type == 'reference':
-                    res_query = text("""
-                        SELECT id, teacher_id, material_name, original_filename, resource_type, file_size, file_path
-                        FROM reference_material
-                        WHERE id = :resource_id AND is_active = true
-                    """)
-                    res_result = await db.execute(res_query, {"resource_id": resource_id})
-                    res_row = res_result.fetchone()
-                    if res_row:
-                        # 构建下载URL
-                        file_url = f"/api/v1/teacher/references/{res_row[0]}/download"
-                        resource_info = {
-                            "id": res_row[0],
-                            "teacher_id": res_row[1],  # 添加teacher_id，供ResourcePreviewModal使用
-                            "type": "reference_material",
-                            "resource_type": res_row[4] or "reference_material",  # 使用数据库中的resource_type
-                            "name": res_row[2],  # material_name -> name
-                            "material_name": res_row[2],  # 保留material_name字段
-                            "original_filename": res_row[3],  # 添加original_filename
-                            "file_type": res_row[4] or "unknown",  # resource_type作为file_type
-                            "file_url": file_url,
-                            "file_size": res_row[5]
-                        }
-                
-                if resource_info:
-                    resources_data.append(resource_info)
-            
-            # 获取小节的作业及学生提交状态
-            homework_query = text("""
-                SELECT hw.id, hw.title, hw.description, hw.deadline, hw.sort_order,
-                       sub.id as submission_id, sub.status, sub.score, sub.submitted_at
-                FROM course_section_homework hw
-                LEFT JOIN student_homework_submission sub 
-                    ON sub.homework_id = hw.id AND sub.student_id = :student_id
-                WHERE hw.chapter_id = :section_id
-                ORDER BY hw.sort_order
-            """)
-            homework_result = await db.execute(homework_query, {
-                "section_id": section_id,
-                "student_id": current_user.id
-            })
-            homework_rows = homework_result.fetchall()
-            
-            homework_data = []
-            for hw_row in homework_rows:
-                homework_data.append({
-                    "id": hw_row[0],
-                    "title": hw_row[1],
-                    "description": hw_row[2],
-                    "deadline": hw_row[3].isoformat() if hw_row[3] else None,
-                    "sort_order": hw_row[4],
-                    "submission_status": hw_row[6] or "not_started",  # draft, submitted, graded, not_started
-                    "score": hw_row[7],
-                    "submitted_at": hw_row[8].isoformat() if hw_row[8] else None,
-                    "has_submission": hw_row[5] is not None
-                })
-            
-            sections_data.append({
-                "id": section_row[0],
-                "title": section_row[2],
-                "sort_order": section_row[3],
-                "resources": resources_data,
-                "exam_papers": [],
-                "homework": homework_data
-            })
-        
-        outline.append({
-            "id": chapter_row[0],
-            "title": chapter_row[2],
-            "sort_order": chapter_row[3],
-            "sections": sections_data,
-            "exam_papers": []
-        })
-    
-    return outline
+    # 课程大纲骨架（按课程缓存）+ 当前学生的作业提交状态
+    return await build_student_outline(db, course_id, current_user.id)
 
 
 # ==================== 作业相关API ====================
@@ -350,6 +174,7 @@ async def get_homework_detail(
     homework_id: int,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
+    principal: Principal = Depends(get_current_principal),
 ) -> Any:
     """
     获取作业详情及学生的提交记录
@@ -366,12 +191,7 @@ async def get_homework_detail(
         raise HTTPException(status_code=404, detail="作业不存在")
     
     # 验证学生是否有权限访问（通过班级-课程关联）
-    student_result = await db.execute(
-        select(StudentProfile).where(StudentProfile.user_id == current_user.id)
-    )
-    student_profile = student_result.scalars().first()
-    
-    if not student_profile:
+    if principal.student_profile_id is None:
         raise HTTPException(status_code=403, detail="学生信息不存在")
     
     # 获取作业所属章节和课程
@@ -387,7 +207,7 @@ async def get_homework_detail(
     # 验证学生班级是否有该课程
     class_course_result = await db.execute(
         select(ClassCourseRelation).where(
-            ClassCourseRelation.class_id == student_profile.class_id,
+            ClassCourseRelation.class_id == principal.class_id,
             ClassCourseRelation.course_id == chapter.course_id
         )
     )
@@ -458,6 +278,7 @@ async def submit_homework(
     data: HomeworkSubmissionCreate,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
+    principal: Principal = Depends(get_current_principal),
 ) -> Any:
     """
     提交或更新作业
@@ -482,17 +303,12 @@ async def submit_homework(
         raise HTTPException(status_code=404, detail="章节不存在")
     
     # 验证学生权限
-    student_result = await db.execute(
-        select(StudentProfile).where(StudentProfile.user_id == current_user.id)
-    )
-    student_profile = student_result.scalars().first()
-    
-    if not student_profile:
+    if principal.student_profile_id is None:
         raise HTTPException(status_code=403, detail="学生信息不存在")
     
     class_course_result = await db.execute(
         select(ClassCourseRelation).where(
-            ClassCourseRelation.class_id == student_profile.class_id,
+            ClassCourseRelation.class_id == principal.class_id,
             ClassCourseRelation.course_id == chapter.course_id
         )
     )
@@ -1,7 +1,5 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set
 from datetime import datetime
-import json
-import re
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
 from fastapi.responses import Response
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -11,12 +9,21 @@ from pydantic import BaseModel
 
 from app.db.session import get_db
 from app.models.base import Course, Class, ClassCourseRelation, StudentProfile, TeacherProfile, User
-from app.models.student_learning import StudentExamScore, StudentLearningBehavior, StudentImportedExamScore, CourseGrade, CourseGradePublishHistory
+from app.models.student_learning import StudentExamScore, StudentImportedExamScore, CourseGrade, CourseGradePublishHistory
 from app.models.llm_config import LLMConfig
-from app.api.v1.endpoints.students import get_current_user
+from app.api.deps import get_current_user
 from app.utils.import_utils import parse_excel_file, generate_excel_template
 from app.utils.llm_call_logger import log_llm_call
 from app.api.v1.endpoints.learning_profile import call_llm_api
+from app.services.learning_score_service import (
+    LearningScoreJob,
+    apply_learning_score,
+    build_learning_prompt,
+    empty_learning_metrics,
+    learning_score_jobs,
+    load_learning_metrics,
+    parse_learning_score,
+)
 
 router = APIRouter()
 
@@ -43,6 +50,11 @@ class AIScoreRequest(BaseModel):
     student_id: int
 
 
+class BatchAIScoreRequest(BaseModel):
+    class_id: Optional[int] = None
+    student_ids: Optional[List[int]] = None
+
+
 DEFAULT_COMPONENTS = [
     {"key": "quiz", "name": "平时测验", "weight": 40, "enabled": True},
     {"key": "learning", "name": "学习数据", "weight": 20, "enabled": True},
@@ -87,6 +99,24 @@ async def get_course_access(
     return {"course": course, "relations": relations, "is_main_teacher": is_main_teacher}
 
 
+def get_teacher_class_ids(
+    access: Dict[str, Any],
+    teacher_profile: TeacherProfile,
+    class_id: Optional[int] = None
+) -> Set[int]:
+    """教师在课程中可管理的班级：主讲教师为课程关联的所有班级，其他教师为自己授课的班级"""
+    relations = access["relations"]
+    if not access["is_main_teacher"]:
+        relations = [rel for rel in relations if rel.teacher_id == teacher_profile.id]
+
+    class_ids = {relation.class_id for relation in relations if relation.class_id}
+    if class_id:
+        if class_id not in class_ids:
+            raise HTTPException(status_code=403, detail="班级不在该教师授课范围内")
+        class_ids = {class_id}
+    return class_ids
+
+
 def normalize_components(components: List[GradeComponent]) -> List[Dict[str, Any]]:
     normalized = []
     for item in components:
@@ -257,21 +287,7 @@ async def list_course_students(
     teacher_profile = await get_teacher_profile(db, current_user.id)
     access = await get_course_access(db, course_id, teacher_profile, current_user)
     course = access["course"]
-    relations = access["relations"]
-    is_main_teacher = access["is_main_teacher"]
-
-    if is_main_teacher:
-        relation_query = select(ClassCourseRelation).where(ClassCourseRelation.course_id == course_id)
-        relation_result = await db.execute(relation_query)
-        relations = relation_result.scalars().all()
-    else:
-        relations = [rel for rel in relations if rel.teacher_id == teacher_profile.id]
-
-    class_ids = {relation.class_id for relation in relations if relation.class_id}
-    if class_id:
-        if class_id not in class_ids:
-            raise HTTPException(status_code=403, detail="班级不在该教师授课范围内")
-        class_ids = {class_id}
+    class_ids = get_teacher_class_ids(access, teacher_profile, class_id)
 
     if not class_ids:
         return {"course_id": course_id, "students": []}
@@ -380,20 +396,8 @@ async def calculate_learning_ai_score(
         raise HTTPException(status_code=404, detail="学生不存在")
     student_user, student_profile = student_row
 
-    behavior_result = await db.execute(
-        select(
-            func.coalesce(func.sum(StudentLearningBehavior.duration_seconds), 0),
-            func.count(StudentLearningBehavior.id),
-            func.max(StudentLearningBehavior.created_at)
-        )
-        .where(
-            StudentLearningBehavior.course_id == course_id,
-            StudentLearningBehavior.student_id == payload.student_id
-        )
-    )
-    total_seconds, study_count, last_active = behavior_result.first()
-    total_minutes = round(float(total_seconds or 0) / 60, 2)
-    last_active_str = last_active.isoformat() if last_active else "无"
+    metrics_map = await load_learning_metrics(db, course_id, [payload.student_id])
+    metrics = metrics_map.get(payload.student_id) or empty_learning_metrics()
 
     llm_result = await db.execute(
         select(LLMConfig).where(LLMConfig.is_active == True).limit(1)
@@ -402,15 +406,7 @@ async def calculate_learning_ai_score(
     if not llm_config:
         raise HTTPException(status_code=503, detail="系统未配置大模型服务")
 
-    prompt = (
-        "你是课程教师评分助手，请根据学习数据给出学习表现评分。\n"
-        "请严格输出JSON格式，字段为 score（0-100数字）和 reason（简短中文）。\n"
-        f"课程：{course.title}\n"
-        f"学生：{student_user.full_name or student_user.username}\n"
-        f"学习时长（分钟）：{total_minutes}\n"
-        f"学习次数：{study_count}\n"
-        f"最近学习时间：{last_active_str}\n"
-    )
+    prompt = build_learning_prompt(course.title, student_user.full_name or student_user.username, metrics)
 
     ai_response = None
     async with log_llm_call(
@@ -430,19 +426,9 @@ async def calculate_learning_ai_score(
             log_context.set_result(None, status="failed", error_message=str(e))
             raise HTTPException(status_code=500, detail=str(e))
 
-    score_value = None
-    try:
-        parsed = json.loads(ai_response.strip())
-        score_value = float(parsed.get("score"))
-        reason = parsed.get("reason")
-    except Exception:
-        match = re.search(r"(\d{1,3}(\.\d+)?)", ai_response or "")
-        score_value = float(match.group(1)) if match else None
-        reason = None
-
+    score_value, reason = parse_learning_score(ai_response)
     if score_value is None:
         raise HTTPException(status_code=500, detail="无法解析AI评分结果")
-    score_value = max(0, min(100, score_value))
 
     grade_result = await db.execute(
         select(CourseGrade).where(
@@ -458,20 +444,7 @@ async def calculate_learning_ai_score(
         )
         db.add(grade)
 
-    breakdown = grade.breakdown if grade.breakdown and isinstance(grade.breakdown, dict) else {}
-    breakdown["learning"] = {
-        "score": score_value,
-        "ai_result": ai_response,
-        "reason": reason,
-        "metrics": {
-            "study_minutes": total_minutes,
-            "study_count": int(study_count),
-            "last_active": last_active_str
-        }
-    }
-    grade.breakdown = breakdown
-    grade.final_score = score_value
-    grade.updated_at = datetime.utcnow()
+    apply_learning_score(grade, score_value, ai_response, reason, metrics)
     await db.commit()
     await db.refresh(grade)
 
@@ -483,6 +456,72 @@ async def calculate_learning_ai_score(
     }
 
 
+@router.post("/courses/{course_id}/learning-ai-score/batch")
+async def start_learning_ai_score_job(
+    course_id: int,
+    payload: BatchAIScoreRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> Any:
+    """为课程（或其中一个班级、指定学生）的所有学生进行学习表现AI评分，后台执行并返回任务ID"""
+    if current_user.role != "teacher":
+        raise HTTPException(status_code=403, detail="只有教师可以访问")
+
+    teacher_profile = await get_teacher_profile(db, current_user.id)
+    access = await get_course_access(db, course_id, teacher_profile, current_user)
+    course = access["course"]
+    class_ids = get_teacher_class_ids(access, teacher_profile, payload.class_id)
+    if not class_ids:
+        raise HTTPException(status_code=400, detail="课程没有关联班级")
+
+    student_query = select(StudentProfile.user_id, User.full_name, User.username).join(
+        User, StudentProfile.user_id == User.id
+    ).where(
+        StudentProfile.class_id.in_(class_ids),
+        User.is_active == True,
+        User.role == "student"
+    )
+    if payload.student_ids:
+        student_query = student_query.where(StudentProfile.user_id.in_(payload.student_ids))
+    student_result = await db.execute(student_query)
+    students = [(user_id, full_name or username) for user_id, full_name, username in student_result.all()]
+    if not students:
+        raise HTTPException(status_code=400, detail="没有需要评分的学生")
+
+    llm_result = await db.execute(
+        select(LLMConfig).where(LLMConfig.is_active == True).limit(1)
+    )
+    llm_config = llm_result.scalars().first()
+    if not llm_config:
+        raise HTTPException(status_code=503, detail="系统未配置大模型服务")
+
+    job = learning_score_jobs.start(
+        LearningScoreJob(course_id, course.title, current_user.id, current_user.role, students),
+        llm_config.id
+    )
+    return job.to_dict()
+
+
+@router.get("/courses/{course_id}/learning-ai-score/jobs/{job_id}")
+async def get_learning_ai_score_job(
+    course_id: int,
+    job_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> Any:
+    """查询课程学习表现AI评分任务的进度"""
+    if current_user.role != "teacher":
+        raise HTTPException(status_code=403, detail="只有教师可以访问")
+
+    teacher_profile = await get_teacher_profile(db, current_user.id)
+    await get_course_access(db, course_id, teacher_profile, current_user)
+
+    job = await learning_score_jobs.get(job_id)
+    if not job or job["course_id"] != course_id:
+        raise HTTPException(status_code=404, detail="评分任务不存在")
+    return job
+
+
 @router.get("/courses/{course_id}/import/template")
 async def download_import_template(
     course_id: int,
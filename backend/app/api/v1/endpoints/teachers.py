@@ -1,50 +1,16 @@
 from typing import Any
 import builtins
 from datetime import datetime, timedelta
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_, case
 from sqlalchemy.orm import selectinload
 
 from app.db.session import get_db
+from app.api.deps import get_current_user
 from app.models.base import TeacherProfile, User, Major, StudentProfile, ClassCourseRelation, Course
-from app.models.student_learning import StudentLearningBehavior, StudentExamScore
+from app.models.student_learning import StudentLearningDailyStat, StudentExamScore
 from app.core import security
-from fastapi.security import OAuth2PasswordBearer
-from jose import jwt
-from app.core.config import settings
-
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
-
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_db),
-) -> User:
-    """
-    从token获取当前用户
-    """
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials",
-            )
-    except Exception:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-        )
-    
-    result = await db.execute(select(User).where(User.id == int(user_id)))
-    user = result.scalars().first()
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-        )
-    return user
 
 router = APIRouter()
 
@@ -189,25 +155,25 @@ async def get_teacher_analytics_overview(
             "risk_students": []
         }
 
-    active_students_result = await db.execute(
-        select(StudentLearningBehavior.student_id)
-        .where(
-            StudentLearningBehavior.course_id.in_(course_ids),
-            StudentLearningBehavior.created_at >= start_datetime,
-            StudentLearningBehavior.student_id.in_(student_ids)
-        )
-        .distinct()
+    # 学习行为统计读取日汇总表（写入学习行为时增量维护），不扫描原始行为记录
+    Daily = StudentLearningDailyStat
+    daily_filters = (
+        Daily.course_id.in_(course_ids),
+        Daily.stat_date >= start_date,
+        Daily.student_id.in_(student_ids)
     )
-    active_student_ids = {row[0] for row in active_students_result.fetchall()}
 
-    total_study_seconds = await db.scalar(
-        select(func.coalesce(func.sum(StudentLearningBehavior.duration_seconds), 0)).where(
-            StudentLearningBehavior.course_id.in_(course_ids),
-            StudentLearningBehavior.created_at >= start_datetime,
-            StudentLearningBehavior.student_id.in_(student_ids)
+    minutes_result = await db.execute(
+        select(
+            Daily.student_id,
+            func.coalesce(func.sum(Daily.duration_seconds), 0).label("duration_seconds")
         )
+        .where(*daily_filters)
+        .group_by(Daily.student_id)
     )
-    total_study_hours = round((total_study_seconds or 0) / 3600, 1)
+    seconds_map = {row.student_id: int(row.duration_seconds or 0) for row in minutes_result}
+    active_student_ids = set(seconds_map)
+    total_study_hours = round(sum(seconds_map.values()) / 3600, 1)
 
     student_count = len(student_ids)
     active_count = len(active_student_ids)
@@ -216,22 +182,18 @@ async def get_teacher_analytics_overview(
 
     learning_trend_result = await db.execute(
         select(
-            func.date(StudentLearningBehavior.created_at).label("date"),
-            func.count(StudentLearningBehavior.id).label("study_count"),
-            func.coalesce(func.sum(StudentLearningBehavior.duration_seconds) / 60, 0).label("study_duration")
+            Daily.stat_date.label("date"),
+            func.sum(Daily.behavior_count).label("study_count"),
+            func.coalesce(func.sum(Daily.duration_seconds) / 60, 0).label("study_duration")
         )
-        .where(
-            StudentLearningBehavior.course_id.in_(course_ids),
-            StudentLearningBehavior.created_at >= start_datetime,
-            StudentLearningBehavior.student_id.in_(student_ids)
-        )
-        .group_by(func.date(StudentLearningBehavior.created_at))
-        .order_by(func.date(StudentLearningBehavior.created_at))
+        .where(*daily_filters)
+        .group_by(Daily.stat_date)
+        .order_by(Daily.stat_date)
     )
     learning_data = [
         {
             "date": row.date.isoformat() if row.date else "",
-            "study_count": row.study_count,
+            "study_count": int(row.study_count or 0),
             "study_duration": int(row.study_duration) if row.study_duration else 0
         }
         for row in learning_trend_result
@@ -247,15 +209,15 @@ async def get_teacher_analytics_overview(
         select(
             Course.id,
             Course.title,
-            func.coalesce(func.sum(StudentLearningBehavior.duration_seconds), 0).label("duration_seconds"),
-            func.coalesce(func.count(StudentLearningBehavior.id), 0).label("study_count")
+            func.coalesce(func.sum(Daily.duration_seconds), 0).label("duration_seconds"),
+            func.coalesce(func.sum(Daily.behavior_count), 0).label("study_count")
         )
         .outerjoin(
-            StudentLearningBehavior,
+            Daily,
             and_(
-                StudentLearningBehavior.course_id == Course.id,
-                StudentLearningBehavior.created_at >= start_datetime,
-                StudentLearningBehavior.student_id.in_(student_ids)
+                Daily.course_id == Course.id,
+                Daily.stat_date >= start_date,
+                Daily.student_id.in_(student_ids)
             )
         )
         .where(Course.id.in_(course_ids))
@@ -267,7 +229,7 @@ async def get_teacher_analytics_overview(
             "course_id": row.id,
             "course_name": row.title,
             "study_minutes": int((row.duration_seconds or 0) / 60),
-            "study_count": row.study_count or 0
+            "study_count": int(row.study_count or 0)
         }
         for row in course_progress_result
     ]
@@ -296,19 +258,7 @@ async def get_teacher_analytics_overview(
         {"name": "<60", "value": int(score_row.score_lt or 0) if score_row else 0}
     ]
 
-    minutes_result = await db.execute(
-        select(
-            StudentLearningBehavior.student_id,
-            func.coalesce(func.sum(StudentLearningBehavior.duration_seconds) / 60, 0).label("study_minutes")
-        )
-        .where(
-            StudentLearningBehavior.course_id.in_(course_ids),
-            StudentLearningBehavior.created_at >= start_datetime,
-            StudentLearningBehavior.student_id.in_(student_ids)
-        )
-        .group_by(StudentLearningBehavior.student_id)
-    )
-    minutes_map = {row.student_id: float(row.study_minutes or 0) for row in minutes_result}
+    minutes_map = {student_id: float(seconds // 60) for student_id, seconds in seconds_map.items()}
     max_minutes = max([0] + list(minutes_map.values()))
 
     risk_candidates = []
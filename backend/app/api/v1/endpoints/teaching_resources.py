@@ -1,7 +1,6 @@
 from typing import Any, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
 from fastapi import Request
-from fastapi.responses import FileResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import func, and_
@@ -16,9 +15,13 @@ from app.db.session import get_db
 from app.models.teaching_resource import TeachingResource
 from app.models.base import User
 from app.utils.oss_client import oss_client
-from app.utils.libreoffice_converter import libreoffice_converter
 from app.core.config import settings
 from app.services.imm_service import imm_service
+from app.services.resource_knowledge import sync_resource_knowledge_points
+from app.services.resource_text_store import resource_text_store
+from app.services.pdf_conversion_service import needs_pdf_conversion, pdf_conversion_queue
+from app.utils.streaming_upload import UploadTooLargeError, stream_upload, upload_size
+from app.utils.file_delivery import file_delivery, is_remote_path
 
 router = APIRouter()
 
@@ -58,6 +61,21 @@ RESOURCE_TYPES = {
     }
 }
 
+# 下载接口的响应头
+DOWNLOAD_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET',
+    'Access-Control-Allow-Headers': '*',
+}
+
+# 预览/PDF接口的响应头
+PREVIEW_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, OPTIONS',
+    'Access-Control-Allow-Headers': '*',
+    'Cache-Control': 'public, max-age=3600',
+}
+
 # 确保上传目录存在
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -90,6 +108,14 @@ def get_resource_type_from_filename(filename: str) -> Optional[str]:
             return resource_type
     return None
 
+def get_resource_mime_type(resource_type: str) -> str:
+    """资源类型对应的MIME类型"""
+    if resource_type in RESOURCE_TYPES:
+        mime_types = RESOURCE_TYPES[resource_type]["mime_types"]
+        if mime_types:
+            return mime_types[0]
+    return "application/octet-stream"
+
 @router.get("/stats")
 async def get_resources_stats(
     teacher_id: int,
@@ -212,8 +238,7 @@ async def upload_resource(
     logging.info(f"上传文件: {file.filename}, 类型: {file.content_type}")
     
     # 检查文件大小
-    file_content = await file.read()
-    file_size = len(file_content)
+    file_size = upload_size(file)
     
     if file_size > MAX_FILE_SIZE:
         raise HTTPException(
@@ -235,81 +260,42 @@ async def upload_resource(
     file_id = str(uuid.uuid4())
     filename = f"{file_id}{file_ext}"
     
-    # 先保存到本地服务器（无论OSS是否启用，都需要本地文件用于PDF转换）
-    type_dir = UPLOAD_DIR / resource_type
-    type_dir.mkdir(parents=True, exist_ok=True)
-    local_file_path = type_dir / filename
+    # 保存到本地服务器（无论OSS是否启用，都需要本地文件用于PDF转换），同时上传到OSS（如果OSS已启用）
+    local_file_path = UPLOAD_DIR / resource_type / filename
+    oss_key = f"teaching_resources/{resource_type}/{filename}"
+    # 确定MIME类型
+    mime_type = None
+    if resource_type in RESOURCE_TYPES:
+        mime_types = RESOURCE_TYPES[resource_type]["mime_types"]
+        if mime_types:
+            mime_type = mime_types[0]
     
     try:
-        with open(local_file_path, "wb") as f:
-            f.write(file_content)
-        logging.info(f"文件已保存到本地: {local_file_path}")
+        stored = await stream_upload(
+            file,
+            local_path=local_file_path,
+            oss_key=oss_key,
+            content_type=mime_type,
+            max_size=MAX_FILE_SIZE
+        )
+    except UploadTooLargeError:
+        raise HTTPException(status_code=400, detail="文件大小超过限制。最大允许 50MB")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"文件保存失败: {str(e)}")
-    
-    # 同时上传到OSS（如果OSS已启用）
-    oss_url = None
-    if oss_client.enabled:
-        try:
-            oss_key = f"teaching_resources/{resource_type}/{filename}"
-            # 确定MIME类型
-            mime_type = None
-            if resource_type in RESOURCE_TYPES:
-                mime_types = RESOURCE_TYPES[resource_type]["mime_types"]
-                if mime_types:
-                    mime_type = mime_types[0]
-            oss_url = oss_client.upload_file(file_content, oss_key, content_type=mime_type)
-            logging.info(f"文件已上传到OSS: {oss_key}, URL: {oss_url}")
-        except Exception as e:
-            logging.error(f"上传到OSS失败: {e}，继续使用本地存储")
-            oss_url = None
+    file_size = stored.size
+    oss_url = stored.oss_url
+    logging.info(f"文件已保存到本地: {local_file_path}")
+    if oss_url:
+        logging.info(f"文件已上传到OSS: {oss_key}, URL: {oss_url}")
+    elif oss_client.enabled:
+        logging.error("上传到OSS失败，继续使用本地存储")
     
     # 文件路径：优先使用OSS URL，否则使用本地路径
     file_path_str = oss_url if oss_url else str(local_file_path)
     
-    # 如果是Office文档，尝试转换为PDF
-    pdf_local_path = None
-    pdf_path = None
+    # Office文档转换为PDF由后台队列完成，先以 pending 状态入库
     pdf_conversion_status = 'pending'
     
-    if resource_type in ['word', 'excel', 'ppt']:
-        if libreoffice_converter.is_supported_format(local_file_path):
-            try:
-                # 创建PDF输出目录
-                pdf_output_dir = UPLOAD_DIR / "pdfs" / resource_type
-                pdf_output_dir.mkdir(parents=True, exist_ok=True)
-                
-                # 转换为PDF
-                pdf_file = libreoffice_converter.convert_to_pdf(local_file_path, pdf_output_dir)
-                
-                if pdf_file and pdf_file.exists():
-                    pdf_local_path = str(pdf_file)
-                    pdf_conversion_status = 'success'
-                    
-                    # 读取PDF文件内容
-                    with open(pdf_file, 'rb') as f:
-                        pdf_content = f.read()
-                    
-                    # 上传PDF到OSS（如果OSS已启用）
-                    if oss_client.enabled:
-                        try:
-                            pdf_oss_key = f"teaching_resources/pdfs/{resource_type}/{pdf_file.name}"
-                            pdf_path = oss_client.upload_file(pdf_content, pdf_oss_key, content_type="application/pdf")
-                            logging.info(f"PDF已上传到OSS: {pdf_oss_key}, URL: {pdf_path}")
-                        except Exception as e:
-                            logging.error(f"PDF上传到OSS失败: {e}")
-                            pdf_path = pdf_local_path  # 使用本地路径
-                    else:
-                        pdf_path = pdf_local_path
-                    
-                    logging.info(f"PDF转换成功: {pdf_local_path}")
-                else:
-                    pdf_conversion_status = 'failed'
-                    logging.warning(f"PDF转换失败: {local_file_path}")
-            except Exception as e:
-                pdf_conversion_status = 'failed'
-                logging.error(f"PDF转换过程中出错: {e}")
-    
     # 创建数据库记录
     resource = TeachingResource(
         teacher_id=teacher_id,
@@ -319,17 +305,21 @@ async def upload_resource(
         local_file_path=str(local_file_path),  # 本地文件路径（用于PDF转换）
         file_size=file_size,
         resource_type=resource_type,
-        pdf_path=pdf_path,  # PDF文件路径（OSS或本地）
-        pdf_local_path=pdf_local_path,  # PDF本地文件路径
-        pdf_converted_at=datetime.utcnow() if pdf_local_path else None,
         pdf_conversion_status=pdf_conversion_status,
         knowledge_point=knowledge_point,
         folder_id=folder_id,
         is_active=True
     )
     db.add(resource)
+    await db.flush()
+    await sync_resource_knowledge_points(db, resource)
     await db.commit()
     await db.refresh(resource)
+    if needs_pdf_conversion(resource_type, resource.local_file_path):
+        # 转换完成后再提取文本（优先使用PDF版本）
+        await pdf_conversion_queue.enqueue(resource.id)
+    else:
+        resource_text_store.schedule(resource.id)
     
     return {
         "message": "资源上传成功",
@@ -338,7 +328,8 @@ async def upload_resource(
         "resource_type": resource.resource_type,
         "file_size": file_size,
         "file_path": file_path_str,
-        "pdf_converted": pdf_conversion_status == 'success'
+        "pdf_converted": False,
+        "pdf_conversion_status": resource.pdf_conversion_status
     }
 
 @router.put("/{resource_id}")
@@ -363,6 +354,7 @@ async def update_resource(
         resource.resource_name = resource_update.resource_name
     if resource_update.knowledge_point is not None:
         resource.knowledge_point = resource_update.knowledge_point
+        await sync_resource_knowledge_points(db, resource)
     if resource_update.folder_id is not None:
         resource.folder_id = resource_update.folder_id
     
@@ -400,9 +392,10 @@ async def delete_resource(
 async def download_resource(
     resource_id: int,
     teacher_id: int,
+    request: Request,
     db: AsyncSession = Depends(get_db),
 ):
-    """下载教学资源（支持OSS和本地文件）- 需要权限验证"""
+    """下载教学资源（支持OSS和本地文件，支持Range分段下载）- 需要权限验证"""
     result = await db.execute(
         select(TeachingResource).where(
             TeachingResource.id == resource_id,
@@ -415,78 +408,31 @@ async def download_resource(
     if not resource:
         raise HTTPException(status_code=404, detail="资源不存在或无权访问")
     
-    # 如果是OSS文件，从OSS下载并返回
-    if resource.file_path.startswith('http://') or resource.file_path.startswith('https://'):
-        try:
-            # 从OSS URL中提取key
-            oss_key = None
-            if '.aliyuncs.com/' in resource.file_path:
-                parts = resource.file_path.split('.aliyuncs.com/')
-                if len(parts) > 1:
-                    oss_key = parts[1].split('?')[0]
-            elif settings.OSS_USE_CNAME and settings.OSS_ENDPOINT:
-                if resource.file_path.startswith(settings.OSS_ENDPOINT):
-                    oss_key = resource.file_path.replace(settings.OSS_ENDPOINT + '/', '').split('?')[0]
-            
-            if oss_key and oss_client.enabled:
-                # 从OSS下载文件
-                import httpx
-                async with httpx.AsyncClient() as client:
-                    download_url = oss_client.generate_download_url(oss_key, expires=3600)
-                    response = await client.get(download_url)
-                    response.raise_for_status()
-                    
-                    # 确定 MIME 类型
-                    mime_type = "application/octet-stream"
-                    if resource.resource_type in RESOURCE_TYPES:
-                        mime_types = RESOURCE_TYPES[resource.resource_type]["mime_types"]
-                        if mime_types:
-                            mime_type = mime_types[0]
-                    
-                    from fastapi.responses import Response
-                    from urllib.parse import quote
-                    encoded_filename = quote(resource.original_filename)
-                    
-                    return Response(
-                        content=response.content,
-                        media_type=mime_type,
-                        headers={
-                            'Content-Disposition': f'inline; filename*=UTF-8\'\'{encoded_filename}',
-                            'Access-Control-Allow-Origin': '*',
-                            'Access-Control-Allow-Methods': 'GET',
-                            'Access-Control-Allow-Headers': '*',
-                        }
-                    )
-        except Exception as e:
-            logging.error(f"从OSS下载文件失败: {e}")
-            raise HTTPException(status_code=500, detail=f"文件下载失败: {str(e)}")
-    
-    # 本地文件
-    file_path = Path(resource.file_path)
-    
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="文件不存在")
-    
-    # 确定 MIME 类型
-    mime_type = "application/octet-stream"
-    if resource.resource_type in RESOURCE_TYPES:
-        mime_types = RESOURCE_TYPES[resource.resource_type]["mime_types"]
-        if mime_types:
-            mime_type = mime_types[0]
-    
-    return FileResponse(
-        file_path,
-        media_type=mime_type,
-        filename=resource.original_filename
-    )
+    # OSS文件以inline返回（供前端转换预览），本地文件作为附件下载
+    is_oss = is_remote_path(resource.file_path)
+    try:
+        return await file_delivery.serve(
+            request,
+            resource.file_path,
+            get_resource_mime_type(resource.resource_type),
+            resource.original_filename,
+            disposition='inline' if is_oss else 'attachment',
+            headers=DOWNLOAD_HEADERS
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"从OSS下载文件失败: {e}")
+        raise HTTPException(status_code=500, detail=f"文件下载失败: {str(e)}")
 
 @router.get("/{resource_id}/pdf")
 async def get_pdf(
     resource_id: int,
     teacher_id: int,
+    request: Request,
     db: AsyncSession = Depends(get_db),
 ):
-    """获取PDF文件（转换后的PDF或原始PDF文件）- 需要权限验证"""
+    """获取PDF文件（转换后的PDF或原始PDF文件，支持Range分段加载）- 需要权限验证"""
     result = await db.execute(
         select(TeachingResource).where(
             TeachingResource.id == resource_id,
@@ -501,133 +447,47 @@ async def get_pdf(
     
     # 优先使用转换后的PDF（pdf_path）
     pdf_path_to_use = None
-    pdf_is_oss = False
-    
     if resource.pdf_path:
         pdf_path_to_use = resource.pdf_path
-        pdf_is_oss = pdf_path_to_use.startswith('http://') or pdf_path_to_use.startswith('https://')
-        logging.info(f"使用pdf_path: {pdf_path_to_use}, is_oss: {pdf_is_oss}")
     elif resource.pdf_local_path:
         pdf_path_to_use = resource.pdf_local_path
-        pdf_is_oss = False
-        logging.info(f"使用pdf_local_path: {pdf_path_to_use}, is_oss: {pdf_is_oss}")
     elif resource.resource_type.lower() == 'pdf':
         # 如果是原始PDF文件，使用原始文件路径
         pdf_path_to_use = resource.file_path
-        pdf_is_oss = pdf_path_to_use.startswith('http://') or pdf_path_to_use.startswith('https://')
-        logging.info(f"使用原始file_path: {pdf_path_to_use}, is_oss: {pdf_is_oss}")
     
     if not pdf_path_to_use:
         logging.error(f"资源ID {resource_id} 没有找到PDF路径")
         raise HTTPException(status_code=404, detail="PDF文件不存在")
     
-    logging.info(f"处理PDF文件: path={pdf_path_to_use}, is_oss={pdf_is_oss}, oss_enabled={oss_client.enabled}")
-    
-    # 处理OSS PDF文件
-    if pdf_is_oss:
-        try:
-            # 如果OSS客户端已启用，尝试使用签名URL
-            if oss_client.enabled:
-                # 从OSS URL中提取key
-                oss_key = None
-                if '.aliyuncs.com/' in pdf_path_to_use:
-                    parts = pdf_path_to_use.split('.aliyuncs.com/')
-                    if len(parts) > 1:
-                        oss_key = parts[1].split('?')[0]
-                elif settings.OSS_USE_CNAME and settings.OSS_ENDPOINT:
-                    if pdf_path_to_use.startswith(settings.OSS_ENDPOINT):
-                        oss_key = pdf_path_to_use.replace(settings.OSS_ENDPOINT + '/', '').split('?')[0]
-                
-                if oss_key:
-                    try:
-                        import httpx
-                        async with httpx.AsyncClient() as client:
-                            download_url = oss_client.generate_download_url(oss_key, expires=3600)
-                            logging.info(f"生成OSS签名下载URL: {download_url}")
-                            response = await client.get(download_url)
-                            response.raise_for_status()
-                            
-                            from fastapi.responses import Response
-                            from urllib.parse import quote
-                            pdf_filename = resource.original_filename
-                            if not pdf_filename.endswith('.pdf'):
-                                pdf_filename = resource.original_filename.replace(Path(resource.original_filename).suffix, '.pdf')
-                            encoded_filename = quote(pdf_filename)
-                            
-                            logging.info(f"成功从OSS获取PDF（使用签名URL），大小: {len(response.content)} bytes")
-                            return Response(
-                                content=response.content,
-                                media_type="application/pdf",
-                                headers={
-                                    'Content-Disposition': f'inline; filename*=UTF-8\'\'{encoded_filename}',
-                                    'Access-Control-Allow-Origin': '*',
-                                    'Access-Control-Allow-Methods': 'GET, OPTIONS',
-                                    'Access-Control-Allow-Headers': '*',
-                                    'Access-Control-Expose-Headers': 'Content-Type, Content-Disposition',
-                                    'Cache-Control': 'public, max-age=3600',
-                                }
-                            )
-                    except Exception as e:
-                        logging.warning(f"使用OSS签名URL失败: {e}，尝试直接访问OSS URL")
-            
-            # 如果OSS客户端未启用或签名URL失败，直接通过HTTP访问OSS URL（后端代理）
-            logging.info(f"通过后端代理直接访问OSS URL: {pdf_path_to_use}")
-            import httpx
-            async with httpx.AsyncClient() as client:
-                # 直接访问OSS URL（后端代理，避免CORS问题）
-                response = await client.get(pdf_path_to_use, timeout=30.0)
-                response.raise_for_status()
-                
-                from fastapi.responses import Response
-                from urllib.parse import quote
-                pdf_filename = resource.original_filename
-                if not pdf_filename.endswith('.pdf'):
-                    pdf_filename = resource.original_filename.replace(Path(resource.original_filename).suffix, '.pdf')
-                encoded_filename = quote(pdf_filename)
-                
-                logging.info(f"成功从OSS获取PDF（直接访问），大小: {len(response.content)} bytes")
-                return Response(
-                    content=response.content,
-                    media_type="application/pdf",
-                    headers={
-                        'Content-Disposition': f'inline; filename*=UTF-8\'\'{encoded_filename}',
-                        'Access-Control-Allow-Origin': '*',
-                        'Access-Control-Allow-Methods': 'GET, OPTIONS',
-                        'Access-Control-Allow-Headers': '*',
-                        'Access-Control-Expose-Headers': 'Content-Type, Content-Disposition',
-                        'Cache-Control': 'public, max-age=3600',
-                    }
-                )
-        except HTTPException:
-            raise
-        except Exception as e:
-            logging.error(f"从OSS获取PDF失败: {e}")
-            raise HTTPException(status_code=500, detail=f"获取PDF文件失败: {str(e)}")
-    
-    # 使用本地PDF文件
-    pdf_path = Path(pdf_path_to_use)
-    if not pdf_path.exists():
-        raise HTTPException(status_code=404, detail=f"PDF文件不存在: {pdf_path_to_use}")
+    # 转换后的PDF在本地仍有副本时直接读本地文件（重定向模式除外）
+    if (
+        pdf_path_to_use == resource.pdf_path
+        and is_remote_path(pdf_path_to_use)
+        and not file_delivery.redirect
+        and resource.pdf_local_path
+        and Path(resource.pdf_local_path).exists()
+    ):
+        pdf_path_to_use = resource.pdf_local_path
     
-    from fastapi.responses import FileResponse
-    from urllib.parse import quote
     pdf_filename = resource.original_filename
     if not pdf_filename.endswith('.pdf'):
         pdf_filename = resource.original_filename.replace(Path(resource.original_filename).suffix, '.pdf')
-    encoded_filename = quote(pdf_filename)
     
-    return FileResponse(
-        pdf_path,
-        media_type="application/pdf",
-        headers={
-            'Content-Disposition': f'inline; filename*=UTF-8\'\'{encoded_filename}',
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Methods': 'GET, OPTIONS',
-            'Access-Control-Allow-Headers': '*',
-            'Access-Control-Expose-Headers': 'Content-Type, Content-Disposition',
-            'Cache-Control': 'public, max-age=3600',
-        }
-    )
+    try:
+        return await file_delivery.serve(
+            request,
+            pdf_path_to_use,
+            "application/pdf",
+            pdf_filename,
+            headers=PREVIEW_HEADERS
+        )
+    except HTTPException as e:
+        if e.status_code == 404:
+            raise HTTPException(status_code=404, detail=f"PDF文件不存在: {pdf_path_to_use}")
+        raise
+    except Exception as e:
+        logging.error(f"从OSS获取PDF失败: {e}")
+        raise HTTPException(status_code=500, detail=f"获取PDF文件失败: {str(e)}")
 
 @router.get("/{resource_id}/weboffice-url")
 async def get_weboffice_preview_url(
@@ -744,50 +604,15 @@ async def preview_resource(
     
     # Office文档（Word、Excel、PPT）优先使用转换后的PDF预览
     if resource_type in ['word', 'excel', 'ppt']:
-        # 如果没有PDF或转换失败，尝试自动转换
+        # 还没有转换过的放入后台转换队列，本次先使用其他预览方式；
+        # 已经转换失败（重试次数用完）的不再自动转换，避免每次预览都重新启动LibreOffice
         if not resource.pdf_path or resource.pdf_conversion_status != 'success':
-            if resource.local_file_path:
-                local_file = Path(resource.local_file_path)
-                if local_file.exists() and libreoffice_converter.is_supported_format(local_file):
-                    try:
-                        # 创建PDF输出目录
-                        pdf_output_dir = UPLOAD_DIR / "pdfs" / resource_type
-                        pdf_output_dir.mkdir(parents=True, exist_ok=True)
-                        
-                        # 转换为PDF
-                        pdf_file = libreoffice_converter.convert_to_pdf(local_file, pdf_output_dir)
-                        
-                        if pdf_file and pdf_file.exists():
-                            pdf_local_path_str = str(pdf_file)
-                            
-                            # 读取PDF文件内容
-                            with open(pdf_file, 'rb') as f:
-                                pdf_content = f.read()
-                            
-                            # 上传PDF到OSS（如果OSS已启用）
-                            pdf_path_str = None
-                            if oss_client.enabled:
-                                try:
-                                    pdf_oss_key = f"teaching_resources/pdfs/{resource_type}/{pdf_file.name}"
-                                    pdf_path_str = oss_client.upload_file(pdf_content, pdf_oss_key, content_type="application/pdf")
-                                    logging.info(f"PDF已上传到OSS: {pdf_oss_key}")
-                                except Exception as e:
-                                    logging.error(f"PDF上传到OSS失败: {e}")
-                                    pdf_path_str = pdf_local_path_str
-                            else:
-                                pdf_path_str = pdf_local_path_str
-                            
-                            # 更新数据库记录
-                            resource.pdf_path = pdf_path_str
-                            resource.pdf_local_path = pdf_local_path_str
-                            resource.pdf_converted_at = datetime.utcnow()
-                            resource.pdf_conversion_status = 'success'
-                            await db.commit()
-                            await db.refresh(resource)
-                            
-                            logging.info(f"自动转换PDF成功: {pdf_local_path_str}")
-                    except Exception as e:
-                        logging.error(f"自动转换PDF失败: {e}")
+            if (
+                resource.pdf_conversion_status in ('pending', None)
+                and needs_pdf_conversion(resource_type, resource.local_file_path)
+                and Path(resource.local_file_path).exists()
+            ):
+                await pdf_conversion_queue.enqueue(resource.id)
         
         # 检查是否有转换后的PDF
         if resource.pdf_path and resource.pdf_conversion_status == 'success':
@@ -971,113 +796,31 @@ async def preview_resource(
             }
     
     # 处理OSS URL（图片、视频等，不包括PDF）
-    if resource.file_path.startswith('http://') or resource.file_path.startswith('https://'):
-        # OSS文件，通过后端代理返回文件内容（避免CORS问题）
+    if is_remote_path(resource.file_path):
+        # OSS文件，经本地缓存返回（避免CORS问题，支持视频等的Range加载）
         try:
-            # 从OSS URL中提取key
-            oss_key = None
-            if '.aliyuncs.com/' in resource.file_path:
-                parts = resource.file_path.split('.aliyuncs.com/')
-                if len(parts) > 1:
-                    oss_key = parts[1].split('?')[0]  # 移除查询参数
-            elif settings.OSS_USE_CNAME and settings.OSS_ENDPOINT:
-                if resource.file_path.startswith(settings.OSS_ENDPOINT):
-                    oss_key = resource.file_path.replace(settings.OSS_ENDPOINT + '/', '').split('?')[0]
-            
-            if oss_key and oss_client.enabled:
-                # 从OSS下载文件并返回
-                import httpx
-                async with httpx.AsyncClient() as client:
-                    download_url = oss_client.generate_download_url(oss_key, expires=3600)
-                    response = await client.get(download_url)
-                    response.raise_for_status()
-                    
-                    # 确定 MIME 类型
-                    mime_type = "application/octet-stream"
-                    if resource.resource_type in RESOURCE_TYPES:
-                        mime_types = RESOURCE_TYPES[resource.resource_type]["mime_types"]
-                        if mime_types:
-                            mime_type = mime_types[0]
-                    
-                    from fastapi.responses import Response
-                    from urllib.parse import quote
-                    encoded_filename = quote(resource.original_filename)
-                    
-                    return Response(
-                        content=response.content,
-                        media_type=mime_type,
-                        headers={
-                            'Content-Disposition': f'inline; filename*=UTF-8\'\'{encoded_filename}',
-                            'Access-Control-Allow-Origin': '*',
-                            'Access-Control-Allow-Methods': 'GET, OPTIONS',
-                            'Access-Control-Allow-Headers': '*',
-                            'Access-Control-Expose-Headers': 'Content-Type, Content-Disposition',
-                            'Cache-Control': 'public, max-age=3600',
-                        }
-                    )
+            return await file_delivery.serve(
+                request,
+                resource.file_path,
+                get_resource_mime_type(resource.resource_type),
+                resource.original_filename,
+                headers=PREVIEW_HEADERS
+            )
         except Exception as e:
             logging.error(f"从OSS获取文件失败: {e}")
-            # 如果OSS获取失败，继续尝试本地文件
         
         # 如果无法从OSS获取，尝试直接重定向（可能不是OSS URL）
         from fastapi.responses import RedirectResponse
         return RedirectResponse(url=str(resource.file_path))
     
-    # 本地文件预览
-    file_path = Path(resource.file_path)
-    
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="文件不存在")
-    
-    # 确定 MIME 类型
-    mime_type = "application/octet-stream"
-    if resource.resource_type in RESOURCE_TYPES:
-        mime_types = RESOURCE_TYPES[resource.resource_type]["mime_types"]
-        if mime_types:
-            mime_type = mime_types[0]
-    
-    # 返回文件用于在线预览（不触发下载）
-    from fastapi.responses import Response
-    from urllib.parse import quote
-    
-    # 对于某些类型，使用 inline 显示
-    inline_types = ['image', 'pdf', 'video']
-    
-    # URL编码文件名以支持中文
-    encoded_filename = quote(resource.original_filename)
-    
-    if resource.resource_type.lower() in inline_types:
-        # 读取文件内容
-        with open(file_path, 'rb') as f:
-            content = f.read()
-        
-        # 对于PDF，确保Content-Type正确
-        if resource_type == 'pdf':
-            mime_type = 'application/pdf'
-        
-        return Response(
-            content=content,
-            media_type=mime_type,
-            headers={
-                'Content-Disposition': f'inline; filename*=UTF-8\'\'{encoded_filename}',
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET, OPTIONS',
-                'Access-Control-Allow-Headers': '*',
-                'Access-Control-Expose-Headers': 'Content-Type, Content-Disposition',
-                'Cache-Control': 'public, max-age=3600',
-            }
-        )
-    else:
-        # 其他类型返回 FileResponse
-        return FileResponse(
-            file_path,
-            media_type=mime_type,
-            headers={
-                'Content-Disposition': f'inline; filename*=UTF-8\'\'{encoded_filename}',
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET',
-                'Access-Control-Allow-Headers': '*',
-                'Cache-Control': 'public, max-age=3600',
-            }
-        )
-
+    # 本地文件预览（不触发下载）
+    mime_type = get_resource_mime_type(resource.resource_type)
+    if resource_type == 'pdf':
+        mime_type = 'application/pdf'
+    return await file_delivery.serve(
+        request,
+        resource.file_path,
+        mime_type,
+        resource.original_filename,
+        headers=PREVIEW_HEADERS
+    )
@@ -20,6 +20,8 @@ try:
 except ImportError:
     oss_client = None
 
+from app.utils.streaming_upload import UploadTooLargeError, stream_upload, upload_size
+
 router = APIRouter()
 
 # 支持在线预览的文件类型
@@ -76,9 +78,8 @@ async def upload_file(
             detail=f"不支持的文件类型: {file_ext}。支持的类型: {', '.join(sorted(ALL_ALLOWED_EXTENSIONS))}"
         )
 
-    # 读取文件内容
-    file_content = await file.read()
-    file_size = len(file_content)
+    # 检查文件大小
+    file_size = upload_size(file)
 
     # 限制文件大小 (100MB)
     max_size = 100 * 1024 * 1024
@@ -89,55 +90,60 @@ async def upload_file(
     file_id = str(uuid.uuid4())
     filename = f"{file_id}{file_ext}"
 
-    # 创建文件夹
+    # 本地保存路径
     folder_path = UPLOAD_DIR / folder
-    folder_path.mkdir(parents=True, exist_ok=True)
     local_file_path = folder_path / filename
 
-    # 保存到本地
+    # OSS对象键和MIME类型（OSS已启用时同时上传）
+    oss_key = None
+    mime_type = "application/octet-stream"
+    if oss_client and oss_client.enabled:
+        oss_key = f"{folder}/{filename}"
+        # 根据扩展名确定MIME类型
+        if file_ext in ['.jpg', '.jpeg']:
+            mime_type = "image/jpeg"
+        elif file_ext == '.png':
+            mime_type = "image/png"
+        elif file_ext == '.gif':
+            mime_type = "image/gif"
+        elif file_ext == '.pdf':
+            mime_type = "application/pdf"
+        elif file_ext in ['.doc', '.docx']:
+            mime_type = "application/msword"
+        elif file_ext in ['.xls', '.xlsx']:
+            mime_type = "application/vnd.ms-excel"
+        elif file_ext in ['.ppt', '.pptx']:
+            mime_type = "application/vnd.ms-powerpoint"
+        elif file_ext == '.mp4':
+            mime_type = "video/mp4"
+        elif file_ext == '.mp3':
+            mime_type = "audio/mpeg"
+
+    # 按块写入本地并上传到OSS
     try:
-        with open(local_file_path, 'wb') as f:
-            f.write(file_content)
+        stored = await stream_upload(
+            file,
+            local_path=local_file_path,
+            oss_key=oss_key,
+            content_type=mime_type,
+            max_size=max_size
+        )
         logging.info(f"文件已保存到本地: {local_file_path}")
+    except UploadTooLargeError:
+        raise HTTPException(status_code=400, detail=f"文件大小超过限制 (最大 {max_size // (1024*1024)} MB)")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"文件保存失败: {str(e)}")
-
-    # 尝试上传到OSS
-    file_url = None
-    if oss_client and oss_client.enabled:
-        try:
-            oss_key = f"{folder}/{filename}"
-            # 根据扩展名确定MIME类型
-            mime_type = "application/octet-stream"
-            if file_ext in ['.jpg', '.jpeg']:
-                mime_type = "image/jpeg"
-            elif file_ext == '.png':
-                mime_type = "image/png"
-            elif file_ext == '.gif':
-                mime_type = "image/gif"
-            elif file_ext == '.pdf':
-                mime_type = "application/pdf"
-            elif file_ext in ['.doc', '.docx']:
-                mime_type = "application/msword"
-            elif file_ext in ['.xls', '.xlsx']:
-                mime_type = "application/vnd.ms-excel"
-            elif file_ext in ['.ppt', '.pptx']:
-                mime_type = "application/vnd.ms-powerpoint"
-            elif file_ext == '.mp4':
-                mime_type = "video/mp4"
-            elif file_ext == '.mp3':
-                mime_type = "audio/mpeg"
-
-            file_url = oss_client.upload_file(file_content, oss_key, content_type=mime_type)
-            logging.info(f"文件已上传到OSS: {oss_key}, URL: {file_url}")
-        except Exception as e:
-            error_msg = f"上传到OSS失败: {e}"
-            logging.error(error_msg)
-            # Write error to a file for debugging
-            with open("upload_error.log", "a") as f:
-                f.write(f"{datetime.now()}: {error_msg}\n")
-            print(f"OSS UPLOAD ERROR: {e}") # Print to stdout/stderr
-            file_url = None
+    file_size = stored.size
+
+    file_url = stored.oss_url
+    if file_url:
+        logging.info(f"文件已上传到OSS: {oss_key}, URL: {file_url}")
+    elif oss_key:
+        error_msg = f"上传到OSS失败: {oss_key}"
+        logging.error(error_msg)
+        # Write error to a file for debugging
+        with open("upload_error.log", "a") as f:
+            f.write(f"{datetime.now()}: {error_msg}\n")
 
     # 如果OSS上传失败，使用本地路径
     if not file_url:
@@ -38,6 +38,9 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "CHANGE_THIS_IN_PRODUCTION"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8  # 8 days
+    PASSWORD_HASH_WORKERS: int = 0  # 批量导入时计算密码哈希的进程数，0表示按CPU核数（最多4个）
+    PASSWORD_HASH_ROUNDS: int = 12  # bcrypt计算成本，修改后旧密码在用户下次登录时重新哈希
+    PASSWORD_VERIFY_WORKERS: int = 0  # 登录验证、修改密码时同时计算bcrypt的线程数，0表示按CPU核数
 
     # Aliyun OSS Configuration
     OSS_ACCESS_KEY_ID: str = ""
@@ -51,6 +54,62 @@ class Settings(BaseSettings):
     IMM_PROJECT_NAME: str = "lls"  # IMM项目名称
     IMM_SERVICE_ROLE: str = ""  # 可选：IMM服务角色ARN（如果使用RAM角色访问OSS）
 
+    # Redis配置（可选，REDIS_HOST为空时不启用Redis）
+    REDIS_HOST: str = ""
+    REDIS_PORT: int = 6379
+    REDIS_PASSWORD: str = ""
+    REDIS_DB: int = 0
+
+    # LLM响应缓存
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_MAX_ENTRIES: int = 1000  # 进程内LRU最大条目数
+
+    # 学生端课程大纲骨架缓存时间（秒），0表示不缓存
+    COURSE_OUTLINE_CACHE_TTL: int = 300
+
+    # 学习行为批量写入（心跳等行为先入队，由后台任务批量写入）；关闭时逐条同步写入
+    LEARNING_BEHAVIOR_BUFFERED: bool = True
+
+    # 文档文本提取进程池（PDF/Word/PPT解析不在事件循环中执行）
+    EXTRACTION_WORKERS: int = 0  # 进程数，0表示按CPU核数（最多4个）
+    EXTRACTION_MAX_PENDING: int = 32  # 同时排队和执行的提取任务上限，超出时直接拒绝
+    EXTRACTION_TIMEOUT: int = 120  # 单个提取任务的等待时间上限（秒）
+
+    # Office文档转PDF后台队列（上传后立即返回，由后台LibreOffice进程转换）
+    PDF_CONVERSION_WORKERS: int = 2  # 同时运行的LibreOffice转换进程数
+    PDF_CONVERSION_TIMEOUT: int = 120  # 单次转换超时（秒）
+    PDF_CONVERSION_RETRIES: int = 2  # 转换失败后的重试次数
+
+    # 文件分发（OSS文件缓存到本地磁盘后按Range返回）
+    FILE_CACHE_DIR: str = "uploads/.file_cache"
+    FILE_CACHE_MAX_BYTES: int = 2 * 1024 * 1024 * 1024  # 缓存总大小上限，超出时淘汰最久未访问的文件
+    FILE_DELIVERY_REDIRECT: bool = False  # 为True时OSS文件直接重定向到签名URL，不经过后端
+
+    # 课程封面图片的进程内缓存大小上限（字节）
+    COVER_IMAGE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+
+    # 题库列表总数的缓存时间（秒），0表示每次都重新计数
+    QUESTION_COUNT_CACHE_TTL: int = 60
+
+    # 组卷用的题目索引有效期（秒），本进程内的题目增删改会立即刷新索引
+    QUESTION_INDEX_TTL: int = 300
+
+    # 整门课程学习表现AI评分时同时进行的LLM调用数
+    LEARNING_SCORE_CONCURRENCY: int = 5
+
+    # 组织树统计快照的缓存时间（秒），本进程内组织、专业、班级、学生变更时立即失效
+    ORG_STATS_CACHE_TTL: int = 60
+
+    # 考试监控的消息分发方式：auto（配置了Redis时使用Redis发布订阅，否则进程内分发）、memory、redis
+    EXAM_MONITOR_BROKER: str = "auto"
+    # 考试各状态考生数的缓存时间（秒），过期后用一次分组查询重新加载
+    EXAM_MONITOR_COUNTS_TTL: int = 300
+
+    # 登录用户身份信息（用户及学生/教师档案）的缓存时间（秒）和最多缓存的用户数，
+    # 本进程内修改、停用用户或重置密码时立即失效
+    AUTH_PRINCIPAL_CACHE_TTL: int = 30
+    AUTH_PRINCIPAL_CACHE_SIZE: int = 10000
+
     # Banana-Slides PPT服务配置
     BANANA_SLIDES_API_URL: str = "http://localhost:5002"
     BANANA_SLIDES_FRONTEND_URL: str = "http://localhost:3002"
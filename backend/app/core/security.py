@@ -1,9 +1,16 @@
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Any, Union
+from typing import Optional, Any, Callable, Dict, List, Union
 from jose import jwt
 import bcrypt
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 ALGORITHM = "HS256"
 
 def create_access_token(subject: Union[str, Any], expires_delta: timedelta = None) -> str:
@@ -29,7 +36,143 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     """生成密码哈希"""
     password_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=settings.PASSWORD_HASH_ROUNDS)
     hashed = bcrypt.hashpw(password_bytes, salt)
     return hashed.decode('utf-8')
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """密码哈希的计算成本与当前配置（PASSWORD_HASH_ROUNDS）不一致时需要重新哈希"""
+    # bcrypt哈希格式：$2b$12$<盐和哈希>
+    parts = (hashed_password or "").split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return False
+    return int(parts[2]) != settings.PASSWORD_HASH_ROUNDS
+
+
+# 排队等待超过该时间（秒）时记录警告
+SLOW_QUEUE_SECONDS = 1.0
+
+
+class PasswordHasher:
+    """
+    在线程池中计算bcrypt，不阻塞事件循环
+    bcrypt计算时释放GIL，多个线程可以同时使用多个CPU核；
+    同时计算的数量不超过线程数，其余请求排队，并统计排队时间
+
+    Args:
+        workers: 线程数（同时计算的上限）
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+            self._semaphore = asyncio.Semaphore(self.workers)
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        wait = time.perf_counter() - queued_at
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        if wait > SLOW_QUEUE_SECONDS:
+            logger.warning(f"密码计算排队 {wait:.2f} 秒，当前排队 {self.waiting} 个")
+        self.running += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    def stats(self) -> Dict[str, Any]:
+        """排队和计算情况"""
+        return {
+            "workers": self.workers,
+            "running": self.running,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "avg_wait_ms": round(self.total_wait / self.completed * 1000, 1) if self.completed else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._semaphore = None
+
+
+# 创建全局密码计算实例
+password_hasher = PasswordHasher(workers=settings.PASSWORD_VERIFY_WORKERS or (os.cpu_count() or 1))
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """验证密码（在线程池中计算）"""
+    return await password_hasher.verify(plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """生成密码哈希（在线程池中计算）"""
+    return await password_hasher.hash(password)
+
+
+def _hash_password_batch(passwords: List[str]) -> List[str]:
+    """在子进程中批量生成密码哈希"""
+    return [get_password_hash(password) for password in passwords]
+
+
+_password_hash_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_password_hash_pool() -> ProcessPoolExecutor:
+    global _password_hash_pool
+    if _password_hash_pool is None:
+        workers = settings.PASSWORD_HASH_WORKERS or min(4, os.cpu_count() or 1)
+        _password_hash_pool = ProcessPoolExecutor(max_workers=workers)
+    return _password_hash_pool
+
+
+async def get_password_hashes(passwords: List[str]) -> List[str]:
+    """
+    批量生成密码哈希（批量导入使用）
+    bcrypt是CPU密集操作，按进程数分片后在进程池中并行计算，不阻塞事件循环；
+    每个密码仍使用独立的盐
+    """
+    if not passwords:
+        return []
+    pool = _get_password_hash_pool()
+    workers = pool._max_workers
+    chunk_size = (len(passwords) + workers - 1) // workers
+    chunks = [passwords[i:i + chunk_size] for i in range(0, len(passwords), chunk_size)]
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(*[
+        loop.run_in_executor(pool, _hash_password_batch, chunk) for chunk in chunks
+    ])
+    return [hashed for chunk in results for hashed in chunk]
+
+
+def shutdown_password_hash_pool() -> None:
+    """关闭密码哈希进程池和线程池（应用关闭时调用）"""
+    global _password_hash_pool
+    if _password_hash_pool is not None:
+        _password_hash_pool.shutdown(wait=False, cancel_futures=True)
+        _password_hash_pool = None
+    password_hasher.shutdown()
@@ -0,0 +1,49 @@
+"""
+Redis客户端
+Redis为可选依赖：未配置REDIS_HOST或redis库未安装时，get_redis() 返回None，调用方退回进程内实现
+"""
+import logging
+from typing import Optional
+
+from app.core.config import settings
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+_redis_client = None
+
+
+def get_redis() -> Optional["aioredis.Redis"]:
+    """获取全局Redis客户端（懒创建，内部维护连接池）"""
+    global _redis_client
+    if not REDIS_AVAILABLE or not settings.REDIS_HOST:
+        return None
+    if _redis_client is None:
+        _redis_client = aioredis.Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            password=settings.REDIS_PASSWORD or None,
+            db=settings.REDIS_DB,
+            socket_timeout=2.0,
+            socket_connect_timeout=2.0,
+        )
+    return _redis_client
+
+
+async def close_redis() -> None:
+    """关闭Redis连接池（应用关闭时调用）"""
+    global _redis_client
+    if _redis_client is not None:
+        try:
+            # redis>=5 使用aclose()，旧版本为close()
+            close = getattr(_redis_client, "aclose", None) or _redis_client.close
+            await close()
+        except Exception as e:
+            logger.warning(f"关闭Redis连接失败: {str(e)}")
+        _redis_client = None
@@ -8,6 +8,15 @@ import logging
 import traceback
 from app.core.config import settings
 from app.api.v1.api import api_router
+from app.services.llm_gateway import llm_gateway
+from app.db.redis import close_redis
+from app.utils.llm_call_logger import llm_call_log_writer
+from app.core.security import shutdown_password_hash_pool
+from app.utils.extraction_executor import extraction_executor
+from app.services.learning_behavior_writer import learning_behavior_writer
+from app.services.exam_monitor import exam_monitor
+from app.services.pdf_conversion_service import pdf_conversion_queue
+from app.services.learning_score_service import learning_score_jobs
 
 # 配置日志
 logging.basicConfig(
@@ -107,6 +116,32 @@ def _build_cors_headers(request: Request) -> dict:
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+@app.on_event("startup")
+async def startup_event():
+    # 检查llm_call_log表并启动LLM调用日志的后台写入任务
+    await llm_call_log_writer.start()
+    # 启动学习行为的后台批量写入任务
+    await learning_behavior_writer.start()
+    # 启动Office文档转PDF的后台队列，并重新入队未完成的转换
+    await pdf_conversion_queue.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # 写完队列中剩余的LLM调用日志
+    await llm_call_log_writer.stop()
+    # 写完队列中剩余的学习行为
+    await learning_behavior_writer.stop()
+    await pdf_conversion_queue.stop()
+    # 取消进行中的课程评分任务（已写入的评分保留）
+    await learning_score_jobs.stop()
+    # 停止考试监控的消息订阅
+    await exam_monitor.stop()
+    # 关闭LLM网关的长连接池
+    await llm_gateway.aclose()
+    await close_redis()
+    shutdown_password_hash_pool()
+    extraction_executor.shutdown()
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to Smart Learning System API", "version": "0.1.0"}
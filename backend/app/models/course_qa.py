@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Text, ARRAY
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Text, ARRAY, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import ARRAY as PG_ARRAY
 from datetime import datetime
@@ -26,6 +26,10 @@ class CourseQASession(Base):
 class CourseQAMessage(Base):
     """课程问答消息表"""
     __tablename__ = "course_qa_message"
+    __table_args__ = (
+        # 按教师查询收到的消息（teacher_ids @> ARRAY[教师ID]）
+        Index('idx_qa_message_teacher_ids', 'teacher_ids', postgresql_using='gin'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(Integer, ForeignKey("course_qa_session.id", ondelete="CASCADE"), nullable=False)
@@ -45,3 +49,27 @@ class CourseQAMessage(Base):
     sender = relationship("User", foreign_keys=[sender_id])
     ai_response = relationship("CourseQAMessage", remote_side=[id], foreign_keys=[ai_response_id])
     parent_message = relationship("CourseQAMessage", remote_side=[id], foreign_keys=[parent_message_id])
+
+
+class CourseQATeacherInbox(Base):
+    """
+    教师问答收件箱表
+    每个（教师, 会话）一行，记录发送给该教师的消息数、未读数和最新一条消息，
+    在消息发送给教师、标记已读时按会话重新汇总
+    """
+    __tablename__ = "course_qa_teacher_inbox"
+    __table_args__ = (
+        UniqueConstraint('teacher_id', 'session_id', name='uq_qa_inbox_teacher_session'),
+        Index('idx_qa_inbox_teacher_latest', 'teacher_id', 'latest_message_at', 'session_id'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    teacher_id = Column(Integer, ForeignKey("sys_user.id", ondelete="CASCADE"), nullable=False)
+    session_id = Column(Integer, ForeignKey("course_qa_session.id", ondelete="CASCADE"), nullable=False)
+    course_id = Column(Integer, ForeignKey("course.id", ondelete="CASCADE"), nullable=False)
+    student_id = Column(Integer, ForeignKey("sys_user.id", ondelete="CASCADE"), nullable=False)
+    latest_message_id = Column(Integer, ForeignKey("course_qa_message.id", ondelete="SET NULL"), nullable=True)
+    latest_message_at = Column(DateTime, nullable=False)  # 最新消息时间（游标分页排序字段）
+    total_messages = Column(Integer, nullable=False, default=0)  # 发送给该教师的消息数
+    unread_count = Column(Integer, nullable=False, default=0)  # 其中未读的消息数
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -19,7 +19,7 @@ class LLMCallLog(Base):
     prompt = Column(Text, nullable=False, comment="提示词")
     result = Column(Text, nullable=True, comment="返回结果")
     execution_time_ms = Column(Integer, nullable=True, comment="执行时长（毫秒）")
-    status = Column(String(20), nullable=False, comment="调用状态：success/failed")
+    status = Column(String(20), nullable=False, comment="调用状态：success/failed/cached（命中响应缓存，没有调用模型）")
     error_message = Column(Text, nullable=True, comment="错误信息")
     related_id = Column(Integer, nullable=True, comment="关联的业务ID")
     related_type = Column(String(50), nullable=True, comment="关联的业务类型")
@@ -31,5 +31,5 @@ class LLMCallLog(Base):
 
     __table_args__ = (
         CheckConstraint("user_role IN ('teacher', 'student', 'admin')", name="check_user_role"),
-        CheckConstraint("status IN ('success', 'failed')", name="check_status"),
+        CheckConstraint("status IN ('success', 'failed', 'cached')", name="check_status"),
     )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Text, BigInteger
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Text, BigInteger, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.models.base import Base
@@ -6,6 +6,10 @@ from app.models.base import Base
 class Question(Base):
     """题目表"""
     __tablename__ = "question"
+    __table_args__ = (
+        # 题目列表按 (updated_at, id) 倒序分页
+        Index("idx_question_teacher_active_updated", "teacher_id", "is_active", "updated_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     teacher_id = Column(Integer, ForeignKey("sys_user.id"), nullable=False)
@@ -29,6 +33,9 @@ class Question(Base):
 class QuestionOption(Base):
     """题目选项表（用于单选和多选）"""
     __tablename__ = "question_option"
+    __table_args__ = (
+        Index("idx_question_option_question_id", "question_id", "sort_order"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     question_id = Column(Integer, ForeignKey("question.id"), nullable=False)
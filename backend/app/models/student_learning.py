@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float, Boolean, ARRAY, Numeric
+from sqlalchemy import Column, Integer, BigInteger, String, Date, DateTime, ForeignKey, Text, Float, Boolean, ARRAY, Numeric, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import JSONB
 from datetime import datetime
@@ -29,11 +29,37 @@ class StudentLearningBehavior(Base):
     chapter = relationship("CourseChapter", foreign_keys=[chapter_id])
 
 
+class StudentLearningDailyStat(Base):
+    """
+    学生学习行为日汇总表
+    按 (student_id, course_id, stat_date) 汇总 student_learning_behavior，
+    stat_date 取 DATE(created_at)（UTC）；写入学习行为时在同一事务中增量累加
+    """
+    __tablename__ = "student_learning_daily_stat"
+    __table_args__ = (
+        UniqueConstraint('student_id', 'course_id', 'stat_date', name='uq_learning_daily_stat_student_course_day'),
+        Index('idx_learning_daily_stat_course_date', 'course_id', 'stat_date'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    student_id = Column(Integer, ForeignKey("sys_user.id", ondelete="CASCADE"), nullable=False, comment="学生ID")
+    course_id = Column(Integer, ForeignKey("course.id", ondelete="CASCADE"), nullable=False, comment="课程ID")
+    stat_date = Column(Date, nullable=False, comment="统计日期（UTC）")
+    behavior_count = Column(Integer, nullable=False, default=0, comment="学习行为次数")
+    duration_seconds = Column(BigInteger, nullable=False, default=0, comment="学习时长（秒）")
+    last_activity_at = Column(DateTime, nullable=True, comment="当天最后一次学习行为时间")
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class StudentStudyDuration(Base):
     """
     学生学习时长统计表（按天统计）
+    study_date 统一为当天零点，(student_id, course_id, study_date) 唯一
     """
     __tablename__ = "student_study_duration"
+    __table_args__ = (
+        UniqueConstraint('student_id', 'course_id', 'study_date', name='uq_study_duration_student_course_day'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("sys_user.id"), nullable=False, comment="学生ID")
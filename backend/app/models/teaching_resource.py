@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Text, BigInteger
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Text, BigInteger, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.models.base import Base
@@ -18,7 +18,7 @@ class TeachingResource(Base):
     pdf_path = Column(String(500), nullable=True)  # PDF文件路径（OSS或本地）
     pdf_local_path = Column(String(500), nullable=True)  # PDF本地文件路径
     pdf_converted_at = Column(DateTime, nullable=True)  # PDF转换时间
-    pdf_conversion_status = Column(String(20), nullable=True, default='pending')  # PDF转换状态: pending/success/failed
+    pdf_conversion_status = Column(String(20), nullable=True, default='pending')  # PDF转换状态: pending/converting/success/failed
     knowledge_point = Column(Text, nullable=True)  # 知识点（非必填）
     folder_id = Column(Integer, ForeignKey("resource_folder.id"), nullable=True)  # 所属文件夹ID
     is_active = Column(Boolean, default=True)  # 是否有效（逻辑删除）
@@ -29,3 +29,34 @@ class TeachingResource(Base):
     teacher = relationship("User", foreign_keys=[teacher_id])
     folder = relationship("ResourceFolder", foreign_keys=[folder_id])
 
+
+
+class TeachingResourceKnowledgePoint(Base):
+    """教学资源-知识点关联表（由 knowledge_point 字段拆分得到，按名称与知识图谱节点关联）"""
+    __tablename__ = "teaching_resource_knowledge_point"
+    __table_args__ = (
+        UniqueConstraint('resource_id', 'knowledge_point', name='uq_resource_knowledge_point'),
+        Index('idx_resource_kp_teacher_point', 'teacher_id', 'knowledge_point'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    resource_id = Column(Integer, ForeignKey("teaching_resource.id", ondelete="CASCADE"), nullable=False)
+    teacher_id = Column(Integer, ForeignKey("sys_user.id"), nullable=False)  # 冗余资源的教师ID，便于按教师聚合
+    knowledge_point = Column(String(255), nullable=False)  # 单个知识点名称
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class TeachingResourceParsedText(Base):
+    """教学资源提取文本缓存表（每个资源一条，源文件或其PDF版本变化后重新提取）"""
+    __tablename__ = "teaching_resource_parsed_text"
+    __table_args__ = (
+        Index('idx_resource_parsed_text_hash', 'content_hash'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    resource_id = Column(Integer, ForeignKey("teaching_resource.id", ondelete="CASCADE"), nullable=False, unique=True)
+    source_path = Column(String(500), nullable=False)  # 提取文本所用文件的存储路径（原文件或PDF版本）
+    content_hash = Column(String(64), nullable=False)  # 源文件内容SHA-256，内容相同的资源复用提取结果
+    text_content = Column(Text, nullable=False)  # 提取的文本（已按长度上限截取）
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -14,7 +14,7 @@ class LLMCallLogListItem(BaseModel):
     llm_config_name: Optional[str] = Field(None, description="LLM配置名称")
     result_summary: Optional[str] = Field(None, description="结果摘要（前100字符）")
     execution_time_ms: Optional[int] = Field(None, description="执行时长（毫秒）")
-    status: str = Field(..., description="调用状态：success/failed")
+    status: str = Field(..., description="调用状态：success/failed/cached")
     created_at: datetime = Field(..., description="创建时间")
     
     class Config:
@@ -33,7 +33,7 @@ class LLMCallLogDetail(BaseModel):
     prompt: str = Field(..., description="提示词")
     result: Optional[str] = Field(None, description="返回结果")
     execution_time_ms: Optional[int] = Field(None, description="执行时长（毫秒）")
-    status: str = Field(..., description="调用状态：success/failed")
+    status: str = Field(..., description="调用状态：success/failed/cached")
     error_message: Optional[str] = Field(None, description="错误信息")
     related_id: Optional[int] = Field(None, description="关联的业务ID")
     related_type: Optional[str] = Field(None, description="关联的业务类型")
@@ -49,3 +49,18 @@ class LLMCallLogListResponse(BaseModel):
     total: int = Field(..., description="总记录数")
     skip: int = Field(..., description="跳过记录数")
     limit: int = Field(..., description="每页记录数")
+
+
+class LLMCacheStatsItem(BaseModel):
+    """LLM响应缓存命中统计（按功能类型）"""
+    function_type: str = Field(..., description="调用功能类型")
+    hits: int = Field(..., description="缓存命中次数")
+    misses: int = Field(..., description="缓存未命中次数")
+    hit_rate: float = Field(..., description="命中率")
+    ttl_seconds: int = Field(..., description="缓存时间（秒），0表示不缓存")
+
+
+class LLMCacheStatsResponse(BaseModel):
+    """LLM响应缓存统计响应"""
+    items: list[LLMCacheStatsItem]
+    local_entries: int = Field(..., description="当前进程内缓存条目数")
@@ -0,0 +1,228 @@
+"""
+学生端课程大纲服务
+按课程缓存大纲骨架，叠加当前学生的作业提交状态
+"""
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CourseOutlineCache:
+    """按课程缓存大纲骨架（进程内，带TTL）"""
+
+    def __init__(self, ttl_seconds: int, max_courses: int = 500):
+        self.ttl_seconds = ttl_seconds
+        self.max_courses = max_courses
+        self._data: Dict[int, Tuple[float, List[Dict[str, Any]]]] = {}
+
+    def get(self, course_id: int) -> Optional[List[Dict[str, Any]]]:
+        item = self._data.get(course_id)
+        if item is None:
+            return None
+        expires_at, skeleton = item
+        if expires_at <= time.monotonic():
+            self._data.pop(course_id, None)
+            return None
+        return skeleton
+
+    def set(self, course_id: int, skeleton: List[Dict[str, Any]]) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        if len(self._data) >= self.max_courses:
+            # 先清理过期条目，仍然超出时淘汰最早过期的条目
+            now = time.monotonic()
+            for key in [k for k, (expires_at, _) in self._data.items() if expires_at <= now]:
+                del self._data[key]
+            if len(self._data) >= self.max_courses:
+                oldest = min(self._data, key=lambda k: self._data[k][0])
+                del self._data[oldest]
+        self._data[course_id] = (time.monotonic() + self.ttl_seconds, skeleton)
+
+    def invalidate(self, course_id: int) -> None:
+        """课程大纲发生变化后调用"""
+        self._data.pop(course_id, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+# 创建全局课程大纲缓存实例
+course_outline_cache = CourseOutlineCache(ttl_seconds=settings.COURSE_OUTLINE_CACHE_TTL)
+
+
+def _build_resource_info(row) -> Dict[str, Any]:
+    """把资源查询行转换为前端使用的资源信息"""
+    if row.link_type == "teaching_resource":
+        return {
+            "id": row.id,
+            "teacher_id": row.teacher_id,  # 供ResourcePreviewModal使用
+            "type": "teaching_resource",
+            "resource_type": row.resource_type or "teaching_resource",
+            "name": row.name,
+            "resource_name": row.name,
+            "original_filename": row.original_filename,
+            "file_type": row.resource_type or "unknown",
+            "file_url": f"/api/v1/teacher/resources/{row.id}/download",
+            "file_size": row.file_size,
+        }
+    return {
+        "id": row.id,
+        "teacher_id": row.teacher_id,
+        "type": "reference_material",
+        "resource_type": row.resource_type or "reference_material",
+        "name": row.name,
+        "material_name": row.name,
+        "original_filename": row.original_filename,
+        "file_type": row.resource_type or "unknown",
+        "file_url": f"/api/v1/teacher/references/{row.id}/download",
+        "file_size": row.file_size,
+    }
+
+
+async def load_outline_skeleton(db: AsyncSession, course_id: int) -> List[Dict[str, Any]]:
+    """
+    加载课程大纲骨架：章节+小节一次查询，小节资源一次查询，作业一次查询
+    作业只包含作业本身的信息，不含学生提交状态
+    """
+    chapter_rows = (await db.execute(text("""
+        SELECT id, title, sort_order, parent_id
+        FROM course_chapter
+        WHERE (course_id = :course_id AND parent_id IS NULL)
+           OR parent_id IN (
+               SELECT id FROM course_chapter
+               WHERE course_id = :course_id AND parent_id IS NULL
+           )
+        ORDER BY sort_order, id
+    """), {"course_id": course_id})).fetchall()
+
+    chapters: List[Dict[str, Any]] = []
+    sections_by_id: Dict[int, Dict[str, Any]] = {}
+    chapter_by_id: Dict[int, Dict[str, Any]] = {}
+    for row in chapter_rows:
+        if row.parent_id is None:
+            chapter = {
+                "id": row.id,
+                "title": row.title,
+                "sort_order": row.sort_order,
+                "sections": [],
+                "exam_papers": [],
+            }
+            chapters.append(chapter)
+            chapter_by_id[row.id] = chapter
+    for row in chapter_rows:
+        if row.parent_id is not None and row.parent_id in chapter_by_id:
+            section = {
+                "id": row.id,
+                "title": row.title,
+                "sort_order": row.sort_order,
+                "resources": [],
+                "exam_papers": [],
+                "homework": [],
+            }
+            chapter_by_id[row.parent_id]["sections"].append(section)
+            sections_by_id[row.id] = section
+
+    if not sections_by_id:
+        return chapters
+    section_ids = list(sections_by_id)
+
+    # 小节资源：关联表同时连接教学资源和参考资料，按关联创建顺序排列
+    resource_rows = (await db.execute(text("""
+        SELECT csr.chapter_id, csr.id AS link_id, 'teaching_resource' AS link_type,
+               tr.id, tr.teacher_id, tr.resource_name AS name, tr.original_filename,
+               tr.resource_type, tr.file_size
+        FROM course_section_resource csr
+        JOIN teaching_resource tr ON tr.id = csr.resource_id AND tr.is_active = true
+        WHERE csr.chapter_id = ANY(:section_ids)
+          AND csr.resource_type IN ('teaching_resource', 'teaching')
+        UNION ALL
+        SELECT csr.chapter_id, csr.id AS link_id, 'reference_material' AS link_type,
+               rm.id, rm.teacher_id, rm.material_name AS name, rm.original_filename,
+               rm.resource_type, rm.file_size
+        FROM course_section_resource csr
+        JOIN reference_material rm ON rm.id = csr.resource_id AND rm.is_active = true
+        WHERE csr.chapter_id = ANY(:section_ids)
+          AND csr.resource_type IN ('reference_material', 'reference')
+        ORDER BY link_id
+    """), {"section_ids": section_ids})).fetchall()
+    for row in resource_rows:
+        sections_by_id[row.chapter_id]["resources"].append(_build_resource_info(row))
+
+    homework_rows = (await db.execute(text("""
+        SELECT id, chapter_id, title, description, deadline, sort_order
+        FROM course_section_homework
+        WHERE chapter_id = ANY(:section_ids)
+        ORDER BY sort_order, id
+    """), {"section_ids": section_ids})).fetchall()
+    for row in homework_rows:
+        sections_by_id[row.chapter_id]["homework"].append({
+            "id": row.id,
+            "title": row.title,
+            "description": row.description,
+            "deadline": row.deadline.isoformat() if row.deadline else None,
+            "sort_order": row.sort_order,
+        })
+
+    return chapters
+
+
+async def get_outline_skeleton(db: AsyncSession, course_id: int) -> List[Dict[str, Any]]:
+    """获取课程大纲骨架（优先使用缓存）"""
+    skeleton = course_outline_cache.get(course_id)
+    if skeleton is None:
+        skeleton = await load_outline_skeleton(db, course_id)
+        course_outline_cache.set(course_id, skeleton)
+    return skeleton
+
+
+async def build_student_outline(db: AsyncSession, course_id: int, student_id: int) -> List[Dict[str, Any]]:
+    """
+    获取学生的课程大纲：骨架 + 当前学生的作业提交状态（一次查询）
+    返回新的结构，不修改缓存中的骨架
+    """
+    skeleton = await get_outline_skeleton(db, course_id)
+
+    homework_ids = [
+        hw["id"]
+        for chapter in skeleton
+        for section in chapter["sections"]
+        for hw in section["homework"]
+    ]
+    submissions: Dict[int, Any] = {}
+    if homework_ids:
+        submission_rows = (await db.execute(text("""
+            SELECT homework_id, id, status, score, submitted_at
+            FROM student_homework_submission
+            WHERE student_id = :student_id AND homework_id = ANY(:homework_ids)
+        """), {"student_id": student_id, "homework_ids": homework_ids})).fetchall()
+        submissions = {row.homework_id: row for row in submission_rows}
+
+    outline = []
+    for chapter in skeleton:
+        sections = []
+        for section in chapter["sections"]:
+            homework = []
+            for hw in section["homework"]:
+                sub = submissions.get(hw["id"])
+                homework.append({
+                    **hw,
+                    "submission_status": (sub.status if sub else None) or "not_started",  # draft, submitted, graded, not_started
+                    "score": sub.score if sub else None,
+                    "submitted_at": sub.submitted_at.isoformat() if sub and sub.submitted_at else None,
+                    "has_submission": sub is not None,
+                })
+            sections.append({
+                **section,
+                "resources": list(section["resources"]),
+                "exam_papers": [],
+                "homework": homework,
+            })
+        outline.append({**chapter, "sections": sections, "exam_papers": []})
+    return outline
@@ -2,22 +2,78 @@
 课程问答服务层
 处理课程问答相关的业务逻辑
 """
+import asyncio
 import logging
-from typing import List, Optional, Dict, Any, Tuple
+import time
+from datetime import datetime
+from typing import List, Optional, Dict, Any, Tuple, AsyncIterator
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import and_, or_
-from sqlalchemy.orm import selectinload, joinedload
+from sqlalchemy import and_, func, or_, text, tuple_, update
+from sqlalchemy.orm import joinedload
 
-from app.models.course_qa import CourseQASession, CourseQAMessage
+from app.models.course_qa import CourseQASession, CourseQAMessage, CourseQATeacherInbox
 from app.models.base import Course, User, StudentProfile, ClassCourseRelation, TeacherProfile
 from app.models.llm_config import LLMConfig
-from app.api.v1.endpoints.ai_creation import call_openai_compatible, call_aliyun_qwen
-from app.utils.llm_call_logger import log_llm_call
-import httpx
+from app.db.session import AsyncSessionLocal
+from app.services.llm_gateway import llm_gateway
+from app.services.llm_cache import cached_chat, cached_stream_chat
+from app.utils.llm_call_logger import LogContext, log_llm_call, enqueue_llm_call_log, STREAM_CANCELLED_MESSAGE
+from app.utils.pagination import decode_cursor, encode_cursor
 
 logger = logging.getLogger(__name__)
 
+# 按会话重新汇总教师收件箱：每个（教师, 会话）的消息数、未读数和最新消息
+# （DISTINCT ON 取最新消息，分组计数），只读取该会话的消息
+REFRESH_TEACHER_INBOX_SQL = text("""
+    WITH sent AS (
+        SELECT DISTINCT t.teacher_id, m.session_id, m.id, m.created_at, m.is_read
+        FROM course_qa_message m
+        CROSS JOIN LATERAL unnest(m.teacher_ids) AS t(teacher_id)
+        WHERE m.session_id = :session_id AND m.is_sent_to_teacher = TRUE
+    ),
+    latest AS (
+        SELECT DISTINCT ON (teacher_id, session_id) teacher_id, session_id, id, created_at
+        FROM sent
+        ORDER BY teacher_id, session_id, created_at DESC NULLS LAST, id DESC
+    ),
+    counts AS (
+        SELECT teacher_id, session_id,
+               COUNT(*) AS total_messages,
+               COUNT(*) FILTER (WHERE NOT COALESCE(is_read, FALSE)) AS unread_count
+        FROM sent
+        GROUP BY teacher_id, session_id
+    )
+    INSERT INTO course_qa_teacher_inbox (
+        teacher_id, session_id, course_id, student_id,
+        latest_message_id, latest_message_at, total_messages, unread_count, updated_at
+    )
+    SELECT c.teacher_id, c.session_id, s.course_id, s.student_id,
+           l.id, COALESCE(l.created_at, s.created_at, :now), c.total_messages, c.unread_count, :now
+    FROM counts c
+    JOIN latest l ON l.teacher_id = c.teacher_id AND l.session_id = c.session_id
+    JOIN course_qa_session s ON s.id = c.session_id
+    JOIN sys_user u ON u.id = c.teacher_id
+    ON CONFLICT (teacher_id, session_id) DO UPDATE SET
+        latest_message_id = EXCLUDED.latest_message_id,
+        latest_message_at = EXCLUDED.latest_message_at,
+        total_messages = EXCLUDED.total_messages,
+        unread_count = EXCLUDED.unread_count,
+        updated_at = EXCLUDED.updated_at
+""")
+
+# 删除会话中已不再有消息发送给该教师的收件箱记录（消息的接收教师被修改）
+DELETE_STALE_TEACHER_INBOX_SQL = text("""
+    DELETE FROM course_qa_teacher_inbox i
+    WHERE i.session_id = :session_id
+      AND NOT EXISTS (
+          SELECT 1 FROM course_qa_message m
+          WHERE m.session_id = i.session_id
+            AND m.is_sent_to_teacher = TRUE
+            AND m.teacher_ids @> ARRAY[i.teacher_id]
+      )
+""")
+
 
 async def get_course_teachers(
     db: AsyncSession,
@@ -154,14 +210,14 @@ async def get_or_create_session(
     return session
 
 
-async def generate_ai_response(
+async def build_ai_prompt(
     db: AsyncSession,
     course_id: int,
     student_question: str,
     conversation_history: List[Dict[str, str]] = None
 ) -> str:
     """
-    生成AI回答
+    构建课程问答的AI提示词
     
     Args:
         db: 数据库会话
@@ -170,7 +226,7 @@ async def generate_ai_response(
         conversation_history: 对话历史（可选）
     
     Returns:
-        AI回答内容
+        提示词
     """
     # 获取课程信息
     course_result = await db.execute(
@@ -209,9 +265,11 @@ async def generate_ai_response(
     prompt_parts.append(f"\n学生问题：{student_question}")
     prompt_parts.append("\n请回答：")
     
-    prompt = "\n".join(prompt_parts)
-    
-    # 获取激活的LLM配置
+    return "\n".join(prompt_parts)
+
+
+async def get_active_llm_config(db: AsyncSession) -> LLMConfig:
+    """获取激活的LLM配置，未配置或提供商不支持时抛出ValueError"""
     llm_result = await db.execute(
         select(LLMConfig).where(LLMConfig.is_active == True)
     )
@@ -220,33 +278,59 @@ async def generate_ai_response(
     if not llm_config:
         raise ValueError("系统未配置大模型服务，请联系管理员")
     
+    if not llm_gateway.is_supported(llm_config.provider_key):
+        raise ValueError(f"不支持的LLM提供商: {llm_config.provider_key}")
+    
+    return llm_config
+
+
+async def _resolve_log_user(db: AsyncSession, course_id: int) -> Tuple[int, str]:
+    """
+    确定LLM调用日志记录的用户
+    注意：user_role必须是'teacher', 'student', 'admin'之一
+    对于课程问答，使用学生的角色来记录AI调用
+    """
+    try:
+        # 获取学生用户信息（通过course_id查找会话中的学生）
+        session_result = await db.execute(
+            select(CourseQASession).where(CourseQASession.course_id == course_id).limit(1)
+        )
+        session = session_result.scalars().first()
+        if session:
+            student_result = await db.execute(select(User).where(User.id == session.student_id))
+            student = student_result.scalars().first()
+            if student:
+                return student.id, student.role
+    except Exception:
+        pass
+    # 如果找不到学生，使用默认值
+    return 1, "admin"
+
+
+async def generate_ai_response(
+    db: AsyncSession,
+    course_id: int,
+    student_question: str,
+    conversation_history: List[Dict[str, str]] = None
+) -> str:
+    """
+    生成AI回答
+    
+    Args:
+        db: 数据库会话
+        course_id: 课程ID
+        student_question: 学生问题
+        conversation_history: 对话历史（可选）
+    
+    Returns:
+        AI回答内容
+    """
+    prompt = await build_ai_prompt(db, course_id, student_question, conversation_history)
+    llm_config = await get_active_llm_config(db)
+    
     # 调用LLM API
     try:
-        # 使用log_llm_call记录调用日志（如果表不存在会失败，但不影响主流程）
-        # 注意：user_role必须是'teacher', 'student', 'admin'之一
-        # 对于课程问答，使用学生的角色来记录AI调用
-        try:
-            # 获取学生用户信息（通过course_id查找会话中的学生）
-            session_result = await db.execute(
-                select(CourseQASession).where(CourseQASession.course_id == course_id).limit(1)
-            )
-            session = session_result.scalars().first()
-            if session:
-                student_result = await db.execute(select(User).where(User.id == session.student_id))
-                student = student_result.scalars().first()
-                if student:
-                    log_user_id = student.id
-                    log_user_role = student.role  # 使用学生的角色
-                else:
-                    # 如果找不到学生，使用默认值
-                    log_user_id = 1
-                    log_user_role = "admin"
-            else:
-                log_user_id = 1
-                log_user_role = "admin"
-        except:
-            log_user_id = 1
-            log_user_role = "admin"
+        log_user_id, log_user_role = await _resolve_log_user(db, course_id)
         
         async with log_llm_call(
             db=db,
@@ -258,80 +342,30 @@ async def generate_ai_response(
             related_id=course_id,
             related_type="course"
         ) as log_context:
-            provider_key = llm_config.provider_key
-            
-            if provider_key == "aliyun_qwen":
-                response_text = await call_aliyun_qwen(llm_config, prompt)
-            elif provider_key in ["deepseek", "kimi", "volcengine_doubao", "siliconflow"]:
-                response_text = await call_openai_compatible(llm_config, prompt)
-            elif provider_key == "wenxin":
-                # 调用文心一言API
-                token_url = "https://aip.baidubce.com/oauth/2.0/token"
-                token_params = {
-                    "grant_type": "client_credentials",
-                    "client_id": llm_config.api_key,
-                    "client_secret": llm_config.api_secret
-                }
-                async with httpx.AsyncClient(timeout=60.0) as client:
-                    token_response = await client.post(token_url, params=token_params)
-                    token_response.raise_for_status()
-                    access_token = token_response.json()["access_token"]
-                    
-                    endpoint = llm_config.endpoint_url.rstrip('/') if llm_config.endpoint_url else ""
-                    chat_url = f"{endpoint}/wenxinworkshop/chat/completions"
-                    
-                    data = {
-                        "messages": [{"role": "user", "content": prompt}],
-                        "temperature": 0.7,
-                        "max_output_tokens": 2000
-                    }
-                    
-                    chat_response = await client.post(
-                        chat_url,
-                        json=data,
-                        headers={"Content-Type": "application/json"},
-                        params={"access_token": access_token}
-                    )
-                    chat_response.raise_for_status()
-                    result = chat_response.json()
-                    if "result" in result:
-                        response_text = result["result"]
-                    else:
-                        raise Exception("文心一言响应格式错误")
-            else:
-                error_msg = f"不支持的LLM提供商: {provider_key}"
-                log_context.set_result(None, status='failed', error_message=error_msg)
-                raise ValueError(error_msg)
-            
+            response_text = await cached_chat(
+                "course_qa_ai_response", llm_config, prompt, max_tokens=4000, timeout=300.0,
+                log_context=log_context
+            )
             log_context.set_result(response_text, status='success')
             return response_text
     
     except Exception as e:
         logger.error(f"生成AI回答失败: {e}", exc_info=True)
-        import traceback
-        error_traceback = traceback.format_exc()
-        logger.error(f"AI回答生成详细错误: {error_traceback}")
         # 不抛出异常，让调用者决定如何处理
         raise Exception(f"AI回答生成失败: {str(e)}")
 
 
-async def send_student_message(
+async def _save_student_message(
     db: AsyncSession,
     session_id: int,
     student_id: int,
     content: str
-) -> Tuple[CourseQAMessage, Optional[CourseQAMessage]]:
+) -> Tuple[CourseQAMessage, CourseQASession, List[Dict[str, str]]]:
     """
-    发送学生消息并自动生成AI回复
-    
-    Args:
-        db: 数据库会话
-        session_id: 会话ID
-        student_id: 学生ID
-        content: 消息内容
+    保存学生消息，并返回会话及对话历史
     
     Returns:
-        (学生消息对象, AI回复消息对象)
+        (学生消息对象, 会话对象, 对话历史)
     """
     # 创建学生消息
     student_message = CourseQAMessage(
@@ -378,6 +412,31 @@ async def send_student_message(
     await db.commit()
     await db.refresh(student_message)
     
+    return student_message, session, conversation_history
+
+
+async def send_student_message(
+    db: AsyncSession,
+    session_id: int,
+    student_id: int,
+    content: str
+) -> Tuple[CourseQAMessage, Optional[CourseQAMessage]]:
+    """
+    发送学生消息并自动生成AI回复
+    
+    Args:
+        db: 数据库会话
+        session_id: 会话ID
+        student_id: 学生ID
+        content: 消息内容
+    
+    Returns:
+        (学生消息对象, AI回复消息对象)
+    """
+    student_message, session, conversation_history = await _save_student_message(
+        db, session_id, student_id, content
+    )
+    
     # 生成AI回复
     ai_message = None
     try:
@@ -413,6 +472,124 @@ async def send_student_message(
     return student_message, ai_message
 
 
+async def stream_student_message(
+    db: AsyncSession,
+    session_id: int,
+    student_id: int,
+    content: str
+) -> Tuple[CourseQAMessage, AsyncIterator[Tuple[str, Any]]]:
+    """
+    发送学生消息并以流式方式生成AI回复
+    
+    学生消息、提示词和LLM配置在返回前准备好，之后请求的数据库会话不再使用；
+    AI回复生成完成后，回复消息使用独立的短会话一次性写入，LLM调用日志进入后台写入队列；
+    客户端中途断开时，已生成的部分同样写入，调用日志记录为失败。
+    
+    Args:
+        db: 数据库会话
+        session_id: 会话ID
+        student_id: 学生ID
+        content: 消息内容
+    
+    Returns:
+        (学生消息对象, 事件流)
+        事件流产出 (事件名, 数据)：
+        - ("delta", 增量文本)
+        - ("done", AI回复消息对象)
+        - ("error", 错误信息)
+    """
+    student_message, session, conversation_history = await _save_student_message(
+        db, session_id, student_id, content
+    )
+    course_id = session.course_id
+    prompt = await build_ai_prompt(db, course_id, content, conversation_history)
+    llm_config = await get_active_llm_config(db)
+    log_user_id, log_user_role = await _resolve_log_user(db, course_id)
+    # 释放数据库连接，流式生成期间不占用连接池
+    await db.close()
+    
+    async def finish(
+        response_text: str,
+        error_message: Optional[str],
+        execution_time_ms: int,
+        cache_hit: bool
+    ) -> Optional[CourseQAMessage]:
+        """保存AI回复（中途断开时保存已生成的部分）并记录调用日志"""
+        ai_message = None
+        if response_text and error_message in (None, STREAM_CANCELLED_MESSAGE):
+            try:
+                async with AsyncSessionLocal() as write_db:
+                    ai_message = CourseQAMessage(
+                        session_id=session_id,
+                        sender_id=None,  # AI消息使用NULL作为sender_id
+                        sender_type='ai',
+                        content=response_text,
+                        message_type='text'
+                    )
+                    write_db.add(ai_message)
+                    await write_db.flush()
+                    # 更新学生消息，关联到AI回复
+                    await write_db.execute(
+                        update(CourseQAMessage)
+                        .where(CourseQAMessage.id == student_message.id)
+                        .values(ai_response_id=ai_message.id)
+                    )
+                    await write_db.commit()
+                    await write_db.refresh(ai_message)
+            except Exception as e:
+                logger.error(f"保存AI回复失败: {e}", exc_info=True)
+                ai_message = None
+        
+        await enqueue_llm_call_log(
+            function_type="course_qa_ai_response",
+            user_id=log_user_id,
+            user_role=log_user_role,
+            llm_config_id=llm_config.id,
+            prompt=prompt,
+            result=response_text if error_message is None else None,
+            execution_time_ms=execution_time_ms,
+            status=('cached' if cache_hit else 'success') if error_message is None else 'failed',
+            error_message=error_message,
+            related_id=course_id,
+            related_type="course"
+        )
+        return ai_message
+    
+    async def events() -> AsyncIterator[Tuple[str, Any]]:
+        start_time = time.perf_counter()
+        log_context = LogContext(start_time)
+        chunks: List[str] = []
+        # 没有正常结束（客户端断开，生成器在yield处被关闭）时按中途断开记录
+        error_message: Optional[str] = STREAM_CANCELLED_MESSAGE
+        try:
+            try:
+                async for delta in cached_stream_chat(
+                    "course_qa_ai_response", llm_config, prompt, max_tokens=4000, timeout=300.0,
+                    log_context=log_context
+                ):
+                    chunks.append(delta)
+                    yield "delta", delta
+                error_message = None
+            except Exception as e:
+                logger.error(f"流式生成AI回答失败: {e}", exc_info=True)
+                error_message = str(e)
+        finally:
+            # 保存和记录日志放在独立任务中，客户端断开（GeneratorExit/CancelledError）时也会完成
+            saving = asyncio.ensure_future(finish(
+                "".join(chunks), error_message, int((time.perf_counter() - start_time) * 1000),
+                log_context.cache_hit
+            ))
+            await asyncio.shield(saving)
+        
+        ai_message = saving.result()
+        if ai_message:
+            yield "done", ai_message
+        else:
+            yield "error", f"AI回答生成失败: {error_message or 'AI未返回内容'}"
+    
+    return student_message, events()
+
+
 async def send_to_teachers(
     db: AsyncSession,
     message_id: int,
@@ -439,6 +616,8 @@ async def send_to_teachers(
     
     message.is_sent_to_teacher = True
     message.teacher_ids = teacher_ids
+    await db.flush()
+    await refresh_teacher_inbox(db, message.session_id)
     
     await db.commit()
     await db.refresh(message)
@@ -490,19 +669,58 @@ async def teacher_reply(
     return teacher_message
 
 
+async def refresh_teacher_inbox(db: AsyncSession, session_id: int) -> None:
+    """
+    重新汇总会话在各教师收件箱中的记录（不提交事务）
+
+    消息发送给教师、标记已读后调用，与消息的修改在同一事务中提交
+    """
+    await db.execute(REFRESH_TEACHER_INBOX_SQL, {"session_id": session_id, "now": datetime.utcnow()})
+    await db.execute(DELETE_STALE_TEACHER_INBOX_SQL, {"session_id": session_id})
+
+
+def group_inbox_rows(rows: List[Any]) -> List[Dict[str, Any]]:
+    """把收件箱行（已按最新消息时间倒序）按课程分组，课程按名称排序"""
+    courses: Dict[int, Dict[str, Any]] = {}
+    for row in rows:
+        course = courses.setdefault(row.course_id, {
+            "course_id": row.course_id,
+            "course_name": row.course_name,
+            "students": []
+        })
+        course["students"].append({
+            "student_id": row.student_id,
+            "student_no": row.student_no or "",
+            "student_name": row.full_name or row.username,
+            "session_id": row.session_id,
+            "latest_message_content": row.latest_message_content or "",
+            "latest_message_time": row.latest_message_at.isoformat() if row.latest_message_at else "",
+            "unread_count": row.unread_count,
+            "total_messages": row.total_messages
+        })
+    return sorted(courses.values(), key=lambda course: course["course_name"] or "")
+
+
 async def get_teacher_qa_sessions_grouped(
     db: AsyncSession,
-    teacher_id: int
-) -> List[Dict[str, Any]]:
+    teacher_id: int,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
     """
-    获取教师的所有问答会话，按课程分组
+    获取教师的问答会话，按课程分组
+
+    从收件箱表按最新消息时间倒序读取，一次查询连接会话的课程、学生和最新消息，
+    耗时只与返回的会话数有关，与累计的消息数无关
     
     Args:
         db: 数据库会话
         teacher_id: 教师ID
+        cursor: 上一页返回的游标
+        limit: 每页会话数，为空时返回全部会话（分页时同一课程可能出现在多页中）
     
     Returns:
-        按课程分组的会话列表，格式：
+        (按课程分组的会话列表, 下一页游标)，没有下一页时游标为None；会话列表格式：
         [
             {
                 "course_id": int,
@@ -521,143 +739,44 @@ async def get_teacher_qa_sessions_grouped(
                 ]
             }
         ]
+
+    Raises:
+        InvalidCursorError: 游标格式错误
     """
-    from sqlalchemy import func, desc
-    from datetime import datetime
-    
-    # 查询所有已发送给该教师的消息
-    # 对于 PostgreSQL ARRAY，使用 @> 操作符检查数组是否包含值
-    from sqlalchemy.dialects.postgresql import ARRAY
-    messages_result = await db.execute(
-        select(CourseQAMessage)
-        .join(CourseQASession)
-        .where(
-            CourseQAMessage.is_sent_to_teacher == True,
-            CourseQAMessage.teacher_ids.contains([teacher_id])
+    query = (
+        select(
+            CourseQATeacherInbox.session_id,
+            CourseQATeacherInbox.course_id,
+            CourseQATeacherInbox.student_id,
+            CourseQATeacherInbox.latest_message_at,
+            CourseQATeacherInbox.unread_count,
+            CourseQATeacherInbox.total_messages,
+            Course.title.label("course_name"),
+            User.full_name,
+            User.username,
+            StudentProfile.student_no,
+            func.left(CourseQAMessage.content, 100).label("latest_message_content"),
         )
-        .order_by(desc(CourseQAMessage.created_at))
-    )
-    messages = messages_result.scalars().all()
-    
-    if not messages:
-        return []
-    
-    # 获取所有相关的session_id
-    session_ids = list(set([msg.session_id for msg in messages]))
-    
-    # 批量加载会话信息
-    sessions_result = await db.execute(
-        select(CourseQASession)
-        .where(CourseQASession.id.in_(session_ids))
-        .options(selectinload(CourseQASession.student), selectinload(CourseQASession.course))
-    )
-    sessions = sessions_result.scalars().all()
-    sessions_map = {s.id: s for s in sessions}
-    
-    # 获取所有学生ID和课程ID
-    student_ids = list(set([s.student_id for s in sessions]))
-    course_ids = list(set([s.course_id for s in sessions]))
-    
-    # 批量加载学生信息
-    students_result = await db.execute(
-        select(User).where(User.id.in_(student_ids))
-    )
-    students = students_result.scalars().all()
-    students_map = {s.id: s for s in students}
-    
-    # 批量加载学生档案（获取学号）
-    profiles_result = await db.execute(
-        select(StudentProfile).where(StudentProfile.user_id.in_(student_ids))
-    )
-    profiles = profiles_result.scalars().all()
-    profiles_map = {p.user_id: p for p in profiles}
-    
-    # 批量加载课程信息
-    courses_result = await db.execute(
-        select(Course).where(Course.id.in_(course_ids))
+        .join(Course, Course.id == CourseQATeacherInbox.course_id)
+        .join(User, User.id == CourseQATeacherInbox.student_id)
+        .outerjoin(StudentProfile, StudentProfile.user_id == CourseQATeacherInbox.student_id)
+        .outerjoin(CourseQAMessage, CourseQAMessage.id == CourseQATeacherInbox.latest_message_id)
+        .where(CourseQATeacherInbox.teacher_id == teacher_id)
     )
-    courses = courses_result.scalars().all()
-    courses_map = {c.id: c for c in courses}
-    
-    # 按课程分组，统计每个学生的消息
-    course_students_map = {}  # {course_id: {student_id: {session_id, messages, latest_time}}}
-    
-    for msg in messages:
-        session = sessions_map.get(msg.session_id)
-        if not session:
-            continue
-        
-        course_id = session.course_id
-        student_id = session.student_id
-        
-        if course_id not in course_students_map:
-            course_students_map[course_id] = {}
-        
-        if student_id not in course_students_map[course_id]:
-            course_students_map[course_id][student_id] = {
-                'session_id': session.id,
-                'messages': [],
-                'unread_messages': []
-            }
-        
-        student_data = course_students_map[course_id][student_id]
-        student_data['messages'].append(msg)
-        
-        # 统计未读消息
-        if not msg.is_read:
-            student_data['unread_messages'].append(msg)
-    
-    # 构建返回数据
-    result = []
-    for course_id, students_data in course_students_map.items():
-        course = courses_map.get(course_id)
-        if not course:
-            continue
-        
-        students_list = []
-        for student_id, data in students_data.items():
-            student = students_map.get(student_id)
-            if not student:
-                continue
-            
-            profile = profiles_map.get(student_id)
-            student_no = profile.student_no if profile else ""
-            student_name = student.full_name or student.username
-            
-            # 获取最新消息
-            messages_list = data['messages']
-            if not messages_list:
-                continue
-            
-            latest_message = max(messages_list, key=lambda m: m.created_at if m.created_at else datetime.min)
-            latest_content = latest_message.content[:100] if latest_message.content else ""
-            latest_time = latest_message.created_at.isoformat() if latest_message.created_at else ""
-            
-            # 统计未读消息数
-            unread_count = len(data['unread_messages'])
-            
-            students_list.append({
-                "student_id": student_id,
-                "student_no": student_no,
-                "student_name": student_name,
-                "session_id": data['session_id'],
-                "latest_message_content": latest_content,
-                "latest_message_time": latest_time,
-                "unread_count": unread_count,
-                "total_messages": len(messages_list)
-            })
-        
-        # 按最新消息时间排序学生列表
-        students_list.sort(key=lambda x: x['latest_message_time'], reverse=True)
-        
-        if students_list:
-            result.append({
-                "course_id": course_id,
-                "course_name": course.title,
-                "students": students_list
-            })
-    
-    # 按课程名称排序
-    result.sort(key=lambda x: x['course_name'])
-    
-    return result
+    if cursor:
+        latest_message_at, session_id = decode_cursor(cursor)
+        query = query.where(
+            tuple_(CourseQATeacherInbox.latest_message_at, CourseQATeacherInbox.session_id)
+            < tuple_(latest_message_at, session_id)
+        )
+    query = query.order_by(CourseQATeacherInbox.latest_message_at.desc(), CourseQATeacherInbox.session_id.desc())
+    if limit is not None:
+        # 多取一条判断是否还有下一页
+        query = query.limit(limit + 1)
+    rows = list((await db.execute(query)).all())
+
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].latest_message_at, rows[-1].session_id)
+    return group_inbox_rows(rows), next_cursor
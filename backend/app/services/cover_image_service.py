@@ -0,0 +1,273 @@
+"""
+课程封面图片服务
+生成、缓存和返回不同尺寸的课程封面图片
+"""
+import asyncio
+import hashlib
+import io
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import httpx
+from fastapi import Request
+from fastapi.responses import Response
+
+from app.core.config import settings
+from app.utils.file_delivery import SIGNED_URL_EXPIRES, etag_matches, file_delivery, is_remote_path
+from app.utils.oss_client import oss_client
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# 封面本地目录（OSS不可用时的回退存储）
+COVER_UPLOAD_DIR = Path("uploads/covers")
+# 尺寸变体的本地目录和OSS前缀
+COVER_VARIANT_DIR = COVER_UPLOAD_DIR / "variants"
+COVER_VARIANT_OSS_PREFIX = "course_covers/variants"
+
+# 尺寸变体：名称 -> 最长边像素
+COVER_VARIANTS: Dict[str, int] = {
+    "thumbnail": 320,
+    "card": 640,
+    "full": 1280,
+}
+WEBP_QUALITY = 80
+
+# 封面响应的缓存时间（封面替换后文件名会变化，可以长期缓存）
+COVER_CACHE_CONTROL = "public, max-age=31536000"
+
+
+def cover_media_type(filename: str) -> str:
+    """根据文件扩展名确定图片的MIME类型"""
+    filename_lower = filename.lower().split('?')[0]
+    if filename_lower.endswith((".jpg", ".jpeg")):
+        return "image/jpeg"
+    if filename_lower.endswith(".png"):
+        return "image/png"
+    if filename_lower.endswith(".gif"):
+        return "image/gif"
+    if filename_lower.endswith(".webp"):
+        return "image/webp"
+    return "image/jpeg"
+
+
+def variant_filename(filename: str, variant: str) -> str:
+    """尺寸变体的文件名"""
+    stem = Path(filename.split('?')[0]).stem
+    return f"{stem}_{variant}.webp"
+
+
+def render_variants(data: bytes) -> Dict[str, bytes]:
+    """生成各尺寸的WebP图片（同步执行，调用方放到线程中），未安装Pillow时返回空字典"""
+    if Image is None:
+        return {}
+    with Image.open(io.BytesIO(data)) as source:
+        source.load()
+        image = source if source.mode in ("RGB", "RGBA") else source.convert("RGBA")
+        variants = {}
+        for variant, max_side in COVER_VARIANTS.items():
+            resized = image.copy()
+            resized.thumbnail((max_side, max_side), Image.LANCZOS)
+            buffer = io.BytesIO()
+            resized.save(buffer, format="WEBP", quality=WEBP_QUALITY)
+            variants[variant] = buffer.getvalue()
+    return variants
+
+
+class CoverImage:
+    """缓存的封面图片内容"""
+
+    def __init__(self, content: bytes, media_type: str):
+        self.content = content
+        self.media_type = media_type
+        self.etag = f'"{hashlib.md5(content, usedforsecurity=False).hexdigest()}"'
+
+
+class ImageLRUCache:
+    """按总字节数限制的进程内LRU缓存"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[Tuple[str, str], CoverImage]" = OrderedDict()
+        self._total = 0
+
+    def get(self, key: Tuple[str, str]) -> Optional[CoverImage]:
+        image = self._data.get(key)
+        if image is not None:
+            self._data.move_to_end(key)
+        return image
+
+    def set(self, key: Tuple[str, str], image: CoverImage) -> None:
+        self.pop(key)
+        if len(image.content) > self.max_bytes:
+            return
+        self._data[key] = image
+        self._total += len(image.content)
+        while self._total > self.max_bytes:
+            _, evicted = self._data.popitem(last=False)
+            self._total -= len(evicted.content)
+
+    def pop(self, key: Tuple[str, str]) -> None:
+        image = self._data.pop(key, None)
+        if image is not None:
+            self._total -= len(image.content)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class CoverImageService:
+    """
+    课程封面图片服务
+
+    Args:
+        max_bytes: 进程内图片缓存的总大小上限（字节）
+    """
+
+    def __init__(self, max_bytes: int):
+        self._cache = ImageLRUCache(max_bytes)
+        self._generating: Dict[str, asyncio.Task] = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, filename: str, variant: Optional[str] = None) -> CoverImage:
+        """
+        读取封面图片
+
+        Args:
+            filename: CourseCover.filename（OSS URL或本地文件名）
+            variant: 尺寸变体名称，None表示原图
+
+        本地文件不存在时抛出 FileNotFoundError；未安装Pillow时尺寸变体回退为原图
+        """
+        key = (filename, variant or "original")
+        image = self._cache.get(key)
+        if image is not None:
+            self.hits += 1
+            return image
+        self.misses += 1
+
+        if variant:
+            content = await self._load_variant(filename, variant)
+            if content is None:
+                variants = await self.create_variants(filename)
+                content = variants.get(variant)
+            if content is not None:
+                image = CoverImage(content, "image/webp")
+        if image is None:
+            image = CoverImage(await self._load_original(filename), cover_media_type(filename))
+        self._cache.set(key, image)
+        return image
+
+    async def create_variants(self, filename: str, data: Optional[bytes] = None) -> Dict[str, bytes]:
+        """
+        生成并保存封面的各尺寸变体（上传/替换封面后调用），同一封面的并发请求只生成一次
+
+        Args:
+            filename: CourseCover.filename
+            data: 原图内容（None时重新读取）
+
+        失败时只记录日志，返回空字典
+        """
+        task = self._generating.get(filename)
+        if task is None:
+            task = asyncio.ensure_future(self._create_variants(filename, data))
+            self._generating[filename] = task
+            task.add_done_callback(lambda _: self._generating.pop(filename, None))
+        try:
+            return await asyncio.shield(task)
+        except Exception as e:
+            logger.error(f"生成封面尺寸变体失败: {filename}, {e}")
+            return {}
+
+    async def _create_variants(self, filename: str, data: Optional[bytes]) -> Dict[str, bytes]:
+        if data is None:
+            data = await self._load_original(filename)
+        variants = await asyncio.to_thread(render_variants, data)
+        for variant, content in variants.items():
+            await self._store_variant(filename, variant, content)
+            self._cache.set((filename, variant), CoverImage(content, "image/webp"))
+        if variants:
+            logger.info(f"已生成封面尺寸变体: {filename}")
+        return variants
+
+    async def delete_variants(self, filename: str) -> None:
+        """删除封面的尺寸变体和缓存（删除/替换/重命名封面时调用）"""
+        self._cache.pop((filename, "original"))
+        for variant in COVER_VARIANTS:
+            self._cache.pop((filename, variant))
+            name = variant_filename(filename, variant)
+            try:
+                if self._variant_in_oss(filename):
+                    await asyncio.to_thread(oss_client.delete_file, f"{COVER_VARIANT_OSS_PREFIX}/{name}")
+                else:
+                    (COVER_VARIANT_DIR / name).unlink(missing_ok=True)
+            except Exception as e:
+                logger.warning(f"删除封面尺寸变体失败: {name}, {e}")
+
+    def response(self, request: Request, image: CoverImage) -> Response:
+        """封面图片的响应（If-None-Match 命中时返回304）"""
+        headers = {"Cache-Control": COVER_CACHE_CONTROL, "ETag": image.etag}
+        if etag_matches(request.headers.get("if-none-match"), image.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=image.content, media_type=image.media_type, headers=headers)
+
+    def stats(self) -> dict:
+        """缓存运行统计"""
+        return {
+            "entries": len(self._cache),
+            "bytes": self._cache._total,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    @staticmethod
+    def _variant_in_oss(filename: str) -> bool:
+        # OSS上的封面，变体也放在OSS；本地封面（或OSS未启用）的变体放在本地目录
+        return is_remote_path(filename) and oss_client.enabled
+
+    async def _load_original(self, filename: str) -> bytes:
+        if is_remote_path(filename):
+            path = await file_delivery.fetch(filename)
+        else:
+            path = COVER_UPLOAD_DIR / filename
+        return await asyncio.to_thread(path.read_bytes)
+
+    async def _load_variant(self, filename: str, variant: str) -> Optional[bytes]:
+        """读取已生成的尺寸变体，不存在时返回None"""
+        name = variant_filename(filename, variant)
+        if self._variant_in_oss(filename):
+            object_key = f"{COVER_VARIANT_OSS_PREFIX}/{name}"
+            signed_url = oss_client.generate_download_url(object_key, expires=SIGNED_URL_EXPIRES)
+            try:
+                path = await file_delivery.cache.get(object_key, signed_url)
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code == 404:
+                    return None
+                raise
+        else:
+            path = COVER_VARIANT_DIR / name
+            if not path.exists():
+                return None
+        return await asyncio.to_thread(path.read_bytes)
+
+    async def _store_variant(self, filename: str, variant: str, content: bytes) -> None:
+        name = variant_filename(filename, variant)
+        if self._variant_in_oss(filename):
+            await asyncio.to_thread(
+                oss_client.upload_file, content, f"{COVER_VARIANT_OSS_PREFIX}/{name}", content_type="image/webp"
+            )
+        else:
+            COVER_VARIANT_DIR.mkdir(parents=True, exist_ok=True)
+            await asyncio.to_thread((COVER_VARIANT_DIR / name).write_bytes, content)
+
+
+# 创建全局封面图片服务实例
+cover_image_service = CoverImageService(max_bytes=settings.COVER_IMAGE_CACHE_MAX_BYTES)
@@ -0,0 +1,268 @@
+"""
+考试实时监控
+维护各考试的考生状态计数，并通过SSE推送变化
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.db.redis import get_redis
+from app.db.session import AsyncSessionLocal
+from app.models.exam import ExamStudent
+from app.utils.sse import format_sse
+
+logger = logging.getLogger(__name__)
+
+# 监控的考生状态（与 ExamStudent.exam_status 一致）
+EXAM_STATUSES = ("pending", "in_progress", "submitted")
+
+# Redis发布订阅频道
+REDIS_CHANNEL = "exam_monitor"
+
+# 没有新事件时发送心跳的间隔（秒），防止代理断开空闲连接
+HEARTBEAT_INTERVAL = 15.0
+
+# 每个监控连接最多积压的事件数，超过后改为重新发送完整计数
+SUBSCRIBER_QUEUE_SIZE = 100
+
+MessageHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+def empty_counts() -> Dict[str, int]:
+    counts = {status: 0 for status in EXAM_STATUSES}
+    counts["total"] = 0
+    return counts
+
+
+def apply_changes(counts: Dict[str, int], changes: Dict[str, int]) -> None:
+    """把状态增量累加到计数上（未知状态只计入总数）"""
+    for status, delta in changes.items():
+        if status in counts and status != "total":
+            counts[status] = max(counts[status] + delta, 0)
+        counts["total"] = max(counts["total"] + delta, 0)
+
+
+async def load_exam_counts(db: AsyncSession, exam_id: int) -> Dict[str, int]:
+    """一次分组查询考试各状态的考生数"""
+    result = await db.execute(
+        select(ExamStudent.exam_status, func.count(ExamStudent.id))
+        .where(ExamStudent.exam_id == exam_id)
+        .group_by(ExamStudent.exam_status)
+    )
+    counts = empty_counts()
+    apply_changes(counts, {status or "pending": int(count) for status, count in result.all()})
+    return counts
+
+
+class InProcessBroker:
+    """进程内消息分发（单worker部署）"""
+
+    def __init__(self):
+        self._handler: Optional[MessageHandler] = None
+
+    async def start(self, handler: MessageHandler) -> None:
+        self._handler = handler
+
+    async def publish(self, message: Dict[str, Any]) -> None:
+        if self._handler is not None:
+            await self._handler(message)
+
+    async def stop(self) -> None:
+        self._handler = None
+
+
+class RedisBroker:
+    """通过Redis发布订阅分发消息（多worker部署），本进程发布的消息也经订阅收到"""
+
+    def __init__(self, redis: Any, channel: str = REDIS_CHANNEL):
+        self.redis = redis
+        self.channel = channel
+        self._task: Optional[asyncio.Task] = None
+        self._subscribed = asyncio.Event()
+
+    async def start(self, handler: MessageHandler) -> None:
+        self._task = asyncio.create_task(self._listen(handler))
+        # 订阅建立后再返回，保证之后发布的消息都能收到
+        try:
+            await asyncio.wait_for(self._subscribed.wait(), timeout=5.0)
+        except asyncio.TimeoutError:
+            logger.warning("订阅考试监控频道超时")
+
+    async def publish(self, message: Dict[str, Any]) -> None:
+        await self.redis.publish(self.channel, json.dumps(message))
+
+    async def _listen(self, handler: MessageHandler) -> None:
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                self._subscribed.set()
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is None or message.get("type") != "message":
+                        continue
+                    try:
+                        await handler(json.loads(message["data"]))
+                    except Exception as e:
+                        logger.warning(f"处理考试监控消息失败: {str(e)}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"考试监控频道订阅中断，1秒后重连: {str(e)}")
+                await asyncio.sleep(1.0)
+            finally:
+                try:
+                    close = getattr(pubsub, "aclose", None) or pubsub.close
+                    await close()
+                except Exception:
+                    pass
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+def create_broker() -> Any:
+    """按 EXAM_MONITOR_BROKER 配置创建消息分发"""
+    mode = settings.EXAM_MONITOR_BROKER
+    redis = get_redis() if mode in ("auto", "redis") else None
+    if redis is not None:
+        return RedisBroker(redis)
+    if mode == "redis":
+        logger.warning("EXAM_MONITOR_BROKER=redis 但Redis不可用，考试监控使用进程内分发")
+    return InProcessBroker()
+
+
+class ExamMonitor:
+    """
+    考试实时监控
+
+    Args:
+        counts_ttl: 各状态考生数的缓存时间（秒）
+        broker_factory: 创建消息分发的函数，需返回带 start/publish/stop 方法的对象
+    """
+
+    def __init__(self, counts_ttl: int = 300, broker_factory: Callable[[], Any] = create_broker):
+        self.counts_ttl = counts_ttl
+        self.broker_factory = broker_factory
+        self._broker: Any = None
+        self._start_lock = asyncio.Lock()
+        self._counts: Dict[int, Tuple[float, Dict[str, int]]] = {}
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = {}
+
+    async def _get_broker(self) -> Any:
+        if self._broker is None:
+            async with self._start_lock:
+                if self._broker is None:
+                    broker = self.broker_factory()
+                    await broker.start(self._handle)
+                    self._broker = broker
+        return self._broker
+
+    async def get_counts(self, db: AsyncSession, exam_id: int) -> Dict[str, int]:
+        """考试各状态的考生数（缓存过期时重新查询）"""
+        cached = self._counts.get(exam_id)
+        if cached is not None and cached[0] > time.monotonic():
+            return dict(cached[1])
+        counts = await load_exam_counts(db, exam_id)
+        if self.counts_ttl > 0:
+            self._counts[exam_id] = (time.monotonic() + self.counts_ttl, counts)
+        return dict(counts)
+
+    def invalidate(self, exam_id: int) -> None:
+        self._counts.pop(exam_id, None)
+
+    async def publish_changes(self, exam_id: int, changes: Dict[str, int]) -> None:
+        """
+        发布考生状态增量（在数据库提交之后调用）
+
+        Args:
+            changes: 状态 -> 考生数变化，如添加考生 {"pending": 30}，交卷 {"in_progress": -1, "submitted": 1}
+        """
+        changes = {status: delta for status, delta in changes.items() if delta}
+        if not changes:
+            return
+        try:
+            broker = await self._get_broker()
+            await broker.publish({"exam_id": exam_id, "changes": changes})
+        except Exception as e:
+            # 增量发不出去时丢弃本进程的计数，下次读取时重新查询
+            logger.warning(f"发布考试 {exam_id} 状态变化失败: {str(e)}")
+            self.invalidate(exam_id)
+
+    async def record_transition(self, exam_id: int, old_status: Optional[str], new_status: str) -> None:
+        """单个考生状态变化（如开始考试、交卷）"""
+        changes = {new_status: 1}
+        if old_status:
+            changes[old_status] = changes.get(old_status, 0) - 1
+        await self.publish_changes(exam_id, changes)
+
+    async def _handle(self, message: Dict[str, Any]) -> None:
+        """收到状态增量：更新缓存的计数并推送给本进程的监控连接"""
+        exam_id = int(message["exam_id"])
+        changes = {status: int(delta) for status, delta in message["changes"].items()}
+        cached = self._counts.get(exam_id)
+        if cached is not None:
+            apply_changes(cached[1], changes)
+        event = {"changes": changes}
+        for queue in self._subscribers.get(exam_id, ()):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # 监控端跟不上时丢弃积压的增量，改为重新发送完整计数
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"resync": True})
+
+    async def stream(self, exam_id: int, counts: Dict[str, int]) -> AsyncIterator[str]:
+        """
+        监控连接的SSE事件流
+
+        事件：snapshot（完整计数）、delta（changes 为各状态的增量），空闲时发送心跳注释
+
+        Args:
+            counts: 连接建立时的完整计数
+        """
+        await self._get_broker()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(exam_id, set()).add(queue)
+        try:
+            yield format_sse({"exam_id": exam_id, **counts}, event="snapshot")
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if event.get("resync"):
+                    self.invalidate(exam_id)
+                    async with AsyncSessionLocal() as db:
+                        counts = await self.get_counts(db, exam_id)
+                    yield format_sse({"exam_id": exam_id, **counts}, event="snapshot")
+                else:
+                    yield format_sse({"exam_id": exam_id, **event}, event="delta")
+        finally:
+            subscribers = self._subscribers.get(exam_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[exam_id]
+
+    async def stop(self) -> None:
+        """停止消息分发（应用关闭时调用）"""
+        if self._broker is not None:
+            await self._broker.stop()
+            self._broker = None
+
+
+# 创建全局考试监控实例
+exam_monitor = ExamMonitor(counts_ttl=settings.EXAM_MONITOR_COUNTS_TTL)
@@ -0,0 +1,118 @@
+"""
+知识图谱节点树缓存
+按图谱缓存节点父子关系，以图谱的 updated_at 判断是否过期
+"""
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.models.knowledge_graph import KnowledgeGraph, KnowledgeNode
+
+logger = logging.getLogger(__name__)
+
+
+class KnowledgeTree:
+    """单个图谱的节点关系快照"""
+
+    def __init__(self, version: Optional[datetime], rows: Iterable[Tuple[int, Optional[int], str]]):
+        self.version = version
+        self.parent: Dict[int, Optional[int]] = {}
+        self.names: Dict[int, str] = {}
+        self.children: Dict[int, List[int]] = {}
+        for node_id, parent_id, node_name in rows:
+            self.parent[node_id] = parent_id
+            self.names[node_id] = node_name
+            self.children.setdefault(node_id, [])
+        for node_id, parent_id in self.parent.items():
+            if parent_id in self.children:
+                self.children[parent_id].append(node_id)
+
+    def __contains__(self, node_id: int) -> bool:
+        return node_id in self.parent
+
+    def subtree_ids(self, node_id: int) -> List[int]:
+        """节点及其所有后代的ID（先序），节点不存在时返回空列表"""
+        if node_id not in self.parent:
+            return []
+        ids = []
+        stack = [node_id]
+        while stack:
+            current = stack.pop()
+            ids.append(current)
+            stack.extend(reversed(self.children.get(current, [])))
+        return ids
+
+    def ancestor_ids(self, node_id: int) -> List[int]:
+        """从父节点到根节点的ID链"""
+        ids = []
+        seen = {node_id}
+        current = self.parent.get(node_id)
+        while current is not None and current not in seen:
+            ids.append(current)
+            seen.add(current)
+            current = self.parent.get(current)
+        return ids
+
+    def is_descendant(self, node_id: int, ancestor_id: int) -> bool:
+        """node_id 是否为 ancestor_id 自身或其后代"""
+        return node_id == ancestor_id or ancestor_id in self.ancestor_ids(node_id)
+
+
+class KnowledgeTreeCache:
+    """知识图谱节点树的进程内LRU缓存"""
+
+    def __init__(self, max_graphs: int = 200):
+        self.max_graphs = max_graphs
+        self._trees: "OrderedDict[int, KnowledgeTree]" = OrderedDict()
+
+    def put(self, graph: KnowledgeGraph, nodes: Iterable[KnowledgeNode]) -> KnowledgeTree:
+        """用调用方已经查出的有效节点填充缓存"""
+        tree = KnowledgeTree(graph.updated_at, ((n.id, n.parent_id, n.node_name) for n in nodes))
+        self._store(graph.id, tree)
+        return tree
+
+    async def get(self, db: AsyncSession, graph: KnowledgeGraph) -> KnowledgeTree:
+        """获取图谱节点树，缓存未命中或已过期时一次查询重新加载"""
+        tree = self._trees.get(graph.id)
+        if tree is not None and tree.version == graph.updated_at:
+            self._trees.move_to_end(graph.id)
+            return tree
+
+        result = await db.execute(
+            select(KnowledgeNode.id, KnowledgeNode.parent_id, KnowledgeNode.node_name).where(
+                and_(
+                    KnowledgeNode.graph_id == graph.id,
+                    KnowledgeNode.is_active == True
+                )
+            )
+        )
+        tree = KnowledgeTree(graph.updated_at, result.all())
+        self._store(graph.id, tree)
+        return tree
+
+    def invalidate(self, graph_id: int) -> None:
+        """图谱节点发生变化后调用"""
+        self._trees.pop(graph_id, None)
+
+    def clear(self) -> None:
+        self._trees.clear()
+
+    def _store(self, graph_id: int, tree: KnowledgeTree) -> None:
+        self._trees[graph_id] = tree
+        self._trees.move_to_end(graph_id)
+        while len(self._trees) > self.max_graphs:
+            self._trees.popitem(last=False)
+
+
+# 创建全局知识图谱节点树缓存实例
+knowledge_tree_cache = KnowledgeTreeCache()
+
+
+def touch_graph(graph: KnowledgeGraph) -> None:
+    """节点变更时刷新图谱的 updated_at，使其他worker中的缓存失效（随当前事务提交）"""
+    graph.updated_at = datetime.utcnow()
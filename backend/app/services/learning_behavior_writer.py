@@ -0,0 +1,178 @@
+"""
+学习行为批量写入
+学习行为进入队列后由后台任务批量写入，并累加学习时长和日汇总
+"""
+import logging
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import func, insert, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import AsyncSessionLocal
+from app.models.student_learning import StudentLearningBehavior, StudentLearningDailyStat, StudentStudyDuration
+from app.utils.batch_writer import BatchWriter
+
+logger = logging.getLogger(__name__)
+
+
+def build_behavior_event(student_id: int, course_id: int, behavior_data: Dict[str, Any]) -> Dict[str, Any]:
+    """把接口参数转换为待写入的学习行为记录（记录时间取入队时间）"""
+    return {
+        "student_id": student_id,
+        "course_id": course_id,
+        "chapter_id": behavior_data.get("chapter_id"),
+        "resource_id": behavior_data.get("resource_id"),
+        "resource_type": behavior_data.get("resource_type"),
+        "behavior_type": behavior_data.get("behavior_type", "view_resource"),
+        "duration_seconds": behavior_data.get("duration_seconds", 0) or 0,
+        "description": behavior_data.get("description"),
+        "created_at": datetime.utcnow(),
+        # 学习日期按服务器本地时间计算，与原有统计口径一致
+        "study_day": datetime.now().replace(hour=0, minute=0, second=0, microsecond=0),
+    }
+
+
+def aggregate_daily_minutes(events: List[Dict[str, Any]]) -> Dict[Tuple[int, int, datetime], int]:
+    """按 (学生, 课程, 日期) 汇总学习分钟数（每条行为按整分钟计入）"""
+    totals: Dict[Tuple[int, int, datetime], int] = defaultdict(int)
+    for event in events:
+        minutes = event["duration_seconds"] // 60
+        if minutes > 0:
+            totals[(event["student_id"], event["course_id"], event["study_day"])] += minutes
+    return totals
+
+
+def aggregate_daily_stats(events: List[Dict[str, Any]]) -> Dict[Tuple[int, int, date], Dict[str, Any]]:
+    """按 (学生, 课程, DATE(created_at)) 汇总行为次数、时长（秒）和最后学习时间"""
+    stats: Dict[Tuple[int, int, date], Dict[str, Any]] = {}
+    for event in events:
+        if event.get("course_id") is None:
+            continue
+        created_at = event["created_at"]
+        key = (event["student_id"], event["course_id"], created_at.date())
+        item = stats.get(key)
+        if item is None:
+            stats[key] = {
+                "behavior_count": 1,
+                "duration_seconds": event["duration_seconds"],
+                "last_activity_at": created_at,
+            }
+        else:
+            item["behavior_count"] += 1
+            item["duration_seconds"] += event["duration_seconds"]
+            item["last_activity_at"] = max(item["last_activity_at"], created_at)
+    return stats
+
+
+async def accumulate_daily_stats(session: AsyncSession, events: List[Dict[str, Any]]) -> None:
+    """把一批学习行为累加到 student_learning_daily_stat（不提交）"""
+    stats = aggregate_daily_stats(events)
+    if not stats:
+        return
+    now = datetime.utcnow()
+    stmt = pg_insert(StudentLearningDailyStat).values([
+        {
+            "student_id": student_id,
+            "course_id": course_id,
+            "stat_date": stat_date,
+            "behavior_count": item["behavior_count"],
+            "duration_seconds": item["duration_seconds"],
+            "last_activity_at": item["last_activity_at"],
+            "updated_at": now,
+        }
+        # 固定顺序加锁，避免多个worker同时刷新时死锁
+        for (student_id, course_id, stat_date), item in sorted(stats.items())
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["student_id", "course_id", "stat_date"],
+        set_={
+            "behavior_count": StudentLearningDailyStat.behavior_count + stmt.excluded.behavior_count,
+            "duration_seconds": StudentLearningDailyStat.duration_seconds + stmt.excluded.duration_seconds,
+            "last_activity_at": func.greatest(StudentLearningDailyStat.last_activity_at, stmt.excluded.last_activity_at),
+            "updated_at": stmt.excluded.updated_at,
+        }
+    )
+    await session.execute(stmt)
+
+
+async def write_behavior_events(session: AsyncSession, events: List[Dict[str, Any]]) -> List[int]:
+    """在给定会话中写入一批学习行为并累加每日学习时长和日汇总（不提交），返回行为记录ID"""
+    rows = [{k: v for k, v in event.items() if k != "study_day"} for event in events]
+    result = await session.execute(
+        insert(StudentLearningBehavior).returning(StudentLearningBehavior.id, sort_by_parameter_order=True),
+        rows
+    )
+    behavior_ids = list(result.scalars().all())
+
+    totals = aggregate_daily_minutes(events)
+    if totals:
+        now = datetime.utcnow()
+        stmt = pg_insert(StudentStudyDuration).values([
+            {
+                "student_id": student_id,
+                "course_id": course_id,
+                "study_date": study_day,
+                "duration_minutes": minutes,
+                "created_at": now,
+                "updated_at": now,
+            }
+            # 固定顺序加锁，避免多个worker同时刷新时死锁
+            for (student_id, course_id, study_day), minutes in sorted(totals.items())
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["student_id", "course_id", "study_date"],
+            set_={
+                "duration_minutes": StudentStudyDuration.duration_minutes + stmt.excluded.duration_minutes,
+                "updated_at": stmt.excluded.updated_at,
+            }
+        )
+        await session.execute(stmt)
+
+    await accumulate_daily_stats(session, events)
+    return behavior_ids
+
+
+class LearningBehaviorWriter(BatchWriter):
+    """学习行为后台批量写入器，参数见 BatchWriter"""
+
+    def __init__(self, **kwargs):
+        super().__init__("学习行为", **kwargs)
+
+    async def _check_ready(self) -> bool:
+        try:
+            async with AsyncSessionLocal() as session:
+                await session.execute(text("SELECT 1 FROM student_learning_behavior LIMIT 1"))
+            return True
+        except Exception as e:
+            logger.warning(f"student_learning_behavior表检查失败，学习行为改为同步写入: {e}")
+            return False
+
+    async def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        """整批写入；失败时逐条重试，跳过有问题的记录"""
+        if not batch:
+            return
+        try:
+            async with AsyncSessionLocal() as session:
+                await write_behavior_events(session, batch)
+                await session.commit()
+            self.written += len(batch)
+            return
+        except Exception as e:
+            logger.warning(f"批量写入学习行为失败，改为逐条写入: {str(e)}")
+
+        for event in batch:
+            try:
+                async with AsyncSessionLocal() as session:
+                    await write_behavior_events(session, [event])
+                    await session.commit()
+                self.written += 1
+            except Exception as e:
+                self.failed += 1
+                logger.warning(f"写入学习行为失败: {str(e)}")
+
+
+# 创建全局学习行为写入器实例
+learning_behavior_writer = LearningBehaviorWriter(max_queue_size=50000, batch_size=500)
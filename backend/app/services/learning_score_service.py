@@ -0,0 +1,360 @@
+"""
+课程学习表现AI评分
+整门课程的学习表现评分后台任务
+"""
+import asyncio
+import json
+import logging
+import re
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.redis import get_redis
+from app.db.session import AsyncSessionLocal
+from app.models.llm_config import LLMConfig
+from app.models.student_learning import CourseGrade, StudentLearningBehavior
+from app.services.llm_gateway import llm_gateway
+from app.utils.llm_call_logger import enqueue_llm_call_log
+
+logger = logging.getLogger(__name__)
+
+# 每累计多少个学生的评分结果写入一次数据库
+SCORE_FLUSH_SIZE = 20
+
+# 任务状态在Redis中的保留时间（秒）
+JOB_STATE_TTL = 24 * 3600
+REDIS_JOB_KEY_PREFIX = "learning_score_job:"
+
+
+def empty_learning_metrics() -> Dict[str, Any]:
+    """没有学习记录的学生的指标"""
+    return {"study_minutes": 0.0, "study_count": 0, "last_active": "无"}
+
+
+async def load_learning_metrics(db: AsyncSession, course_id: int, student_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    """一次分组查询多个学生在课程中的学习时长、次数和最近学习时间（没有学习记录的学生不在结果中）"""
+    ids = list(student_ids)
+    if not ids:
+        return {}
+    result = await db.execute(
+        select(
+            StudentLearningBehavior.student_id,
+            func.coalesce(func.sum(StudentLearningBehavior.duration_seconds), 0),
+            func.count(StudentLearningBehavior.id),
+            func.max(StudentLearningBehavior.created_at)
+        )
+        .where(
+            StudentLearningBehavior.course_id == course_id,
+            StudentLearningBehavior.student_id.in_(ids)
+        )
+        .group_by(StudentLearningBehavior.student_id)
+    )
+    metrics = {}
+    for student_id, total_seconds, study_count, last_active in result.all():
+        metrics[student_id] = {
+            "study_minutes": round(float(total_seconds or 0) / 60, 2),
+            "study_count": int(study_count),
+            "last_active": last_active.isoformat() if last_active else "无"
+        }
+    return metrics
+
+
+def build_learning_prompt(course_title: str, student_name: str, metrics: Dict[str, Any]) -> str:
+    return (
+        "你是课程教师评分助手，请根据学习数据给出学习表现评分。\n"
+        "请严格输出JSON格式，字段为 score（0-100数字）和 reason（简短中文）。\n"
+        f"课程：{course_title}\n"
+        f"学生：{student_name}\n"
+        f"学习时长（分钟）：{metrics['study_minutes']}\n"
+        f"学习次数：{metrics['study_count']}\n"
+        f"最近学习时间：{metrics['last_active']}\n"
+    )
+
+
+def parse_learning_score(ai_response: Optional[str]) -> Tuple[Optional[float], Optional[str]]:
+    """解析AI评分结果，返回 (0-100的分数, 理由)，无法解析时分数为None"""
+    try:
+        parsed = json.loads(ai_response.strip())
+        score_value = float(parsed.get("score"))
+        reason = parsed.get("reason")
+    except Exception:
+        match = re.search(r"(\d{1,3}(\.\d+)?)", ai_response or "")
+        score_value = float(match.group(1)) if match else None
+        reason = None
+    if score_value is None:
+        return None, None
+    return max(0, min(100, score_value)), reason
+
+
+def apply_learning_score(
+    grade: CourseGrade,
+    score_value: float,
+    ai_response: str,
+    reason: Optional[str],
+    metrics: Dict[str, Any]
+) -> None:
+    """把学习表现评分写入成绩行的 breakdown"""
+    # 复制一份再赋值，JSONB列原地修改不会被识别为变更
+    breakdown = dict(grade.breakdown) if grade.breakdown and isinstance(grade.breakdown, dict) else {}
+    breakdown["learning"] = {
+        "score": score_value,
+        "ai_result": ai_response,
+        "reason": reason,
+        "metrics": metrics
+    }
+    grade.breakdown = breakdown
+    grade.final_score = score_value
+    grade.updated_at = datetime.utcnow()
+
+
+class LearningScoreJob:
+    """
+    一次整门课程的学习表现评分任务
+
+    Args:
+        course_id: 课程ID
+        course_title: 课程名称（用于提示词）
+        user_id: 发起任务的教师用户ID
+        user_role: 发起任务的用户角色（用于LLM调用记录）
+        students: [(学生用户ID, 学生姓名)]
+    """
+
+    def __init__(self, course_id: int, course_title: str, user_id: int, user_role: str, students: List[Tuple[int, str]]):
+        self.job_id = uuid.uuid4().hex
+        self.course_id = course_id
+        self.course_title = course_title
+        self.user_id = user_id
+        self.user_role = user_role
+        self.students = students
+        self.status = "pending"  # pending, running, completed, failed, cancelled
+        self.total = len(students)
+        self.succeeded = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+        self.error: Optional[str] = None
+        self.created_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self.status in ("pending", "running")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "course_id": self.course_id,
+            "status": self.status,
+            "total": self.total,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "progress": round((self.succeeded + self.failed) / self.total * 100, 1) if self.total else 100.0,
+            "errors": self.errors,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class LearningScoreJobManager:
+    """
+    学习表现评分任务管理
+
+    Args:
+        concurrency: 每个任务同时进行的LLM调用数
+        max_jobs: 进程内保留的任务数（超出时丢弃最早的已结束任务）
+    """
+
+    def __init__(self, concurrency: int = 5, max_jobs: int = 100):
+        self.concurrency = max(1, concurrency)
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, LearningScoreJob]" = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def start(self, job: LearningScoreJob, llm_config_id: int) -> LearningScoreJob:
+        """启动任务；同一课程已有进行中的任务时返回该任务"""
+        for existing in self._jobs.values():
+            if existing.course_id == job.course_id and existing.is_running:
+                return existing
+        self._jobs[job.job_id] = job
+        self._trim()
+        task = asyncio.create_task(self._run(job, llm_config_id))
+        self._tasks[job.job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.job_id, None))
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """查询任务状态（本进程没有时查Redis），任务不存在时返回None"""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        redis = get_redis()
+        if redis is not None:
+            try:
+                raw = await redis.get(REDIS_JOB_KEY_PREFIX + job_id)
+                if raw is not None:
+                    return json.loads(raw)
+            except Exception as e:
+                logger.warning(f"读取Redis评分任务状态失败: {str(e)}")
+        return None
+
+    async def stop(self) -> None:
+        """取消进行中的任务（应用关闭时调用），已写入的评分结果保留"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _trim(self) -> None:
+        while len(self._jobs) > self.max_jobs:
+            finished = next((job_id for job_id, job in self._jobs.items() if not job.is_running), None)
+            if finished is None:
+                break
+            del self._jobs[finished]
+
+    async def _publish(self, job: LearningScoreJob) -> None:
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.set(REDIS_JOB_KEY_PREFIX + job.job_id, json.dumps(job.to_dict(), ensure_ascii=False), ex=JOB_STATE_TTL)
+        except Exception as e:
+            logger.warning(f"写入Redis评分任务状态失败: {str(e)}")
+
+    async def _run(self, job: LearningScoreJob, llm_config_id: int) -> None:
+        job.status = "running"
+        await self._publish(job)
+        try:
+            # 配置和学习行为读取完就释放连接，等待LLM期间不占用连接，也不保持打开的事务
+            async with AsyncSessionLocal() as db:
+                llm_config = await db.get(LLMConfig, llm_config_id)
+                if llm_config is None:
+                    raise RuntimeError("系统未配置大模型服务")
+                metrics = await load_learning_metrics(db, job.course_id, [student_id for student_id, _ in job.students])
+
+            semaphore = asyncio.Semaphore(self.concurrency)
+            tasks = [
+                asyncio.ensure_future(self._score_student(
+                    semaphore, job, llm_config, student_id, student_name,
+                    metrics.get(student_id) or empty_learning_metrics()
+                ))
+                for student_id, student_name in job.students
+            ]
+            pending: List[Tuple[int, float, str, Optional[str], Dict[str, Any]]] = []
+            try:
+                for next_result in asyncio.as_completed(tasks):
+                    result = await next_result
+                    if result is not None:
+                        pending.append(result)
+                    if len(pending) >= SCORE_FLUSH_SIZE:
+                        await self._save(job, pending)
+                        pending = []
+                        await self._publish(job)
+                await self._save(job, pending)
+            finally:
+                for task in tasks:
+                    task.cancel()
+            job.status = "completed"
+            logger.info(f"课程 {job.course_id} 学习表现评分完成: 成功 {job.succeeded}，失败 {job.failed}")
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            raise
+        except Exception as e:
+            logger.error(f"课程 {job.course_id} 学习表现评分任务失败: {str(e)}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.utcnow()
+            await self._publish(job)
+
+    async def _score_student(
+        self,
+        semaphore: asyncio.Semaphore,
+        job: LearningScoreJob,
+        llm_config: LLMConfig,
+        student_id: int,
+        student_name: str,
+        metrics: Dict[str, Any]
+    ) -> Optional[Tuple[int, float, str, Optional[str], Dict[str, Any]]]:
+        """为一个学生评分，失败时记录到任务的错误列表并返回None"""
+        prompt = build_learning_prompt(job.course_title, student_name, metrics)
+        async with semaphore:
+            start_time = time.perf_counter()
+            ai_response = None
+            error_message = None
+            try:
+                ai_response = await llm_gateway.chat(llm_config, prompt, max_tokens=1000, timeout=60.0)
+            except Exception as e:
+                error_message = f"AI评价生成失败: {str(e)}"
+            await enqueue_llm_call_log(
+                function_type="grade_learning_ai",
+                user_id=job.user_id,
+                user_role=job.user_role,
+                llm_config_id=llm_config.id,
+                prompt=prompt,
+                result=ai_response,
+                execution_time_ms=int((time.perf_counter() - start_time) * 1000),
+                status="failed" if error_message else "success",
+                error_message=error_message,
+                related_id=job.course_id,
+                related_type="course_grade"
+            )
+
+        score_value, reason = (None, None) if error_message else parse_learning_score(ai_response)
+        if score_value is None:
+            job.failed += 1
+            job.errors.append({
+                "student_id": student_id,
+                "student_name": student_name,
+                "error": error_message or "无法解析AI评分结果"
+            })
+            return None
+        return student_id, score_value, ai_response, reason, metrics
+
+    async def _save(
+        self,
+        job: LearningScoreJob,
+        results: List[Tuple[int, float, str, Optional[str], Dict[str, Any]]]
+    ) -> None:
+        """批量写入一批学生的评分结果（每批使用独立的短会话）"""
+        if not results:
+            return
+        async with AsyncSessionLocal() as db:
+            try:
+                grade_result = await db.execute(
+                    select(CourseGrade).where(
+                        CourseGrade.course_id == job.course_id,
+                        CourseGrade.student_id.in_([result[0] for result in results])
+                    )
+                )
+                grades: Dict[int, CourseGrade] = {}
+                for grade in grade_result.scalars().all():
+                    grades.setdefault(grade.student_id, grade)
+                for student_id, score_value, ai_response, reason, metrics in results:
+                    grade = grades.get(student_id)
+                    if grade is None:
+                        grade = CourseGrade(course_id=job.course_id, student_id=student_id)
+                        db.add(grade)
+                    apply_learning_score(grade, score_value, ai_response, reason, metrics)
+                await db.commit()
+                job.succeeded += len(results)
+            except Exception as e:
+                await db.rollback()
+                logger.error(f"写入学习表现评分失败: {str(e)}")
+                job.failed += len(results)
+                student_names = dict(job.students)
+                job.errors.extend(
+                    {"student_id": result[0], "student_name": student_names.get(result[0]), "error": f"保存评分失败: {str(e)}"}
+                    for result in results
+                )
+
+
+# 创建全局评分任务管理实例
+learning_score_jobs = LearningScoreJobManager(concurrency=settings.LEARNING_SCORE_CONCURRENCY)
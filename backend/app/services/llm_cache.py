@@ -0,0 +1,249 @@
+"""
+LLM响应缓存
+按功能类型、模型、采样参数和提示词缓存LLM结果（进程内LRU + 可选Redis）
+"""
+import hashlib
+import json
+import logging
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.db.redis import get_redis
+from app.models.llm_config import LLMConfig
+from app.services.llm_gateway import (
+    llm_gateway,
+    DEFAULT_MAX_TOKENS,
+    DEFAULT_TEMPERATURE,
+    DEFAULT_TIMEOUT,
+)
+from app.utils.llm_call_logger import LogContext
+
+logger = logging.getLogger(__name__)
+
+# 各功能类型的缓存时间（秒），未列出的功能类型不缓存
+CACHE_TTL_SECONDS: Dict[str, int] = {
+    "course_qa_ai_response": 6 * 3600,
+    "personalized_learning": 24 * 3600,
+    "ai_quiz": 3600,
+}
+
+REDIS_KEY_PREFIX = "llm_cache:"
+REDIS_STATS_KEY = "llm_cache:stats"
+
+
+def normalize_prompt(prompt: str) -> str:
+    """规范化提示词：统一全角/半角字符，合并连续空白"""
+    text = unicodedata.normalize("NFKC", prompt)
+    return " ".join(text.split())
+
+
+def build_cache_key(
+    function_type: str,
+    config: LLMConfig,
+    prompt: str,
+    max_tokens: int,
+    temperature: Optional[float]
+) -> str:
+    """根据功能类型、模型、采样参数和规范化提示词生成缓存键"""
+    raw = json.dumps(
+        [
+            function_type,
+            config.provider_key,
+            config.model_name,
+            max_tokens,
+            temperature,
+            normalize_prompt(prompt),
+        ],
+        ensure_ascii=False
+    )
+    return REDIS_KEY_PREFIX + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TTLLRUCache:
+    """带过期时间的进程内LRU缓存"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str, ttl: int) -> None:
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class LLMResponseCache:
+    """LLM响应缓存（进程内LRU + 可选Redis）"""
+
+    def __init__(self, max_entries: int, enabled: bool = True):
+        self.enabled = enabled
+        self._local = TTLLRUCache(max_entries)
+        # function_type -> {"hits": n, "misses": n}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def ttl_for(self, function_type: str) -> int:
+        """功能类型对应的缓存时间，0表示不缓存"""
+        if not self.enabled:
+            return 0
+        return CACHE_TTL_SECONDS.get(function_type, 0)
+
+    async def get(self, function_type: str, key: str) -> Optional[str]:
+        """读取缓存：先查进程内，再查Redis（命中后回填进程内）"""
+        value = self._local.get(key)
+        if value is None:
+            redis = get_redis()
+            if redis is not None:
+                try:
+                    raw = await redis.get(key)
+                    if raw is not None:
+                        value = raw.decode("utf-8") if isinstance(raw, bytes) else raw
+                        self._local.set(key, value, self.ttl_for(function_type))
+                except Exception as e:
+                    logger.warning(f"读取Redis LLM缓存失败: {str(e)}")
+        await self._record(function_type, hit=value is not None)
+        return value
+
+    async def set(self, function_type: str, key: str, value: str) -> None:
+        """写入缓存"""
+        ttl = self.ttl_for(function_type)
+        if ttl <= 0 or not value:
+            return
+        self._local.set(key, value, ttl)
+        redis = get_redis()
+        if redis is not None:
+            try:
+                await redis.set(key, value, ex=ttl)
+            except Exception as e:
+                logger.warning(f"写入Redis LLM缓存失败: {str(e)}")
+
+    async def _record(self, function_type: str, hit: bool) -> None:
+        field = "hits" if hit else "misses"
+        stats = self._stats.setdefault(function_type, {"hits": 0, "misses": 0})
+        stats[field] += 1
+        redis = get_redis()
+        if redis is not None:
+            try:
+                await redis.hincrby(REDIS_STATS_KEY, f"{function_type}:{field}", 1)
+            except Exception as e:
+                logger.debug(f"更新Redis LLM缓存计数失败: {str(e)}")
+
+    async def get_stats(self) -> List[Dict[str, object]]:
+        """
+        获取各功能类型的命中统计
+        启用Redis时返回所有worker的汇总，否则返回当前进程的计数
+        """
+        stats: Dict[str, Dict[str, int]] = {
+            function_type: dict(counts) for function_type, counts in self._stats.items()
+        }
+        redis = get_redis()
+        if redis is not None:
+            try:
+                raw = await redis.hgetall(REDIS_STATS_KEY)
+                stats = {}
+                for field, count in raw.items():
+                    field = field.decode("utf-8") if isinstance(field, bytes) else field
+                    function_type, _, kind = field.rpartition(":")
+                    stats.setdefault(function_type, {"hits": 0, "misses": 0})[kind] = int(count)
+            except Exception as e:
+                logger.warning(f"读取Redis LLM缓存计数失败: {str(e)}")
+
+        items = []
+        for function_type, counts in sorted(stats.items()):
+            hits = counts.get("hits", 0)
+            misses = counts.get("misses", 0)
+            total = hits + misses
+            items.append({
+                "function_type": function_type,
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": round(hits / total, 4) if total else 0.0,
+                "ttl_seconds": self.ttl_for(function_type),
+            })
+        return items
+
+    def local_size(self) -> int:
+        """当前进程内缓存条目数"""
+        return len(self._local)
+
+
+# 创建全局LLM响应缓存实例
+llm_cache = LLMResponseCache(
+    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+    enabled=settings.LLM_CACHE_ENABLED
+)
+
+
+async def cached_chat(
+    function_type: str,
+    config: LLMConfig,
+    prompt: str,
+    max_tokens: int = DEFAULT_MAX_TOKENS,
+    temperature: Optional[float] = DEFAULT_TEMPERATURE,
+    timeout: float = DEFAULT_TIMEOUT,
+    log_context: Optional[LogContext] = None
+) -> str:
+    """带缓存的 llm_gateway.chat，未配置TTL的功能类型直接调用；命中时标记 log_context.cache_hit"""
+    if llm_cache.ttl_for(function_type) <= 0:
+        return await llm_gateway.chat(config, prompt, max_tokens, temperature, timeout)
+
+    key = build_cache_key(function_type, config, prompt, max_tokens, temperature)
+    cached = await llm_cache.get(function_type, key)
+    if cached is not None:
+        if log_context is not None:
+            log_context.cache_hit = True
+        return cached
+
+    result = await llm_gateway.chat(config, prompt, max_tokens, temperature, timeout)
+    await llm_cache.set(function_type, key, result)
+    return result
+
+
+async def cached_stream_chat(
+    function_type: str,
+    config: LLMConfig,
+    prompt: str,
+    max_tokens: int = DEFAULT_MAX_TOKENS,
+    temperature: Optional[float] = DEFAULT_TEMPERATURE,
+    timeout: float = DEFAULT_TIMEOUT,
+    log_context: Optional[LogContext] = None
+) -> AsyncIterator[str]:
+    """带缓存的 llm_gateway.stream_chat：命中时一次性返回完整结果（并标记 log_context.cache_hit），未命中时在流结束后写入缓存"""
+    if llm_cache.ttl_for(function_type) <= 0:
+        async for delta in llm_gateway.stream_chat(config, prompt, max_tokens, temperature, timeout):
+            yield delta
+        return
+
+    key = build_cache_key(function_type, config, prompt, max_tokens, temperature)
+    cached = await llm_cache.get(function_type, key)
+    if cached is not None:
+        if log_context is not None:
+            log_context.cache_hit = True
+        yield cached
+        return
+
+    chunks: List[str] = []
+    async for delta in llm_gateway.stream_chat(config, prompt, max_tokens, temperature, timeout):
+        chunks.append(delta)
+        yield delta
+    await llm_cache.set(function_type, key, "".join(chunks))
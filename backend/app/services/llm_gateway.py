@@ -0,0 +1,480 @@
+"""
+统一LLM调用网关
+为各业务模块提供统一的大模型调用入口（普通调用和流式输出）
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+
+import httpx
+
+from app.models.llm_config import LLMConfig
+
+# HTTP/2需要h2库，未安装时退回HTTP/1.1 keep-alive
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# OpenAI兼容协议的提供商
+OPENAI_COMPATIBLE_PROVIDERS = ("deepseek", "kimi", "volcengine_doubao", "siliconflow")
+SUPPORTED_PROVIDERS = ("aliyun_qwen", "wenxin") + OPENAI_COMPATIBLE_PROVIDERS
+
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_MAX_TOKENS = 2000
+DEFAULT_TEMPERATURE = 0.7
+
+WENXIN_TOKEN_URL = "https://aip.baidubce.com/oauth/2.0/token"
+# access_token提前过期的余量（秒）
+WENXIN_TOKEN_REFRESH_MARGIN = 300
+WENXIN_MAX_OUTPUT_TOKENS = 2048
+
+ProviderHandler = Callable[[LLMConfig, str, int, Optional[float], float], Awaitable[str]]
+# 流式请求构建函数：返回 (url, json, headers, params)，以及从SSE数据块中提取增量文本的函数
+StreamRequest = Tuple[str, Dict[str, Any], Dict[str, str], Optional[Dict[str, str]]]
+StreamRequestBuilder = Callable[[LLMConfig, str, int, Optional[float]], Awaitable[StreamRequest]]
+StreamChunkParser = Callable[[Dict[str, Any]], Optional[str]]
+
+
+class LLMGateway:
+    """LLM调用网关，进程内单例"""
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 60.0
+    ):
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        # 文心一言access_token缓存: (api_key, api_secret) -> (token, 过期时间)
+        self._wenxin_tokens: Dict[Tuple[str, str], Tuple[str, float]] = {}
+
+        # provider_key -> 调用函数
+        self._handlers: Dict[str, ProviderHandler] = {
+            "aliyun_qwen": self._call_aliyun_qwen,
+            "wenxin": self._call_wenxin,
+        }
+        for provider_key in OPENAI_COMPATIBLE_PROVIDERS:
+            self._handlers[provider_key] = self._call_openai_compatible
+
+        # provider_key -> (流式请求构建函数, 数据块解析函数)
+        self._stream_handlers: Dict[str, Tuple[StreamRequestBuilder, StreamChunkParser]] = {
+            "aliyun_qwen": (self._build_aliyun_qwen_stream, self._parse_aliyun_qwen_chunk),
+            "wenxin": (self._build_wenxin_stream, self._parse_wenxin_chunk),
+        }
+        for provider_key in OPENAI_COMPATIBLE_PROVIDERS:
+            self._stream_handlers[provider_key] = (
+                self._build_openai_compatible_stream,
+                self._parse_openai_compatible_chunk
+            )
+
+    def is_supported(self, provider_key: Optional[str]) -> bool:
+        """是否支持该提供商"""
+        return provider_key in self._handlers
+
+    def _get_client(self, provider_key: str) -> httpx.AsyncClient:
+        """获取（或懒创建）提供商对应的长连接客户端"""
+        client = self._clients.get(provider_key)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                limits=self._limits,
+                timeout=DEFAULT_TIMEOUT
+            )
+            self._clients[provider_key] = client
+        return client
+
+    async def chat(
+        self,
+        config: LLMConfig,
+        prompt: str,
+        max_tokens: int = DEFAULT_MAX_TOKENS,
+        temperature: Optional[float] = DEFAULT_TEMPERATURE,
+        timeout: float = DEFAULT_TIMEOUT
+    ) -> str:
+        """
+        调用大模型，返回生成的文本
+
+        Args:
+            config: LLM配置
+            prompt: 用户提示词
+            max_tokens: 最大生成token数
+            temperature: 采样温度，为None时使用提供商默认值
+            timeout: 单次请求超时（秒）
+        """
+        handler = self._handlers.get(config.provider_key)
+        if handler is None:
+            raise ValueError(f"不支持的LLM提供商: {config.provider_key}")
+
+        try:
+            logger.info(f"调用LLM API: provider={config.provider_key}, 模型: {config.model_name}")
+            return await handler(config, prompt, max_tokens, temperature, timeout)
+        except httpx.TimeoutException as e:
+            logger.error(f"LLM API超时: {str(e)}")
+            raise Exception(f"AI生成超时（超过{int(timeout)}秒），请稍后重试或简化提示词")
+        except httpx.HTTPStatusError as e:
+            logger.error(f"LLM API HTTP错误: {e.response.status_code} - {e.response.text[:200]}")
+            raise Exception(f"AI生成失败: HTTP {e.response.status_code}")
+
+    async def _call_openai_compatible(
+        self,
+        config: LLMConfig,
+        prompt: str,
+        max_tokens: int,
+        temperature: Optional[float],
+        timeout: float
+    ) -> str:
+        """调用OpenAI兼容的API（DeepSeek, KIMI, SiliconFlow, 火山引擎等）"""
+        url, data, headers = self._openai_compatible_request(config, prompt, max_tokens, temperature)
+
+        client = self._get_client(config.provider_key)
+        response = await client.post(url, json=data, headers=headers, timeout=timeout)
+        response.raise_for_status()
+        result = response.json()
+
+        if "choices" in result and len(result["choices"]) > 0:
+            return result["choices"][0]["message"]["content"]
+        raise Exception("LLM响应格式错误")
+
+    def _openai_compatible_request(
+        self,
+        config: LLMConfig,
+        prompt: str,
+        max_tokens: int,
+        temperature: Optional[float]
+    ) -> Tuple[str, Dict[str, Any], Dict[str, str]]:
+        """构建OpenAI兼容API的请求"""
+        endpoint = config.endpoint_url.rstrip('/') if config.endpoint_url else ""
+        # 如果endpoint已经包含/chat/completions，就不需要再拼接
+        if endpoint.endswith('/chat/completions'):
+            url = endpoint
+        else:
+            url = f"{endpoint}/chat/completions"
+
+        headers = {
+            "Authorization": f"Bearer {config.api_key}",
+            "Content-Type": "application/json"
+        }
+
+        data = {
+            "model": config.model_name or "default",
+            "messages": [
+                {"role": "user", "content": prompt}
+            ],
+            "max_tokens": max_tokens
+        }
+        if temperature is not None:
+            data["temperature"] = temperature
+        return url, data, headers
+
+    async def _call_aliyun_qwen(
+        self,
+        config: LLMConfig,
+        prompt: str,
+        max_tokens: int,
+        temperature: Optional[float],
+        timeout: float
+    ) -> str:
+        """
+        调用阿里云通义千问API
+        配置了endpoint_url时走HTTP接口，否则使用dashscope SDK（在线程池中执行）
+        """
+        if not config.endpoint_url:
+            return await self._call_dashscope_sdk(config, prompt, max_tokens, temperature)
+
+        url, data, headers = self._aliyun_qwen_request(config, prompt, max_tokens, temperature)
+
+        client = self._get_client(config.provider_key)
+        response = await client.post(url, json=data, headers=headers, timeout=timeout)
+        response.raise_for_status()
+        result = response.json()
+
+        if "output" in result and "text" in result["output"]:
+            return result["output"]["text"]
+        raise Exception("阿里云API响应格式错误")
+
+    def _aliyun_qwen_request(
+        self,
+        config: LLMConfig,
+        prompt: str,
+        max_tokens: int,
+        temperature: Optional[float]
+    ) -> Tuple[str, Dict[str, Any], Dict[str, str]]:
+        """构建通义千问HTTP接口的请求"""
+        endpoint = config.endpoint_url.rstrip('/')
+        url = f"{endpoint}/services/aigc/text-generation/generation"
+
+        headers = {
+            "Authorization": f"Bearer {config.api_key}",
+            "Content-Type": "application/json"
+        }
+
+        parameters = {"max_tokens": max_tokens}
+        if temperature is not None:
+            parameters["temperature"] = temperature
+
+        data = {
+            "model": config.model_name or "qwen-max",
+            "input": {
+                "messages": [
+                    {"role": "user", "content": prompt}
+                ]
+            },
+            "parameters": parameters
+        }
+        return url, data, headers
+
+    async def _call_dashscope_sdk(
+        self,
+        config: LLMConfig,
+        prompt: str,
+        max_tokens: int,
+        temperature: Optional[float]
+    ) -> str:
+        """通过dashscope SDK调用通义千问（SDK为同步阻塞调用，放到线程池执行）"""
+        import dashscope
+
+        kwargs = {
+            "model": config.model_name or "qwen-turbo",
+            "prompt": prompt,
+            "max_tokens": max_tokens,
+            # 显式传入api_key，避免多线程下修改全局dashscope.api_key
+            "api_key": config.api_key,
+        }
+        if temperature is not None:
+            kwargs["temperature"] = temperature
+
+        response = await asyncio.to_thread(dashscope.Generation.call, **kwargs)
+
+        if response.status_code == 200:
+            return response.output.text
+        raise Exception(f"通义千问API调用失败: {response.message}")
+
+    async def _get_wenxin_access_token(self, config: LLMConfig) -> str:
+        """获取文心一言access_token（按密钥缓存，过期前自动刷新）"""
+        cache_key = (config.api_key, config.api_secret)
+        cached = self._wenxin_tokens.get(cache_key)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+
+        token_params = {
+            "grant_type": "client_credentials",
+            "client_id": config.api_key,
+            "client_secret": config.api_secret
+        }
+        client = self._get_client(config.provider_key)
+        token_response = await client.post(WENXIN_TOKEN_URL, params=token_params, timeout=30.0)
+        token_response.raise_for_status()
+        token_data = token_response.json()
+        access_token = token_data["access_token"]
+
+        expires_in = int(token_data.get("expires_in") or 0)
+        if expires_in > WENXIN_TOKEN_REFRESH_MARGIN:
+            self._wenxin_tokens[cache_key] = (
+                access_token,
+                time.monotonic() + expires_in - WENXIN_TOKEN_REFRESH_MARGIN
+            )
+        return access_token
+
+    async def _wenxin_request(
+        self,
+        config: LLMConfig,
+        prompt: str,
+        max_tokens: int,
+        temperature: Optional[float]
+    ) -> Tuple[str, Dict[str, Any], Dict[str, str]]:
+        """构建文心一言对话接口的请求"""
+        if not config.api_secret:
+            raise Exception("文心一言需要配置API Secret")
+
+        access_token = await self._get_wenxin_access_token(config)
+
+        endpoint = config.endpoint_url.rstrip('/') if config.endpoint_url else ""
+        # endpoint_url既可以是完整的对话地址，也可以是API根地址
+        if "/wenxinworkshop/" in endpoint:
+            chat_url = endpoint
+        else:
+            chat_url = f"{endpoint}/wenxinworkshop/chat/completions"
+
+        data = {
+            "messages": [
+                {"role": "user", "content": prompt}
+            ],
+            # 文心一言max_output_tokens上限为2048
+            "max_output_tokens": min(max_tokens, WENXIN_MAX_OUTPUT_TOKENS)
+        }
+        if temperature is not None:
+            data["temperature"] = temperature
+        return chat_url, data, {"access_token": access_token}
+
+    async def _call_wenxin(
+        self,
+        config: LLMConfig,
+        prompt: str,
+        max_tokens: int,
+        temperature: Optional[float],
+        timeout: float
+    ) -> str:
+        """调用百度文心一言API"""
+        chat_url, data, params = await self._wenxin_request(config, prompt, max_tokens, temperature)
+
+        client = self._get_client(config.provider_key)
+        chat_response = await client.post(
+            chat_url,
+            json=data,
+            headers={"Content-Type": "application/json"},
+            params=params,
+            timeout=timeout
+        )
+        chat_response.raise_for_status()
+        result = chat_response.json()
+
+        if "result" in result:
+            return result["result"]
+        raise Exception("文心一言API响应格式错误")
+
+    # ==================== 流式输出 ====================
+
+    async def stream_chat(
+        self,
+        config: LLMConfig,
+        prompt: str,
+        max_tokens: int = DEFAULT_MAX_TOKENS,
+        temperature: Optional[float] = DEFAULT_TEMPERATURE,
+        timeout: float = DEFAULT_TIMEOUT
+    ) -> AsyncIterator[str]:
+        """
+        流式调用大模型，逐段产出增量文本
+
+        不支持流式的调用方式（未配置endpoint_url的通义千问SDK）会退化为一次性返回完整结果。
+        timeout为相邻两段数据之间的最长等待时间。
+        """
+        if not self.is_supported(config.provider_key):
+            raise ValueError(f"不支持的LLM提供商: {config.provider_key}")
+
+        if config.provider_key == "aliyun_qwen" and not config.endpoint_url:
+            yield await self.chat(config, prompt, max_tokens, temperature, timeout)
+            return
+
+        build_request, parse_chunk = self._stream_handlers[config.provider_key]
+        client = self._get_client(config.provider_key)
+
+        try:
+            url, data, headers, params = await build_request(config, prompt, max_tokens, temperature)
+            logger.info(f"流式调用LLM API: provider={config.provider_key}, 模型: {config.model_name}")
+            async with client.stream(
+                "POST", url, json=data, headers=headers, params=params, timeout=timeout
+            ) as response:
+                if response.status_code >= 400:
+                    await response.aread()
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    line = line.strip()
+                    if not line.startswith("data:"):
+                        continue
+                    payload = line[5:].strip()
+                    if not payload or payload == "[DONE]":
+                        continue
+                    try:
+                        chunk = json.loads(payload)
+                    except json.JSONDecodeError:
+                        logger.warning(f"无法解析的流式数据块: {payload[:200]}")
+                        continue
+                    error_message = self._extract_stream_error(chunk)
+                    if error_message:
+                        raise Exception(f"AI生成失败: {error_message}")
+                    delta = parse_chunk(chunk)
+                    if delta:
+                        yield delta
+        except httpx.TimeoutException as e:
+            logger.error(f"LLM流式API超时: {str(e)}")
+            raise Exception(f"AI生成超时（超过{int(timeout)}秒无响应），请稍后重试或简化提示词")
+        except httpx.HTTPStatusError as e:
+            logger.error(f"LLM流式API HTTP错误: {e.response.status_code} - {e.response.text[:200]}")
+            raise Exception(f"AI生成失败: HTTP {e.response.status_code}")
+
+    @staticmethod
+    def _extract_stream_error(chunk: Dict[str, Any]) -> Optional[str]:
+        """识别流中途返回的错误数据块（各提供商格式不同）"""
+        if chunk.get("error"):
+            error = chunk["error"]
+            return error.get("message") if isinstance(error, dict) else str(error)
+        if chunk.get("error_code"):
+            return chunk.get("error_msg") or str(chunk["error_code"])
+        if chunk.get("code") and "output" not in chunk:
+            return chunk.get("message") or str(chunk["code"])
+        return None
+
+    async def _build_openai_compatible_stream(
+        self,
+        config: LLMConfig,
+        prompt: str,
+        max_tokens: int,
+        temperature: Optional[float]
+    ) -> StreamRequest:
+        url, data, headers = self._openai_compatible_request(config, prompt, max_tokens, temperature)
+        data["stream"] = True
+        return url, data, headers, None
+
+    @staticmethod
+    def _parse_openai_compatible_chunk(chunk: Dict[str, Any]) -> Optional[str]:
+        choices = chunk.get("choices") or []
+        if not choices:
+            return None
+        return (choices[0].get("delta") or {}).get("content")
+
+    async def _build_aliyun_qwen_stream(
+        self,
+        config: LLMConfig,
+        prompt: str,
+        max_tokens: int,
+        temperature: Optional[float]
+    ) -> StreamRequest:
+        url, data, headers = self._aliyun_qwen_request(config, prompt, max_tokens, temperature)
+        headers["X-DashScope-SSE"] = "enable"
+        # 增量输出，每个数据块只包含新生成的部分
+        data["parameters"]["incremental_output"] = True
+        return url, data, headers, None
+
+    @staticmethod
+    def _parse_aliyun_qwen_chunk(chunk: Dict[str, Any]) -> Optional[str]:
+        return (chunk.get("output") or {}).get("text")
+
+    async def _build_wenxin_stream(
+        self,
+        config: LLMConfig,
+        prompt: str,
+        max_tokens: int,
+        temperature: Optional[float]
+    ) -> StreamRequest:
+        chat_url, data, params = await self._wenxin_request(config, prompt, max_tokens, temperature)
+        data["stream"] = True
+        return chat_url, data, {"Content-Type": "application/json"}, params
+
+    @staticmethod
+    def _parse_wenxin_chunk(chunk: Dict[str, Any]) -> Optional[str]:
+        return chunk.get("result")
+
+    async def aclose(self) -> None:
+        """关闭所有连接池（应用关闭时调用）"""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"关闭LLM客户端失败: {str(e)}")
+
+
+# 创建全局LLM网关实例
+llm_gateway = LLMGateway()
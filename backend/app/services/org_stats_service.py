@@ -0,0 +1,209 @@
+"""
+组织树统计
+计算并缓存各组织（含子组织）的专业、班级、学生数
+"""
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.models.base import Class, Major, Organization, StudentProfile, User
+
+STAT_KEYS = ("majors_count", "classes_count", "students_count")
+
+
+def empty_stats() -> Dict[str, int]:
+    return {key: 0 for key in STAT_KEYS}
+
+
+class OrgTreeSnapshot:
+    """
+    全部组织（含已删除）及其统计数据的快照
+
+    Args:
+        organizations: 组织行（字典，字段与 Organization 一致）
+        direct_stats: 组织ID -> 直属的专业、班级、学生数
+        user_names: 用户ID -> 显示名称（创建人、更新人）
+    """
+
+    def __init__(
+        self,
+        organizations: Iterable[Dict[str, Any]],
+        direct_stats: Dict[int, Dict[str, int]],
+        user_names: Dict[int, str],
+        loaded_at: float = 0.0
+    ):
+        self.loaded_at = loaded_at
+        self.orgs: Dict[int, Dict[str, Any]] = {org["id"]: org for org in organizations}
+        self.user_names = user_names
+        self.children: Dict[int, List[int]] = {org_id: [] for org_id in self.orgs}
+        for org_id, org in self.orgs.items():
+            if org["parent_id"] in self.children:
+                self.children[org["parent_id"]].append(org_id)
+        self.totals = self._roll_up(direct_stats)
+
+    def _roll_up(self, direct_stats: Dict[int, Dict[str, int]]) -> Dict[int, Dict[str, int]]:
+        """自底向上累加子组织的统计数据（每个节点只访问一次，父子关系有环时环上的节点只计一次）"""
+        totals = {org_id: dict(direct_stats.get(org_id) or empty_stats()) for org_id in self.orgs}
+        roots = [org_id for org_id, org in self.orgs.items() if org["parent_id"] not in self.orgs]
+        visited = set()
+        order = []
+        tree_parent: Dict[int, int] = {}
+        # 先从根节点遍历，剩下的（环上的节点）再依次作为起点
+        for start in roots + list(self.orgs):
+            if start in visited:
+                continue
+            visited.add(start)
+            stack = [start]
+            while stack:
+                org_id = stack.pop()
+                order.append(org_id)
+                for child_id in self.children[org_id]:
+                    if child_id not in visited:
+                        visited.add(child_id)
+                        tree_parent[child_id] = org_id
+                        stack.append(child_id)
+        for org_id in reversed(order):
+            parent_id = tree_parent.get(org_id)
+            if parent_id is not None:
+                for key in STAT_KEYS:
+                    totals[parent_id][key] += totals[org_id][key]
+        return totals
+
+    def stats(self, org_id: int) -> Dict[str, int]:
+        """组织及其所有子组织的统计数据"""
+        return dict(self.totals.get(org_id) or empty_stats())
+
+    def user_name(self, user_id: Optional[int]) -> Optional[str]:
+        return self.user_names.get(user_id) if user_id else None
+
+    def node(self, org_id: int, with_users: bool = True) -> Dict[str, Any]:
+        """组织树节点（不含children）"""
+        org = self.orgs[org_id]
+        node = {
+            "id": org["id"],
+            "name": org["name"],
+            "code": org["code"],
+            "parent_id": org["parent_id"],
+        }
+        if with_users:
+            node.update({
+                "created_by": org["created_by"],
+                "updated_by": org["updated_by"],
+                "created_at": org["created_at"].isoformat() if org["created_at"] else None,
+                "updated_at": org["updated_at"].isoformat() if org["updated_at"] else None,
+            })
+        node.update(self.stats(org_id))
+        if with_users:
+            node["creator_name"] = self.user_name(org["created_by"])
+            node["updater_name"] = self.user_name(org["updated_by"])
+        return node
+
+    def ancestor_ids(self, org_id: int) -> List[int]:
+        """从父组织到根组织的ID链"""
+        ids = []
+        seen = {org_id}
+        parent_id = self.orgs[org_id]["parent_id"] if org_id in self.orgs else None
+        while parent_id in self.orgs and parent_id not in seen:
+            ids.append(parent_id)
+            seen.add(parent_id)
+            parent_id = self.orgs[parent_id]["parent_id"]
+        return ids
+
+
+async def load_direct_stats(db: AsyncSession) -> Dict[int, Dict[str, int]]:
+    """三次分组查询每个组织直属的有效专业、班级、学生数"""
+    stats: Dict[int, Dict[str, int]] = {}
+
+    majors_result = await db.execute(
+        select(Major.organization_id, func.count(Major.id))
+        .where(Major.is_active == True)
+        .group_by(Major.organization_id)
+    )
+    classes_result = await db.execute(
+        select(Major.organization_id, func.count(func.distinct(Class.id)))
+        .select_from(Class)
+        .join(Major, Class.major_id == Major.id)
+        .where(Major.is_active == True, Class.is_active == True)
+        .group_by(Major.organization_id)
+    )
+    students_result = await db.execute(
+        select(Major.organization_id, func.count(StudentProfile.id))
+        .select_from(StudentProfile)
+        .join(Class, StudentProfile.class_id == Class.id)
+        .join(Major, Class.major_id == Major.id)
+        .join(User, StudentProfile.user_id == User.id)
+        .where(Major.is_active == True, Class.is_active == True, User.is_active == True)
+        .group_by(Major.organization_id)
+    )
+    for key, result in (
+        ("majors_count", majors_result),
+        ("classes_count", classes_result),
+        ("students_count", students_result),
+    ):
+        for org_id, count in result.all():
+            if org_id is not None:
+                stats.setdefault(org_id, empty_stats())[key] = int(count or 0)
+    return stats
+
+
+async def load_user_names(db: AsyncSession, user_ids: Iterable[Optional[int]]) -> Dict[int, str]:
+    """一次查询多个用户的显示名称"""
+    ids = {user_id for user_id in user_ids if user_id}
+    if not ids:
+        return {}
+    result = await db.execute(select(User.id, User.full_name, User.username).where(User.id.in_(ids)))
+    return {user_id: full_name or username for user_id, full_name, username in result.all()}
+
+
+class OrgStatsCache:
+    """
+    组织树统计快照缓存
+
+    Args:
+        ttl: 快照有效期（秒），0表示不缓存
+    """
+
+    def __init__(self, ttl: int = 60):
+        self.ttl = ttl
+        self._snapshot: Optional[OrgTreeSnapshot] = None
+
+    async def get(self, db: AsyncSession) -> OrgTreeSnapshot:
+        """获取组织树快照（过期时重新加载）"""
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.loaded_at + self.ttl > time.monotonic():
+            return snapshot
+
+        orgs_result = await db.execute(
+            select(
+                Organization.id,
+                Organization.name,
+                Organization.code,
+                Organization.parent_id,
+                Organization.is_active,
+                Organization.created_by,
+                Organization.updated_by,
+                Organization.created_at,
+                Organization.updated_at,
+            ).order_by(Organization.id)
+        )
+        organizations = [dict(row._mapping) for row in orgs_result.all()]
+        direct_stats = await load_direct_stats(db)
+        user_names = await load_user_names(
+            db, [org["created_by"] for org in organizations] + [org["updated_by"] for org in organizations]
+        )
+        snapshot = OrgTreeSnapshot(organizations, direct_stats, user_names, time.monotonic())
+        if self.ttl > 0:
+            self._snapshot = snapshot
+        return snapshot
+
+    def invalidate(self) -> None:
+        """组织、专业、班级、学生发生变更后清除快照"""
+        self._snapshot = None
+
+
+# 创建全局组织树统计缓存实例
+org_stats_cache = OrgStatsCache(ttl=settings.ORG_STATS_CACHE_TTL)
@@ -0,0 +1,263 @@
+"""
+组卷引擎
+按题型、难度和知识点分层随机抽取题目
+"""
+import random
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.models.question import Question
+
+# 未设置难度的题目按简单题处理（与 Question.difficulty 的默认值一致）
+DEFAULT_DIFFICULTY = 1
+
+# 索引分组：(题型, 难度, 知识点)
+BucketKey = Tuple[str, int, str]
+
+
+class InsufficientQuestionsError(ValueError):
+    """可抽取的题目数量不足"""
+
+    def __init__(self, question_type: str, required: int, available: int):
+        super().__init__(f"题型 {question_type} 的可用题目不足，需要 {required} 道，只有 {available} 道")
+        self.question_type = question_type
+        self.required = required
+        self.available = available
+
+
+class QuestionIndex:
+    """单个教师有效题目的分组索引"""
+
+    def __init__(self, rows: Iterable[Tuple[int, str, Optional[int], Optional[str]]], loaded_at: float = 0.0):
+        self.loaded_at = loaded_at
+        self.buckets: Dict[str, Dict[int, Dict[str, List[int]]]] = {}
+        self.location: Dict[int, BucketKey] = {}
+        for question_id, question_type, difficulty, knowledge_point in rows:
+            difficulty = difficulty or DEFAULT_DIFFICULTY
+            knowledge_point = knowledge_point or ""
+            by_kp = self.buckets.setdefault(question_type, {}).setdefault(difficulty, {})
+            by_kp.setdefault(knowledge_point, []).append(question_id)
+            self.location[question_id] = (question_type, difficulty, knowledge_point)
+
+    def __len__(self) -> int:
+        return len(self.location)
+
+    def strata(self, question_type: str, knowledge_points: Optional[Sequence[Optional[str]]] = None) -> Dict[int, Dict[str, List[int]]]:
+        """
+        题型下按难度、知识点分组的题目ID，knowledge_points 不为空时只保留这些知识点
+        （None 与索引一致按 "" 处理，即没有知识点的题目）
+        """
+        by_difficulty = self.buckets.get(question_type, {})
+        if not knowledge_points:
+            return by_difficulty
+        wanted = {kp or "" for kp in knowledge_points}
+        return {
+            difficulty: {kp: ids for kp, ids in by_kp.items() if kp in wanted}
+            for difficulty, by_kp in by_difficulty.items()
+        }
+
+    def excluded_counts(self, exclude: Iterable[int]) -> Dict[BucketKey, int]:
+        """各分组中被排除的题目数"""
+        counts: Dict[BucketKey, int] = {}
+        for question_id in exclude:
+            key = self.location.get(question_id)
+            if key is not None:
+                counts[key] = counts.get(key, 0) + 1
+        return counts
+
+
+def largest_remainder(total: int, weights: Dict[Hashable, float]) -> Dict[Hashable, int]:
+    """按权重把 total 拆成整数份（最大余数法，余数相同时随机）"""
+    weight_sum = sum(weights.values())
+    exact = {key: total * weight / weight_sum for key, weight in weights.items()}
+    quotas = {key: int(value) for key, value in exact.items()}
+    rest = total - sum(quotas.values())
+    order = sorted(weights, key=lambda key: (exact[key] - quotas[key], random.random()), reverse=True)
+    for key in order[:rest]:
+        quotas[key] += 1
+    return quotas
+
+
+def allocate(count: int, capacities: Dict[Hashable, int], weights: Optional[Dict[Hashable, float]] = None) -> Dict[Hashable, int]:
+    """
+    把 count 道题分配给各分层，每层不超过其可用题数
+
+    weights 为空时平均分配，否则按权重比例分配（权重为0的分层不分配）；
+    某一层题目不足时，缺额按权重转给仍有剩余的分层。调用方需保证可分配的题目总数不少于 count
+    """
+    allocation = {key: 0 for key in capacities}
+    if weights is None:
+        weights = {key: 1.0 for key in capacities}
+    active = [key for key in capacities if capacities[key] > 0 and weights.get(key, 0) > 0]
+    remaining = count
+    while remaining > 0 and active:
+        quotas = largest_remainder(remaining, {key: weights[key] for key in active})
+        for key in active:
+            take = min(quotas[key], capacities[key] - allocation[key])
+            allocation[key] += take
+            remaining -= take
+        active = [key for key in active if allocation[key] < capacities[key]]
+    return allocation
+
+
+def sample_questions(
+    index: QuestionIndex,
+    question_type: str,
+    count: int,
+    difficulty_distribution: Optional[Dict[int, float]] = None,
+    knowledge_points: Optional[Sequence[str]] = None,
+    exclude: Optional[Set[int]] = None
+) -> List[int]:
+    """
+    在索引上分层随机抽取一个题型的题目ID
+
+    Args:
+        difficulty_distribution: 难度 -> 比例（如 {1: 0.3, 2: 0.5, 3: 0.2}），为空时按各难度题目数量的比例
+        knowledge_points: 只从这些知识点抽题，为空时不限
+        exclude: 不参与抽取的题目ID
+
+    Raises:
+        InsufficientQuestionsError: 符合条件的题目少于 count 道
+    """
+    exclude = exclude or set()
+    strata = index.strata(question_type, knowledge_points)
+    excluded = index.excluded_counts(exclude)
+    capacities = {
+        (difficulty, kp): len(ids) - excluded.get((question_type, difficulty, kp), 0)
+        for difficulty, by_kp in strata.items()
+        for kp, ids in by_kp.items()
+    }
+    difficulty_capacities: Dict[int, int] = {}
+    for (difficulty, _), capacity in capacities.items():
+        difficulty_capacities[difficulty] = difficulty_capacities.get(difficulty, 0) + capacity
+
+    if difficulty_distribution:
+        weights = {difficulty: float(ratio) for difficulty, ratio in difficulty_distribution.items() if ratio > 0}
+    else:
+        weights = {difficulty: float(capacity) for difficulty, capacity in difficulty_capacities.items()}
+    available = sum(capacity for difficulty, capacity in difficulty_capacities.items() if weights.get(difficulty, 0) > 0)
+    if available < count:
+        raise InsufficientQuestionsError(question_type, count, available)
+
+    chosen: List[int] = []
+    for difficulty, quota in allocate(count, difficulty_capacities, weights).items():
+        if not quota:
+            continue
+        by_kp = strata[difficulty]
+        kp_capacities = {kp: capacities[(difficulty, kp)] for kp in by_kp}
+        for kp, take in allocate(quota, kp_capacities).items():
+            if not take:
+                continue
+            ids = by_kp[kp]
+            # 多抽出被排除的数量，过滤后仍够 take 道
+            extra = excluded.get((question_type, difficulty, kp), 0)
+            picked = random.sample(ids, min(len(ids), take + extra))
+            if extra:
+                picked = [question_id for question_id in picked if question_id not in exclude]
+            chosen.extend(picked[:take])
+    random.shuffle(chosen)
+    return chosen
+
+
+class PaperComposer:
+    """
+    组卷引擎
+
+    Args:
+        ttl: 题目索引的有效期（秒）
+        max_teachers: 最多缓存的教师索引数
+    """
+
+    def __init__(self, ttl: int = 300, max_teachers: int = 100):
+        self.ttl = ttl
+        self.max_teachers = max_teachers
+        self._indexes: "OrderedDict[int, QuestionIndex]" = OrderedDict()
+
+    async def get_index(self, db: AsyncSession, teacher_id: int) -> QuestionIndex:
+        """教师的题目索引（缓存过期时重新查询）"""
+        index = self._indexes.get(teacher_id)
+        if index is not None and index.loaded_at + self.ttl > time.monotonic():
+            self._indexes.move_to_end(teacher_id)
+            return index
+        result = await db.execute(
+            select(Question.id, Question.question_type, Question.difficulty, Question.knowledge_point).where(
+                Question.teacher_id == teacher_id,
+                Question.is_active == True
+            )
+        )
+        index = QuestionIndex(result.all(), time.monotonic())
+        self._indexes[teacher_id] = index
+        self._indexes.move_to_end(teacher_id)
+        while len(self._indexes) > self.max_teachers:
+            self._indexes.popitem(last=False)
+        return index
+
+    def invalidate(self, teacher_id: int) -> None:
+        """教师的题目增删改后清除其索引"""
+        self._indexes.pop(teacher_id, None)
+
+    async def compose(
+        self,
+        db: AsyncSession,
+        teacher_id: int,
+        configs: Sequence[Any],
+        knowledge_points: Optional[Sequence[str]] = None,
+        exclude_ids: Iterable[int] = ()
+    ) -> List[Tuple[Question, Any]]:
+        """
+        按题型配置抽题，并加载选中的题目
+
+        Args:
+            configs: 题型配置，需有 question_type、count 属性，
+                     可选 difficulty_distribution（难度比例）、knowledge_points（知识点范围）
+            knowledge_points: 所有题型统一的知识点范围（AI组卷按试卷的知识点），优先于配置中的知识点
+            exclude_ids: 不参与抽取的题目ID（试卷中已有的题目）
+
+        Returns:
+            [(题目, 对应的题型配置)]，按配置顺序排列
+
+        Raises:
+            InsufficientQuestionsError: 某个题型符合条件的题目不足
+        """
+        for attempt in range(2):
+            index = await self.get_index(db, teacher_id)
+            exclude = set(exclude_ids)
+            picks = []
+            for config in configs:
+                ids = sample_questions(
+                    index,
+                    config.question_type,
+                    config.count,
+                    getattr(config, "difficulty_distribution", None),
+                    knowledge_points or getattr(config, "knowledge_points", None),
+                    exclude
+                )
+                exclude.update(ids)
+                picks.append((config, ids))
+
+            chosen_ids = [question_id for _, ids in picks for question_id in ids]
+            questions: Dict[int, Question] = {}
+            if chosen_ids:
+                result = await db.execute(
+                    select(Question).where(
+                        Question.id.in_(chosen_ids),
+                        Question.teacher_id == teacher_id,
+                        Question.is_active == True
+                    )
+                )
+                questions = {question.id: question for question in result.scalars().all()}
+            if len(questions) == len(chosen_ids) or attempt:
+                break
+            # 其他worker进程删除了选中的题目，索引已过期
+            self.invalidate(teacher_id)
+
+        return [(questions[question_id], config) for config, ids in picks for question_id in ids if question_id in questions]
+
+
+# 创建全局组卷引擎实例
+paper_composer = PaperComposer(ttl=settings.QUESTION_INDEX_TTL)
@@ -0,0 +1,240 @@
+"""
+Office文档转PDF后台队列
+上传后的Word/Excel/PPT由后台转换任务转换为PDF
+"""
+import asyncio
+import logging
+import os
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Optional, Set
+
+from sqlalchemy import or_, select, update
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.teaching_resource import TeachingResource
+from app.services.resource_text_store import resource_text_store
+from app.utils.libreoffice_converter import libreoffice_converter
+from app.utils.oss_client import oss_client
+
+logger = logging.getLogger(__name__)
+
+# 需要转换为PDF的资源类型
+OFFICE_RESOURCE_TYPES = ('word', 'excel', 'ppt')
+
+# 转换后的PDF保存目录（与教学资源上传目录一致）
+PDF_OUTPUT_DIR = Path("uploads/teaching_resources") / "pdfs"
+
+# 停留在 converting 超过该时间的资源视为转换进程已退出，启动时重新入队
+STALE_CONVERSION_MINUTES = 30
+
+
+def needs_pdf_conversion(resource_type: str, local_file_path: Optional[str]) -> bool:
+    """资源是否需要（且能够）转换为PDF"""
+    return (
+        resource_type in OFFICE_RESOURCE_TYPES
+        and bool(local_file_path)
+        and libreoffice_converter.is_supported_format(Path(local_file_path))
+    )
+
+
+class PdfConversionQueue:
+    """
+    Office文档转PDF队列
+
+    Args:
+        workers: 同时运行的转换任务数
+        timeout: 单次转换超时（秒）
+        retries: 转换失败后的重试次数
+    """
+
+    def __init__(self, workers: int = 2, timeout: int = 120, retries: int = 2):
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.retries = retries
+        self._queue: Optional[asyncio.Queue] = None
+        self._queued: Set[int] = set()
+        self._tasks: List[asyncio.Task] = []
+        self._start_lock: Optional[asyncio.Lock] = None
+
+        self.converted = 0
+        self.failed = 0
+
+    def _ensure_queue(self) -> asyncio.Queue:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        return self._queue
+
+    async def start(self) -> None:
+        """启动后台转换任务并重新入队未完成的资源（应用启动时调用，重复调用无副作用）"""
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._tasks:
+                return
+            self._ensure_queue()
+            profile_root = Path(tempfile.gettempdir()) / f"lo_profiles_{os.getpid()}"
+            self._tasks = [
+                asyncio.create_task(self._worker(profile_root / f"worker_{index}"))
+                for index in range(self.workers)
+            ]
+            try:
+                await self._recover()
+            except Exception as e:
+                logger.warning(f"恢复待转换的资源失败: {e}")
+
+    async def stop(self) -> None:
+        """停止后台转换任务（未处理的资源保持 pending，下次启动时重新入队）"""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    async def enqueue(self, resource_id: int) -> None:
+        """资源入队等待转换，已在队列中的资源不会重复入队"""
+        if not self._tasks:
+            await self.start()
+        if resource_id in self._queued:
+            return
+        self._queued.add(resource_id)
+        self._ensure_queue().put_nowait(resource_id)
+
+    def stats(self) -> dict:
+        """转换队列运行统计"""
+        return {
+            "queued": len(self._queued),
+            "converted": self.converted,
+            "failed": self.failed,
+        }
+
+    async def _recover(self) -> None:
+        async with AsyncSessionLocal() as session:
+            stale_before = datetime.utcnow() - timedelta(minutes=STALE_CONVERSION_MINUTES)
+            await session.execute(
+                update(TeachingResource)
+                .where(
+                    TeachingResource.pdf_conversion_status == 'converting',
+                    TeachingResource.updated_at < stale_before
+                )
+                .values(pdf_conversion_status='pending')
+            )
+            await session.commit()
+            result = await session.execute(
+                select(TeachingResource.id)
+                .where(
+                    TeachingResource.is_active == True,
+                    TeachingResource.pdf_conversion_status == 'pending',
+                    TeachingResource.resource_type.in_(OFFICE_RESOURCE_TYPES),
+                    TeachingResource.local_file_path.isnot(None)
+                )
+                .order_by(TeachingResource.id)
+            )
+            resource_ids = list(result.scalars().all())
+        for resource_id in resource_ids:
+            await self.enqueue(resource_id)
+        if resource_ids:
+            logger.info(f"重新入队 {len(resource_ids)} 个待转换PDF的资源")
+
+    async def _worker(self, profile_dir: Path) -> None:
+        queue = self._ensure_queue()
+        while True:
+            resource_id = await queue.get()
+            self._queued.discard(resource_id)
+            try:
+                await self._process(resource_id, profile_dir)
+            except Exception as e:
+                logger.error(f"处理PDF转换任务失败: {resource_id}, {e}")
+
+    async def _claim(self, resource_id: int) -> Optional[TeachingResource]:
+        """把资源状态从 pending 改为 converting，成功时返回资源（其他进程已在转换、已转换或已失败时返回None）"""
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                update(TeachingResource)
+                .where(
+                    TeachingResource.id == resource_id,
+                    TeachingResource.is_active == True,
+                    or_(
+                        TeachingResource.pdf_conversion_status == 'pending',
+                        TeachingResource.pdf_conversion_status.is_(None)
+                    )
+                )
+                .values(pdf_conversion_status='converting', updated_at=datetime.utcnow())
+                .returning(TeachingResource.id)
+            )
+            if result.scalar() is None:
+                return None
+            await session.commit()
+            return await session.get(TeachingResource, resource_id)
+
+    async def _process(self, resource_id: int, profile_dir: Path) -> None:
+        resource = await self._claim(resource_id)
+        if resource is None:
+            return
+        resource_type = resource.resource_type
+
+        pdf_file = None
+        if needs_pdf_conversion(resource_type, resource.local_file_path):
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    await asyncio.sleep(2 ** attempt)
+                pdf_file = await libreoffice_converter.convert_to_pdf_async(
+                    Path(resource.local_file_path),
+                    PDF_OUTPUT_DIR / resource_type,
+                    profile_dir=profile_dir,
+                    timeout=self.timeout
+                )
+                if pdf_file is not None:
+                    break
+                logger.warning(f"PDF转换失败（第{attempt + 1}次）: 资源 {resource_id}")
+
+        if pdf_file is None:
+            await self._finish(resource_id, pdf_conversion_status='failed')
+            self.failed += 1
+            return
+
+        pdf_local_path = str(pdf_file)
+        pdf_path = pdf_local_path
+        if oss_client.enabled:
+            try:
+                pdf_content = await asyncio.to_thread(pdf_file.read_bytes)
+                pdf_oss_key = f"teaching_resources/pdfs/{resource_type}/{pdf_file.name}"
+                pdf_path = await asyncio.to_thread(
+                    oss_client.upload_file, pdf_content, pdf_oss_key, content_type="application/pdf"
+                )
+                logger.info(f"PDF已上传到OSS: {pdf_oss_key}, URL: {pdf_path}")
+            except Exception as e:
+                logger.error(f"PDF上传到OSS失败: {e}")
+                pdf_path = pdf_local_path
+
+        await self._finish(
+            resource_id,
+            pdf_path=pdf_path,
+            pdf_local_path=pdf_local_path,
+            pdf_converted_at=datetime.utcnow(),
+            pdf_conversion_status='success'
+        )
+        self.converted += 1
+        resource_text_store.schedule(resource_id)
+
+    async def _finish(self, resource_id: int, **values) -> None:
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                update(TeachingResource)
+                .where(TeachingResource.id == resource_id)
+                .values(updated_at=datetime.utcnow(), **values)
+            )
+            await session.commit()
+
+
+# 创建全局PDF转换队列实例
+pdf_conversion_queue = PdfConversionQueue(
+    workers=settings.PDF_CONVERSION_WORKERS,
+    timeout=settings.PDF_CONVERSION_TIMEOUT,
+    retries=settings.PDF_CONVERSION_RETRIES
+)
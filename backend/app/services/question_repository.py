@@ -0,0 +1,224 @@
+"""
+题库查询
+题目列表、选项加载和导出
+"""
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, func, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.question import Question, QuestionOption
+from app.utils.pagination import decode_cursor, encode_cursor
+from app.utils.streaming_export import stream_rows
+
+CountKey = Tuple[int, Optional[str], Optional[str], Optional[str]]
+
+
+def serialize_option(option: QuestionOption) -> dict:
+    return {
+        "id": option.id,
+        "option_label": option.option_label,
+        "option_text": option.option_text,
+        "option_image": option.option_image,
+        "is_correct": option.is_correct,
+        "sort_order": option.sort_order,
+    }
+
+
+def serialize_question(question: Question, options: Sequence[QuestionOption]) -> dict:
+    """题目列表和详情接口返回的题目数据"""
+    return {
+        "id": question.id,
+        "teacher_id": question.teacher_id,
+        "question_type": question.question_type,
+        "title": question.title,
+        "title_image": question.title_image,
+        "knowledge_point": question.knowledge_point,
+        "answer": question.answer,
+        "answer_image": question.answer_image,
+        "explanation": question.explanation,
+        "explanation_image": question.explanation_image,
+        "difficulty": question.difficulty,
+        "is_active": question.is_active,
+        "created_at": question.created_at.isoformat() if question.created_at else None,
+        "updated_at": question.updated_at.isoformat() if question.updated_at else None,
+        "options": [serialize_option(opt) for opt in options],
+    }
+
+
+async def load_options(db: AsyncSession, question_ids: Iterable[int]) -> Dict[int, List[QuestionOption]]:
+    """一次查询加载一批题目的选项，返回 题目ID -> 按 sort_order 排序的选项列表（无选项的题目为空列表）"""
+    ids = list(dict.fromkeys(question_ids))
+    options_by_question: Dict[int, List[QuestionOption]] = {question_id: [] for question_id in ids}
+    if not ids:
+        return options_by_question
+    result = await db.execute(
+        select(QuestionOption)
+        .where(QuestionOption.question_id.in_(ids))
+        .order_by(QuestionOption.question_id, QuestionOption.sort_order, QuestionOption.id)
+    )
+    for option in result.scalars().all():
+        options_by_question[option.question_id].append(option)
+    return options_by_question
+
+
+def question_filters(
+    teacher_id: int,
+    question_type: Optional[str] = None,
+    knowledge_point: Optional[str] = None,
+    search: Optional[str] = None
+) -> list:
+    """题目列表的筛选条件"""
+    conditions = [Question.teacher_id == teacher_id, Question.is_active == True]
+    if question_type:
+        conditions.append(Question.question_type == question_type)
+    if knowledge_point:
+        conditions.append(Question.knowledge_point.ilike(f"%{knowledge_point}%"))
+    if search:
+        conditions.append(
+            or_(
+                Question.title.ilike(f"%{search}%"),
+                Question.knowledge_point.ilike(f"%{search}%")
+            )
+        )
+    return conditions
+
+
+class QuestionRepository:
+    """
+    题库查询
+
+    Args:
+        count_ttl: 列表总数的缓存时间（秒），0表示不缓存
+    """
+
+    def __init__(self, count_ttl: int = 60):
+        self.count_ttl = count_ttl
+        self._counts: Dict[CountKey, Tuple[float, int]] = {}
+
+    async def list_questions(
+        self,
+        db: AsyncSession,
+        teacher_id: int,
+        question_type: Optional[str] = None,
+        knowledge_point: Optional[str] = None,
+        search: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        include_total: bool = True
+    ) -> Tuple[List[dict], Optional[int], Optional[str]]:
+        """
+        分页查询题目（按更新时间倒序，带选项）
+
+        Args:
+            cursor: 上一页返回的游标，传入时忽略 skip
+            include_total: 是否返回总数（不需要时跳过计数查询）
+
+        Returns:
+            (题目列表, 总数, 下一页游标)；不需要总数时总数为None，没有下一页时游标为None
+        """
+        conditions = question_filters(teacher_id, question_type, knowledge_point, search)
+        query = select(Question).where(and_(*conditions))
+        if cursor:
+            updated_at, question_id = decode_cursor(cursor)
+            query = query.where(tuple_(Question.updated_at, Question.id) < tuple_(updated_at, question_id))
+        else:
+            query = query.offset(skip)
+        # 多取一条判断是否还有下一页
+        query = query.order_by(Question.updated_at.desc(), Question.id.desc()).limit(limit + 1)
+        questions = list((await db.execute(query)).scalars().all())
+
+        next_cursor = None
+        if len(questions) > limit:
+            questions = questions[:limit]
+            next_cursor = encode_cursor(questions[-1].updated_at, questions[-1].id)
+
+        options = await load_options(db, [question.id for question in questions])
+        items = [serialize_question(question, options[question.id]) for question in questions]
+
+        total = None
+        if include_total:
+            total = await self.count_questions(db, teacher_id, question_type, knowledge_point, search)
+        return items, total, next_cursor
+
+    async def count_questions(
+        self,
+        db: AsyncSession,
+        teacher_id: int,
+        question_type: Optional[str] = None,
+        knowledge_point: Optional[str] = None,
+        search: Optional[str] = None
+    ) -> int:
+        """筛选条件下的题目总数（短时缓存）"""
+        key: CountKey = (teacher_id, question_type or None, knowledge_point or None, search or None)
+        cached = self._counts.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        conditions = question_filters(teacher_id, question_type, knowledge_point, search)
+        total = (await db.execute(select(func.count(Question.id)).where(and_(*conditions)))).scalar() or 0
+        if self.count_ttl > 0:
+            self._counts[key] = (time.monotonic() + self.count_ttl, total)
+        return total
+
+    def invalidate_counts(self, teacher_id: int) -> None:
+        """教师的题目增删改后清除其总数缓存（其他worker进程的缓存在TTL后过期）"""
+        for key in [key for key in self._counts if key[0] == teacher_id]:
+            del self._counts[key]
+
+    async def get_question(self, db: AsyncSession, teacher_id: int, question_id: int) -> Optional[dict]:
+        """题目详情（带选项），不存在或已删除时返回None"""
+        result = await db.execute(
+            select(Question).where(
+                Question.id == question_id,
+                Question.teacher_id == teacher_id,
+                Question.is_active == True
+            )
+        )
+        question = result.scalars().first()
+        if question is None:
+            return None
+        options = await load_options(db, [question.id])
+        return serialize_question(question, options[question.id])
+
+
+async def iter_questions_with_options(teacher_id: int) -> AsyncIterator[Tuple[Any, List[Any]]]:
+    """
+    按创建时间倒序逐题读取教师的全部题目和选项（用于导出）
+
+    题目与选项左连接后按题目排序，同一道题的选项行相邻，逐行合并为 (题目行, 选项行列表)
+    """
+    statement = (
+        select(
+            Question.id,
+            Question.question_type,
+            Question.title,
+            Question.knowledge_point,
+            Question.answer,
+            Question.explanation,
+            Question.difficulty,
+            QuestionOption.option_label,
+            QuestionOption.option_text,
+            QuestionOption.is_correct,
+        )
+        .outerjoin(QuestionOption, QuestionOption.question_id == Question.id)
+        .where(Question.teacher_id == teacher_id, Question.is_active == True)
+        .order_by(Question.created_at.desc(), Question.id.desc(), QuestionOption.sort_order, QuestionOption.id)
+    )
+    current = None
+    options: List[Any] = []
+    async for row in stream_rows(statement):
+        if current is None or row.id != current.id:
+            if current is not None:
+                yield current, options
+            current, options = row, []
+        if row.option_label is not None:
+            options.append(row)
+    if current is not None:
+        yield current, options
+
+
+# 创建全局题库查询实例
+question_repository = QuestionRepository(count_ttl=settings.QUESTION_COUNT_CACHE_TTL)
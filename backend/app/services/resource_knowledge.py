@@ -0,0 +1,80 @@
+"""
+教学资源知识点关联
+把资源的知识点文本拆分写入关联表
+"""
+import re
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, delete, func, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.models.teaching_resource import TeachingResource, TeachingResourceKnowledgePoint
+
+# 与迁移脚本中的回填规则保持一致
+KNOWLEDGE_POINT_SEPARATORS = re.compile(r"[,，;；、\n]+")
+MAX_KNOWLEDGE_POINT_LENGTH = 255
+
+
+def split_knowledge_points(knowledge_point: Optional[str]) -> List[str]:
+    """把知识点文本拆分为去重后的知识点列表（保持原顺序）"""
+    if not knowledge_point:
+        return []
+    points = []
+    for part in KNOWLEDGE_POINT_SEPARATORS.split(knowledge_point):
+        part = part.strip()[:MAX_KNOWLEDGE_POINT_LENGTH]
+        if part and part not in points:
+            points.append(part)
+    return points
+
+
+async def sync_resource_knowledge_points(db: AsyncSession, resource: TeachingResource) -> None:
+    """
+    按资源当前的 knowledge_point 重建关联记录（不提交，随调用方事务提交）
+    resource 必须已有ID（新建资源请先 flush）
+    """
+    await db.execute(
+        delete(TeachingResourceKnowledgePoint).where(
+            TeachingResourceKnowledgePoint.resource_id == resource.id
+        )
+    )
+    points = split_knowledge_points(resource.knowledge_point)
+    if points:
+        await db.execute(
+            insert(TeachingResourceKnowledgePoint).values([
+                {
+                    "resource_id": resource.id,
+                    "teacher_id": resource.teacher_id,
+                    "knowledge_point": point,
+                }
+                for point in points
+            ])
+        )
+
+
+async def count_resources_by_knowledge_point(db: AsyncSession, teacher_id: int) -> Dict[str, int]:
+    """统计教师每个知识点关联的有效资源数量"""
+    result = await db.execute(
+        select(
+            TeachingResourceKnowledgePoint.knowledge_point,
+            func.count(TeachingResourceKnowledgePoint.resource_id).label('count')
+        ).join(
+            TeachingResource, TeachingResource.id == TeachingResourceKnowledgePoint.resource_id
+        ).where(
+            and_(
+                TeachingResourceKnowledgePoint.teacher_id == teacher_id,
+                TeachingResource.is_active == True
+            )
+        ).group_by(TeachingResourceKnowledgePoint.knowledge_point)
+    )
+    return {row.knowledge_point: row.count for row in result}
+
+
+def resource_ids_for_knowledge_points(teacher_id: int, knowledge_points: Iterable[str]):
+    """关联到任一知识点的资源ID子查询"""
+    return select(TeachingResourceKnowledgePoint.resource_id).where(
+        and_(
+            TeachingResourceKnowledgePoint.teacher_id == teacher_id,
+            TeachingResourceKnowledgePoint.knowledge_point.in_(list(knowledge_points))
+        )
+    )
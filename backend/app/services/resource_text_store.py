@@ -0,0 +1,127 @@
+"""
+教学资源提取文本存储
+提取并保存教学资源的文本内容，供AI相关接口读取
+"""
+import asyncio
+import hashlib
+import logging
+from datetime import datetime
+from typing import Dict, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import AsyncSessionLocal
+from app.models.teaching_resource import TeachingResource, TeachingResourceParsedText
+from app.utils.resource_parser import (
+    TEXT_RESOURCE_TYPES,
+    extract_resource_text,
+    read_resource_file,
+    resource_text_source,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def is_parse_error(text_content: str) -> bool:
+    """解析函数失败时返回形如 "[PDF解析失败: ...]" 的提示文本，这类结果不保存"""
+    stripped = text_content.strip()
+    return stripped.startswith("[") and stripped.endswith("]") and "失败" in stripped
+
+
+class ResourceTextStore:
+    """教学资源提取文本的读取与预提取"""
+
+    def __init__(self):
+        self._inflight: Dict[Tuple[int, str], asyncio.Task] = {}
+        self._background: Set[asyncio.Task] = set()
+
+    async def get_text(self, db: AsyncSession, resource: TeachingResource) -> str:
+        """获取资源的提取文本，已保存且源文件未变时直接返回"""
+        source_path, _, _ = resource_text_source(resource)
+        row = (await db.execute(
+            select(TeachingResourceParsedText.source_path, TeachingResourceParsedText.text_content)
+            .where(TeachingResourceParsedText.resource_id == resource.id)
+        )).first()
+        if row is not None and row.source_path == source_path:
+            return row.text_content
+        return await self._extract_once(resource, source_path)
+
+    def schedule(self, resource_id: int) -> None:
+        """在后台为资源预先提取文本（上传、转换PDF后调用，失败只记录日志）"""
+        task = asyncio.create_task(self._warm(resource_id))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _warm(self, resource_id: int) -> None:
+        try:
+            async with AsyncSessionLocal() as session:
+                resource = await session.get(TeachingResource, resource_id)
+                if resource is None or not resource.is_active:
+                    return
+                if resource_text_source(resource)[1] not in TEXT_RESOURCE_TYPES:
+                    return
+                await self.get_text(session, resource)
+        except Exception as e:
+            logger.warning(f"预提取资源文本失败: {resource_id}, {e}")
+
+    async def _extract_once(self, resource: TeachingResource, source_path: str) -> str:
+        key = (resource.id, source_path)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._extract_and_store(resource, source_path))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # 某个请求被取消时不影响其他等待同一提取结果的请求
+        return await asyncio.shield(task)
+
+    async def _extract_and_store(self, resource: TeachingResource, source_path: str) -> str:
+        try:
+            content, resource_type = await asyncio.to_thread(read_resource_file, resource)
+        except Exception as e:
+            logger.error(f"解析资源文件失败: {e}")
+            raise Exception(f"解析资源文件失败: {str(e)}")
+        content_hash = hashlib.sha256(content).hexdigest()
+
+        async with AsyncSessionLocal() as session:
+            text_content: Optional[str] = await session.scalar(
+                select(TeachingResourceParsedText.text_content)
+                .where(TeachingResourceParsedText.content_hash == content_hash)
+                .limit(1)
+            )
+            if text_content is None:
+                logger.info(f"提取资源文本: {resource.id}, 类型: {resource_type}")
+                text_content = await extract_resource_text(content, resource_type, resource.original_filename)
+                if is_parse_error(text_content):
+                    return text_content
+
+            try:
+                now = datetime.utcnow()
+                stmt = pg_insert(TeachingResourceParsedText).values(
+                    resource_id=resource.id,
+                    source_path=source_path,
+                    content_hash=content_hash,
+                    text_content=text_content,
+                    created_at=now,
+                    updated_at=now,
+                )
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=["resource_id"],
+                    set_={
+                        "source_path": stmt.excluded.source_path,
+                        "content_hash": stmt.excluded.content_hash,
+                        "text_content": stmt.excluded.text_content,
+                        "updated_at": stmt.excluded.updated_at,
+                    }
+                )
+                await session.execute(stmt)
+                await session.commit()
+            except Exception as e:
+                await session.rollback()
+                logger.warning(f"保存资源提取文本失败: {resource.id}, {e}")
+        return text_content
+
+
+# 创建全局教学资源文本存储实例
+resource_text_store = ResourceTextStore()
@@ -0,0 +1,145 @@
+"""
+后台批量写入器
+记录进入进程内队列，由后台任务攒批写入数据库，子类实现 _write_batch
+"""
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BatchWriter:
+    """
+    后台批量写入器基类
+
+    Args:
+        name: 写入器名称（用于日志）
+        max_queue_size: 队列上限
+        batch_size: 每批最多写入的记录数
+        flush_interval: 攒批的最长等待时间（秒）
+        overflow_policy: 队列满时的策略
+            - "drop": 丢弃新记录并计数（默认，调用方永不等待）
+            - "block": 等待队列空位，最长 block_timeout 秒，超时后丢弃
+        block_timeout: "block" 策略下的最长等待时间（秒）
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_queue_size: int = 10000,
+        batch_size: int = 200,
+        flush_interval: float = 1.0,
+        overflow_policy: str = "drop",
+        block_timeout: float = 0.5
+    ):
+        if overflow_policy not in ("drop", "block"):
+            raise ValueError(f"不支持的队列溢出策略: {overflow_policy}")
+        self.name = name
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._start_lock: Optional[asyncio.Lock] = None
+        # None: 尚未检查；True/False: 目标表是否可写
+        self._ready: Optional[bool] = None
+
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def _ensure_queue(self) -> asyncio.Queue:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        return self._queue
+
+    async def start(self) -> None:
+        """检查目标表并启动后台写入任务（应用启动时调用，重复调用无副作用）"""
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._task is not None and not self._task.done():
+                return
+            self._ensure_queue()
+            if self._ready is None:
+                self._ready = await self._check_ready()
+            if self._ready:
+                self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止后台任务，并把队列中剩余的记录写完（应用关闭时调用）"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self._queue is None or not self._ready:
+            return
+        while not self._queue.empty():
+            batch = []
+            while not self._queue.empty() and len(batch) < self.batch_size:
+                batch.append(self._queue.get_nowait())
+            await self._write_batch(batch)
+
+    async def enqueue(self, record: Dict[str, Any]) -> bool:
+        """记录入队，不等待写入完成；返回是否成功入队"""
+        if self._ready is False:
+            return False
+        if self._task is None or self._task.done():
+            await self.start()
+            if not self._ready:
+                return False
+
+        queue = self._ensure_queue()
+        try:
+            if self.overflow_policy == "block":
+                await asyncio.wait_for(queue.put(record), timeout=self.block_timeout)
+            else:
+                queue.put_nowait(record)
+            return True
+        except (asyncio.QueueFull, asyncio.TimeoutError):
+            self.dropped += 1
+            # 避免日志刷屏，每丢弃100条提示一次
+            if self.dropped % 100 == 1:
+                logger.warning(f"{self.name}队列已满，已丢弃 {self.dropped} 条记录")
+            return False
+
+    def stats(self) -> Dict[str, int]:
+        """写入器运行统计"""
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+    async def _check_ready(self) -> bool:
+        """启动时检查目标表是否可写，默认可写"""
+        return True
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        queue = self._ensure_queue()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self._write_batch(batch)
+
+    async def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        """写入一批记录，由子类实现；需自行更新 written / failed 计数"""
+        raise NotImplementedError
@@ -0,0 +1,148 @@
+"""
+文档文本提取进程池
+在共享进程池中提取PDF/Word/PPT文本（提交的函数需定义在模块顶层）
+"""
+import asyncio
+import io
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Awaitable, Callable, List, Optional, Union
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 每个PDF子任务至少提取的页数，页数不超过该值的PDF不拆分
+PDF_MIN_PAGES_PER_JOB = 20
+
+PdfSource = Union[str, bytes]
+
+
+class ExtractionError(Exception):
+    """文档提取任务无法执行"""
+
+
+class ExtractionBusyError(ExtractionError):
+    """提取任务过多"""
+
+
+class ExtractionTimeoutError(ExtractionError):
+    """提取任务超时"""
+
+
+def _open_pdf(source: PdfSource):
+    return source if isinstance(source, str) else io.BytesIO(source)
+
+
+def pdf_page_count(source: PdfSource) -> int:
+    """PDF页数（在子进程中执行）"""
+    try:
+        from PyPDF2 import PdfReader
+        return len(PdfReader(_open_pdf(source)).pages)
+    except ImportError:
+        import pdfplumber
+        with pdfplumber.open(_open_pdf(source)) as pdf:
+            return len(pdf.pages)
+
+
+def extract_pdf_page_range(source: PdfSource, start: int, end: int) -> List[str]:
+    """提取 [start, end) 页的文本，每页一项，无文本的页为空字符串（在子进程中执行）"""
+    try:
+        from PyPDF2 import PdfReader
+        reader = PdfReader(_open_pdf(source))
+        return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+    except ImportError:
+        import pdfplumber
+        with pdfplumber.open(_open_pdf(source)) as pdf:
+            return [pdf.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def extract_docx_paragraphs(data: bytes) -> List[str]:
+    """提取Word文档的段落文本（在子进程中执行）"""
+    from docx import Document
+    return [para.text for para in Document(io.BytesIO(data)).paragraphs]
+
+
+class ExtractionExecutor:
+    """
+    文档文本提取进程池
+
+    Args:
+        max_workers: 进程数，0表示按CPU核数（最多4个）
+        max_pending: 同时排队和执行的提取任务上限
+        timeout: 调用方等待单个提取任务的最长时间（秒）
+    """
+
+    def __init__(self, max_workers: int = 0, max_pending: int = 32, timeout: float = 120):
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+
+    async def _call(self, func: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_pool(), func, *args)
+
+    def _release(self, task: asyncio.Task) -> None:
+        self._pending -= 1
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"文档提取任务失败: {task.exception()}")
+
+    async def _submit(self, job: Awaitable[Any]) -> Any:
+        if self._pending >= self.max_pending:
+            job.close()
+            raise ExtractionBusyError("文档解析任务过多，请稍后重试")
+        self._pending += 1
+        task = asyncio.ensure_future(job)
+        task.add_done_callback(self._release)
+        try:
+            # 超时或调用方取消时任务继续在后台执行，结束后释放名额
+            return await asyncio.wait_for(asyncio.shield(task), self.timeout)
+        except asyncio.TimeoutError:
+            raise ExtractionTimeoutError(f"文档解析超时（超过{self.timeout}秒）")
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """在进程池中执行提取函数（func 必须是模块顶层函数）"""
+        return await self._submit(self._call(func, *args))
+
+    async def extract_pdf_pages(self, source: PdfSource, max_pages: Optional[int] = None) -> List[str]:
+        """
+        提取PDF每页的文本，页数较多时按页拆分到多个进程并行提取
+
+        Args:
+            source: PDF文件路径或字节数据
+            max_pages: 最多提取的页数（None表示全部）
+        """
+        return await self._submit(self._extract_pdf_pages(source, max_pages))
+
+    async def _extract_pdf_pages(self, source: PdfSource, max_pages: Optional[int]) -> List[str]:
+        total = await self._call(pdf_page_count, source)
+        if max_pages:
+            total = min(total, max_pages)
+        pages_per_job = max(PDF_MIN_PAGES_PER_JOB, -(-total // self.max_workers))
+        ranges = [(start, min(start + pages_per_job, total)) for start in range(0, total, pages_per_job)]
+        results = await asyncio.gather(*[
+            self._call(extract_pdf_page_range, source, start, end) for start, end in ranges
+        ])
+        return [text for chunk in results for text in chunk]
+
+    def shutdown(self) -> None:
+        """关闭进程池（应用关闭时调用）"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+# 创建全局文档提取进程池实例
+extraction_executor = ExtractionExecutor(
+    max_workers=settings.EXTRACTION_WORKERS,
+    max_pending=settings.EXTRACTION_MAX_PENDING,
+    timeout=settings.EXTRACTION_TIMEOUT
+)
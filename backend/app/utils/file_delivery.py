@@ -0,0 +1,272 @@
+"""
+文件分发
+资源下载、预览和PDF查看的文件响应，OSS文件使用本地磁盘缓存
+"""
+import asyncio
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import quote
+
+import httpx
+from fastapi import HTTPException, Request
+from fastapi.responses import FileResponse, RedirectResponse, Response
+
+from app.core.config import settings
+from app.utils.oss_client import oss_client
+
+logger = logging.getLogger(__name__)
+
+# 从OSS下载到缓存时每次写入的块大小
+DELIVERY_CHUNK_SIZE = 1024 * 1024
+
+# 签名URL有效期（秒）
+SIGNED_URL_EXPIRES = 3600
+
+
+def is_remote_path(path: Optional[str]) -> bool:
+    """路径是否为HTTP(S) URL（OSS文件）"""
+    return bool(path) and (path.startswith('http://') or path.startswith('https://'))
+
+
+def oss_key_from_url(url: str) -> Optional[str]:
+    """从OSS文件URL中提取对象键，不是本项目OSS的URL时返回None"""
+    if '.aliyuncs.com/' in url:
+        return url.split('.aliyuncs.com/', 1)[1].split('?')[0] or None
+    if settings.OSS_USE_CNAME and settings.OSS_ENDPOINT and url.startswith(settings.OSS_ENDPOINT):
+        return url.replace(settings.OSS_ENDPOINT + '/', '').split('?')[0] or None
+    return None
+
+
+def file_etag(stat_result: os.stat_result) -> str:
+    """文件的ETag（与 FileResponse 的计算方式一致）"""
+    etag_base = f"{stat_result.st_mtime}-{stat_result.st_size}"
+    return f'"{hashlib.md5(etag_base.encode(), usedforsecurity=False).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 请求头是否命中ETag（弱比较）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+    return etag.removeprefix('W/') in tags
+
+
+class DiskObjectCache:
+    """
+    远程文件的本地磁盘缓存
+
+    Args:
+        cache_dir: 缓存目录
+        max_bytes: 缓存总大小上限（字节）
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._index: Optional["OrderedDict[str, int]"] = None  # 文件名 -> 大小，按最近访问排序
+        self._total = 0
+        self._fetching: Dict[str, asyncio.Task] = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def _load_index(self) -> "OrderedDict[str, int]":
+        """首次使用时扫描缓存目录（包括其他worker进程写入的文件）"""
+        if self._index is None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            entries = []
+            for path in self.cache_dir.iterdir():
+                if path.suffix == '.part' or not path.is_file():
+                    continue
+                stat_result = path.stat()
+                entries.append((stat_result.st_mtime, path.name, stat_result.st_size))
+            self._index = OrderedDict((name, size) for _, name, size in sorted(entries))
+            self._total = sum(self._index.values())
+        return self._index
+
+    def _path(self, key: str) -> Path:
+        suffix = Path(key.split('?')[0]).suffix[:16]
+        return self.cache_dir / (hashlib.sha256(key.encode('utf-8')).hexdigest() + suffix)
+
+    def _forget(self, name: str) -> None:
+        size = self._index.pop(name, None)
+        if size is not None:
+            self._total -= size
+
+    def _add(self, name: str, size: int) -> None:
+        self._forget(name)
+        self._index[name] = size
+        self._total += size
+        # 淘汰最久未访问的文件，刚写入的文件即使超过上限也保留
+        while self._total > self.max_bytes and len(self._index) > 1:
+            oldest = next(iter(self._index))
+            self._forget(oldest)
+            (self.cache_dir / oldest).unlink(missing_ok=True)
+
+    async def get(self, key: str, url: str) -> Path:
+        """
+        返回缓存文件路径，未缓存时从 url 流式下载（同一对象的并发请求只下载一次）
+
+        Args:
+            key: 缓存键（OSS对象键或不带参数的URL）
+            url: 下载地址（签名URL或公开URL）
+        """
+        index = self._load_index()
+        path = self._path(key)
+        if path.name in index:
+            if path.exists():
+                index.move_to_end(path.name)
+                self.hits += 1
+                try:
+                    os.utime(path)
+                except OSError:
+                    pass
+                return path
+            # 已被其他worker进程淘汰
+            self._forget(path.name)
+
+        task = self._fetching.get(path.name)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(self._fetch(url, path))
+            self._fetching[path.name] = task
+            task.add_done_callback(lambda _: self._fetching.pop(path.name, None))
+        # 调用方断开时下载继续进行，供后续请求使用
+        return await asyncio.shield(task)
+
+    async def _fetch(self, url: str, path: Path) -> Path:
+        part_path = path.with_name(f"{path.name}.{os.getpid()}.part")
+        size = 0
+        try:
+            async with httpx.AsyncClient(timeout=httpx.Timeout(30.0, read=60.0)) as client:
+                async with client.stream('GET', url) as response:
+                    response.raise_for_status()
+                    part_file = await asyncio.to_thread(open, part_path, 'wb')
+                    try:
+                        async for chunk in response.aiter_bytes(DELIVERY_CHUNK_SIZE):
+                            await asyncio.to_thread(part_file.write, chunk)
+                            size += len(chunk)
+                    finally:
+                        await asyncio.to_thread(part_file.close)
+            os.replace(part_path, path)
+        except BaseException:
+            part_path.unlink(missing_ok=True)
+            raise
+        self._add(path.name, size)
+        logger.info(f"文件已缓存到本地: {path.name}, 大小: {size} bytes")
+        return path
+
+    def stats(self) -> dict:
+        """缓存运行统计"""
+        index = self._load_index()
+        return {
+            "files": len(index),
+            "bytes": self._total,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class FileDelivery:
+    """
+    文件分发
+
+    Args:
+        cache: 远程文件的磁盘缓存
+        redirect: OSS文件是否直接重定向到签名URL（不经过后端）
+    """
+
+    def __init__(self, cache: DiskObjectCache, redirect: bool = False):
+        self.cache = cache
+        self.redirect = redirect
+
+    async def fetch(self, url: str) -> Path:
+        """把OSS文件下载到本地缓存（已缓存时直接返回），返回本地路径"""
+        oss_key = oss_key_from_url(url)
+        if oss_key and oss_client.enabled:
+            signed_url = oss_client.generate_download_url(oss_key, expires=SIGNED_URL_EXPIRES)
+            return await self.cache.get(oss_key, signed_url)
+        # 非本项目OSS或OSS未配置，按公开URL下载
+        return await self.cache.get(url.split('?')[0], url)
+
+    async def serve(
+        self,
+        request: Request,
+        path: str,
+        media_type: str,
+        filename: str,
+        disposition: str = 'inline',
+        headers: Optional[Dict[str, str]] = None
+    ) -> Response:
+        """
+        返回文件内容
+
+        Args:
+            request: 当前请求（读取 Range / If-None-Match）
+            path: 本地文件路径或OSS文件URL
+            media_type: MIME类型
+            filename: 响应中的文件名
+            disposition: inline 或 attachment
+            headers: 附加的响应头（CORS、Cache-Control等）
+
+        本地文件不存在时抛出404；OSS下载失败时抛出原始异常，由调用方处理
+        """
+        if is_remote_path(path):
+            oss_key = oss_key_from_url(path)
+            if self.redirect and oss_key and oss_client.enabled:
+                url = oss_client.generate_download_url(oss_key, expires=SIGNED_URL_EXPIRES)
+                return RedirectResponse(url=url, status_code=302)
+            local_path = await self.fetch(path)
+        else:
+            local_path = Path(path)
+            if not local_path.exists():
+                raise HTTPException(status_code=404, detail="文件不存在")
+
+        return await self.file_response(request, local_path, media_type, filename, disposition, headers)
+
+    async def file_response(
+        self,
+        request: Request,
+        local_path: Path,
+        media_type: str,
+        filename: str,
+        disposition: str = 'inline',
+        headers: Optional[Dict[str, str]] = None
+    ) -> Response:
+        """本地文件的响应（支持Range，If-None-Match 命中时返回304）"""
+        stat_result = await asyncio.to_thread(os.stat, local_path)
+        etag = file_etag(stat_result)
+        response_headers = dict(headers or {})
+        response_headers['ETag'] = etag
+        response_headers['Accept-Ranges'] = 'bytes'
+        response_headers['Access-Control-Expose-Headers'] = (
+            'Content-Type, Content-Disposition, Content-Length, Content-Range, Accept-Ranges, ETag'
+        )
+
+        if etag_matches(request.headers.get('if-none-match'), etag):
+            not_modified_headers = {'ETag': etag}
+            if 'Cache-Control' in response_headers:
+                not_modified_headers['Cache-Control'] = response_headers['Cache-Control']
+            return Response(status_code=304, headers=not_modified_headers)
+
+        response_headers['Content-Disposition'] = f"{disposition}; filename*=UTF-8''{quote(filename)}"
+        return FileResponse(
+            local_path,
+            media_type=media_type,
+            headers=response_headers,
+            stat_result=stat_result
+        )
+
+
+# 创建全局文件分发实例
+file_delivery = FileDelivery(
+    DiskObjectCache(Path(settings.FILE_CACHE_DIR), settings.FILE_CACHE_MAX_BYTES),
+    redirect=settings.FILE_DELIVERY_REDIRECT
+)
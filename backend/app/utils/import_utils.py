@@ -3,11 +3,19 @@
 """
 import pandas as pd
 import io
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Iterable, Optional, Set, Tuple
 from fastapi import UploadFile, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import func, and_
+from sqlalchemy import func, insert
+
+# 单条 IN 查询的最大参数个数（asyncpg 单条语句最多 32767 个参数）
+IN_QUERY_CHUNK_SIZE = 5000
+# 多行 INSERT 每批的行数
+INSERT_CHUNK_SIZE = 1000
+
+# 数字列格式错误的标记（区别于空值 None）
+INVALID_NUMBER = object()
 
 
 async def parse_excel_file(file: UploadFile) -> pd.DataFrame:
@@ -38,6 +46,95 @@ async def parse_excel_file(file: UploadFile) -> pd.DataFrame:
     return df
 
 
+def excel_row_numbers(df: pd.DataFrame) -> List[int]:
+    """DataFrame各行对应的Excel行号（第1行为表头）"""
+    return [int(idx) + 2 for idx in df.index]
+
+
+def clean_text_column(df: pd.DataFrame, column: str) -> List[Optional[str]]:
+    """整列转换为去除首尾空格的字符串，空值和空字符串为None；列不存在时全部为None"""
+    if column not in df.columns:
+        return [None] * len(df)
+    series = df[column]
+    text = series.astype(str).str.strip()
+    text = text.where(series.notna() & (text != ""), None)
+    return [value if isinstance(value, str) else None for value in text.tolist()]
+
+
+def parse_number_column(df: pd.DataFrame, column: str, integer: bool = True) -> List[Any]:
+    """
+    整列解析为数字
+    空值为None，无法解析的值为 INVALID_NUMBER；integer=True 时截断为整数
+    """
+    if column not in df.columns:
+        return [None] * len(df)
+    series = df[column]
+    numbers = pd.to_numeric(series, errors="coerce")
+    values: List[Any] = []
+    for raw_missing, number in zip(series.isna().tolist(), numbers.tolist()):
+        if raw_missing:
+            values.append(None)
+        elif pd.isna(number):
+            values.append(INVALID_NUMBER)
+        else:
+            values.append(int(number) if integer else float(number))
+    return values
+
+
+def mark_file_duplicates(values: List[Optional[Any]]) -> List[bool]:
+    """标记在文件中重复出现的值（第一次出现不标记，空值不参与）"""
+    seen: Set[Any] = set()
+    marks = []
+    for value in values:
+        if value is None:
+            marks.append(False)
+        elif value in seen:
+            marks.append(True)
+        else:
+            seen.add(value)
+            marks.append(False)
+    return marks
+
+
+async def find_existing_values(db: AsyncSession, column, values: Iterable[Any], *conditions) -> Set[Any]:
+    """
+    查询数据库中已存在的值（每批一次 IN 查询）
+
+    Args:
+        column: 要检查的模型列，例如 User.username
+        values: 待检查的值，None会被忽略
+        conditions: 额外的过滤条件，例如 Class.is_active == True
+    """
+    candidates = list({value for value in values if value is not None and value is not INVALID_NUMBER})
+    existing: Set[Any] = set()
+    for i in range(0, len(candidates), IN_QUERY_CHUNK_SIZE):
+        chunk = candidates[i:i + IN_QUERY_CHUNK_SIZE]
+        result = await db.execute(select(column).where(column.in_(chunk), *conditions))
+        existing.update(result.scalars().all())
+    return existing
+
+
+async def bulk_insert(db: AsyncSession, model, rows: List[Dict[str, Any]], returning=None) -> List[Any]:
+    """
+    分批批量INSERT（不提交，随调用方事务提交）
+    SQLAlchemy会把每批参数合并为多行 INSERT ... VALUES 语句执行
+
+    Args:
+        returning: 需要返回的列（例如 User.id），返回值与 rows 顺序一致
+    """
+    returned: List[Any] = []
+    for i in range(0, len(rows), INSERT_CHUNK_SIZE):
+        chunk = rows[i:i + INSERT_CHUNK_SIZE]
+        if returning is None:
+            await db.execute(insert(model), chunk)
+        else:
+            result = await db.execute(
+                insert(model).returning(returning, sort_by_parameter_order=True), chunk
+            )
+            returned.extend(result.scalars().all())
+    return returned
+
+
 def generate_excel_template(headers: List[str], sample_data: Optional[List[Dict[str, Any]]] = None) -> bytes:
     """生成Excel模板文件"""
     # 创建DataFrame
@@ -56,104 +153,3 @@ def generate_excel_template(headers: List[str], sample_data: Optional[List[Dict[
     
     output.seek(0)
     return output.getvalue()
-
-
-async def check_duplicate_username(db: AsyncSession, username: str, exclude_id: Optional[int] = None) -> bool:
-    """检查用户名是否重复"""
-    from app.models.base import User
-    
-    query = select(User).where(User.username == username)
-    if exclude_id:
-        query = query.where(User.id != exclude_id)
-    
-    result = await db.execute(query)
-    return result.scalars().first() is not None
-
-
-async def check_duplicate_email(db: AsyncSession, email: str, exclude_id: Optional[int] = None) -> bool:
-    """检查邮箱是否重复"""
-    from app.models.base import User
-    
-    if not email or pd.isna(email):
-        return False
-    
-    query = select(User).where(User.email == email)
-    if exclude_id:
-        query = query.where(User.id != exclude_id)
-    
-    result = await db.execute(query)
-    return result.scalars().first() is not None
-
-
-async def check_duplicate_phone(db: AsyncSession, phone: str, exclude_id: Optional[int] = None) -> bool:
-    """检查手机号是否重复"""
-    from app.models.base import User
-    
-    if not phone:
-        return False
-    
-    # 处理pandas的NaN值
-    try:
-        if pd.isna(phone):
-            return False
-    except:
-        pass
-    
-    query = select(User).where(User.phone == phone)
-    if exclude_id:
-        query = query.where(User.id != exclude_id)
-    
-    result = await db.execute(query)
-    return result.scalars().first() is not None
-
-
-async def check_duplicate_student_no(db: AsyncSession, student_no: str, exclude_id: Optional[int] = None) -> bool:
-    """检查学号是否重复"""
-    from app.models.base import StudentProfile
-    
-    if not student_no or pd.isna(student_no):
-        return False
-    
-    query = select(StudentProfile).where(StudentProfile.student_no == student_no)
-    if exclude_id:
-        query = query.join(User, StudentProfile.user_id == User.id).where(User.id != exclude_id)
-    
-    result = await db.execute(query)
-    return result.scalars().first() is not None
-
-
-async def check_duplicate_organization_name(db: AsyncSession, name: str, exclude_id: Optional[int] = None) -> bool:
-    """检查组织名称是否重复"""
-    from app.models.base import Organization
-    
-    query = select(Organization).where(and_(Organization.name == name, Organization.is_active == True))
-    if exclude_id:
-        query = query.where(Organization.id != exclude_id)
-    
-    result = await db.execute(query)
-    return result.scalars().first() is not None
-
-
-async def check_duplicate_major_name(db: AsyncSession, name: str, exclude_id: Optional[int] = None) -> bool:
-    """检查专业名称是否重复"""
-    from app.models.base import Major
-    
-    query = select(Major).where(and_(Major.name == name, Major.is_active == True))
-    if exclude_id:
-        query = query.where(Major.id != exclude_id)
-    
-    result = await db.execute(query)
-    return result.scalars().first() is not None
-
-
-async def check_duplicate_class_name(db: AsyncSession, name: str, exclude_id: Optional[int] = None) -> bool:
-    """检查班级名称是否重复"""
-    from app.models.base import Class
-    
-    query = select(Class).where(and_(Class.name == name, Class.is_active == True))
-    if exclude_id:
-        query = query.where(Class.id != exclude_id)
-    
-    result = await db.execute(query)
-    return result.scalars().first() is not None
-
@@ -2,6 +2,7 @@
 LibreOffice文档转换工具
 使用LibreOffice命令行工具将Office文档转换为PDF
 """
+import asyncio
 import subprocess
 import logging
 import os
@@ -150,6 +151,78 @@ class LibreOfficeConverter:
             logger.error(f"转换过程中出错: {e}")
             return None
     
+    async def convert_to_pdf_async(
+        self,
+        input_file: Path,
+        output_dir: Path,
+        profile_dir: Optional[Path] = None,
+        timeout: int = 60
+    ) -> Optional[Path]:
+        """
+        将文档转换为PDF（异步子进程，不阻塞事件循环）
+        
+        Args:
+            input_file: 输入文件路径
+            output_dir: 输出目录路径
+            profile_dir: LibreOffice用户配置目录；同时运行多个转换进程时各自使用独立目录，
+                避免争用默认配置目录的锁，固定目录在首次启动后可重复使用
+            timeout: 转换超时时间（秒）
+        
+        Returns:
+            PDF文件路径，如果转换失败返回None
+        """
+        if not input_file.exists():
+            logger.error(f"输入文件不存在: {input_file}")
+            return None
+        
+        output_dir.mkdir(parents=True, exist_ok=True)
+        input_file_abs = input_file.resolve()
+        output_dir_abs = output_dir.resolve()
+        
+        cmd = [self.libreoffice_path]
+        if profile_dir is not None:
+            profile_dir.mkdir(parents=True, exist_ok=True)
+            cmd.append(f"-env:UserInstallation={profile_dir.resolve().as_uri()}")
+        cmd += [
+            "--headless",
+            "--norestore",
+            "--convert-to", "pdf",
+            "--outdir", str(output_dir_abs),
+            str(input_file_abs)
+        ]
+        
+        logger.info(f"开始转换文档: {input_file_abs} -> PDF")
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+        except Exception as e:
+            logger.error(f"启动LibreOffice失败: {e}")
+            return None
+        
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            logger.error(f"转换超时（{timeout}秒）: {input_file}")
+            return None
+        
+        if process.returncode != 0:
+            logger.error(f"LibreOffice转换失败，返回码: {process.returncode}")
+            logger.error(f"标准输出: {stdout.decode(errors='ignore')}")
+            logger.error(f"标准错误: {stderr.decode(errors='ignore')}")
+            return None
+        
+        pdf_file = output_dir_abs / f"{input_file.stem}.pdf"
+        if pdf_file.exists():
+            logger.info(f"PDF转换成功: {pdf_file}")
+            return pdf_file
+        logger.error(f"PDF文件未生成: {pdf_file}")
+        return None
+    
     def is_supported_format(self, file_path: Path) -> bool:
         """
         检查文件格式是否支持转换
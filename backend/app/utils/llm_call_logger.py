@@ -1,17 +1,127 @@
 """
 LLM调用记录工具
-提供统一的LLM调用记录功能，自动记录执行时长
+提供统一的LLM调用记录功能，自动记录执行时长，日志由后台任务批量写入
 """
 import time
 import logging
 from contextlib import asynccontextmanager
-from typing import Optional
+from datetime import datetime
+from typing import Any, Dict, List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import text
+from sqlalchemy import insert, text
+from app.db.session import AsyncSessionLocal
 from app.models.llm_call_log import LLMCallLog
+from app.utils.batch_writer import BatchWriter
 
 logger = logging.getLogger(__name__)
 
+# 流式生成被客户端中途断开时记录的错误信息
+STREAM_CANCELLED_MESSAGE = "客户端断开连接，生成被中止"
+
+
+class LLMCallLogWriter(BatchWriter):
+    """LLM调用记录的后台批量写入器，参数见 BatchWriter"""
+
+    def __init__(self, **kwargs):
+        super().__init__("LLM调用日志", **kwargs)
+
+    async def _check_ready(self) -> bool:
+        try:
+            async with AsyncSessionLocal() as session:
+                await session.execute(text("SELECT 1 FROM llm_call_log LIMIT 1"))
+            return True
+        except Exception as e:
+            logger.warning(f"llm_call_log表不存在或检查失败，LLM调用日志不会写入: {e}")
+            return False
+
+    async def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        """多行INSERT写入一批记录；整批失败时逐条重试，跳过有问题的记录"""
+        if not batch:
+            return
+        try:
+            async with AsyncSessionLocal() as session:
+                await session.execute(insert(LLMCallLog).values(batch))
+                await session.commit()
+            self.written += len(batch)
+            return
+        except Exception as e:
+            logger.warning(f"批量写入LLM调用日志失败，改为逐条写入: {str(e)}")
+
+        for record in batch:
+            try:
+                async with AsyncSessionLocal() as session:
+                    await session.execute(insert(LLMCallLog).values(record))
+                    await session.commit()
+                self.written += 1
+            except Exception as e:
+                self.failed += 1
+                logger.warning(f"写入LLM调用日志失败: {str(e)}")
+
+
+# 创建全局写入器实例
+llm_call_log_writer = LLMCallLogWriter()
+
+
+async def enqueue_llm_call_log(
+    function_type: str,
+    user_id: int,
+    user_role: str,
+    llm_config_id: Optional[int],
+    prompt: str,
+    result: Optional[str] = None,
+    execution_time_ms: Optional[int] = None,
+    status: str = 'success',
+    error_message: Optional[str] = None,
+    related_id: Optional[int] = None,
+    related_type: Optional[str] = None,
+) -> None:
+    """
+    异步记录一次LLM调用（进入写入队列，由后台任务批量写入）
+
+    适用于已经知道执行时长的场景
+    """
+    await llm_call_log_writer.enqueue({
+        "function_type": function_type,
+        "user_id": user_id,
+        "user_role": user_role,
+        "llm_config_id": llm_config_id,
+        "prompt": prompt,
+        "result": result,
+        "execution_time_ms": execution_time_ms,
+        "status": status,
+        "error_message": error_message,
+        "related_id": related_id,
+        "related_type": related_type,
+        "created_at": datetime.utcnow(),
+    })
+
+
+class LogContext:
+    """log_llm_call 产出的上下文对象，用于设置调用结果"""
+
+    def __init__(self, start_time: float):
+        self.start_time = start_time
+        self.result: Optional[str] = None
+        self.status = 'success'
+        self.error_message: Optional[str] = None
+        self.execution_time_ms: Optional[int] = None
+        self.is_set = False
+        # 结果来自响应缓存（由 cached_chat 设置），成功时记录为 cached
+        self.cache_hit = False
+
+    def set_result(
+        self,
+        result: Optional[str] = None,
+        status: str = 'success',
+        error_message: Optional[str] = None
+    ):
+        """设置调用结果"""
+        self.result = result
+        self.status = 'cached' if status == 'success' and self.cache_hit else status
+        self.error_message = error_message
+        self.execution_time_ms = int((time.perf_counter() - self.start_time) * 1000)
+        self.is_set = True
+
 
 @asynccontextmanager
 async def log_llm_call(
@@ -26,12 +136,12 @@ async def log_llm_call(
 ):
     """
     LLM调用记录上下文管理器
-    
+
     用法：
     async with log_llm_call(db, function_type, user_id, user_role, llm_config_id, prompt) as log_context:
         result = await call_llm_api(...)
         log_context.set_result(result)
-    
+
     或者：
     async with log_llm_call(...) as log_context:
         try:
@@ -39,99 +149,40 @@ async def log_llm_call(
             log_context.set_result(result, status='success')
         except Exception as e:
             log_context.set_result(None, status='failed', error_message=str(e))
+
+    db参数保留以兼容调用方，日志写入不使用请求的数据库会话。
+    未调用set_result而抛出异常时，记录为失败。
     """
-    start_time = time.perf_counter()
-    log_entry = None
-    
-    # 检查表是否存在
-    table_exists = False
-    try:
-        result = await db.execute(text("SELECT 1 FROM llm_call_log LIMIT 1"))
-        table_exists = True
-    except Exception as check_err:
-        # 表不存在，跳过日志记录
-        logger.debug(f"llm_call_log表不存在或检查失败，跳过日志记录: {check_err}")
-        table_exists = False
-    
-    if not table_exists:
-        # 如果表不存在，创建一个空的上下文管理器
-        class EmptyLogContext:
-            def set_result(self, result=None, status='success', error_message=None):
-                pass
-        
-        yield EmptyLogContext()
-        return
-    
+    log_context = LogContext(time.perf_counter())
     try:
-        # 创建日志记录对象（先不保存）
-        log_entry = LLMCallLog(
-            function_type=function_type,
-            user_id=user_id if user_id else 0,  # 如果user_id为None，使用0
-            user_role=user_role,
-            llm_config_id=llm_config_id,
-            prompt=prompt,
-            related_id=related_id,
-            related_type=related_type,
-            status='success',  # 默认成功，如果出错会在except中修改
-        )
-        
-        # 创建上下文对象
-        class LogContext:
-            def __init__(self, log_entry: Optional[LLMCallLog], start_time: float):
-                self.log_entry = log_entry
-                self.start_time = start_time
-            
-            def set_result(
-                self,
-                result: Optional[str] = None,
-                status: str = 'success',
-                error_message: Optional[str] = None
-            ):
-                """设置调用结果"""
-                if self.log_entry:
-                    execution_time_ms = int((time.perf_counter() - self.start_time) * 1000)
-                    self.log_entry.result = result
-                    self.log_entry.status = status
-                    self.log_entry.execution_time_ms = execution_time_ms
-                    if error_message:
-                        self.log_entry.error_message = error_message
-        
-        log_context = LogContext(log_entry, start_time)
-        
         yield log_context
-        
-        # 如果log_entry存在，处理结果
-        if log_entry:
-            # 如果调用成功但没有设置结果，尝试获取
-            if log_entry.status == 'success' and log_entry.result is None:
-                # 这种情况不应该发生，但为了安全起见
-                log_entry.result = ""
-            
-            # 计算执行时长
-            if log_entry.execution_time_ms is None:
-                log_entry.execution_time_ms = int((time.perf_counter() - start_time) * 1000)
-        
     except Exception as e:
-        # 如果记录过程中出错，记录错误但不影响主流程
-        logger.warning(f"记录LLM调用日志失败（可能表不存在），继续执行: {str(e)}")
-        log_entry = None  # 设置为None，避免后续保存
+        if not log_context.is_set:
+            log_context.set_result(None, status='failed', error_message=str(e))
+        raise
     finally:
-        # 保存日志记录（如果log_entry存在）
-        if log_entry:
-            try:
-                # 检查数据库会话是否仍然有效
-                if db.is_active:
-                    db.add(log_entry)
-                    await db.commit()
-                    await db.refresh(log_entry)
-            except Exception as e:
-                # 如果保存失败（可能是表不存在或会话已关闭），记录警告但不抛出异常
-                logger.warning(f"保存LLM调用日志失败（可能表不存在或会话已关闭）: {str(e)}")
-                try:
-                    if db.is_active:
-                        await db.rollback()
-                except:
-                    pass
+        try:
+            await enqueue_llm_call_log(
+                function_type=function_type,
+                user_id=user_id if user_id else 0,  # 如果user_id为None，使用0
+                user_role=user_role,
+                llm_config_id=llm_config_id,
+                prompt=prompt,
+                # 调用成功但没有设置结果时记录为空字符串
+                result=log_context.result if log_context.result is not None or log_context.status != 'success' else "",
+                execution_time_ms=(
+                    log_context.execution_time_ms
+                    if log_context.execution_time_ms is not None
+                    else int((time.perf_counter() - log_context.start_time) * 1000)
+                ),
+                status=log_context.status,
+                error_message=log_context.error_message,
+                related_id=related_id,
+                related_type=related_type,
+            )
+        except Exception as e:
+            # 记录日志失败不影响主流程
+            logger.warning(f"记录LLM调用日志失败，继续执行: {str(e)}")
 
 
 async def create_llm_call_log(
@@ -150,8 +201,9 @@ async def create_llm_call_log(
 ) -> LLMCallLog:
     """
     直接创建LLM调用记录（不使用上下文管理器）
-    
-    适用于已经知道执行时长的场景
+
+    在给定会话中同步写入并返回记录，需要记录ID时使用；
+    一般场景请使用 enqueue_llm_call_log
     """
     log_entry = LLMCallLog(
         function_type=function_type,
@@ -166,7 +218,7 @@ async def create_llm_call_log(
         related_id=related_id,
         related_type=related_type,
     )
-    
+
     try:
         db.add(log_entry)
         await db.commit()
@@ -19,6 +19,61 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# 分片上传的分片大小（OSS要求除最后一片外不小于100KB）
+OSS_PART_SIZE = 5 * 1024 * 1024
+
+
+class OSSMultipartUpload:
+    """
+    OSS分片上传（同步，调用方在线程中执行）
+    数据累积到 OSS_PART_SIZE 后上传一个分片；总大小不足一个分片时在 complete 中直接 put_object
+    """
+    
+    def __init__(self, client: "OSSClient", object_key: str, content_type: Optional[str] = None):
+        self.client = client
+        self.object_key = object_key
+        self.headers = {'Content-Type': content_type} if content_type else {}
+        self.upload_id: Optional[str] = None
+        self.parts = []
+        self._buffer = bytearray()
+    
+    def write(self, data: bytes) -> None:
+        self._buffer.extend(data)
+        while len(self._buffer) >= OSS_PART_SIZE:
+            part = bytes(self._buffer[:OSS_PART_SIZE])
+            del self._buffer[:OSS_PART_SIZE]
+            self._upload_part(part)
+    
+    def _upload_part(self, data: bytes) -> None:
+        bucket = self.client.bucket
+        if self.upload_id is None:
+            self.upload_id = bucket.init_multipart_upload(self.object_key, headers=self.headers).upload_id
+        part_number = len(self.parts) + 1
+        result = bucket.upload_part(self.object_key, self.upload_id, part_number, data)
+        self.parts.append(oss2.models.PartInfo(part_number, result.etag))
+    
+    def complete(self) -> str:
+        """上传剩余数据并完成上传，返回对象URL"""
+        if self.upload_id is None:
+            self.client.bucket.put_object(self.object_key, bytes(self._buffer), headers=self.headers)
+        else:
+            if self._buffer:
+                self._upload_part(bytes(self._buffer))
+            self.client.bucket.complete_multipart_upload(self.object_key, self.upload_id, self.parts)
+        self._buffer = bytearray()
+        return self.client.object_url(self.object_key)
+    
+    def abort(self) -> None:
+        """取消上传，清理已上传的分片"""
+        self._buffer = bytearray()
+        if self.upload_id is not None:
+            try:
+                self.client.bucket.abort_multipart_upload(self.object_key, self.upload_id)
+            except Exception as e:
+                logger.warning(f"取消OSS分片上传失败: {e}")
+            self.upload_id = None
+
+
 class OSSClient:
     """OSS客户端封装类"""
     
@@ -77,8 +132,10 @@ class OSSClient:
             headers['Content-Type'] = content_type
         
         self.bucket.put_object(object_key, file_content, headers=headers)
-        
-        # 返回文件URL
+        return self.object_url(object_key)
+    
+    def object_url(self, object_key: str) -> str:
+        """上传后保存到数据库的对象URL（相对路径或完整URL）"""
         if settings.OSS_USE_CNAME and settings.OSS_ENDPOINT:
             # 如果ENDPOINT是主域名(smarteduonline.cn)，返回相对路径以使用Next.js代理
             # 如果是OSS子域名(oss.smarteduonline.cn)，返回完整URL
@@ -92,6 +149,12 @@ class OSSClient:
             # 使用OSS默认域名
             return f"https://{settings.OSS_BUCKET_NAME}.oss-{settings.OSS_REGION}.aliyuncs.com/{object_key}"
     
+    def multipart_upload(self, object_key: str, content_type: Optional[str] = None) -> "OSSMultipartUpload":
+        """创建分片上传（逐块写入，内存中最多缓存一个分片）"""
+        if not self.enabled:
+            raise Exception("OSS未配置，请设置OSS_ACCESS_KEY_ID和OSS_ACCESS_KEY_SECRET")
+        return OSSMultipartUpload(self, object_key, content_type)
+    
     def generate_weboffice_preview_url(
         self, 
         object_key: str, 
@@ -0,0 +1,27 @@
+"""
+游标分页工具
+按 (时间, id) 倒序分页的游标编码和解析
+"""
+import base64
+from datetime import datetime
+from typing import Tuple
+
+
+class InvalidCursorError(ValueError):
+    """分页游标格式错误"""
+
+
+def encode_cursor(sort_value: datetime, row_id: int) -> str:
+    """根据一页最后一行的 (时间, id) 生成下一页的游标"""
+    raw = f"{sort_value.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """解析分页游标，返回 (时间, id)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        sort_value, row_id = raw.split("|")
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except (ValueError, UnicodeError) as e:
+        raise InvalidCursorError(f"无效的分页游标: {cursor}") from e
@@ -4,6 +4,8 @@ from pathlib import Path
 from typing import Optional
 import io
 
+from app.utils.extraction_executor import extraction_executor
+
 logger = logging.getLogger(__name__)
 
 class PDFExtractor:
@@ -80,6 +82,25 @@ class PDFExtractor:
             logger.error(f"提取PDF文本失败: {e}")
             return None
     
+    async def extract_text_async(self, pdf_path: Path, max_pages: Optional[int] = None) -> Optional[str]:
+        """在提取进程池中提取PDF文本（接口中使用，不阻塞事件循环），失败返回None"""
+        if not pdf_path.exists():
+            logger.error(f"PDF文件不存在: {pdf_path}")
+            return None
+        return await self._extract_in_pool(str(pdf_path), max_pages)
+    
+    async def extract_text_from_bytes_async(self, pdf_bytes: bytes, max_pages: Optional[int] = None) -> Optional[str]:
+        """在提取进程池中从PDF字节数据提取文本（接口中使用，不阻塞事件循环），失败返回None"""
+        return await self._extract_in_pool(pdf_bytes, max_pages)
+    
+    async def _extract_in_pool(self, source, max_pages: Optional[int]) -> Optional[str]:
+        try:
+            pages = await extraction_executor.extract_pdf_pages(source, max_pages)
+            return "\n\n".join(text for text in pages if text)
+        except Exception as e:
+            logger.error(f"提取PDF文本失败: {e}")
+            return None
+    
     def _extract_with_pdfplumber(self, pdf_path: Path, max_pages: Optional[int] = None) -> str:
         """使用pdfplumber提取文本"""
         import pdfplumber
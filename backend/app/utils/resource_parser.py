@@ -2,78 +2,127 @@
 教学资源文件解析工具
 支持从OSS下载并解析PDF、Word、PPT等文件格式
 """
+import asyncio
 import os
 import tempfile
 import logging
-from typing import Optional
+from typing import Optional, Tuple
 from app.models.teaching_resource import TeachingResource
 from app.utils.oss_client import oss_client
+from app.utils.extraction_executor import ExtractionError, extraction_executor
 
 logger = logging.getLogger(__name__)
 
 # 文本长度限制
 MAX_TEXT_LENGTH = 20000
 
+# 可提取文本的解析类型（上传后预提取只处理这些类型）
+TEXT_RESOURCE_TYPES = ('pdf', 'word', 'ppt', 'markdown', 'text')
 
-async def download_and_parse_resource(resource: TeachingResource) -> str:
+
+def resource_text_source(resource: TeachingResource) -> Tuple[str, str, Optional[str]]:
     """
-    从OSS下载资源并解析文本内容
-    
-    Args:
-        resource: 教学资源对象
-        
+    确定用于提取文本的文件：优先使用已转换的PDF版本
+
     Returns:
-        str: 解析后的文本内容
+        (存储路径, 解析类型, 本地文件路径)
     """
+    if resource.pdf_path and resource.pdf_conversion_status == 'success':
+        return resource.pdf_path, 'pdf', resource.pdf_local_path
+    return resource.file_path, resource.resource_type, resource.local_file_path
+
+
+def read_resource_file(resource: TeachingResource) -> Tuple[bytes, str]:
+    """
+    读取资源文件内容（同步）：本地文件存在时直接读取，否则从OSS下载
+
+    Returns:
+        (文件内容, 解析类型)
+    """
+    download_path, resource_type, local_path = resource_text_source(resource)
+    if local_path and os.path.exists(local_path):
+        with open(local_path, 'rb') as f:
+            return f.read(), resource_type
+
+    logger.info(f"开始下载资源: {resource.id}, 类型: {resource.resource_type}")
+    if not oss_client.enabled:
+        raise Exception("OSS未配置，无法下载文件")
     try:
-        # 1. 创建临时文件
-        suffix = get_file_suffix(resource.resource_type, resource.original_filename)
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-        temp_path = temp_file.name
+        # 使用oss2的get_object方法下载文件
+        result = oss_client.bucket.get_object(download_path)
+        content = result.read()
+        logger.info(f"文件下载成功: {download_path}")
+        return content, resource_type
+    except Exception as e:
+        raise Exception(f"从OSS下载文件失败: {download_path}, 错误: {str(e)}")
+
+
+def truncate_text(text_content: str) -> str:
+    """超过 MAX_TEXT_LENGTH 时截取"""
+    if len(text_content) > MAX_TEXT_LENGTH:
+        logger.info(f"文本内容过长({len(text_content)}字符)，截取前{MAX_TEXT_LENGTH}字符")
+        text_content = text_content[:MAX_TEXT_LENGTH] + "\n\n...(内容过长，已截取)"
+    return text_content
+
+
+def parse_resource_content(content: bytes, resource_type: str, original_filename: Optional[str] = None) -> str:
+    """
+    解析文件内容为文本（同步，在提取进程池中执行），超过 MAX_TEXT_LENGTH 时截取
+    """
+    # 1. 写入临时文件
+    suffix = get_file_suffix(resource_type, original_filename)
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+    temp_path = temp_file.name
+    try:
+        temp_file.write(content)
         temp_file.close()
-        
-        # 2. 从OSS下载文件
-        logger.info(f"开始下载资源: {resource.id}, 类型: {resource.resource_type}")
-        
-        # 优先使用PDF版本（如果已转换）
-        if resource.pdf_path and resource.pdf_conversion_status == 'success':
-            download_path = resource.pdf_path
-            resource_type = 'pdf'
-        else:
-            download_path = resource.file_path
-            resource_type = resource.resource_type
-        
-        # 下载文件
-        if not oss_client.enabled:
-            raise Exception("OSS未配置，无法下载文件")
-        
-        try:
-            # 使用oss2的get_object方法下载文件
-            result = oss_client.bucket.get_object(download_path)
-            # 将内容写入临时文件
-            with open(temp_path, 'wb') as f:
-                f.write(result.read())
-            logger.info(f"文件下载成功: {temp_path}")
-        except Exception as e:
-            raise Exception(f"从OSS下载文件失败: {download_path}, 错误: {str(e)}")
-        
-        # 3. 根据类型解析文件
+
+        # 2. 根据类型解析文件
         text_content = parse_file_by_type(temp_path, resource_type)
-        
-        # 4. 删除临时文件
+    finally:
+        temp_file.close()
+        # 3. 删除临时文件
         try:
             os.unlink(temp_path)
-            logger.info(f"临时文件已删除: {temp_path}")
         except Exception as e:
             logger.warning(f"删除临时文件失败: {e}")
-        
-        # 5. 限制文本长度
-        if len(text_content) > MAX_TEXT_LENGTH:
-            logger.info(f"文本内容过长({len(text_content)}字符)，截取前{MAX_TEXT_LENGTH}字符")
-            text_content = text_content[:MAX_TEXT_LENGTH] + "\n\n...(内容过长，已截取)"
-        
-        return text_content
+
+    # 4. 限制文本长度
+    return truncate_text(text_content)
+
+
+async def extract_resource_text(content: bytes, resource_type: str, original_filename: Optional[str] = None) -> str:
+    """
+    在提取进程池中解析文件内容，PDF按页并行提取
+    进程池繁忙或超时时抛出 ExtractionError
+    """
+    if resource_type != 'pdf':
+        return await extraction_executor.run(parse_resource_content, content, resource_type, original_filename)
+
+    try:
+        pages = await extraction_executor.extract_pdf_pages(content)
+    except ExtractionError:
+        raise
+    except Exception as e:
+        logger.error(f"PDF解析失败: {e}")
+        return f"[PDF解析失败: {str(e)}]"
+    text_parts = [f"=== 第{i+1}页 ===\n{page_text}\n" for i, page_text in enumerate(pages) if page_text.strip()]
+    return truncate_text("\n".join(text_parts))
+
+
+async def download_and_parse_resource(resource: TeachingResource) -> str:
+    """
+    下载资源并解析文本内容（不经过缓存，接口应使用 resource_text_store.get_text(db, resource)）
     
+    Args:
+        resource: 教学资源对象
+        
+    Returns:
+        str: 解析后的文本内容
+    """
+    try:
+        content, resource_type = await asyncio.to_thread(read_resource_file, resource)
+        return await extract_resource_text(content, resource_type, resource.original_filename)
     except Exception as e:
         logger.error(f"解析资源文件失败: {e}")
         raise Exception(f"解析资源文件失败: {str(e)}")
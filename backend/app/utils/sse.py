@@ -0,0 +1,37 @@
+"""
+Server-Sent Events 工具
+用于把流式生成的内容推送给浏览器
+"""
+import json
+from typing import Any, AsyncIterator, Optional
+
+from fastapi.responses import StreamingResponse
+
+# 禁止中间代理（nginx）缓冲，保证事件即时到达浏览器
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+}
+
+
+def format_sse(data: Any, event: Optional[str] = None) -> str:
+    """
+    格式化一条SSE事件
+
+    Args:
+        data: 事件数据，会被序列化为JSON（保留中文字符）
+        event: 事件名称（可选）
+    """
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    lines = []
+    if event:
+        lines.append(f"event: {event}")
+    for line in payload.splitlines() or [""]:
+        lines.append(f"data: {line}")
+    return "\n".join(lines) + "\n\n"
+
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    """把已格式化的SSE事件流包装为HTTP响应"""
+    return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
@@ -0,0 +1,140 @@
+"""
+流式导出
+按批读取记录并以CSV或XLSX流式返回
+"""
+import asyncio
+import codecs
+import csv
+import io
+import os
+import tempfile
+from datetime import datetime
+from typing import Any, AsyncIterator, List, Sequence
+from urllib.parse import quote
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy.sql import Select
+
+from app.db.session import AsyncSessionLocal
+
+try:
+    from openpyxl import Workbook
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+except ImportError:
+    Workbook = None
+    ILLEGAL_CHARACTERS_RE = None
+
+# 每批从数据库读取和写入的行数
+EXPORT_BATCH_SIZE = 500
+
+# 读取生成的xlsx文件时每次发送的块大小
+EXPORT_CHUNK_SIZE = 256 * 1024
+
+EXPORT_MEDIA_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+async def stream_rows(statement: Select, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[Any]:
+    """通过服务端游标逐行读取查询结果（每次从数据库取 batch_size 行）"""
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(statement.execution_options(yield_per=batch_size))
+        async for partition in result.partitions():
+            for row in partition:
+                yield row
+
+
+async def batched(rows: AsyncIterator[Sequence[Any]], size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[List[Sequence[Any]]]:
+    """把逐行的异步迭代器按 size 分批"""
+    batch = []
+    async for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _cell_value(value: Any) -> Any:
+    """去掉xlsx不允许的控制字符"""
+    if isinstance(value, str) and ILLEGAL_CHARACTERS_RE is not None:
+        return ILLEGAL_CHARACTERS_RE.sub("", value)
+    return value
+
+
+async def csv_chunks(headers: Sequence[str], rows: AsyncIterator[Sequence[Any]]) -> AsyncIterator[bytes]:
+    """逐批生成CSV内容（带BOM，Excel可直接打开中文）"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+    yield codecs.BOM_UTF8 + buffer.getvalue().encode("utf-8")
+    async for batch in batched(rows):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(batch)
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def xlsx_chunks(sheet_name: str, headers: Sequence[str], rows: AsyncIterator[Sequence[Any]]) -> AsyncIterator[bytes]:
+    """以只写模式生成xlsx，写完后分块返回文件内容"""
+    if Workbook is None:
+        raise RuntimeError("缺少openpyxl库，无法导出Excel")
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_name)
+    sheet.append(list(headers))
+
+    def append_batch(batch: List[Sequence[Any]]) -> None:
+        for row in batch:
+            sheet.append([_cell_value(value) for value in row])
+
+    async for batch in batched(rows):
+        await asyncio.to_thread(append_batch, batch)
+
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        await asyncio.to_thread(workbook.save, path)
+        with open(path, "rb") as f:
+            while True:
+                chunk = await asyncio.to_thread(f.read, EXPORT_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.unlink(path)
+
+
+def export_response(
+    filename_prefix: str,
+    sheet_name: str,
+    headers: Sequence[str],
+    rows: AsyncIterator[Sequence[Any]],
+    export_format: str = "xlsx"
+) -> StreamingResponse:
+    """
+    流式导出响应
+
+    Args:
+        filename_prefix: 下载文件名前缀（会追加时间戳和扩展名）
+        sheet_name: xlsx工作表名称
+        headers: 表头
+        rows: 逐行产生数据的异步迭代器
+        export_format: xlsx 或 csv
+    """
+    if export_format not in EXPORT_MEDIA_TYPES:
+        raise ValueError(f"不支持的导出格式: {export_format}")
+    if export_format == "csv":
+        chunks = csv_chunks(headers, rows)
+    else:
+        chunks = xlsx_chunks(sheet_name, headers, rows)
+    filename = f"{filename_prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}",
+            "X-Accel-Buffering": "no",
+        }
+    )
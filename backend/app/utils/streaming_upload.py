@@ -0,0 +1,120 @@
+"""
+上传文件流式保存
+按块把上传文件写入本地或OSS，同时计算大小和SHA-256
+"""
+import asyncio
+import hashlib
+import logging
+from pathlib import Path
+from typing import Optional
+
+from fastapi import UploadFile
+
+from app.utils.oss_client import OSSMultipartUpload, oss_client
+
+logger = logging.getLogger(__name__)
+
+# 每次从上传文件读取的块大小
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLargeError(Exception):
+    """上传文件超过大小限制"""
+
+    def __init__(self, max_size: int):
+        super().__init__(f"文件大小超过限制（最大{max_size // (1024 * 1024)}MB）")
+        self.max_size = max_size
+
+
+class StoredUpload:
+    """流式保存的结果"""
+
+    def __init__(self, size: int, sha256: str, local_path: Optional[Path], oss_url: Optional[str]):
+        self.size = size
+        self.sha256 = sha256
+        self.local_path = local_path  # 未写本地时为None
+        self.oss_url = oss_url  # 未上传OSS或OSS上传失败时为None
+
+
+def upload_size(file: UploadFile) -> int:
+    """上传文件的大小（请求体已由框架暂存，不需要读取内容）"""
+    if file.size is not None:
+        return file.size
+    file.file.seek(0, 2)
+    size = file.file.tell()
+    file.file.seek(0)
+    return size
+
+
+async def stream_upload(
+    file: UploadFile,
+    local_path: Optional[Path] = None,
+    oss_key: Optional[str] = None,
+    content_type: Optional[str] = None,
+    max_size: Optional[int] = None
+) -> StoredUpload:
+    """
+    流式保存上传文件
+
+    Args:
+        file: 上传文件
+        local_path: 本地保存路径（None表示不写本地）
+        oss_key: OSS对象键（None或OSS未启用时不上传）
+        content_type: OSS对象的MIME类型
+        max_size: 大小上限，超出时抛出 UploadTooLargeError 并清理已写入的内容
+
+    OSS上传失败只记录日志（结果中 oss_url 为None），由调用方决定是否回退到本地；
+    本地写入失败时抛出异常。可对同一个 UploadFile 多次调用（每次从头读取）。
+    """
+    await file.seek(0)
+    hasher = hashlib.sha256()
+    size = 0
+    local_file = None
+    multipart: Optional[OSSMultipartUpload] = None
+    oss_url = None
+
+    def write_local(chunk: bytes) -> None:
+        hasher.update(chunk)
+        if local_file is not None:
+            local_file.write(chunk)
+
+    try:
+        if local_path is not None:
+            local_path.parent.mkdir(parents=True, exist_ok=True)
+            local_file = await asyncio.to_thread(open, local_path, "wb")
+        if oss_key and oss_client.enabled:
+            multipart = oss_client.multipart_upload(oss_key, content_type=content_type)
+
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if max_size is not None and size > max_size:
+                raise UploadTooLargeError(max_size)
+            await asyncio.to_thread(write_local, chunk)
+            if multipart is not None:
+                try:
+                    await asyncio.to_thread(multipart.write, chunk)
+                except Exception as e:
+                    logger.error(f"上传到OSS失败: {oss_key}, {e}")
+                    await asyncio.to_thread(multipart.abort)
+                    multipart = None
+
+        if multipart is not None:
+            try:
+                oss_url = await asyncio.to_thread(multipart.complete)
+            except Exception as e:
+                logger.error(f"上传到OSS失败: {oss_key}, {e}")
+                await asyncio.to_thread(multipart.abort)
+        if local_file is not None:
+            await asyncio.to_thread(local_file.close)
+    except BaseException:
+        if multipart is not None:
+            await asyncio.to_thread(multipart.abort)
+        if local_file is not None:
+            local_file.close()
+            local_path.unlink(missing_ok=True)
+        raise
+
+    return StoredUpload(size, hasher.hexdigest(), local_path, oss_url)
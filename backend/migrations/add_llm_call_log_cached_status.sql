@@ -0,0 +1,9 @@
+-- LLM调用记录：缓存命中状态
+-- 命中LLM响应缓存的调用不再记为 success，改为 cached，调用次数和模型花费统计可以排除缓存命中
+-- 日期: 2026-10-18
+
+ALTER TABLE llm_call_log DROP CONSTRAINT IF EXISTS llm_call_log_status_check;
+ALTER TABLE llm_call_log DROP CONSTRAINT IF EXISTS check_status;
+ALTER TABLE llm_call_log ADD CONSTRAINT check_status CHECK (status IN ('success', 'failed', 'cached'));
+
+COMMENT ON COLUMN llm_call_log.status IS '调用状态：success/failed/cached（命中响应缓存，没有调用模型）';
@@ -0,0 +1,15 @@
+-- 题库列表分页索引
+-- 题目列表按 (updated_at, id) 倒序读取，游标分页从索引位置继续扫描，不再随页码增加而变慢；
+-- 选项按题目批量加载，需要 question_option.question_id 上的索引
+-- 日期: 2026-10-18
+
+-- 游标比较要求 updated_at 非空，历史数据用创建时间补齐
+UPDATE question
+SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP)
+WHERE updated_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_question_teacher_active_updated
+    ON question (teacher_id, is_active, updated_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_question_option_question_id
+    ON question_option (question_id, sort_order);
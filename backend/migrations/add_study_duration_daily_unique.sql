@@ -0,0 +1,36 @@
+-- 学习时长日统计唯一键
+-- student_study_duration 按 (学生, 课程, 日期) 唯一，学习行为批量写入时用 INSERT ... ON CONFLICT 累加
+-- 日期: 2026-10-18
+
+BEGIN;
+
+-- 1. 合并同一天的重复记录（保留ID最小的一条，日期统一为当天零点）
+WITH merged AS (
+    SELECT MIN(id) AS keep_id,
+           date_trunc('day', study_date) AS study_day,
+           SUM(COALESCE(duration_minutes, 0)) AS total_minutes,
+           MAX(updated_at) AS last_updated_at
+    FROM student_study_duration
+    GROUP BY student_id, course_id, date_trunc('day', study_date)
+)
+UPDATE student_study_duration d
+SET study_date = m.study_day,
+    duration_minutes = m.total_minutes,
+    updated_at = m.last_updated_at
+FROM merged m
+WHERE d.id = m.keep_id;
+
+DELETE FROM student_study_duration
+WHERE id NOT IN (
+    SELECT MIN(id)
+    FROM student_study_duration
+    GROUP BY student_id, course_id, date_trunc('day', study_date)
+);
+
+-- 2. 唯一键
+ALTER TABLE student_study_duration
+    ADD CONSTRAINT uq_study_duration_student_course_day UNIQUE (student_id, course_id, study_date);
+
+COMMIT;
+
+COMMENT ON COLUMN student_study_duration.study_date IS '学习日期（当天零点）';
@@ -0,0 +1,66 @@
+-- 教师问答收件箱
+-- 教师问答列表原来把发送给教师的全部消息读入内存再分组统计，随学期推进越来越慢：
+-- 收件箱表按（教师, 会话）维护消息数、未读数和最新消息，列表按最新消息时间游标分页读取；
+-- teacher_ids 上的GIN索引用于按教师查找收到的消息
+-- 日期: 2026-10-18
+
+CREATE INDEX IF NOT EXISTS idx_qa_message_teacher_ids
+    ON course_qa_message USING GIN (teacher_ids);
+
+CREATE TABLE IF NOT EXISTS course_qa_teacher_inbox (
+    id SERIAL PRIMARY KEY,
+    teacher_id INTEGER NOT NULL REFERENCES sys_user(id) ON DELETE CASCADE,
+    session_id INTEGER NOT NULL REFERENCES course_qa_session(id) ON DELETE CASCADE,
+    course_id INTEGER NOT NULL REFERENCES course(id) ON DELETE CASCADE,
+    student_id INTEGER NOT NULL REFERENCES sys_user(id) ON DELETE CASCADE,
+    latest_message_id INTEGER REFERENCES course_qa_message(id) ON DELETE SET NULL,
+    latest_message_at TIMESTAMP NOT NULL,  -- 最新消息时间（游标分页排序字段）
+    total_messages INTEGER NOT NULL DEFAULT 0,  -- 发送给该教师的消息数
+    unread_count INTEGER NOT NULL DEFAULT 0,  -- 其中未读的消息数
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_qa_inbox_teacher_session UNIQUE (teacher_id, session_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_qa_inbox_teacher_latest
+    ON course_qa_teacher_inbox (teacher_id, latest_message_at DESC, session_id DESC);
+
+COMMENT ON TABLE course_qa_teacher_inbox IS '教师问答收件箱表（每个教师、会话一行）';
+COMMENT ON COLUMN course_qa_teacher_inbox.latest_message_id IS '发送给该教师的最新消息ID';
+COMMENT ON COLUMN course_qa_teacher_inbox.total_messages IS '发送给该教师的消息数';
+COMMENT ON COLUMN course_qa_teacher_inbox.unread_count IS '其中未读的消息数';
+
+-- 用已有消息回填收件箱
+WITH sent AS (
+    SELECT DISTINCT t.teacher_id, m.session_id, m.id, m.created_at, m.is_read
+    FROM course_qa_message m
+    CROSS JOIN LATERAL unnest(m.teacher_ids) AS t(teacher_id)
+    WHERE m.is_sent_to_teacher = TRUE
+),
+latest AS (
+    SELECT DISTINCT ON (teacher_id, session_id) teacher_id, session_id, id, created_at
+    FROM sent
+    ORDER BY teacher_id, session_id, created_at DESC NULLS LAST, id DESC
+),
+counts AS (
+    SELECT teacher_id, session_id,
+           COUNT(*) AS total_messages,
+           COUNT(*) FILTER (WHERE NOT COALESCE(is_read, FALSE)) AS unread_count
+    FROM sent
+    GROUP BY teacher_id, session_id
+)
+INSERT INTO course_qa_teacher_inbox (
+    teacher_id, session_id, course_id, student_id,
+    latest_message_id, latest_message_at, total_messages, unread_count, updated_at
+)
+SELECT c.teacher_id, c.session_id, s.course_id, s.student_id,
+       l.id, COALESCE(l.created_at, s.created_at, CURRENT_TIMESTAMP), c.total_messages, c.unread_count, CURRENT_TIMESTAMP
+FROM counts c
+JOIN latest l ON l.teacher_id = c.teacher_id AND l.session_id = c.session_id
+JOIN course_qa_session s ON s.id = c.session_id
+JOIN sys_user u ON u.id = c.teacher_id
+ON CONFLICT (teacher_id, session_id) DO UPDATE SET
+    latest_message_id = EXCLUDED.latest_message_id,
+    latest_message_at = EXCLUDED.latest_message_at,
+    total_messages = EXCLUDED.total_messages,
+    unread_count = EXCLUDED.unread_count,
+    updated_at = EXCLUDED.updated_at;
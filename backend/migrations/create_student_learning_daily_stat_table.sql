@@ -0,0 +1,48 @@
+-- 学生学习行为日汇总表
+-- 按 (学生, 课程, 日期) 汇总 student_learning_behavior 的次数、时长和最后学习时间，
+-- 教师学情概览、学生首页和学习曲线读取本表，不再扫描原始行为记录；
+-- 写入学习行为时在同一事务中用 INSERT ... ON CONFLICT 增量累加
+-- 日期: 2026-10-18
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS student_learning_daily_stat (
+    id SERIAL PRIMARY KEY,
+    student_id INTEGER NOT NULL REFERENCES sys_user(id) ON DELETE CASCADE,
+    course_id INTEGER NOT NULL REFERENCES course(id) ON DELETE CASCADE,
+    stat_date DATE NOT NULL,
+    behavior_count INTEGER NOT NULL DEFAULT 0,
+    duration_seconds BIGINT NOT NULL DEFAULT 0,
+    last_activity_at TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_learning_daily_stat_student_course_day UNIQUE (student_id, course_id, stat_date)
+);
+
+CREATE INDEX IF NOT EXISTS idx_learning_daily_stat_course_date ON student_learning_daily_stat(course_id, stat_date);
+
+-- 回填历史数据；回填期间阻止新的学习行为写入，避免重复或遗漏
+LOCK TABLE student_learning_behavior IN SHARE MODE;
+
+DELETE FROM student_learning_daily_stat;
+
+INSERT INTO student_learning_daily_stat
+    (student_id, course_id, stat_date, behavior_count, duration_seconds, last_activity_at, updated_at)
+SELECT student_id,
+       course_id,
+       DATE(created_at),
+       COUNT(*),
+       COALESCE(SUM(duration_seconds), 0),
+       MAX(created_at),
+       CURRENT_TIMESTAMP
+FROM student_learning_behavior
+WHERE course_id IS NOT NULL
+  AND created_at IS NOT NULL
+GROUP BY student_id, course_id, DATE(created_at);
+
+COMMIT;
+
+COMMENT ON TABLE student_learning_daily_stat IS '学生学习行为日汇总表';
+COMMENT ON COLUMN student_learning_daily_stat.stat_date IS '统计日期（DATE(created_at)，UTC）';
+COMMENT ON COLUMN student_learning_daily_stat.behavior_count IS '学习行为次数';
+COMMENT ON COLUMN student_learning_daily_stat.duration_seconds IS '学习时长（秒）';
+COMMENT ON COLUMN student_learning_daily_stat.last_activity_at IS '当天最后一次学习行为时间';
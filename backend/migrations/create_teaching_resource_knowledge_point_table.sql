@@ -0,0 +1,29 @@
+-- 教学资源-知识点关联表
+-- 替代在 teaching_resource.knowledge_point 上的 ILIKE 模糊匹配，
+-- 知识图谱节点按名称与关联表做索引连接
+-- 日期: 2026-10-18
+
+CREATE TABLE IF NOT EXISTS teaching_resource_knowledge_point (
+    id SERIAL PRIMARY KEY,
+    resource_id INTEGER NOT NULL REFERENCES teaching_resource(id) ON DELETE CASCADE,
+    teacher_id INTEGER NOT NULL REFERENCES sys_user(id),
+    knowledge_point VARCHAR(255) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_resource_knowledge_point UNIQUE(resource_id, knowledge_point)
+);
+
+CREATE INDEX IF NOT EXISTS idx_resource_kp_teacher_point ON teaching_resource_knowledge_point(teacher_id, knowledge_point);
+
+COMMENT ON TABLE teaching_resource_knowledge_point IS '教学资源-知识点关联表';
+COMMENT ON COLUMN teaching_resource_knowledge_point.resource_id IS '教学资源ID';
+COMMENT ON COLUMN teaching_resource_knowledge_point.teacher_id IS '资源所属教师ID';
+COMMENT ON COLUMN teaching_resource_knowledge_point.knowledge_point IS '知识点名称（与knowledge_node.node_name对应）';
+
+-- 回填已有资源：knowledge_point 按中英文逗号、分号、顿号和换行拆分
+INSERT INTO teaching_resource_knowledge_point (resource_id, teacher_id, knowledge_point)
+SELECT DISTINCT r.id, r.teacher_id, LEFT(TRIM(kp), 255)
+FROM teaching_resource r
+CROSS JOIN LATERAL regexp_split_to_table(r.knowledge_point, E'[,，;；、\\n]+') AS kp
+WHERE r.knowledge_point IS NOT NULL
+  AND TRIM(kp) <> ''
+ON CONFLICT (resource_id, knowledge_point) DO NOTHING;
@@ -0,0 +1,21 @@
+-- 教学资源提取文本缓存表
+-- 个性化学习、AI测评等接口直接读取提取好的文本，不再每次从OSS下载并重新解析文件；
+-- 上传或转换PDF后预先提取，源文件路径变化时重新提取，内容相同的资源复用提取结果
+-- 日期: 2026-10-18
+
+CREATE TABLE IF NOT EXISTS teaching_resource_parsed_text (
+    id SERIAL PRIMARY KEY,
+    resource_id INTEGER NOT NULL UNIQUE REFERENCES teaching_resource(id) ON DELETE CASCADE,
+    source_path VARCHAR(500) NOT NULL,
+    content_hash VARCHAR(64) NOT NULL,
+    text_content TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_resource_parsed_text_hash ON teaching_resource_parsed_text(content_hash);
+
+COMMENT ON TABLE teaching_resource_parsed_text IS '教学资源提取文本缓存表';
+COMMENT ON COLUMN teaching_resource_parsed_text.source_path IS '提取文本所用文件的存储路径（原文件或PDF版本）';
+COMMENT ON COLUMN teaching_resource_parsed_text.content_hash IS '源文件内容SHA-256';
+COMMENT ON COLUMN teaching_resource_parsed_text.text_content IS '提取的文本（已按长度上限截取）';
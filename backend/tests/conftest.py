@@ -3,7 +3,7 @@ Test configuration and fixtures
 """
 import pytest
 import asyncio
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator, Callable, Iterable, List, Optional
 from httpx import AsyncClient, ASGITransport
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.pool import NullPool
@@ -31,6 +31,90 @@ TestSessionLocal = async_sessionmaker(
 )
 
 
+class FakeScalars:
+    """FakeResult.scalars() 的返回值"""
+
+    def __init__(self, rows: List[Any]):
+        self._rows = rows
+
+    def all(self) -> List[Any]:
+        return self._rows
+
+    def first(self) -> Any:
+        return self._rows[0] if self._rows else None
+
+
+class FakeResult:
+    """不连接数据库的查询结果"""
+
+    def __init__(self, rows: Iterable[Any]):
+        self._rows = list(rows)
+
+    def all(self) -> List[Any]:
+        return self._rows
+
+    def fetchall(self) -> List[Any]:
+        return self._rows
+
+    def first(self) -> Any:
+        return self._rows[0] if self._rows else None
+
+    def scalar(self) -> Any:
+        return self._rows[0] if self._rows else None
+
+    def scalars(self) -> FakeScalars:
+        return FakeScalars(self._rows)
+
+
+class FakeSession:
+    """
+    不连接数据库的会话，用于服务层单元测试
+
+    Args:
+        rows: 每次查询都返回的行
+        respond: 根据语句返回行的函数，设置后优先于 rows
+    """
+
+    def __init__(self, rows: Optional[Iterable[Any]] = None, respond: Optional[Callable[[Any], Iterable[Any]]] = None):
+        self.rows = list(rows or [])
+        self.respond = respond
+        self.statements: List[Any] = []
+        self.added: List[Any] = []
+        self.commits = 0
+
+    @property
+    def queries(self) -> int:
+        return len(self.statements)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def execute(self, statement, params=None) -> FakeResult:
+        self.statements.append(statement)
+        return FakeResult(self.respond(statement) if self.respond else self.rows)
+
+    def add(self, obj) -> None:
+        self.added.append(obj)
+
+    async def flush(self) -> None:
+        pass
+
+    async def refresh(self, obj) -> None:
+        pass
+
+    async def commit(self) -> None:
+        self.commits += 1
+
+    async def rollback(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
 @pytest.fixture(scope="session")
 def event_loop():
     """Create an instance of the default event loop for each test case."""
@@ -0,0 +1,56 @@
+"""
+Test cases for the shared authenticated-user dependency
+"""
+import pytest
+from fastapi import HTTPException
+
+from app.api import deps
+from app.api.deps import Principal, PrincipalCache, decode_user_id
+from app.core.security import create_access_token
+
+
+def principal(user_id, role="student", class_id=None):
+    return Principal({"id": user_id, "role": role, "username": f"user{user_id}"}, class_id=class_id)
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    calls = []
+
+    async def fake_load_principal(db, user_id):
+        calls.append(user_id)
+        return None if user_id == 404 else principal(user_id, class_id=len(calls))
+
+    monkeypatch.setattr(deps, "load_principal", fake_load_principal)
+    return calls
+
+
+async def test_principal_cached_until_invalidated(loads):
+    cache = PrincipalCache(ttl=60)
+    first = await cache.get(None, 1)
+    assert (await cache.get(None, 1)) is first
+    assert loads == [1]
+
+    cache.invalidate(1)
+    reloaded = await cache.get(None, 1)
+    assert reloaded is not first
+    assert loads == [1, 1]
+
+
+async def test_cache_is_bounded_and_skips_missing_users(loads):
+    cache = PrincipalCache(ttl=60, max_size=2)
+    for user_id in (1, 2, 3):
+        await cache.get(None, user_id)
+    await cache.get(None, 1)
+    assert loads == [1, 2, 3, 1]
+
+    assert await cache.get(None, 404) is None
+    assert await cache.get(None, 404) is None
+    assert loads[-2:] == [404, 404]
+
+
+def test_decode_user_id():
+    assert decode_user_id(create_access_token(42)) == 42
+    with pytest.raises(HTTPException) as exc:
+        decode_user_id("not-a-token")
+    assert exc.value.status_code == 401
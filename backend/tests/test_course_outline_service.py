@@ -0,0 +1,53 @@
+"""
+Test cases for the cached student course outline
+"""
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.services import course_outline_service
+from app.services.course_outline_service import CourseOutlineCache, build_student_outline
+from tests.conftest import FakeSession
+
+
+SKELETON = [{
+    "id": 1,
+    "title": "第一章",
+    "sort_order": 0,
+    "exam_papers": [],
+    "sections": [{
+        "id": 11,
+        "title": "1.1",
+        "sort_order": 0,
+        "resources": [],
+        "exam_papers": [],
+        "homework": [
+            {"id": 100, "title": "作业1", "description": None, "deadline": None, "sort_order": 0},
+            {"id": 101, "title": "作业2", "description": None, "deadline": None, "sort_order": 1},
+        ],
+    }],
+}]
+
+
+async def test_student_status_is_overlaid_on_cached_skeleton(monkeypatch):
+    cache = CourseOutlineCache(ttl_seconds=60)
+    cache.set(5, SKELETON)
+    monkeypatch.setattr(course_outline_service, "course_outline_cache", cache)
+
+    submitted_at = datetime(2024, 3, 1, 8, 0)
+    db = FakeSession([SimpleNamespace(homework_id=100, id=7, status="graded", score=95, submitted_at=submitted_at)])
+    outline = await build_student_outline(db, 5, student_id=42)
+
+    homework = outline[0]["sections"][0]["homework"]
+    assert db.queries == 1
+    assert homework[0]["submission_status"] == "graded"
+    assert homework[0]["submitted_at"] == submitted_at.isoformat()
+    assert homework[1]["submission_status"] == "not_started"
+    assert homework[1]["has_submission"] is False
+    # 缓存中的骨架不被修改
+    assert "submission_status" not in SKELETON[0]["sections"][0]["homework"][0]
+
+
+def test_cache_ttl_zero_disables_caching():
+    cache = CourseOutlineCache(ttl_seconds=0)
+    cache.set(1, SKELETON)
+    assert cache.get(1) is None
@@ -0,0 +1,52 @@
+"""
+Test cases for the teacher Q&A inbox
+"""
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.services.course_qa_service import get_teacher_qa_sessions_grouped
+from app.utils.pagination import decode_cursor
+from tests.conftest import FakeSession
+
+
+def inbox_row(session_id, course_id, course_name, minute, unread=0):
+    return SimpleNamespace(
+        session_id=session_id,
+        course_id=course_id,
+        student_id=100 + session_id,
+        latest_message_at=datetime(2026, 10, 18, 9, minute),
+        unread_count=unread,
+        total_messages=3,
+        course_name=course_name,
+        full_name=None,
+        username=f"student{session_id}",
+        student_no=None,
+        latest_message_content=f"问题{session_id}",
+    )
+
+
+async def test_sessions_grouped_by_course_with_next_cursor():
+    rows = [
+        inbox_row(3, 2, "高等数学", 50, unread=2),
+        inbox_row(2, 1, "大学物理", 40),
+        inbox_row(1, 2, "高等数学", 30),
+    ]
+    db = FakeSession(rows)
+
+    courses, next_cursor = await get_teacher_qa_sessions_grouped(db, teacher_id=7, limit=2)
+
+    assert [course["course_name"] for course in courses] == ["大学物理", "高等数学"]
+    math = courses[1]["students"]
+    assert [student["session_id"] for student in math] == [3]
+    assert math[0]["unread_count"] == 2
+    assert math[0]["student_name"] == "student3"
+    assert math[0]["student_no"] == ""
+    assert decode_cursor(next_cursor) == (datetime(2026, 10, 18, 9, 40), 2)
+    assert len(db.statements) == 1
+
+
+async def test_last_page_has_no_cursor():
+    db = FakeSession([inbox_row(1, 1, "大学物理", 30)])
+    courses, next_cursor = await get_teacher_qa_sessions_grouped(db, teacher_id=7)
+    assert next_cursor is None
+    assert courses[0]["students"][0]["latest_message_content"] == "问题1"
@@ -0,0 +1,65 @@
+"""
+Test cases for streaming course Q&A answers
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import course_qa_service
+from app.utils.llm_call_logger import STREAM_CANCELLED_MESSAGE
+from tests.conftest import FakeSession
+
+
+@pytest.fixture
+def stream_env(monkeypatch):
+    write_session, logs = FakeSession(), []
+
+    async def fake_save_student_message(db, session_id, student_id, content):
+        return SimpleNamespace(id=1), SimpleNamespace(course_id=5), []
+
+    async def fake_build_ai_prompt(db, course_id, content, history):
+        return "prompt"
+
+    async def fake_get_active_llm_config(db):
+        return SimpleNamespace(id=3)
+
+    async def fake_resolve_log_user(db, course_id):
+        return 7, "student"
+
+    async def fake_stream(function_type, config, prompt, **kwargs):
+        for delta in ("第一段", "第二段", "第三段"):
+            yield delta
+
+    async def fake_enqueue(**record):
+        logs.append(record)
+
+    monkeypatch.setattr(course_qa_service, "_save_student_message", fake_save_student_message)
+    monkeypatch.setattr(course_qa_service, "build_ai_prompt", fake_build_ai_prompt)
+    monkeypatch.setattr(course_qa_service, "get_active_llm_config", fake_get_active_llm_config)
+    monkeypatch.setattr(course_qa_service, "_resolve_log_user", fake_resolve_log_user)
+    monkeypatch.setattr(course_qa_service, "cached_stream_chat", fake_stream)
+    monkeypatch.setattr(course_qa_service, "enqueue_llm_call_log", fake_enqueue)
+    monkeypatch.setattr(course_qa_service, "AsyncSessionLocal", lambda: write_session)
+    return write_session.added, logs
+
+
+async def test_completed_stream_saves_reply_and_logs(stream_env):
+    saved, logs = stream_env
+    _, events = await course_qa_service.stream_student_message(FakeSession(), 1, 2, "问题")
+
+    received = [event async for event in events]
+    assert received[-1] == ("done", saved[0])
+    assert saved[0].content == "第一段第二段第三段"
+    assert logs[0]["status"] == "success"
+
+
+async def test_closed_stream_still_saves_partial_reply_and_logs(stream_env):
+    saved, logs = stream_env
+    _, events = await course_qa_service.stream_student_message(FakeSession(), 1, 2, "问题")
+
+    assert await events.__anext__() == ("delta", "第一段")
+    await events.aclose()
+
+    assert saved[0].content == "第一段"
+    assert logs[0]["status"] == "failed"
+    assert logs[0]["error_message"] == STREAM_CANCELLED_MESSAGE
@@ -0,0 +1,61 @@
+"""
+Test cases for course cover image variants and caching
+"""
+import io
+
+import httpx
+from fastapi import FastAPI, Request
+from PIL import Image
+
+from app.services import cover_image_service as cover_module
+from app.services.cover_image_service import CoverImageService, ImageLRUCache, CoverImage, render_variants
+
+
+def png_bytes(width: int, height: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 80, 40)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_render_variants_keeps_aspect_ratio():
+    variants = render_variants(png_bytes(1600, 900))
+    assert set(variants) == {"thumbnail", "card", "full"}
+    with Image.open(io.BytesIO(variants["card"])) as image:
+        assert image.format == "WEBP"
+        assert image.size == (640, 360)
+
+
+def test_lru_cache_is_bounded_by_bytes():
+    cache = ImageLRUCache(max_bytes=10)
+    cache.set(("a", "original"), CoverImage(b"x" * 4, "image/png"))
+    cache.set(("b", "original"), CoverImage(b"x" * 4, "image/png"))
+    assert cache.get(("a", "original")) is not None
+    cache.set(("c", "original"), CoverImage(b"x" * 4, "image/png"))
+    assert cache.get(("b", "original")) is None
+    assert len(cache) == 2
+
+
+async def test_local_cover_variant_is_generated_and_conditional(tmp_path, monkeypatch):
+    monkeypatch.setattr(cover_module, "COVER_UPLOAD_DIR", tmp_path)
+    monkeypatch.setattr(cover_module, "COVER_VARIANT_DIR", tmp_path / "variants")
+    (tmp_path / "cover.png").write_bytes(png_bytes(800, 450))
+    service = CoverImageService(max_bytes=1024 * 1024)
+
+    # 历史封面没有预生成的变体，首次请求时补生成并保存
+    image = await service.get("cover.png", "thumbnail")
+    assert image.media_type == "image/webp"
+    assert (tmp_path / "variants" / "cover_thumbnail.webp").exists()
+    assert await service.get("cover.png", "thumbnail") is image
+
+    app = FastAPI()
+
+    @app.get("/image")
+    async def get_image(request: Request):
+        return service.response(request, image)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/image", headers={"If-None-Match": image.etag})
+        assert response.status_code == 304
+
+    await service.delete_variants("cover.png")
+    assert not (tmp_path / "variants" / "cover_thumbnail.webp").exists()
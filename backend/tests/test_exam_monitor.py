@@ -0,0 +1,55 @@
+"""
+Test cases for live exam monitoring
+"""
+import asyncio
+import json
+
+from app.services.exam_monitor import ExamMonitor, InProcessBroker, apply_changes, empty_counts
+from tests.conftest import FakeSession
+
+
+def parse_event(raw):
+    lines = raw.strip().splitlines()
+    return lines[0].split(": ", 1)[1], json.loads(lines[1].split(": ", 1)[1])
+
+
+def test_apply_changes_keeps_total_in_sync():
+    counts = empty_counts()
+    apply_changes(counts, {"pending": 3})
+    apply_changes(counts, {"pending": -1, "in_progress": 1})
+    apply_changes(counts, {"submitted": -5})
+    assert counts == {"pending": 2, "in_progress": 1, "submitted": 0, "total": 0}
+
+
+async def test_counts_loaded_once_then_updated_by_deltas():
+    monitor = ExamMonitor(counts_ttl=60, broker_factory=InProcessBroker)
+    db = FakeSession([("pending", 3), ("submitted", 2)])
+
+    counts = await monitor.get_counts(db, 1)
+    assert counts == {"pending": 3, "in_progress": 0, "submitted": 2, "total": 5}
+
+    await monitor.record_transition(1, "pending", "in_progress")
+    await monitor.publish_changes(1, {"pending": 4})
+    counts = await monitor.get_counts(db, 1)
+    assert counts == {"pending": 6, "in_progress": 1, "submitted": 2, "total": 9}
+    assert db.queries == 1
+
+
+async def test_stream_pushes_snapshot_then_deltas():
+    monitor = ExamMonitor(counts_ttl=60, broker_factory=InProcessBroker)
+    stream = monitor.stream(7, {"pending": 1, "in_progress": 0, "submitted": 0, "total": 1})
+
+    event, data = parse_event(await stream.__anext__())
+    assert event == "snapshot"
+    assert data["pending"] == 1
+
+    next_event = asyncio.ensure_future(stream.__anext__())
+    await asyncio.sleep(0)
+    await monitor.publish_changes(8, {"pending": 1})
+    await monitor.record_transition(7, "pending", "in_progress")
+    event, data = parse_event(await next_event)
+    assert event == "delta"
+    assert data == {"exam_id": 7, "changes": {"in_progress": 1, "pending": -1}}
+
+    await stream.aclose()
+    assert 7 not in monitor._subscribers
@@ -0,0 +1,54 @@
+"""
+Test cases for the document extraction process pool
+"""
+import asyncio
+import io
+import time
+
+import pytest
+from PyPDF2 import PdfWriter
+
+from app.utils.extraction_executor import (
+    ExtractionBusyError,
+    ExtractionExecutor,
+    ExtractionTimeoutError,
+)
+
+
+def blank_pdf(pages: int) -> bytes:
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=72, height=72)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+async def test_large_pdf_is_split_across_jobs_and_keeps_page_order():
+    executor = ExtractionExecutor(max_workers=2)
+    try:
+        pages = await executor.extract_pdf_pages(blank_pdf(45))
+        assert pages == [""] * 45
+
+        assert len(await executor.extract_pdf_pages(blank_pdf(45), max_pages=5)) == 5
+    finally:
+        executor.shutdown()
+
+
+async def test_busy_and_timeout_release_slots_after_job_finishes():
+    executor = ExtractionExecutor(max_workers=1, max_pending=1, timeout=0.2)
+    try:
+        job = asyncio.ensure_future(executor.run(time.sleep, 0.5))
+        await asyncio.sleep(0.05)
+        with pytest.raises(ExtractionBusyError):
+            await executor.run(time.sleep, 0)
+
+        with pytest.raises(ExtractionTimeoutError):
+            await job
+        # 超时的任务仍在子进程中执行，名额在其结束后才释放
+        assert executor._pending == 1
+        await asyncio.sleep(0.5)
+        assert executor._pending == 0
+        assert await executor.run(abs, -3) == 3
+    finally:
+        executor.shutdown()
@@ -0,0 +1,63 @@
+"""
+Test cases for range-capable file delivery and the local object cache
+"""
+import httpx
+from fastapi import FastAPI, Request
+
+from app.utils.file_delivery import DiskObjectCache, FileDelivery, etag_matches, oss_key_from_url
+
+
+def make_client(delivery: FileDelivery, path) -> httpx.AsyncClient:
+    app = FastAPI()
+
+    @app.get("/file")
+    async def get_file(request: Request):
+        return await delivery.serve(request, str(path), "application/pdf", "讲义.pdf")
+
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+async def test_local_file_supports_range_and_etag(tmp_path):
+    path = tmp_path / "a.pdf"
+    path.write_bytes(b"0123456789")
+    delivery = FileDelivery(DiskObjectCache(tmp_path / "cache", 1024))
+
+    async with make_client(delivery, path) as client:
+        response = await client.get("/file", headers={"Range": "bytes=2-5"})
+        assert response.status_code == 206
+        assert response.content == b"2345"
+        assert response.headers["content-range"] == "bytes 2-5/10"
+
+        etag = response.headers["etag"]
+        response = await client.get("/file", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+
+        response = await client.get("/file", headers={"If-None-Match": '"other"'})
+        assert response.status_code == 200
+        assert response.content == b"0123456789"
+
+
+async def test_cache_evicts_least_recently_used(tmp_path):
+    cache = DiskObjectCache(tmp_path, max_bytes=10)
+    for key in ("a.pdf", "b.pdf"):
+        cache._load_index()
+        cache._path(key).write_bytes(b"x" * 4)
+        cache._add(cache._path(key).name, 4)
+
+    # 命中的文件不需要下载，并移到最近访问
+    assert await cache.get("a.pdf", "http://unused") == cache._path("a.pdf")
+
+    cache._path("c.pdf").write_bytes(b"x" * 4)
+    cache._add(cache._path("c.pdf").name, 4)
+    assert not cache._path("b.pdf").exists()
+    assert cache._path("a.pdf").exists()
+    assert cache.stats()["bytes"] == 8
+
+
+def test_etag_and_oss_key_parsing():
+    assert etag_matches('W/"abc", "def"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches(None, '"abc"')
+    assert oss_key_from_url("https://b.oss-cn-beijing.aliyuncs.com/teaching_resources/pdf/a.pdf?x=1") == "teaching_resources/pdf/a.pdf"
+    assert oss_key_from_url("https://example.com/a.pdf") is None
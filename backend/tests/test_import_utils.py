@@ -0,0 +1,47 @@
+"""
+Test cases for set-based bulk import helpers
+"""
+import pandas as pd
+
+from app.core import security
+from app.utils.import_utils import (
+    INVALID_NUMBER,
+    clean_text_column,
+    excel_row_numbers,
+    mark_file_duplicates,
+    parse_number_column,
+)
+
+
+def test_clean_text_column_matches_row_by_row_cleaning():
+    df = pd.DataFrame({"姓名": [" 张三 ", None, "  ", "李四"]})
+
+    assert clean_text_column(df, "姓名") == ["张三", None, None, "李四"]
+    assert clean_text_column(df, "邮箱（可选）") == [None] * 4
+
+
+def test_parse_number_column_distinguishes_missing_and_invalid():
+    df = pd.DataFrame({"所属班级ID": [3.0, "abc", None, "7"]})
+
+    assert parse_number_column(df, "所属班级ID") == [3, INVALID_NUMBER, None, 7]
+
+
+def test_row_numbers_follow_original_index_after_dropping_blank_rows():
+    df = pd.DataFrame({"姓名": ["a", None, "b"]}).dropna(how="all")
+
+    assert excel_row_numbers(df) == [2, 4]
+
+
+def test_mark_file_duplicates_keeps_first_occurrence():
+    assert mark_file_duplicates(["s1", "s2", None, "s1", None]) == [False, False, False, True, False]
+
+
+async def test_password_hashes_are_salted_per_user():
+    try:
+        hashes = await security.get_password_hashes(["12345678", "12345678"])
+    finally:
+        security.shutdown_password_hash_pool()
+
+    assert len(hashes) == 2
+    assert hashes[0] != hashes[1]
+    assert all(security.verify_password("12345678", h) for h in hashes)
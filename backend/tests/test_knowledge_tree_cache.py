@@ -0,0 +1,48 @@
+"""
+Test cases for the knowledge graph node tree cache
+"""
+from datetime import datetime
+
+from app.models.knowledge_graph import KnowledgeGraph, KnowledgeNode
+from app.services.knowledge_tree_cache import KnowledgeTree, KnowledgeTreeCache
+
+
+ROWS = [
+    (1, None, "函数"),
+    (2, 1, "极限"),
+    (3, 2, "数列极限"),
+    (4, 2, "函数极限"),
+    (5, 1, "导数"),
+    (6, None, "积分"),
+]
+
+
+def test_subtree_ids_include_all_descendants():
+    tree = KnowledgeTree(None, ROWS)
+
+    assert tree.subtree_ids(1) == [1, 2, 3, 4, 5]
+    assert tree.subtree_ids(2) == [2, 3, 4]
+    assert tree.subtree_ids(6) == [6]
+    assert tree.subtree_ids(99) == []
+
+
+def test_ancestors_and_cycle_detection():
+    tree = KnowledgeTree(None, ROWS)
+
+    assert tree.ancestor_ids(3) == [2, 1]
+    assert tree.is_descendant(4, 1)
+    assert tree.is_descendant(2, 2)
+    assert not tree.is_descendant(6, 1)
+
+
+async def test_cached_tree_is_reused_until_graph_version_changes():
+    cache = KnowledgeTreeCache()
+    graph = KnowledgeGraph(id=1, updated_at=datetime(2024, 1, 1))
+    nodes = [KnowledgeNode(id=i, parent_id=p, node_name=n) for i, p, n in ROWS]
+    cached = cache.put(graph, nodes)
+
+    # 版本一致时直接命中，不访问数据库
+    assert await cache.get(None, graph) is cached
+
+    cache.invalidate(1)
+    assert 1 not in cache._trees
@@ -0,0 +1,57 @@
+"""
+Test cases for batched learning behavior ingestion
+"""
+from datetime import date, datetime
+
+from app.services.learning_behavior_writer import (
+    aggregate_daily_minutes,
+    aggregate_daily_stats,
+    build_behavior_event,
+)
+
+
+def test_build_behavior_event_defaults():
+    event = build_behavior_event(1, 2, {"resource_id": 9})
+
+    assert event["behavior_type"] == "view_resource"
+    assert event["duration_seconds"] == 0
+    assert event["study_day"].hour == 0 and event["study_day"].minute == 0
+
+
+def test_daily_minutes_are_summed_per_student_course_day():
+    events = [
+        build_behavior_event(1, 2, {"duration_seconds": 125}),
+        build_behavior_event(1, 2, {"duration_seconds": 60}),
+        build_behavior_event(1, 3, {"duration_seconds": 30}),
+        build_behavior_event(4, 2, {"duration_seconds": 600}),
+    ]
+    day = events[0]["study_day"]
+
+    assert aggregate_daily_minutes(events) == {(1, 2, day): 3, (4, 2, day): 10}
+
+
+
+def test_daily_stats_count_duration_and_last_activity_by_utc_date():
+    def event(student_id, course_id, seconds, created_at):
+        return {"student_id": student_id, "course_id": course_id,
+                "duration_seconds": seconds, "created_at": created_at}
+
+    events = [
+        event(1, 2, 30, datetime(2026, 3, 1, 23, 50)),
+        event(1, 2, 45, datetime(2026, 3, 1, 8, 0)),
+        event(1, 2, 10, datetime(2026, 3, 2, 0, 5)),
+        event(1, None, 99, datetime(2026, 3, 1, 9, 0)),
+    ]
+
+    assert aggregate_daily_stats(events) == {
+        (1, 2, date(2026, 3, 1)): {
+            "behavior_count": 2,
+            "duration_seconds": 75,
+            "last_activity_at": datetime(2026, 3, 1, 23, 50),
+        },
+        (1, 2, date(2026, 3, 2)): {
+            "behavior_count": 1,
+            "duration_seconds": 10,
+            "last_activity_at": datetime(2026, 3, 2, 0, 5),
+        },
+    }
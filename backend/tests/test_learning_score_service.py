@@ -0,0 +1,92 @@
+"""
+Test cases for whole-course learning AI scoring
+"""
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.models.student_learning import CourseGrade
+from app.services import learning_score_service
+from app.services.learning_score_service import (
+    LearningScoreJob,
+    LearningScoreJobManager,
+    apply_learning_score,
+    parse_learning_score,
+)
+from tests.conftest import FakeSession
+
+
+def test_parse_learning_score():
+    assert parse_learning_score('{"score": 88, "reason": "学习积极"}') == (88.0, "学习积极")
+    assert parse_learning_score("评分：120分") == (100, None)
+    assert parse_learning_score("无法评分") == (None, None)
+
+
+def test_apply_learning_score_replaces_breakdown_dict():
+    original = {"quiz": {"score": 90}}
+    grade = CourseGrade(course_id=1, student_id=2, breakdown=original)
+    apply_learning_score(grade, 75.0, "{}", "良好", {"study_minutes": 30.0, "study_count": 3, "last_active": "无"})
+
+    assert grade.breakdown is not original
+    assert grade.breakdown["quiz"] == {"score": 90}
+    assert grade.breakdown["learning"]["score"] == 75.0
+    assert grade.final_score == 75.0
+
+
+class ScoringSession(FakeSession):
+    """第一次查询返回学习行为，之后返回已有成绩"""
+
+    def __init__(self, behavior_rows, existing_grades):
+        super().__init__(respond=lambda statement: behavior_rows if self.queries == 1 else existing_grades)
+
+    async def get(self, model, ident):
+        return SimpleNamespace(id=ident)
+
+
+async def test_course_job_scores_students_concurrently_and_saves_in_batches(monkeypatch):
+    existing = CourseGrade(course_id=9, student_id=1, breakdown={})
+    session = ScoringSession([(1, 3600, 12, datetime(2026, 10, 1, 8, 0))], [existing])
+    opened = []
+
+    def open_session():
+        opened.append(session)
+        return session
+    monkeypatch.setattr(learning_score_service, "AsyncSessionLocal", open_session)
+    monkeypatch.setattr(learning_score_service, "SCORE_FLUSH_SIZE", 10)
+
+    async def no_log(**kwargs):
+        pass
+    monkeypatch.setattr(learning_score_service, "enqueue_llm_call_log", no_log)
+
+    running = 0
+    max_running = 0
+
+    async def fake_chat(config, prompt, **kwargs):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        if "学生：学生3\n" in prompt:
+            return "无法评分"
+        return '{"score": 80, "reason": "良好"}'
+    monkeypatch.setattr(learning_score_service.llm_gateway, "chat", fake_chat)
+
+    manager = LearningScoreJobManager(concurrency=4)
+    students = [(student_id, f"学生{student_id}") for student_id in range(1, 26)]
+    job = manager.start(LearningScoreJob(9, "数据结构", 100, "teacher", students), llm_config_id=1)
+    # 同一课程已有进行中的任务时返回该任务
+    assert manager.start(LearningScoreJob(9, "数据结构", 100, "teacher", students), 1) is job
+    await manager._tasks[job.job_id]
+
+    state = await manager.get(job.job_id)
+    assert state["status"] == "completed"
+    assert state["succeeded"] == 24 and state["failed"] == 1
+    assert state["errors"][0]["student_id"] == 3
+    assert max_running == 4
+    # 24个结果分3批写入，已有成绩行被更新而不是重复新增
+    # 读取配置和学习行为一个会话，每批结果各一个短会话
+    assert session.commits == 3
+    assert len(opened) == 4
+    assert len(session.added) == 23
+    assert existing.breakdown["learning"]["metrics"]["study_minutes"] == 60.0
@@ -0,0 +1,104 @@
+"""
+Test cases for the LLM response cache
+"""
+from app.models.llm_config import LLMConfig
+from app.services import llm_cache as llm_cache_module
+from app.utils.llm_call_logger import LogContext
+from app.services.llm_cache import (
+    LLMResponseCache,
+    TTLLRUCache,
+    build_cache_key,
+    cached_chat,
+)
+
+
+def make_config() -> LLMConfig:
+    return LLMConfig(provider_key="deepseek", model_name="deepseek-chat", api_key="sk-test")
+
+
+def test_cache_key_normalizes_whitespace_and_width():
+    config = make_config()
+    key1 = build_cache_key("course_qa_ai_response", config, "什么是 栈？", 4000, 0.7)
+    key2 = build_cache_key("course_qa_ai_response", config, "  什么是\n栈？ ", 4000, 0.7)
+    key3 = build_cache_key("course_qa_ai_response", config, "什么是 栈?", 4000, 0.7)
+    assert key1 == key2 == key3
+
+
+def test_cache_key_depends_on_model_and_temperature():
+    config = make_config()
+    base = build_cache_key("course_qa_ai_response", config, "q", 4000, 0.7)
+    assert base != build_cache_key("course_qa_ai_response", config, "q", 4000, 0.2)
+    other_model = LLMConfig(provider_key="deepseek", model_name="deepseek-reasoner", api_key="sk-test")
+    assert base != build_cache_key("course_qa_ai_response", other_model, "q", 4000, 0.7)
+
+
+def test_lru_evicts_least_recently_used():
+    cache = TTLLRUCache(max_entries=2)
+    cache.set("a", "1", ttl=60)
+    cache.set("b", "2", ttl=60)
+    assert cache.get("a") == "1"
+    cache.set("c", "3", ttl=60)
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+
+
+def test_expired_entries_are_dropped():
+    cache = TTLLRUCache(max_entries=2)
+    cache.set("a", "1", ttl=0)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+async def test_cached_chat_hits_after_first_call(monkeypatch):
+    calls = []
+
+    async def fake_chat(config, prompt, max_tokens, temperature, timeout):
+        calls.append(prompt)
+        return "答案"
+
+    cache = LLMResponseCache(max_entries=10)
+    monkeypatch.setattr(llm_cache_module, "llm_cache", cache)
+    monkeypatch.setattr(llm_cache_module.llm_gateway, "chat", fake_chat)
+
+    config = make_config()
+    assert await cached_chat("course_qa_ai_response", config, "什么是栈") == "答案"
+    assert await cached_chat("course_qa_ai_response", config, "什么是栈 ") == "答案"
+    assert len(calls) == 1
+
+    stats = {item["function_type"]: item for item in await cache.get_stats()}
+    assert stats["course_qa_ai_response"]["hits"] == 1
+    assert stats["course_qa_ai_response"]["misses"] == 1
+
+
+async def test_uncached_function_type_always_calls_llm(monkeypatch):
+    calls = []
+
+    async def fake_chat(config, prompt, max_tokens, temperature, timeout):
+        calls.append(prompt)
+        return "内容"
+
+    monkeypatch.setattr(llm_cache_module, "llm_cache", LLMResponseCache(max_entries=10))
+    monkeypatch.setattr(llm_cache_module.llm_gateway, "chat", fake_chat)
+
+    config = make_config()
+    await cached_chat("ai_create_resource", config, "p")
+    await cached_chat("ai_create_resource", config, "p")
+    assert len(calls) == 2
+
+
+async def test_cache_hit_is_logged_as_cached(monkeypatch):
+    async def fake_chat(config, prompt, max_tokens, temperature, timeout):
+        return "答案"
+
+    monkeypatch.setattr(llm_cache_module, "llm_cache", LLMResponseCache(max_entries=10))
+    monkeypatch.setattr(llm_cache_module.llm_gateway, "chat", fake_chat)
+
+    config = make_config()
+    statuses = []
+    for _ in range(2):
+        log_context = LogContext(0.0)
+        result = await cached_chat("course_qa_ai_response", config, "什么是栈", log_context=log_context)
+        log_context.set_result(result, status='success')
+        statuses.append(log_context.status)
+    assert statuses == ["success", "cached"]
@@ -0,0 +1,154 @@
+"""
+Test cases for the unified LLM gateway
+"""
+import json
+
+import httpx
+import pytest
+
+from app.models.llm_config import LLMConfig
+from app.services.llm_gateway import LLMGateway
+
+
+def make_config(provider_key: str, endpoint_url: str = "https://llm.test/v1") -> LLMConfig:
+    return LLMConfig(
+        provider_name="测试",
+        provider_key=provider_key,
+        api_key="sk-test",
+        api_secret="secret",
+        endpoint_url=endpoint_url,
+        model_name="test-model",
+    )
+
+
+def install_mock_client(gateway: LLMGateway, provider_key: str, handler) -> None:
+    """用MockTransport替换提供商的连接池"""
+    gateway._clients[provider_key] = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+async def test_openai_compatible_reuses_pooled_client():
+    gateway = LLMGateway()
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json={"choices": [{"message": {"content": "你好"}}]})
+
+    install_mock_client(gateway, "deepseek", handler)
+    client = gateway._get_client("deepseek")
+    config = make_config("deepseek")
+
+    assert await gateway.chat(config, "hi", max_tokens=100) == "你好"
+    assert await gateway.chat(config, "hi again") == "你好"
+
+    assert gateway._get_client("deepseek") is client
+    assert str(requests[0].url) == "https://llm.test/v1/chat/completions"
+    body = json.loads(requests[0].content)
+    assert body["max_tokens"] == 100
+    assert body["temperature"] == 0.7
+    await gateway.aclose()
+
+
+async def test_temperature_none_is_omitted():
+    gateway = LLMGateway()
+    bodies = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        bodies.append(json.loads(request.content))
+        return httpx.Response(200, json={"choices": [{"message": {"content": "ok"}}]})
+
+    install_mock_client(gateway, "kimi", handler)
+    await gateway.chat(make_config("kimi"), "hi", temperature=None)
+
+    assert "temperature" not in bodies[0]
+    await gateway.aclose()
+
+
+async def test_wenxin_access_token_is_cached():
+    gateway = LLMGateway()
+    token_calls = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal token_calls
+        if request.url.path.endswith("/oauth/2.0/token"):
+            token_calls += 1
+            return httpx.Response(200, json={"access_token": "tok", "expires_in": 2592000})
+        assert request.url.params["access_token"] == "tok"
+        return httpx.Response(200, json={"result": "文心回答"})
+
+    install_mock_client(gateway, "wenxin", handler)
+    config = make_config("wenxin", endpoint_url="https://aip.test/rpc/2.0/ai_custom/v1")
+
+    assert await gateway.chat(config, "q1") == "文心回答"
+    assert await gateway.chat(config, "q2") == "文心回答"
+    assert token_calls == 1
+    await gateway.aclose()
+
+
+async def test_unsupported_provider_raises():
+    gateway = LLMGateway()
+    assert not gateway.is_supported("unknown")
+    with pytest.raises(ValueError):
+        await gateway.chat(make_config("unknown"), "hi")
+
+
+async def test_http_error_is_wrapped():
+    gateway = LLMGateway()
+    install_mock_client(gateway, "siliconflow", lambda request: httpx.Response(503, text="busy"))
+
+    with pytest.raises(Exception, match="HTTP 503"):
+        await gateway.chat(make_config("siliconflow"), "hi")
+    await gateway.aclose()
+
+
+async def test_stream_chat_openai_compatible_yields_deltas():
+    gateway = LLMGateway()
+    bodies = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        bodies.append(json.loads(request.content))
+        events = [
+            {"choices": [{"delta": {"role": "assistant"}}]},
+            {"choices": [{"delta": {"content": "你"}}]},
+            {"choices": [{"delta": {"content": "好"}}]},
+        ]
+        stream = "".join(f"data: {json.dumps(e)}\n\n" for e in events) + "data: [DONE]\n\n"
+        return httpx.Response(200, content=stream.encode("utf-8"))
+
+    install_mock_client(gateway, "deepseek", handler)
+    deltas = [d async for d in gateway.stream_chat(make_config("deepseek"), "hi")]
+
+    assert deltas == ["你", "好"]
+    assert bodies[0]["stream"] is True
+    await gateway.aclose()
+
+
+async def test_stream_chat_aliyun_qwen_uses_incremental_output():
+    gateway = LLMGateway()
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        stream = (
+            'id:1\nevent:result\ndata:{"output":{"text":"第一"}}\n\n'
+            'id:2\nevent:result\ndata:{"output":{"text":"段"}}\n\n'
+        )
+        return httpx.Response(200, content=stream.encode("utf-8"))
+
+    install_mock_client(gateway, "aliyun_qwen", handler)
+    deltas = [d async for d in gateway.stream_chat(make_config("aliyun_qwen"), "hi")]
+
+    assert "".join(deltas) == "第一段"
+    assert requests[0].headers["X-DashScope-SSE"] == "enable"
+    assert json.loads(requests[0].content)["parameters"]["incremental_output"] is True
+    await gateway.aclose()
+
+
+async def test_stream_chat_raises_on_error_chunk():
+    gateway = LLMGateway()
+    stream = 'data: {"error": {"message": "quota exceeded"}}\n\n'
+    install_mock_client(gateway, "kimi", lambda request: httpx.Response(200, content=stream.encode()))
+
+    with pytest.raises(Exception, match="quota exceeded"):
+        [d async for d in gateway.stream_chat(make_config("kimi"), "hi")]
+    await gateway.aclose()
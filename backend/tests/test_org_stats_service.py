@@ -0,0 +1,86 @@
+"""
+Test cases for organization tree statistics
+"""
+from datetime import datetime
+
+from app.services.org_stats_service import OrgStatsCache, OrgTreeSnapshot
+from tests.conftest import FakeSession
+
+
+def org(org_id, parent_id, name=None, is_active=True, created_by=None):
+    return {
+        "id": org_id,
+        "name": name or f"组织{org_id}",
+        "code": None,
+        "parent_id": parent_id,
+        "is_active": is_active,
+        "created_by": created_by,
+        "updated_by": None,
+        "created_at": datetime(2026, 1, 1),
+        "updated_at": None,
+    }
+
+
+def test_stats_roll_up_to_every_ancestor():
+    # 1 -> 2 -> 4, 1 -> 3
+    snapshot = OrgTreeSnapshot(
+        [org(1, None), org(2, 1), org(3, 1), org(4, 2)],
+        {
+            2: {"majors_count": 1, "classes_count": 2, "students_count": 60},
+            3: {"majors_count": 2, "classes_count": 1, "students_count": 30},
+            4: {"majors_count": 1, "classes_count": 1, "students_count": 25},
+        },
+        {}
+    )
+    assert snapshot.stats(1) == {"majors_count": 4, "classes_count": 4, "students_count": 115}
+    assert snapshot.stats(2) == {"majors_count": 2, "classes_count": 3, "students_count": 85}
+    assert snapshot.stats(4)["students_count"] == 25
+    assert snapshot.ancestor_ids(4) == [2, 1]
+
+
+def test_parent_cycle_is_counted_once():
+    snapshot = OrgTreeSnapshot(
+        [org(1, 2), org(2, 1)],
+        {1: {"majors_count": 1, "classes_count": 0, "students_count": 0},
+         2: {"majors_count": 1, "classes_count": 0, "students_count": 0}},
+        {}
+    )
+    assert sorted(snapshot.stats(org_id)["majors_count"] for org_id in (1, 2)) == [1, 2]
+
+
+class FakeRow:
+    def __init__(self, mapping):
+        self._mapping = mapping
+
+
+# 快照依次查询：组织、专业数、班级数、学生数、用户名称
+SNAPSHOT_RESULTS = [
+    [FakeRow(org(1, None, created_by=7)), FakeRow(org(2, 1))],
+    [(2, 3)],
+    [(2, 5)],
+    [(2, 150)],
+    [(7, None, "admin")],
+]
+
+
+def snapshot_session():
+    session = FakeSession(respond=lambda statement: SNAPSHOT_RESULTS[(session.queries - 1) % 5])
+    return session
+
+
+async def test_snapshot_is_loaded_with_five_queries_and_cached():
+    cache = OrgStatsCache(ttl=60)
+    db = snapshot_session()
+
+    snapshot = await cache.get(db)
+    assert db.queries == 5
+    root = snapshot.node(1)
+    assert root["creator_name"] == "admin"
+    assert (root["majors_count"], root["classes_count"], root["students_count"]) == (3, 5, 150)
+
+    assert await cache.get(db) is snapshot
+    assert db.queries == 5
+
+    cache.invalidate()
+    await cache.get(db)
+    assert db.queries == 10
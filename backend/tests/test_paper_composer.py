@@ -0,0 +1,110 @@
+"""
+Test cases for the paper composition engine
+"""
+import time
+from collections import Counter
+
+import pytest
+from pydantic import BaseModel
+
+from app.models.question import Question
+from app.services.paper_composer import (
+    InsufficientQuestionsError,
+    PaperComposer,
+    QuestionIndex,
+    allocate,
+    sample_questions,
+)
+from tests.conftest import FakeSession
+
+
+class Config(BaseModel):
+    question_type: str
+    count: int
+    score_per_question: float = 2.0
+
+
+def bank():
+    """单选题：3种难度 x 4个知识点，每组10道；ID = 难度*1000 + 知识点*100 + 序号"""
+    return [
+        (difficulty * 1000 + kp * 100 + n, "single_choice", difficulty, f"知识点{kp}")
+        for difficulty in (1, 2, 3)
+        for kp in range(4)
+        for n in range(10)
+    ]
+
+
+def test_allocate_spreads_evenly_and_spills_over():
+    assert allocate(9, {"a": 10, "b": 10, "c": 10}) == {"a": 3, "b": 3, "c": 3}
+    # a只有1道，缺额转给其余分层
+    assert allocate(9, {"a": 1, "b": 10, "c": 10}) == {"a": 1, "b": 4, "c": 4}
+    assert allocate(10, {1: 20, 2: 20, 3: 20}, {1: 0.5, 2: 0.5}) == {1: 5, 2: 5, 3: 0}
+
+
+def test_sampling_follows_difficulty_ratio_and_covers_knowledge_points():
+    index = QuestionIndex(bank())
+    ids = sample_questions(index, "single_choice", 20, difficulty_distribution={1: 0.2, 2: 0.5, 3: 0.3})
+
+    assert len(set(ids)) == 20
+    difficulties = Counter(question_id // 1000 for question_id in ids)
+    assert difficulties == {1: 4, 2: 10, 3: 6}
+    # 每个难度内题量平均分到4个知识点
+    per_kp = Counter((question_id // 1000, question_id // 100 % 10) for question_id in ids)
+    assert sorted(per_kp[(2, kp)] for kp in range(4)) == [2, 2, 3, 3]
+    assert all(per_kp[(1, kp)] == 1 for kp in range(4))
+
+
+def test_sampling_respects_exclusions_and_knowledge_points():
+    index = QuestionIndex(bank())
+    exclude = {1000 + n for n in range(8)}
+    ids = sample_questions(index, "single_choice", 6, knowledge_points=["知识点0"], exclude=exclude)
+
+    assert not exclude & set(ids)
+    assert all(question_id // 100 % 10 == 0 for question_id in ids)
+
+    with pytest.raises(InsufficientQuestionsError) as exc_info:
+        sample_questions(index, "single_choice", 23, knowledge_points=["知识点0"], exclude=exclude)
+    assert exc_info.value.available == 22
+
+
+def test_paper_without_knowledge_point_samples_untagged_questions():
+    index = QuestionIndex(bank() + [(9000 + n, "single_choice", 2, None) for n in range(5)])
+    ids = sample_questions(index, "single_choice", 5, knowledge_points=[None])
+    assert sorted(ids) == [9000 + n for n in range(5)]
+
+
+def question_bank_session(rows, deleted=()):
+    """第一次查询返回索引行，之后按选中的ID返回题目"""
+    deleted = set(deleted)
+
+    def respond(statement):
+        if len(statement.selected_columns) == 4:
+            return [row for row in rows if row[0] not in deleted]
+        ids = statement.whereclause.clauses[0].right.value
+        return [Question(id=question_id) for question_id in ids if question_id not in deleted]
+
+    return FakeSession(respond=respond)
+
+
+async def test_compose_loads_only_chosen_questions_and_reuses_index():
+    composer = PaperComposer(ttl=300)
+    db = question_bank_session(bank())
+
+    selected = await composer.compose(db, 1, [Config(question_type="single_choice", count=5)])
+    assert len(selected) == 5
+    assert all(config.score_per_question == 2.0 for _, config in selected)
+
+    await composer.compose(db, 1, [Config(question_type="single_choice", count=5)])
+    # 索引只查询一次，之后每次组卷只按ID加载选中的题目
+    assert len(db.statements) == 3
+
+
+async def test_compose_rebuilds_stale_index():
+    composer = PaperComposer(ttl=300)
+    composer._indexes[1] = QuestionIndex(bank(), time.monotonic())
+    # 其他进程删除了知识点0、1的题目
+    db = question_bank_session(bank(), deleted={row[0] for row in bank() if row[0] // 100 % 10 < 2})
+
+    selected = await composer.compose(db, 1, [Config(question_type="single_choice", count=30)])
+    assert len(selected) == 30
+    assert all(question.id // 100 % 10 >= 2 for question, _ in selected)
@@ -0,0 +1,38 @@
+"""
+Test cases for off-loop password hashing
+"""
+import asyncio
+
+from app.core import security
+from app.core.security import PasswordHasher, password_needs_rehash
+
+
+async def test_hash_and_verify_in_pool(monkeypatch):
+    monkeypatch.setattr(security.settings, "PASSWORD_HASH_ROUNDS", 4)
+    hasher = PasswordHasher(workers=2)
+    try:
+        hashed = await hasher.hash("secret123")
+        results = await asyncio.gather(
+            hasher.verify("secret123", hashed),
+            hasher.verify("wrong", hashed),
+            hasher.verify("secret123", hashed),
+        )
+        assert results == [True, False, True]
+
+        stats = hasher.stats()
+        assert stats["completed"] == 4
+        assert stats["running"] == 0 and stats["waiting"] == 0
+        assert stats["workers"] == 2
+    finally:
+        hasher.shutdown()
+
+
+def test_password_needs_rehash(monkeypatch):
+    monkeypatch.setattr(security.settings, "PASSWORD_HASH_ROUNDS", 4)
+    hashed = security.get_password_hash("secret123")
+    assert hashed.startswith("$2b$04$")
+    assert not password_needs_rehash(hashed)
+
+    monkeypatch.setattr(security.settings, "PASSWORD_HASH_ROUNDS", 12)
+    assert password_needs_rehash(hashed)
+    assert not password_needs_rehash("not-a-bcrypt-hash")
@@ -0,0 +1,21 @@
+"""
+Test cases for the background Office to PDF conversion queue
+"""
+from app.services.pdf_conversion_service import needs_pdf_conversion
+from app.utils.libreoffice_converter import LibreOfficeConverter
+
+
+def test_only_local_office_documents_are_queued():
+    assert needs_pdf_conversion("ppt", "uploads/teaching_resources/ppt/a.pptx")
+    assert needs_pdf_conversion("word", "uploads/teaching_resources/word/a.doc")
+    assert not needs_pdf_conversion("pdf", "uploads/teaching_resources/pdf/a.pdf")
+    assert not needs_pdf_conversion("word", None)
+
+
+async def test_async_conversion_reports_failure_without_raising(tmp_path):
+    converter = LibreOfficeConverter(libreoffice_path=str(tmp_path / "missing-soffice"))
+    source = tmp_path / "lecture.docx"
+    source.write_bytes(b"not a real document")
+
+    assert await converter.convert_to_pdf_async(source, tmp_path / "pdfs", profile_dir=tmp_path / "profile") is None
+    assert await converter.convert_to_pdf_async(tmp_path / "missing.docx", tmp_path / "pdfs") is None
@@ -0,0 +1,46 @@
+"""
+Test cases for the question bank repository
+"""
+from datetime import datetime
+
+import pytest
+
+from app.models.question import Question, QuestionOption
+from app.services.question_repository import QuestionRepository, load_options
+from app.utils.pagination import InvalidCursorError, decode_cursor, encode_cursor
+from tests.conftest import FakeSession
+
+
+def test_cursor_round_trip():
+    question = Question(id=42, updated_at=datetime(2026, 10, 18, 9, 30, 15, 123456))
+    assert decode_cursor(encode_cursor(question.updated_at, question.id)) == (question.updated_at, 42)
+
+    with pytest.raises(InvalidCursorError):
+        decode_cursor("not-a-cursor")
+
+
+async def test_options_for_a_batch_are_loaded_in_one_query():
+    db = FakeSession([
+        QuestionOption(id=1, question_id=10, option_label="A", sort_order=0),
+        QuestionOption(id=2, question_id=10, option_label="B", sort_order=1),
+        QuestionOption(id=3, question_id=11, option_label="A", sort_order=0),
+    ])
+    options = await load_options(db, [10, 11, 12])
+
+    assert len(db.statements) == 1
+    assert [opt.option_label for opt in options[10]] == ["A", "B"]
+    assert len(options[11]) == 1
+    assert options[12] == []
+
+
+async def test_total_count_is_cached_until_invalidated():
+    repository = QuestionRepository(count_ttl=60)
+    db = FakeSession([120])
+
+    assert await repository.count_questions(db, 1, question_type="single_choice") == 120
+    assert await repository.count_questions(db, 1, question_type="single_choice") == 120
+    assert len(db.statements) == 1
+
+    repository.invalidate_counts(1)
+    await repository.count_questions(db, 1, question_type="single_choice")
+    assert len(db.statements) == 2
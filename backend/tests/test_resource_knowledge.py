@@ -0,0 +1,13 @@
+"""
+Test cases for splitting resource knowledge points
+"""
+from app.services.resource_knowledge import split_knowledge_points
+
+
+def test_split_knowledge_points_handles_mixed_separators():
+    assert split_knowledge_points("极限, 导数；积分、极限\n微分方程") == ["极限", "导数", "积分", "微分方程"]
+
+
+def test_split_knowledge_points_empty():
+    assert split_knowledge_points(None) == []
+    assert split_knowledge_points(" ，, ") == []
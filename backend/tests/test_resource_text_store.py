@@ -0,0 +1,34 @@
+"""
+Test cases for the teaching resource parsed-text store
+"""
+from app.models.teaching_resource import TeachingResource
+from app.services.resource_text_store import is_parse_error
+from app.utils.resource_parser import MAX_TEXT_LENGTH, parse_resource_content, resource_text_source
+
+
+def test_text_source_prefers_converted_pdf():
+    resource = TeachingResource(
+        file_path="teaching_resources/ppt/a.pptx",
+        local_file_path="/uploads/ppt/a.pptx",
+        resource_type="ppt",
+        pdf_path="teaching_resources/pdfs/ppt/a.pdf",
+        pdf_local_path="/uploads/pdfs/ppt/a.pdf",
+        pdf_conversion_status="success",
+    )
+    assert resource_text_source(resource) == ("teaching_resources/pdfs/ppt/a.pdf", "pdf", "/uploads/pdfs/ppt/a.pdf")
+
+    resource.pdf_conversion_status = "failed"
+    assert resource_text_source(resource) == ("teaching_resources/ppt/a.pptx", "ppt", "/uploads/ppt/a.pptx")
+
+
+def test_parse_text_content_is_truncated():
+    assert parse_resource_content("极限与连续".encode("utf-8"), "text", "notes.txt") == "极限与连续"
+
+    long_text = parse_resource_content(b"a" * (MAX_TEXT_LENGTH + 10), "markdown", "notes.md")
+    assert long_text.startswith("a" * MAX_TEXT_LENGTH)
+    assert long_text.endswith("...(内容过长，已截取)")
+
+
+def test_parse_errors_are_not_stored():
+    assert is_parse_error("[PDF解析失败: 缺少必要的库]")
+    assert not is_parse_error("=== 第1页 ===\n函数的极限")
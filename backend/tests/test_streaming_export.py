@@ -0,0 +1,41 @@
+"""
+Test cases for streamed XLSX/CSV exports
+"""
+import io
+
+from openpyxl import load_workbook
+
+from app.utils.streaming_export import csv_chunks, export_response, xlsx_chunks
+
+
+async def numbered_rows(count: int):
+    for index in range(count):
+        yield [index, f"题目{index}\x07"]
+
+
+async def collect(chunks) -> list:
+    return [chunk async for chunk in chunks]
+
+
+async def test_csv_is_sent_batch_by_batch():
+    chunks = await collect(csv_chunks(["序号", "题干"], numbered_rows(1200)))
+    # 表头 + 3个批次（每批500行）
+    assert len(chunks) == 4
+    text = b"".join(chunks).decode("utf-8-sig")
+    assert text.splitlines()[0] == "序号,题干"
+    assert len(text.splitlines()) == 1201
+
+
+async def test_xlsx_rows_are_written_in_write_only_mode():
+    data = b"".join(await collect(xlsx_chunks("题目列表", ["序号", "题干"], numbered_rows(3))))
+    sheet = load_workbook(io.BytesIO(data))["题目列表"]
+    rows = list(sheet.iter_rows(values_only=True))
+    assert rows[0] == ("序号", "题干")
+    # xlsx不允许的控制字符被去掉
+    assert rows[3] == (2, "题目2")
+
+
+def test_export_response_headers():
+    response = export_response("成绩", "成绩", ["学号"], numbered_rows(0), "csv")
+    assert response.media_type.startswith("text/csv")
+    assert "attachment; filename*=UTF-8''" in response.headers["content-disposition"]
@@ -0,0 +1,40 @@
+"""
+Test cases for streaming upload storage
+"""
+import hashlib
+import io
+
+import pytest
+from fastapi import UploadFile
+
+from app.utils.streaming_upload import UPLOAD_CHUNK_SIZE, UploadTooLargeError, stream_upload, upload_size
+
+
+def make_upload(data: bytes) -> UploadFile:
+    return UploadFile(io.BytesIO(data), filename="lecture.pdf")
+
+
+async def test_stream_to_disk_computes_size_and_hash(tmp_path):
+    data = b"x" * (UPLOAD_CHUNK_SIZE * 2 + 123)
+    upload = make_upload(data)
+    target = tmp_path / "pdf" / "lecture.pdf"
+
+    assert upload_size(upload) == len(data)
+    stored = await stream_upload(upload, local_path=target)
+
+    assert stored.size == len(data)
+    assert stored.sha256 == hashlib.sha256(data).hexdigest()
+    assert stored.oss_url is None
+    assert target.read_bytes() == data
+
+    # 同一个上传文件可以再次读取（例如OSS失败后回退到本地）
+    again = await stream_upload(upload, local_path=tmp_path / "copy.pdf")
+    assert again.sha256 == stored.sha256
+
+
+async def test_oversized_upload_is_removed(tmp_path):
+    target = tmp_path / "big.bin"
+
+    with pytest.raises(UploadTooLargeError):
+        await stream_upload(make_upload(b"x" * (UPLOAD_CHUNK_SIZE + 1)), local_path=target, max_size=UPLOAD_CHUNK_SIZE)
+    assert not target.exists()
@@ -340,7 +340,7 @@ export default function AdminCourseCoversPage() {
                             onClick={() => handleViewImage(image)}
                           >
                             <img
-                              src={courseCoverService.getImageUrl(image.id)}
+                              src={courseCoverService.getImageUrl(image.id, 'thumbnail')}
                               alt={image.filename}
                               className="w-full h-full object-cover"
                               onError={(e) => {
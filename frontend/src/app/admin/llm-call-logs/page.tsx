@@ -8,6 +8,8 @@ import {
   LLMCallLogListItem,
   LLMCallLogDetail,
   FUNCTION_TYPE_NAMES,
+  STATUS_NAMES,
+  STATUS_CLASSES,
 } from '@/types/llmCallLog';
 
 export default function LLMCallLogsPage() {
@@ -298,13 +300,9 @@ export default function LLMCallLogsPage() {
                     </td>
                     <td className="px-6 py-4 whitespace-nowrap">
                       <span
-                        className={`px-2 inline-flex text-xs leading-5 font-semibold rounded-full ${
-                          log.status === 'success'
-                            ? 'bg-green-100 text-green-800'
-                            : 'bg-red-100 text-red-800'
-                        }`}
+                        className={`px-2 inline-flex text-xs leading-5 font-semibold rounded-full ${STATUS_CLASSES[log.status]}`}
                       >
-                        {log.status === 'success' ? '成功' : '失败'}
+                        {STATUS_NAMES[log.status]}
                       </span>
                     </td>
                     <td className="px-6 py-4 whitespace-nowrap text-sm font-medium">
@@ -423,13 +421,9 @@ export default function LLMCallLogsPage() {
                   状态
                 </label>
                 <span
-                  className={`px-2 inline-flex text-xs leading-5 font-semibold rounded-full ${
-                    selectedLog.status === 'success'
-                      ? 'bg-green-100 text-green-800'
-                      : 'bg-red-100 text-red-800'
-                  }`}
+                  className={`px-2 inline-flex text-xs leading-5 font-semibold rounded-full ${STATUS_CLASSES[selectedLog.status]}`}
                 >
-                  {selectedLog.status === 'success' ? '成功' : '失败'}
+                  {STATUS_NAMES[selectedLog.status]}
                 </span>
               </div>
             </div>
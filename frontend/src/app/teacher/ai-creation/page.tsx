@@ -20,6 +20,7 @@ export default function AICreationPage() {
   // 基础状态
   const [loading, setLoading] = useState(true);
   const [generating, setGenerating] = useState(false);
+  const [streamingContent, setStreamingContent] = useState('');
   const [saving, setSaving] = useState(false);
   const [exporting, setExporting] = useState(false);
   
@@ -349,19 +350,23 @@ export default function AICreationPage() {
     setIsEditing(false);
     setPptProjectId(null);
     setPptIframeUrl(null);
+    setStreamingContent('');
     
-    // 启动进度条模拟
+    // 启动进度条模拟（收到第一段内容后改为显示生成中的内容）
     const stopProgress = simulateProgress();
     
     try {
-      const result = await aiCreationService.generateContent({
-        knowledge_point: selectedNode!,
-        graph_id: selectedGraphId!,
-        teacher_id: teacherId!,
-        custom_prompt: customPrompt,
-        selected_resource_ids: Array.from(selectedResourceIds),
-        auxiliary_files: auxiliaryFiles,
-      });
+      const result = await aiCreationService.generateContentStream(
+        {
+          knowledge_point: selectedNode!,
+          graph_id: selectedGraphId!,
+          teacher_id: teacherId!,
+          custom_prompt: customPrompt,
+          selected_resource_ids: Array.from(selectedResourceIds),
+          auxiliary_files: auxiliaryFiles,
+        },
+        (text) => setStreamingContent((prev) => prev + text)
+      );
       
       // 停止进度条
       stopProgress();
@@ -369,11 +374,9 @@ export default function AICreationPage() {
       if (result.success && result.content) {
         setGenerationProgress(100);
         setProgressMessage('创作完成！');
-        setTimeout(() => {
-          setGeneratedContent(result.content);
-          setEditedContent(result.content);
-          setToast({ message: 'AI创作完成！', type: 'success' });
-        }, 500);
+        setGeneratedContent(result.content);
+        setEditedContent(result.content);
+        setToast({ message: 'AI创作完成！', type: 'success' });
       } else {
         setToast({ message: result.error || 'AI生成失败', type: 'error' });
       }
@@ -382,11 +385,10 @@ export default function AICreationPage() {
       console.error('AI生成失败:', error);
       setToast({ message: error.message || 'AI生成失败', type: 'error' });
     } finally {
-      setTimeout(() => {
-        setGenerating(false);
-        setGenerationProgress(0);
-        setProgressMessage('');
-      }, 1000);
+      setStreamingContent('');
+      setGenerating(false);
+      setGenerationProgress(0);
+      setProgressMessage('');
     }
   };
   
@@ -903,7 +905,13 @@ export default function AICreationPage() {
                 {contentType === 'word' ? (
                   // Word预览模式
                   <div className="h-full overflow-y-auto p-6">
-                    {generating ? (
+                    {generating && streamingContent ? (
+                      // 生成中：逐段显示AI返回的内容
+                      <div className="whitespace-pre-wrap text-sm leading-relaxed text-[#1E293B]">
+                        {streamingContent}
+                        <span className="inline-block w-2 h-4 ml-0.5 align-middle bg-[#2563EB] animate-pulse" />
+                      </div>
+                    ) : generating ? (
                   <div className="py-16 px-8">
                     {/* 进度条 */}
                     <div className="max-w-2xl mx-auto">
@@ -9,6 +9,7 @@ import teacherGradesService, {
   CourseGradeSummary,
   CourseStudentGrade,
   GradeComponent,
+  LearningAIScoreJob,
   PublishHistoryItem,
   PublishRequest,
 } from '@/services/teacherGrades.service';
@@ -55,6 +56,7 @@ export default function TeacherGradesPage() {
   const [historyItems, setHistoryItems] = useState<PublishHistoryItem[]>([]);
   const [historyLoading, setHistoryLoading] = useState(false);
   const [aiLoadingIds, setAiLoadingIds] = useState<Set<number>>(new Set());
+  const [aiScoreJob, setAiScoreJob] = useState<LearningAIScoreJob | null>(null);
 
   const classOptions = useMemo(() => {
     if (!selectedCourse) return [];
@@ -222,6 +224,35 @@ export default function TeacherGradesPage() {
     }
   };
 
+  const handleCourseAiScore = async () => {
+    if (!selectedCourseId) return;
+    const courseId = selectedCourseId;
+    const classId = classFilter === 'all' ? undefined : classFilter;
+    try {
+      let job = await teacherGradesService.startLearningAIScoreJob(courseId, { class_id: classId });
+      setAiScoreJob(job);
+      while (job.status === 'pending' || job.status === 'running') {
+        await new Promise(resolve => setTimeout(resolve, 2000));
+        job = await teacherGradesService.getLearningAIScoreJob(courseId, job.job_id);
+        setAiScoreJob(job);
+      }
+      if (job.status === 'completed') {
+        if (job.failed > 0) {
+          toast.warning(`AI评分完成：成功${job.succeeded}人，失败${job.failed}人`);
+        } else {
+          toast.success(`AI评分完成：共${job.succeeded}人`);
+        }
+      } else {
+        toast.error(job.error || 'AI评分任务未完成');
+      }
+      await loadStudents(courseId, classId);
+    } catch (error: any) {
+      toast.error(error.response?.data?.detail || 'AI评分失败');
+    } finally {
+      setAiScoreJob(null);
+    }
+  };
+
   const handleDownloadTemplate = async (examType: ExamType) => {
     if (!selectedCourseId) return;
     try {
@@ -465,6 +496,13 @@ export default function TeacherGradesPage() {
                           <option key={item.id} value={item.id}>{item.name || `班级${item.id}`}</option>
                         ))}
                       </select>
+                      <button
+                        onClick={handleCourseAiScore}
+                        disabled={!!aiScoreJob}
+                        className="px-3 py-1 text-xs font-medium text-white bg-blue-600 rounded-lg hover:bg-blue-700 disabled:opacity-50"
+                      >
+                        {aiScoreJob ? `AI评分中 ${aiScoreJob.succeeded + aiScoreJob.failed}/${aiScoreJob.total}` : '全部AI评分'}
+                      </button>
                       <button
                         onClick={() => selectedCourseId && loadStudents(selectedCourseId, classFilter === 'all' ? undefined : classFilter)}
                         className="px-3 py-1 text-xs font-medium text-slate-700 bg-slate-100 rounded-lg hover:bg-slate-200"
@@ -131,16 +131,40 @@ const CourseQAChatWindow: React.FC<CourseQAChatWindowProps> = ({
     setTimeout(scrollToBottom, 100);
 
     try {
-      // 发送消息并获取AI回复
-      const newMessages = await courseQAService.sendMessage(courseId, content);
-      
-      // 移除临时消息，添加真实消息
-      setMessages((prev) => {
-        const filtered = prev.filter(
-          (msg) => msg.id !== tempUserMessageId && msg.id !== tempAIMessageId
-        );
-        return [...filtered, ...newMessages];
+      // 发送消息，AI回复逐段显示在临时AI消息中
+      let studentSaved = false;
+      let streamedText = '';
+      const aiMessage = await courseQAService.sendMessageStream(courseId, content, {
+        onStudentMessage: (studentMessage) => {
+          studentSaved = true;
+          setMessages((prev) =>
+            prev.map((msg) => (msg.id === tempUserMessageId ? studentMessage : msg))
+          );
+        },
+        onDelta: (text) => {
+          streamedText += text;
+          const current = streamedText;
+          setMessages((prev) =>
+            prev.map((msg) => (msg.id === tempAIMessageId ? { ...msg, content: current } : msg))
+          );
+          scrollToBottom();
+        },
+      }).catch((err) => {
+        // 学生消息已保存时只移除AI消息，不恢复输入内容
+        if (studentSaved) {
+          setMessages((prev) => prev.filter((msg) => msg.id !== tempAIMessageId));
+          setError(err.message || 'AI回复生成失败，请稍后重试');
+          return null;
+        }
+        throw err;
       });
+
+      if (aiMessage) {
+        // 用保存好的AI回复替换临时消息
+        setMessages((prev) =>
+          prev.map((msg) => (msg.id === tempAIMessageId ? aiMessage : msg))
+        );
+      }
       setTimeout(scrollToBottom, 100);
     } catch (err: any) {
       console.error('发送消息失败:', err);
@@ -2,7 +2,7 @@
 
 import React, { useEffect, useState } from 'react';
 import Modal from '@/components/common/Modal';
-import { examService, ExamStatistics } from '@/services/exam.service';
+import { examService, ExamStatistics, ExamMonitorCounts, ExamMonitorDelta } from '@/services/exam.service';
 import { decodeUnicode } from '@/utils/unicode';
 
 interface ExamMonitorModalProps {
@@ -92,16 +92,40 @@ export default function ExamMonitorModal({
     }
   }, [isOpen, examId]);
 
-  // 定时刷新统计数据（每10秒）
+  // 订阅考生状态推送：连接时收到完整计数，之后只收到增量（断线后浏览器自动重连）
   useEffect(() => {
     if (!isOpen || !examId) return;
 
-    const interval = setInterval(() => {
-      loadStatistics();
-    }, 10000); // 10秒刷新一次
+    const source = new EventSource(examService.getMonitorUrl(examId, teacherId));
 
-    return () => clearInterval(interval);
-  }, [isOpen, examId]);
+    source.addEventListener('snapshot', (event) => {
+      const counts: ExamMonitorCounts = JSON.parse((event as MessageEvent).data);
+      setStatistics((prev) => prev && {
+        ...prev,
+        total_students: counts.total,
+        pending_count: counts.pending,
+        in_progress_count: counts.in_progress,
+        submitted_count: counts.submitted,
+      });
+    });
+
+    source.addEventListener('delta', (event) => {
+      const { changes }: ExamMonitorDelta = JSON.parse((event as MessageEvent).data);
+      setStatistics((prev) => {
+        if (!prev) return prev;
+        const total = Object.values(changes).reduce((sum, value) => sum + value, 0);
+        return {
+          ...prev,
+          total_students: Math.max(prev.total_students + total, 0),
+          pending_count: Math.max(prev.pending_count + (changes.pending || 0), 0),
+          in_progress_count: Math.max(prev.in_progress_count + (changes.in_progress || 0), 0),
+          submitted_count: Math.max(prev.submitted_count + (changes.submitted || 0), 0),
+        };
+      });
+    });
+
+    return () => source.close();
+  }, [isOpen, examId, teacherId]);
 
   // 倒计时更新（每秒）
   useEffect(() => {
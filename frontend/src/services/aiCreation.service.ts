@@ -2,6 +2,7 @@
  * AI创作服务
  */
 import axios from 'axios';
+import { postSSE } from '@/utils/sse';
 
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000/api/v1';
 
@@ -88,6 +89,53 @@ export const aiCreationService = {
     }
   },
 
+  /**
+   * AI生成教学内容（流式），每段增量文本回调 onDelta，结束后返回清理后的完整内容
+   */
+  generateContentStream: async (
+    data: GenerateRequest,
+    onDelta: (text: string) => void,
+    signal?: AbortSignal
+  ): Promise<GenerateResponse> => {
+    const formData = new FormData();
+    formData.append('knowledge_point', data.knowledge_point);
+    formData.append('graph_id', data.graph_id.toString());
+    formData.append('teacher_id', data.teacher_id.toString());
+    if (data.custom_prompt) {
+      formData.append('custom_prompt', data.custom_prompt);
+    }
+    if (data.selected_resource_ids && data.selected_resource_ids.length > 0) {
+      formData.append('selected_resource_ids', data.selected_resource_ids.join(','));
+    }
+    if (data.auxiliary_files && data.auxiliary_files.length > 0) {
+      data.auxiliary_files.forEach((file) => {
+        formData.append('auxiliary_files', file);
+      });
+    }
+
+    let result: GenerateResponse = { success: false, error: '生成中断' };
+    try {
+      await postSSE(
+        '/teacher/ai-creation/generate/stream',
+        formData,
+        ({ event, data: payload }) => {
+          if (event === 'delta') {
+            onDelta(payload.content);
+          } else if (event === 'done') {
+            result = { success: true, content: payload.content };
+          } else if (event === 'error') {
+            result = { success: false, error: payload.detail };
+          }
+        },
+        signal
+      );
+    } catch (error: any) {
+      console.error('AI生成内容失败:', error);
+      return { success: false, error: error.message || '生成失败' };
+    }
+    return result;
+  },
+
   /**
    * 保存AI生成的内容到系统
    */
@@ -1,9 +1,13 @@
 import apiClient from '@/lib/api-client';
 
+// 封面尺寸：thumbnail 最长边320px，card 640px，full 1280px
+export type CoverSize = 'thumbnail' | 'card' | 'full';
+
 export interface CoverImage {
   id: number;
   filename: string;
   image_url: string;
+  thumbnail_url?: string;
   file_size?: number;
   created_at?: string;
 }
@@ -49,13 +53,13 @@ class CourseCoverService {
   }
 
   /**
-   * 获取图片URL
+   * 获取图片URL（默认课程卡片尺寸，列表页不下载原图）
    */
-  getImageUrl(imageId: number): string {
+  getImageUrl(imageId: number, size: CoverSize = 'card'): string {
     // 如果 NEXT_PUBLIC_API_URL 已经包含 /api/v1，直接使用；否则添加
     const baseUrl = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000/api/v1';
     const apiBase = baseUrl.endsWith('/api/v1') ? baseUrl : `${baseUrl}/api/v1`;
-    return `${apiBase}/course-covers/${imageId}/image`;
+    return `${apiBase}/course-covers/${imageId}/image?size=${size}`;
   }
 
   /**
@@ -1,4 +1,5 @@
 import apiClient from '@/lib/api-client';
+import { postSSE } from '@/utils/sse';
 import {
   CourseQASession,
   CourseQAMessage,
@@ -45,6 +46,44 @@ class CourseQAService {
     return response.data;
   }
 
+  /**
+   * 发送学生消息，AI回复流式返回
+   * 学生消息保存后先回调 onStudentMessage，之后每段增量文本回调 onDelta；
+   * 返回保存好的AI回复消息，生成失败时抛出错误（学生消息已保存）
+   */
+  async sendMessageStream(
+    courseId: number,
+    content: string,
+    handlers: {
+      onStudentMessage?: (message: CourseQAMessage) => void;
+      onDelta?: (text: string) => void;
+    } = {},
+    signal?: AbortSignal
+  ): Promise<CourseQAMessage> {
+    let aiMessage: CourseQAMessage | null = null;
+    let errorDetail: string | null = null;
+    await postSSE(
+      `/student/courses/${courseId}/qa/messages/stream`,
+      { content } as SendMessageRequest,
+      ({ event, data }) => {
+        if (event === 'student_message') {
+          handlers.onStudentMessage?.(data);
+        } else if (event === 'delta') {
+          handlers.onDelta?.(data.content);
+        } else if (event === 'done') {
+          aiMessage = data;
+        } else if (event === 'error') {
+          errorDetail = data.detail;
+        }
+      },
+      signal
+    );
+    if (!aiMessage) {
+      throw new Error(errorDetail || 'AI回复生成失败');
+    }
+    return aiMessage;
+  }
+
   /**
    * 将消息发送给教师
    */
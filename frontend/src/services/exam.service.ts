@@ -45,6 +45,25 @@ export interface ExamCreate {
   minimum_submission_minutes: number;
 }
 
+/**
+ * 考试监控推送的考生状态计数
+ */
+export interface ExamMonitorCounts {
+  exam_id: number;
+  pending: number;
+  in_progress: number;
+  submitted: number;
+  total: number;
+}
+
+/**
+ * 考试监控推送的考生状态增量
+ */
+export interface ExamMonitorDelta {
+  exam_id: number;
+  changes: Record<string, number>;
+}
+
 export interface ExamUpdate {
   exam_paper_id?: number;
   exam_name?: string;
@@ -177,9 +196,13 @@ class ExamService {
   /**
    * 导出成绩
    */
-  async exportGrades(examId: number, teacherId: number): Promise<any> {
+  async exportGrades(examId: number, teacherId: number, format: 'xlsx' | 'csv' = 'xlsx'): Promise<Blob> {
     const response = await apiClient.get(
-      `/teacher/exams/${examId}/export-grades?teacher_id=${teacherId}`
+      `/teacher/exams/${examId}/export-grades`,
+      {
+        params: { teacher_id: teacherId, format },
+        responseType: 'blob',
+      }
     );
     return response.data;
   }
@@ -194,6 +217,15 @@ class ExamService {
     return response.data;
   }
 
+  /**
+   * 获取考试实时监控（SSE）地址
+   */
+  getMonitorUrl(examId: number, teacherId: number): string {
+    const baseUrl = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000/api/v1';
+    const apiBase = baseUrl.endsWith('/api/v1') ? baseUrl : `${baseUrl}/api/v1`;
+    return `${apiBase}/teacher/exams/${examId}/monitor?teacher_id=${teacherId}`;
+  }
+
   /**
    * 获取封面URL
    */
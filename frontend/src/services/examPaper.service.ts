@@ -82,12 +82,15 @@ export interface AutoCompositionConfig {
   question_type: string;
   count: number;
   score_per_question: number;
+  difficulty_distribution?: Record<number, number>;  // 难度比例，如 {1: 0.3, 2: 0.5, 3: 0.2}
+  knowledge_points?: string[];  // 知识点范围
 }
 
 export interface QuestionTypeConfig {
   question_type: string;
   count: number;
   score_per_question: number;
+  difficulty_distribution?: Record<number, number>;  // 难度比例
 }
 
 export interface AIAssembleConfig {
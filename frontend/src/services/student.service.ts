@@ -60,7 +60,7 @@ class StudentService {
     if (coverId) {
       const baseUrl = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
       const apiBase = baseUrl.endsWith('/api/v1') ? baseUrl : `${baseUrl}/api/v1`;
-      return `${apiBase}/course-covers/${coverId}/image`;
+      return `${apiBase}/course-covers/${coverId}/image?size=card`;
     }
     
     if (coverImage) {
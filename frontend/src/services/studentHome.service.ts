@@ -114,7 +114,8 @@ class StudentHomeService {
     if (coverId) {
       const baseUrl = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
       const apiBase = baseUrl.endsWith('/api/v1') ? baseUrl : `${baseUrl}/api/v1`;
-      return `${apiBase}/course-covers/${coverId}/image`;
+      // 首页课程卡片使用card尺寸的WebP封面
+      return `${apiBase}/course-covers/${coverId}/image?size=card`;
     }
     
     if (coverImage) {
@@ -73,6 +73,20 @@ export interface PublishHistoryItem {
   created_at: string;
 }
 
+export interface LearningAIScoreJob {
+  job_id: string;
+  course_id: number;
+  status: 'pending' | 'running' | 'completed' | 'failed' | 'cancelled';
+  total: number;
+  succeeded: number;
+  failed: number;
+  progress: number;
+  errors: { student_id: number; student_name?: string | null; error: string }[];
+  error?: string | null;
+  created_at: string;
+  finished_at?: string | null;
+}
+
 class TeacherGradesService {
   async listCourses(params?: { search?: string; class_id?: number }): Promise<CourseGradeSummary[]> {
     const response = await apiClient.get<CourseGradeSummary[]>('/teacher/grades/courses', { params });
@@ -99,6 +113,16 @@ class TeacherGradesService {
     return response.data;
   }
 
+  async startLearningAIScoreJob(courseId: number, payload?: { class_id?: number; student_ids?: number[] }): Promise<LearningAIScoreJob> {
+    const response = await apiClient.post<LearningAIScoreJob>(`/teacher/grades/courses/${courseId}/learning-ai-score/batch`, payload || {});
+    return response.data;
+  }
+
+  async getLearningAIScoreJob(courseId: number, jobId: string): Promise<LearningAIScoreJob> {
+    const response = await apiClient.get<LearningAIScoreJob>(`/teacher/grades/courses/${courseId}/learning-ai-score/jobs/${jobId}`);
+    return response.data;
+  }
+
   async downloadTemplate(courseId: number, examType: 'midterm' | 'final'): Promise<Blob> {
     const response = await apiClient.get(`/teacher/grades/courses/${courseId}/import/template`, {
       params: { exam_type: examType },
@@ -10,8 +10,8 @@ export type LLMCallLogFunctionType =
   | 'personalized_learning'
   | 'ai_quiz';
 
-// 状态枚举
-export type LLMCallLogStatus = 'success' | 'failed';
+// 状态枚举（cached：命中响应缓存，没有调用模型）
+export type LLMCallLogStatus = 'success' | 'failed' | 'cached';
 
 // 列表项类型
 export interface LLMCallLogListItem {
@@ -65,3 +65,16 @@ export const FUNCTION_TYPE_NAMES: Record<LLMCallLogFunctionType, string> = {
   personalized_learning: '个性化学习',
   ai_quiz: 'AI测评',
 };
+
+// 状态显示名称和样式
+export const STATUS_NAMES: Record<LLMCallLogStatus, string> = {
+  success: '成功',
+  failed: '失败',
+  cached: '缓存命中',
+};
+
+export const STATUS_CLASSES: Record<LLMCallLogStatus, string> = {
+  success: 'bg-green-100 text-green-800',
+  failed: 'bg-red-100 text-red-800',
+  cached: 'bg-blue-100 text-blue-800',
+};
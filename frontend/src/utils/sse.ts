@@ -0,0 +1,90 @@
+/**
+ * Server-Sent Events 读取工具
+ * EventSource 只能发GET请求，流式接口需要POST时用 fetch 读取响应流，逐条解析事件
+ */
+
+const baseUrl = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000/api/v1';
+const API_BASE_URL = baseUrl.endsWith('/api/v1') ? baseUrl : `${baseUrl}/api/v1`;
+
+export interface SSEEvent {
+  event: string;
+  data: any;
+}
+
+/**
+ * 解析一条SSE事件文本（event: / data: 行），注释行（心跳）返回null
+ */
+function parseEvent(block: string): SSEEvent | null {
+  let event = 'message';
+  const dataLines: string[] = [];
+  for (const line of block.split('\n')) {
+    if (line.startsWith('event:')) {
+      event = line.slice(6).trim();
+    } else if (line.startsWith('data:')) {
+      dataLines.push(line.slice(5).replace(/^ /, ''));
+    }
+  }
+  if (dataLines.length === 0) return null;
+  const raw = dataLines.join('\n');
+  try {
+    return { event, data: JSON.parse(raw) };
+  } catch {
+    return { event, data: raw };
+  }
+}
+
+/**
+ * POST请求流式接口，每收到一条事件调用一次 onEvent
+ * @param path 接口路径（相对于 /api/v1）
+ * @param body JSON对象或FormData
+ */
+export async function postSSE(
+  path: string,
+  body: object | FormData,
+  onEvent: (event: SSEEvent) => void,
+  signal?: AbortSignal
+): Promise<void> {
+  const headers: Record<string, string> = { Accept: 'text/event-stream' };
+  const token = typeof window !== 'undefined' ? localStorage.getItem('access_token') : null;
+  if (token) {
+    headers.Authorization = `Bearer ${token}`;
+  }
+  if (!(body instanceof FormData)) {
+    headers['Content-Type'] = 'application/json';
+  }
+
+  const response = await fetch(`${API_BASE_URL}${path}`, {
+    method: 'POST',
+    headers,
+    body: body instanceof FormData ? body : JSON.stringify(body),
+    signal,
+  });
+  if (!response.ok || !response.body) {
+    let detail = `请求失败 (${response.status})`;
+    try {
+      const data = await response.json();
+      detail = data.detail || detail;
+    } catch {
+      // 响应不是JSON时使用默认错误信息
+    }
+    throw new Error(detail);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true }).replace(/\r\n/g, '\n');
+    let boundary = buffer.indexOf('\n\n');
+    while (boundary !== -1) {
+      const parsed = parseEvent(buffer.slice(0, boundary));
+      buffer = buffer.slice(boundary + 2);
+      if (parsed) onEvent(parsed);
+      boundary = buffer.indexOf('\n\n');
+    }
+  }
+  const rest = parseEvent(buffer.trim());
+  if (rest) onEvent(rest);
+}